@@ -16,6 +16,60 @@ class Config:
     # === API Keys (Required) ===
     ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "").strip()
     N8N_URL = os.getenv("N8N_URL", "").strip()
+    # userId الذي يرسله الروبوت لـ n8n (نفس المحادثة سواء من main.py أو الـ router)
+    N8N_SESSION_ID = os.getenv("N8N_SESSION_ID", "123456").strip()
+
+    # === AI Backend ===
+    # n8n (webhook) أو openai (streaming مباشر: أول جملة تُنطق فور جاهزيتها)
+    # أو router (n8n / openai / gemini مع hedging و circuit breakers)
+    AI_BACKEND = os.getenv("AI_BACKEND", "n8n").strip().lower()
+
+    # === Direct LLM (ai_model.py) ===
+    OPEN_AI_API_KEY = os.getenv("OPEN_AI_API_KEY", "").strip()
+    # Optional OpenAI-compatible endpoint (proxy / local server)
+    OPEN_AI_BASE_URL = os.getenv("OPEN_AI_BASE_URL", "").strip()
+    AI_MODEL = os.getenv("AI_MODEL", "gpt-4o-mini").strip()
+    AI_MAX_TOKENS = int(os.getenv("AI_MAX_TOKENS", "1000"))
+    ROBOT_PROMPT = os.getenv("ROBOT_PROMPT", """
+        Act as my personal AI assistant named Ziko, designed to interact with me in a concise and informative manner.
+
+        Guidelines:
+        1. Identify yourself as "Ziko, your personal AI assistant" when asked.
+        2. Always respond politely and concisely (maximum 2-3 sentences), avoiding lengthy explanations.
+        3. Maintain full context across the conversation; never mention memory lapses.
+        4. Match the user's language (Arabic or English) in every response.
+        5. For each interaction, classify the response as "Important" or "Not Important" based on:
+           - Important: Personal data (names, birthdays, locations, hobbies), urgent/critical matters, schedules, or emotionally intense content.
+           - Not Important: Casual chat, trivia, low-priority, or non-actionable info.
+        6. Always format your reply strictly as:
+           [Status, Response]
+
+        Examples:
+        [Important, I have noted this critical task Mr. Jon.]
+        [Not Important, That's fine! Thank you for sharing.]
+        """).strip()
+
+    # ✅ Context budget: حجم الـ prompt ثابت بغض النظر عن طول المحادثة
+    AI_CONTEXT_TOKENS = int(os.getenv("AI_CONTEXT_TOKENS", "1500"))
+    AI_CONTEXT_MAX_ROWS = int(os.getenv("AI_CONTEXT_MAX_ROWS", "40"))
+    AI_SUMMARY_MIN_EVICTED = int(os.getenv("AI_SUMMARY_MIN_EVICTED", "4"))
+
+    # === Gemini (llm_router) ===
+    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "").strip()
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash").strip()
+
+    # === LLM Router ===
+    # ترتيب الأولوية: أول backend هو الأساسي والباقي للـ hedging / fallback
+    LLM_BACKENDS = [b.strip().lower() for b in os.getenv("LLM_BACKENDS", "n8n,openai,gemini").split(",") if b.strip()]
+    LLM_HEDGE = os.getenv("LLM_HEDGE", "True").strip().lower() in ("true", "1", "yes")
+    # ✅ Hedge بعد p90 من زمن الـ backend (محصور بين MIN و MAX)
+    LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "3.0"))  # قبل تجميع عينات كافية
+    LLM_HEDGE_MIN = float(os.getenv("LLM_HEDGE_MIN", "0.8"))
+    LLM_HEDGE_MAX = float(os.getenv("LLM_HEDGE_MAX", "6.0"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20.0"))
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+    LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30.0"))
+    LLM_EWMA_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
 
     # === STT Settings ===
     ELEVEN_STT_URL = os.getenv(
@@ -23,6 +77,10 @@ class Config:
         "https://api.elevenlabs.io/v1/speech-to-text"
     ).strip()
     ELEVEN_STT_MODEL = os.getenv("ELEVEN_STT_MODEL", "scribe_v1").strip()
+    ELEVEN_TTS_URL = os.getenv(
+        "ELEVEN_TTS_URL",
+        "https://api.elevenlabs.io/v1/text-to-speech"
+    ).strip()
 
     # === Interruption Settings ===
     ALLOW_INTERRUPTION = os.getenv("ALLOW_INTERRUPTION", "False").strip().lower() in ("true", "1", "yes")
@@ -36,11 +94,30 @@ class Config:
     DEFAULT_VOICE = os.getenv("DEFAULT_VOICE", "adam").strip()
 
     # === Audio Backend ===
+    # ✅ تأخير خرج الصوت التقريبي: envelope الـ TTS يُزاح به ليتزامن مع ما يُسمع
+    TTS_ENVELOPE_LATENCY = float(os.getenv("TTS_ENVELOPE_LATENCY", "0.08"))
     AUDIO_BACKEND = os.getenv("AUDIO_BACKEND", "").strip().lower()
     AUDIO_DEVICE = os.getenv("AUDIO_DEVICE", "default").strip()
+    # ✅ audio_io.py: pyaudio | sounddevice | alsa | virtual (AUDIO_INPUT_FILE ثم noise floor)
+    AUDIO_INPUT = os.getenv("AUDIO_INPUT", "pyaudio").strip().lower()
+    AUDIO_INPUT_FILE = os.getenv("AUDIO_INPUT_FILE", "").strip()
+    # "" = كل مكوّن بالـ backend الخاص به | sounddevice | alsa | capture (بدون كرت صوت)
+    AUDIO_OUTPUT = os.getenv("AUDIO_OUTPUT", "").strip().lower()
+    # Virtual input / capture output clock: 1 = real time, 0 = as fast as possible
+    AUDIO_VIRTUAL_SPEED = float(os.getenv("AUDIO_VIRTUAL_SPEED", "1.0"))
 
     # === Performance Settings ===
     STATUS_MONITOR = os.getenv("STATUS_MONITOR", "0").strip() in ("1", "true", "yes")
+    # ✅ Telemetry (telemetry.py): عينة كل STATUS_INTERVAL ثانية، آخر STATUS_HISTORY عينة في الذاكرة
+    STATUS_INTERVAL = float(os.getenv("STATUS_INTERVAL", "1.0"))
+    STATUS_HISTORY = int(os.getenv("STATUS_HISTORY", "300"))
+    # "127.0.0.1:8765" | "unix:/tmp/zico-status.sock" | "" (بدون endpoint)
+    STATUS_ADDR = os.getenv("STATUS_ADDR", "127.0.0.1:8765").strip()
+    STATUS_PRINT_EVERY = float(os.getenv("STATUS_PRINT_EVERY", "30"))  # سطر في الـ console، 0 = off
+    # ✅ Turn latency tracing (turn_trace.py): ring of the last N events, exported on exit
+    TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").strip().lower() in ("true", "1", "yes")
+    TRACE_CAPACITY = int(os.getenv("TRACE_CAPACITY", "4096"))
+    TRACE_EXPORT = os.getenv("TRACE_EXPORT", "").strip()  # "turns.jsonl" أو "turns.json" (Chrome trace)
 
     # === Recorder Settings (16k/mono/16-bit) ===
     REC_SAMPLE_RATE = int(os.getenv("REC_SAMPLE_RATE", "16000"))
@@ -70,9 +147,84 @@ class Config:
     # ✅ Retries أقل للسرعة
     RETRIES = int(os.getenv("HTTP_RETRIES", "2"))  # كان 3
 
+    # === Conversation Memory ===
+    # sqlite (WAL, append-only) أو json (الملف القديم)
+    MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "sqlite").strip().lower()
+    MEMORY_FILE = os.getenv("MEMORY_FILE", "chat-memory.json").strip()
+    MEMORY_DB = os.getenv("MEMORY_DB", "chat-memory.db").strip()
+    MEMORY_SESSION_ID = os.getenv("SESSION_ID", "robot-1").strip()
+    # Retention (one policy, both backends): آخر MEMORY_KEEP_* لكل تصنيف، ثم حذف الأقدم
+    # من Not Important حتى يصبح الحجم ضمن MEMORY_MAX_BYTES (Important: MEMORY_KEEP_IMPORTANT فقط)
+    MEMORY_MAX_BYTES = int(os.getenv("MEMORY_MAX_BYTES", "10000"))
+    MEMORY_KEEP_IMPORTANT = int(os.getenv("MEMORY_KEEP_IMPORTANT", "200"))
+    MEMORY_KEEP_NOT_IMPORTANT = int(os.getenv("MEMORY_KEEP_NOT_IMPORTANT", "50"))
+
+    # ✅ Write-behind: الحفظ في ثريد خلفي بدل مسار رد الـ AI
+    MEMORY_WRITE_BEHIND = os.getenv("MEMORY_WRITE_BEHIND", "True").strip().lower() in ("true", "1", "yes")
+    MEMORY_FLUSH_INTERVAL = float(os.getenv("MEMORY_FLUSH_INTERVAL", "2.0"))
+    MEMORY_FLUSH_BYTES = int(os.getenv("MEMORY_FLUSH_BYTES", "4096"))
+
     # === Camera Settings (لو استخدمت Face Tracking) ===
     CAMERA_INDEX = int(os.getenv("CAMERA_INDEX", "0"))
     CAMERA_FLIP = os.getenv("CAMERA_FLIP", "False").strip().lower() in ("true", "1", "yes")
+    # ✅ Face detection في thread منفصل (face_pipeline.py): على frame مصغّر وبمعدل يتبع زمن الـ inference
+    FACE_DETECT_SCALE = float(os.getenv("FACE_DETECT_SCALE", "0.5"))
+    FACE_DETECT_MAX_FPS = float(os.getenv("FACE_DETECT_MAX_FPS", "15"))
+    FACE_DETECT_IDLE_FPS = float(os.getenv("FACE_DETECT_IDLE_FPS", "4"))   # لا يوجد وجه
+    FACE_DETECT_DUTY = float(os.getenv("FACE_DETECT_DUTY", "0.5"))         # حصة الكشف من core واحد
+    # ✅ Detect-then-track: template tracker بين الـ detections، والكشف فقط عند ضعف الثقة أو كل N خطوة
+    FACE_TRACK = os.getenv("FACE_TRACK", "True").strip().lower() in ("true", "1", "yes")
+    FACE_REDETECT_EVERY = int(os.getenv("FACE_REDETECT_EVERY", "15"))
+    FACE_TRACK_MIN_SCORE = float(os.getenv("FACE_TRACK_MIN_SCORE", "0.6"))
+    FACE_ROI_MARGIN = float(os.getenv("FACE_ROI_MARGIN", "1.0"))           # ROI = الوجه + margin × حجمه
+    # ✅ Continuous gaze (gaze_motion.py): One-Euro filter — min_cutoff أقل = أنعم، beta أعلى = أسرع
+    GAZE_MIN_CUTOFF = float(os.getenv("GAZE_MIN_CUTOFF", "1.0"))
+    GAZE_BETA = float(os.getenv("GAZE_BETA", "0.05"))
+    GAZE_RELEASE_AFTER = float(os.getenv("GAZE_RELEASE_AFTER", "1.5"))   # ثواني بلا وجه → العودة للحركة الطبيعية
+    GAZE_RANGE_X = float(os.getenv("GAZE_RANGE_X", "75"))   # أقصى إزاحة للقزحية (pixels)
+    GAZE_RANGE_Y = float(os.getenv("GAZE_RANGE_Y", "25"))
+    # Servo: سرعة قصوى (°/s)، أقل تغيّر يُرسل، وأقل زمن بين رسالتين
+    SERVO_MAX_SPEED = float(os.getenv("SERVO_MAX_SPEED", "120"))
+    SERVO_DEADBAND = float(os.getenv("SERVO_DEADBAND", "1"))
+    SERVO_MIN_INTERVAL = float(os.getenv("SERVO_MIN_INTERVAL", "0.05"))
+    # ✅ Serial writer (servo_channel.py): thread منفصل، آخر قيمة فقط، حد أقصى للـ frames/s
+    SERVO_MAX_RATE = float(os.getenv("SERVO_MAX_RATE", "20"))
+    SERVO_ACK = os.getenv("SERVO_ACK", "False").strip().lower() in ("true", "1", "yes")  # الـ sketch يرد بسطر
+    SERVO_ACK_TIMEOUT = float(os.getenv("SERVO_ACK_TIMEOUT", "0.2"))
+
+    # === Eye Rendering ===
+    EYE_FPS = float(os.getenv("EYE_FPS", "30"))
+    # ✅ معدل أقل أثناء STT / TTS لترك الـ CPU للصوت والشبكة
+    EYE_BUSY_FPS = float(os.getenv("EYE_BUSY_FPS", "15"))
+    # [Eyes] scheduler stats في الـ console كل N ثانية، 0 = off
+    EYE_STATS_EVERY = float(os.getenv("EYE_STATS_EVERY", "0"))
+
+    # === Eye Atlas (eye_runner.py) ===
+    # off | ram | mmap — mmap: cache على القرص يُبنى مرة واحدة (مناسب لـ Pi Zero)
+    EYE_ATLAS = os.getenv("EYE_ATLAS", "off").strip().lower()
+    EYE_ATLAS_DIR = os.getenv("EYE_ATLAS_DIR", "Resources/cache").strip()
+    EYE_ATLAS_BLINK_LEVELS = int(os.getenv("EYE_ATLAS_BLINK_LEVELS", "4"))
+
+    # === Video Eyes (video_frame_source.py) ===
+    # ✅ decode عند الطلب + LRU محدود بدل تحميل كل الـ frames (Pi Zero: 24MB, 0.5, gray)
+    VIDEO_CACHE_MB = float(os.getenv("VIDEO_CACHE_MB", "64"))
+    VIDEO_SCALE = float(os.getenv("VIDEO_SCALE", "1.0"))
+    VIDEO_STORAGE = os.getenv("VIDEO_STORAGE", "bgr").strip().lower()  # bgr | gray
+    VIDEO_READAHEAD = int(os.getenv("VIDEO_READAHEAD", "8"))
+    # ✅ Raw frame store (frame_store.py): تحويل مرة واحدة ثم mmap — loop بدون seek
+    # يُستخدم فقط إذا كانت الملفات موجودة: python frame_store.py Resources/eye_videos --size 1280x720
+    VIDEO_STORE = os.getenv("VIDEO_STORE", "True").strip().lower() in ("true", "1", "yes")
+    VIDEO_STORE_DIR = os.getenv("VIDEO_STORE_DIR", "Resources/cache/frames").strip()
+    VIDEO_STORE_SIZE = os.getenv("VIDEO_STORE_SIZE", "").strip()  # e.g. 1280x720 (فارغ = الحجم الأصلي)
+    # ✅ Transitions: درجات الـ fade المحسوبة مسبقاً + دقة المزج (0.5 = نصف الدقة)
+    VIDEO_TRANSITION_STEPS = int(os.getenv("VIDEO_TRANSITION_STEPS", "32"))
+    VIDEO_TRANSITION_SCALE = float(os.getenv("VIDEO_TRANSITION_SCALE", "1.0"))
+
+    # === Eye Process (eye_process.py) ===
+    # ✅ الـ renderer في process منفصل (لا يتنافس مع الصوت على الـ GIL)
+    EYE_PROCESS = os.getenv("EYE_PROCESS", "False").strip().lower() in ("true", "1", "yes")
+    # مشاركة آخر إطار عبر shared_memory (للمعاينة / البث)
+    EYE_FRAME_SHM = os.getenv("EYE_FRAME_SHM", "False").strip().lower() in ("true", "1", "yes")
 
     # === Validation ===
     def __init__(self):
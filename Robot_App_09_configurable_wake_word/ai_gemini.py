@@ -0,0 +1,66 @@
+# ai_gemini.py
+# Google Gemini backend (same [Status, Response] prompt and memory as ai_model)
+
+import chat_history_manager as history
+from context_builder import ContextBuilder
+from Config import Config
+
+try:
+    import google.generativeai as genai
+    _HAS_GENAI = True
+except ImportError:
+    _HAS_GENAI = False
+
+_model = None
+
+# Summaries are refreshed by ai_model; Gemini only reads them
+context = ContextBuilder(
+    summarizer=None,
+    token_budget=Config.AI_CONTEXT_TOKENS,
+    max_rows=Config.AI_CONTEXT_MAX_ROWS,
+)
+
+def is_available():
+    return _HAS_GENAI and bool(Config.GEMINI_API_KEY)
+
+def _get_model():
+    global _model
+    if _model is None:
+        if not _HAS_GENAI:
+            raise RuntimeError("google-generativeai is not installed")
+        genai.configure(api_key=Config.GEMINI_API_KEY)
+        _model = genai.GenerativeModel(Config.GEMINI_MODEL, system_instruction=Config.ROBOT_PROMPT)
+    return _model
+
+def build_prompt(user_input):
+    """Flatten the budgeted context (summary + history) into one prompt"""
+    messages = context.build(Config.ROBOT_PROMPT, user_input)
+    lines = []
+    for message in messages[1:-1]:
+        role = {"system": "Context", "user": "User", "assistant": "AI"}[message["role"]]
+        lines.append(f"{role}: {message['content']}")
+    lines.append(f"User: {user_input}")
+    return "\n".join(lines)
+
+def generate(user_input):
+    """Raw '[Status, Response]' answer (raises on failure, no memory update)"""
+    response = _get_model().generate_content(build_prompt(user_input))
+    return response.text.strip()
+
+def remember(user_input, ai_response):
+    """Parse the status prefix and store the turn; returns the spoken text"""
+    status, req_response = history.parse_status(ai_response)
+    history.record_turn(user_input, req_response, status)
+    return req_response
+
+def chat(user_input):
+    if not user_input:
+        return ""
+    try:
+        return remember(user_input, generate(user_input))
+    except Exception as e:
+        print(f"[Gemini] ❌ Error: {e}")
+        return "Sorry, an error occurred during processing"
+
+if __name__ == "__main__":
+    print(chat("Hello"))
@@ -1,69 +1,263 @@
 # ------------------- Import Libraries -------------------
+import re
+import time
+
 from openai import OpenAI
 import chat_history_manager as history
+from chat_history_manager import parse_status
+from context_builder import ContextBuilder
 from Config import Config
 from functools import lru_cache
 
 config = Config()
-client = OpenAI(api_key=config.OPEN_AI_API_KEY)
+client = OpenAI(api_key=config.OPEN_AI_API_KEY, base_url=config.OPEN_AI_BASE_URL or None)
 
 ROBOT_PROMPT = config.ROBOT_PROMPT
 
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and their voice assistant. "
+    "Merge the previous summary with the new turns. Keep names, dates, preferences and open tasks; "
+    "drop small talk. Answer with the summary only, in at most 120 words."
+)
+
+ERROR_RESPONSE = "Sorry, an error occurred during processing"
+# Appended to the stored answer when the user cut the robot off
+INTERRUPTED_MARK = "(interrupted)"
+
 # Cache for similar responses
 @lru_cache(maxsize=50)
 def get_cached_response(user_input_hash):
     """Cache for repeated responses"""
     return None
 
-def ai_model_response(u_input, conversation):
-    """Optimized AI call"""
+def summarize_exchanges(previous_summary, exchanges):
+    """Fold evicted turns into the rolling summary (runs off the response path)"""
+    turns = "\n".join(
+        f"User: {row['user_input']}\nAI: {row['ai_response']}"
+        for row in exchanges
+    )
     response = client.chat.completions.create(
-        model="gpt-4o-mini",  # Using faster model
+        model=config.AI_MODEL,
         messages=[
-            {"role": "system", "content": ROBOT_PROMPT},
-            {"role": "user", "content": f"{conversation}\nUser: {u_input}"}
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Previous summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{turns}"}
         ],
-        max_tokens=1000,  # Reduced tokens for faster response
+        max_tokens=200,
+        temperature=0.2,
+    )
+    return response.choices[0].message.content.strip()
+
+# Token-budgeted history + rolling summary
+context = ContextBuilder(
+    summarizer=summarize_exchanges,
+    token_budget=config.AI_CONTEXT_TOKENS,
+    max_rows=config.AI_CONTEXT_MAX_ROWS,
+    summary_min_evicted=config.AI_SUMMARY_MIN_EVICTED,
+)
+
+def build_messages(u_input):
+    """System prompt + summary + newest history within the token budget"""
+    return context.build(ROBOT_PROMPT, u_input)
+
+def ai_model_response(messages):
+    """Optimized AI call"""
+    response = client.chat.completions.create(
+        model=config.AI_MODEL,  # Using faster model
+        messages=messages,
+        max_tokens=config.AI_MAX_TOKENS,
         temperature=0.7,
-        stream=False  # Can enable stream for progressive response
+        stream=False  # chat_stream() is the streaming variant
     )
-    
+
     return response.choices[0].message.content.strip()
 
+def generate(user_input):
+    """Raw '[Status, Response]' answer (raises on failure, no memory update)"""
+    return ai_model_response(build_messages(user_input))
+
+def remember(user_input, ai_response):
+    """Parse the status prefix and store the turn; returns the spoken text"""
+    status, req_response = parse_status(ai_response)
+    history.record_turn(user_input, req_response, status)
+    return req_response
+
 def chat(user_input):
     """Optimized chat function"""
     if not user_input:
         return ""
-    
+
     try:
-        # Get only last 5 messages to reduce context
-        conversation_history = history.get_limited_conversation_history(5)
-        ai_response = ai_model_response(user_input, conversation_history)
+        ai_response = generate(user_input)
 
         # Process response
-        if ai_response.startswith("[") and ai_response.endswith("]"):
-            try:
-                status, req_response = ai_response.strip('[]').split(", ", 1)
-            except ValueError:
-                status = "Not Important"
-                req_response = ai_response
-        else:
-            status = "Not Important"
-            req_response = ai_response
-
-        # Update memory asynchronously (in background)
-        history.update_memory(user_input, req_response, status)
-        
-        # Automatic memory cleanup
-        percentage, _ = history.check_memory_percentage()
-        if percentage > 10:
-            history.delete_not_important_memory()
-        
-        return req_response
-        
+        return remember(user_input, ai_response)
+
     except Exception as e:
         print(f"AI error: {e}")
-        return "Sorry, an error occurred during processing"
+        return ERROR_RESPONSE
+
+# ------------------- Streaming -------------------
+class StatusPrefixParser:
+    """
+    Incremental parser for the '[Status, ' prefix.
+    feed() returns the response text that is safe to speak so far.
+    """
+
+    MAX_PREFIX_CHARS = 24  # longer than "[Not Important, " → no prefix
+
+    def __init__(self):
+        self.status = "Not Important"
+        self.has_prefix = False
+        self._decided = False
+        self._buffer = ""
+        self.text = ""
+
+    def feed(self, delta):
+        if self._decided:
+            self.text += delta
+            return delta
+
+        self._buffer += delta
+        head = self._buffer.lstrip()
+        if not head:
+            return ""
+
+        if not head.startswith("["):
+            return self._decide(head)
+
+        sep = head.find(", ")
+        if sep != -1:
+            self.status = head[1:sep].strip() or self.status
+            self.has_prefix = True
+            return self._decide(head[sep + 2:])
+
+        if len(head) > self.MAX_PREFIX_CHARS:
+            return self._decide(head)
+
+        return ""
+
+    def _decide(self, text):
+        self._decided = True
+        self._buffer = ""
+        self.text += text
+        return text
+
+    def finish(self):
+        """Full response text (closing ']' removed)"""
+        if not self._decided:
+            self._decide(self._buffer.lstrip())
+        text = self.text.strip()
+        if self.has_prefix and text.endswith("]"):
+            text = text[:-1].rstrip()
+        return text
+
+
+class SentenceSplitter:
+    """Yields complete sentences as soon as they form"""
+
+    _END = re.compile(r'[.!?؟…\n]+["\')\]]*\s+')
+
+    def __init__(self, min_chars=12):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text):
+        self._buffer += text
+        sentences = []
+        start = 0
+        for m in self._END.finditer(self._buffer):
+            candidate = self._buffer[start:m.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = m.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        tail, self._buffer = self._buffer.strip(), ""
+        return tail
+
+
+def chat_stream(user_input, spoken=None):
+    """
+    Streaming chat: yields complete sentences as soon as they form.
+    The '[Status, ...]' prefix is parsed incrementally and never spoken;
+    the memory update runs once the stream has ended.
+    spoken: list the consumer fills with the sentences it actually said. The
+    generator then ends with a None item and records the turn when it is closed:
+    the full answer if every sentence was said, otherwise (barge-in) only the
+    spoken sentences marked INTERRUPTED_MARK; an open HTTP stream is closed.
+    """
+    if not user_input:
+        return
+
+    parser = StatusPrefixParser()
+    splitter = SentenceSplitter()
+    yielded = False
+    sentences = 0
+    req_response = None
+    stream = None
+    start = time.perf_counter()
+
+    try:
+        messages = build_messages(user_input)
+        stream = client.chat.completions.create(
+            model=config.AI_MODEL,
+            messages=messages,
+            max_tokens=config.AI_MAX_TOKENS,
+            temperature=0.7,
+            stream=True
+        )
+
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+
+            for sentence in splitter.feed(parser.feed(delta)):
+                if not yielded:
+                    print(f"[AI] ⚡ First sentence in {time.perf_counter() - start:.2f}s")
+                yielded = True
+                sentences += 1
+                yield sentence
+
+        req_response = parser.finish()
+        tail = splitter.flush()
+        if parser.has_prefix and tail.endswith("]"):
+            tail = tail[:-1].rstrip()
+        if tail:
+            yielded = True
+            sentences += 1
+            yield tail
+
+        print(f"[AI] ✅ Stream done in {time.perf_counter() - start:.2f}s")
+
+        if spoken is not None:
+            # Wait (suspended) until the consumer has finished speaking and closes us
+            yield None
+
+    except GeneratorExit:
+        if req_response is not None and len(spoken or []) >= sentences:
+            history.record_turn(user_input, req_response, parser.status)
+            return
+        # Barge-in: stop reading tokens and remember only what the user heard
+        if stream is not None:
+            stream.close()
+        heard = " ".join(spoken or [])
+        print(f"[AI] ✋ Interrupted after {len(spoken or [])}/{sentences} sentences")
+        history.record_turn(user_input, f"{heard} {INTERRUPTED_MARK}".lstrip(), parser.status)
+        return
+
+    except Exception as e:
+        print(f"AI error: {e}")
+        if not yielded:
+            yield ERROR_RESPONSE
+        return
+
+    # Deferred until the whole answer is known
+    history.record_turn(user_input, req_response, parser.status)
 
 if __name__ == "__main__":
     chat("Hello")
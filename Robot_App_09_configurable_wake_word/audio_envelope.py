@@ -0,0 +1,196 @@
+# audio_envelope.py
+# Amplitude envelope of the TTS playback, for talking animation
+# - RMS per 20ms hop, computed vectorized when the PCM is queued for playback (no analysis thread)
+# - Timestamped with time.monotonic() (same clock in every process): renderers ask level(now)
+# - Double buffer: a new utterance is written into the back buffer then `front` flips;
+#   streamed chunks append after `count` and bump it last. Readers never take a lock
+#   (retry if `seq` moved while sampling)
+# - share(): move the buffers into shared_memory so the eye process (eye_process.py) can read them
+#
+# Demo: python audio_envelope.py
+
+import atexit
+import math
+import struct
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+HOP_SECONDS = 0.02
+MAX_SECONDS = 60.0
+
+# seq, front  |  per buffer: t0 (monotonic), hop, count
+_GLOBAL = struct.Struct("<II")
+_BUFFER = struct.Struct("<dfI")
+_BUFFER_OFFSETS = (8, 24)
+_VALUES_OFFSET = 64
+
+
+def rms_envelope(pcm: np.ndarray, sample_rate: int, hop: float = HOP_SECONDS) -> np.ndarray:
+    """RMS لكل hop (0..1 من full scale) — vectorized، آخر hop ناقص يُحسب على ما فيه"""
+    samples = np.asarray(pcm)
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) * (1.0 / 32768.0)
+    else:
+        samples = samples.astype(np.float32, copy=False)
+    n = max(1, int(round(sample_rate * hop)))
+    full = len(samples) // n
+    out = np.empty(full + (1 if len(samples) % n else 0), dtype=np.float32)
+    if full:
+        frames = samples[:full * n].reshape(full, n)
+        np.sqrt(np.einsum("ij,ij->i", frames, frames) / n, out=out[:full])
+    if len(out) > full:
+        tail = samples[full * n:]
+        out[full] = np.sqrt(np.dot(tail, tail) / len(tail))
+    return out
+
+
+class EnvelopeChannel:
+    """
+    الكاتب: TTS (publish عند بدء التشغيل، append للـ chunks، clear عند المقاطعة)
+    القارئ: renderer → level(time.monotonic())
+    """
+
+    def __init__(self, max_seconds: float = MAX_SECONDS, hop: float = HOP_SECONDS,
+                 name: Optional[str] = None, reference: float = 0.25):
+        self.hop = float(hop)
+        self.capacity = int(max_seconds / hop)
+        self.reference = float(reference)  # RMS that maps to level 1.0 (speech peaks ≈ 0.2-0.3)
+        self.size = _VALUES_OFFSET + 2 * 4 * self.capacity
+        self._lock = threading.Lock()  # writers only
+        self.shm = None
+        self.owner = name is None
+        if name is None:
+            self._buf = bytearray(self.size)
+        else:
+            from shm_util import attach
+            self.shm = attach(name)
+            self._buf = self.shm.buf
+        self._map()
+
+    def _map(self) -> None:
+        self._values = [
+            np.ndarray((self.capacity,), dtype=np.float32, buffer=self._buf,
+                       offset=_VALUES_OFFSET + i * 4 * self.capacity)
+            for i in range(2)
+        ]
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.shm.name if self.shm is not None else None
+
+    def share(self) -> str:
+        """نقل الـ buffers إلى shared_memory (مرة واحدة) وإرجاع الاسم"""
+        with self._lock:
+            if self.shm is None:
+                from shm_util import create
+                self.shm = create(self.size)
+                self.shm.buf[:self.size] = bytes(self._buf)
+                self._buf = self.shm.buf
+                self._map()
+                atexit.register(self.close)
+        return self.shm.name
+
+    # ---------------- Writer ----------------
+
+    def publish(self, pcm: np.ndarray, sample_rate: int, start_time: Optional[float] = None) -> int:
+        """Utterance جديد: envelope كامل في الـ back buffer ثم flip"""
+        env = rms_envelope(pcm, sample_rate, self.hop)[:self.capacity]
+        start_time = time.monotonic() if start_time is None else start_time
+        with self._lock:
+            seq, front = _GLOBAL.unpack_from(self._buf, 0)
+            back = 1 - front
+            self._values[back][:len(env)] = env
+            _BUFFER.pack_into(self._buf, _BUFFER_OFFSETS[back], start_time, self.hop, len(env))
+            _GLOBAL.pack_into(self._buf, 0, seq + 1, back)
+        return len(env)
+
+    def append(self, pcm: np.ndarray, sample_rate: int) -> int:
+        """Chunk تالٍ لنفس الـ utterance (streaming): القيم أولاً ثم count"""
+        env = rms_envelope(pcm, sample_rate, self.hop)
+        with self._lock:
+            _, front = _GLOBAL.unpack_from(self._buf, 0)
+            t0, hop, count = _BUFFER.unpack_from(self._buf, _BUFFER_OFFSETS[front])
+            n = min(len(env), self.capacity - count)
+            if n <= 0:
+                return 0
+            self._values[front][count:count + n] = env[:n]
+            _BUFFER.pack_into(self._buf, _BUFFER_OFFSETS[front], t0, hop, count + n)
+        return n
+
+    def clear(self) -> None:
+        """إيقاف / مقاطعة: لا amplitude بعد الآن"""
+        with self._lock:
+            seq, front = _GLOBAL.unpack_from(self._buf, 0)
+            back = 1 - front
+            _BUFFER.pack_into(self._buf, _BUFFER_OFFSETS[back], 0.0, self.hop, 0)
+            _GLOBAL.pack_into(self._buf, 0, seq + 1, back)
+
+    # ---------------- Reader (lock-free) ----------------
+
+    def sample(self, now: Optional[float] = None) -> float:
+        """RMS (0..1 full scale) عند الوقت now (time.monotonic)؛ 0 خارج الكلام"""
+        now = time.monotonic() if now is None else now
+        while True:
+            seq, front = _GLOBAL.unpack_from(self._buf, 0)
+            t0, hop, count = _BUFFER.unpack_from(self._buf, _BUFFER_OFFSETS[front])
+            index = math.floor((now - t0) / hop) if hop > 0 else -1  # floor: int() maps the hop before t0 to 0
+            value = float(self._values[front][index]) if 0 <= index < count else 0.0
+            if _GLOBAL.unpack_from(self._buf, 0)[0] == seq:
+                return value
+
+    def level(self, now: Optional[float] = None) -> float:
+        """Amplitude مطبّع 0..1 للـ animation"""
+        return min(1.0, self.sample(now) / self.reference)
+
+    def close(self) -> None:
+        shm, self.shm = self.shm, None
+        self._values = None
+        self._buf = None
+        if shm is not None:
+            try:
+                shm.close()
+                if self.owner:
+                    shm.unlink()
+            except Exception:
+                pass
+
+
+# Process-wide channel: TTS publishes, renderers (or eye_process) sample
+envelope = EnvelopeChannel()
+
+
+# ✅ Quick check
+if __name__ == "__main__":
+    rate = 16000
+    t = np.arange(rate * 2) / rate
+    # 2s "speech": 4 Hz syllable bursts on a 220 Hz tone
+    pcm = (np.sin(2 * np.pi * 220 * t) * np.clip(np.sin(2 * np.pi * 4 * t), 0, 1) * 12000).astype(np.int16)
+
+    start = time.perf_counter()
+    for _ in range(100):
+        rms_envelope(pcm, rate)
+    print(f"Envelope of 2s PCM: {(time.perf_counter() - start) * 10:.3f}ms ({len(rms_envelope(pcm, rate))} hops)")
+
+    now = time.monotonic()
+    envelope.publish(pcm[:rate], rate, start_time=now)
+    envelope.append(pcm[rate:], rate)
+    levels = [envelope.level(now + i * 0.0625) for i in range(32)]
+    print("Levels @16Hz:", " ".join(f"{v:.2f}" for v in levels))
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        envelope.level()
+    print(f"level(): {(time.perf_counter() - start) * 100:.2f}µs per sample")
+
+    name = envelope.share()
+    reader = EnvelopeChannel(name=name)
+    print(f"Shared reader at +0.125s: {reader.level(now + 0.125):.2f} (writer {envelope.level(now + 0.125):.2f})")
+    envelope.clear()
+    print(f"After clear: {reader.level(now + 0.125):.2f}")
+    reader.close()
+    envelope.close()
@@ -0,0 +1,527 @@
+# audio_io.py
+# Audio I/O abstraction: one small API over real sound devices and virtual ones
+# Inputs — read(frames, exception_on_overflow=False) → bytes (same call as a PyAudio stream):
+#   - PyAudioInput / SoundDeviceInput / AlsaInput: real capture
+#   - VirtualInput: file/array driven, real-time or accelerated clock (clock() = audio time,
+#     AudioRecorder's VAD follows it), noise floor when nothing is queued
+# Outputs — play(pcm, rate) / is_active() / wait() / stop() / close():
+#   - SoundDeviceOutput / AlsaOutput: real playback
+#   - CaptureOutput: records what would have been played (start / end timestamps, interrupted,
+#     optionally the samples) into a shared CaptureLog, at real-time or accelerated speed
+# - open_input() / open_output(): backend from Config (AUDIO_INPUT / AUDIO_OUTPUT)
+#   so VAD, barge-in and playback run on CI boxes with no sound card
+#
+# Demo: python audio_io.py
+
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from Config import Config
+
+try:
+    import pyaudio
+    _HAS_PYAUDIO = True
+except Exception:
+    pyaudio = None  # type: ignore
+    _HAS_PYAUDIO = False
+
+try:
+    import sounddevice as sd
+    _HAS_SOUNDDEVICE = True
+except Exception:
+    sd = None  # type: ignore
+    _HAS_SOUNDDEVICE = False
+
+try:
+    import alsaaudio
+    _HAS_ALSA = True
+except Exception:
+    alsaaudio = None  # type: ignore
+    _HAS_ALSA = False
+
+
+def load_wav(path: str, rate: int = 16000) -> np.ndarray:
+    """WAV → int16 mono بالـ rate المطلوب (mix down + linear resample إذا لزم)"""
+    with wave.open(path, "rb") as wf:
+        src_rate, channels, width = wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+        raw = wf.readframes(wf.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit PCM is supported")
+    pcm = np.frombuffer(raw, dtype=np.int16)
+    if channels == 1 and src_rate == rate:
+        return pcm.copy()
+    pcm = pcm.astype(np.float64)
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1)
+    if src_rate != rate:
+        n = int(len(pcm) * rate / src_rate)
+        pcm = np.interp(np.linspace(0, len(pcm) - 1, n), np.arange(len(pcm)), pcm)
+    return np.clip(pcm, -32768, 32767).astype(np.int16)
+
+
+# ==========================================
+# INPUTS
+# ==========================================
+
+class PyAudioInput:
+    """PyAudio capture stream (الـ backend الافتراضي لـ AudioRecorder)"""
+
+    def __init__(self, rate: int = 16000, channels: int = 1, width: int = 2, chunk: int = 1024,
+                 device_index: Optional[int] = None):
+        if not _HAS_PYAUDIO:
+            raise RuntimeError(
+                "PyAudio is not installed/available. "
+                "Install it first (Windows: pip install pipwin && pipwin install pyaudio) "
+                "or on Linux: sudo apt-get install portaudio19-dev && pip install pyaudio."
+            )
+        try:
+            self._pa = pyaudio.PyAudio()
+        except Exception as ex:
+            raise RuntimeError(f"Failed to initialize PyAudio: {ex}")
+
+        kwargs = dict(
+            format=self._pa.get_format_from_width(width),
+            channels=channels,
+            rate=rate,
+            input=True,
+            frames_per_buffer=chunk
+        )
+        if device_index is not None:
+            kwargs["input_device_index"] = device_index
+        try:
+            self._stream = self._pa.open(**kwargs)
+        except Exception as ex:
+            self._pa.terminate()
+            raise RuntimeError(f"Failed to open input stream: {ex}")
+
+        # Prime the stream to reduce latency
+        try:
+            self._stream.read(chunk, exception_on_overflow=False)
+        except Exception:
+            pass
+
+    def read(self, frames: int, exception_on_overflow: bool = False) -> bytes:
+        return self._stream.read(frames, exception_on_overflow=exception_on_overflow)
+
+    def stop_stream(self) -> None:
+        self._stream.stop_stream()
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._pa.terminate()
+
+
+class SoundDeviceInput:
+    """sounddevice RawInputStream (int16)"""
+
+    def __init__(self, rate: int = 16000, channels: int = 1, width: int = 2, chunk: int = 1024,
+                 device=None):
+        if not _HAS_SOUNDDEVICE:
+            raise RuntimeError("sounddevice is not installed/available (pip install sounddevice)")
+        if width != 2:
+            raise ValueError("SoundDeviceInput supports 16-bit samples only")
+        self._stream = sd.RawInputStream(samplerate=rate, channels=channels, dtype="int16",
+                                         blocksize=chunk, device=device)
+        self._stream.start()
+        self.overflows = 0
+
+    def read(self, frames: int, exception_on_overflow: bool = False) -> bytes:
+        data, overflowed = self._stream.read(frames)
+        if overflowed:
+            self.overflows += 1
+            if exception_on_overflow:
+                raise IOError("Input overflowed")
+        return bytes(data)
+
+    def stop_stream(self) -> None:
+        self._stream.stop()
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class AlsaInput:
+    """ALSA capture (pyalsaaudio) — بدون PortAudio على الـ Pi"""
+
+    def __init__(self, rate: int = 16000, channels: int = 1, width: int = 2, chunk: int = 1024,
+                 device: str = "default"):
+        if not _HAS_ALSA:
+            raise RuntimeError("pyalsaaudio is not installed/available (pip install pyalsaaudio)")
+        if width != 2:
+            raise ValueError("AlsaInput supports 16-bit samples only")
+        self._pcm = alsaaudio.PCM(type=alsaaudio.PCM_CAPTURE, mode=alsaaudio.PCM_NORMAL, device=device,
+                                  channels=channels, rate=rate, format=alsaaudio.PCM_FORMAT_S16_LE,
+                                  periodsize=chunk)
+        self._bytes_per_frame = width * channels
+        self._buf = b""
+
+    def read(self, frames: int, exception_on_overflow: bool = False) -> bytes:
+        need = frames * self._bytes_per_frame
+        while len(self._buf) < need:
+            length, data = self._pcm.read()
+            if length < 0:  # -EPIPE: overrun
+                if exception_on_overflow:
+                    raise IOError("Input overflowed")
+                continue
+            self._buf += data
+        out, self._buf = self._buf[:need], self._buf[need:]
+        return out
+
+    def stop_stream(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._pcm.close()
+
+
+class VirtualInput:
+    """
+    مصدر صوت وهمي بنفس واجهة الـ stream: read(frames) → bytes
+        mic = VirtualInput(speed=0)              # 0: أسرع ما يمكن، 1: زمن حقيقي
+        end_at = mic.queue(pcm, lead=1.2)        # يرجع clock() عند نهاية الكلام
+        mic.append(load_wav("stop.wav"))         # يضيف بعد ما هو موجود
+        recorder = AudioRecorder(stream=mic)
+    عندما لا يوجد شيء في الطابور يعطي noise floor (مثل ميكروفون حقيقي) بدل الصمت التام.
+    """
+
+    def __init__(self, rate: int = 16000, speed: float = 1.0, noise_rms: float = 30.0, seed: int = 0,
+                 max_backlog: float = 0.1):
+        self.rate = rate
+        self.speed = float(speed)
+        self.max_backlog = max_backlog  # like a device buffer: nobody reading ≠ reads that return at once
+        self.noise_rms = float(noise_rms)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()  # main + barge-in threads may share one recorder
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._pos = 0  # samples delivered since creation
+        self._wall_start = time.perf_counter()
+
+    @classmethod
+    def from_wav(cls, path: str, rate: int = 16000, **kwargs) -> "VirtualInput":
+        mic = cls(rate=rate, **kwargs)
+        mic.append(load_wav(path, rate))
+        return mic
+
+    def clock(self) -> float:
+        """زمن الصوت (ثواني) — الـ VAD يستخدمه بدل time.time"""
+        return self._pos / self.rate
+
+    @property
+    def pending(self) -> float:
+        """ثواني الصوت المتبقية في الطابور"""
+        return len(self._pending) / self.rate
+
+    def queue(self, pcm: np.ndarray, lead: float = 1.2, tail: float = 1.0,
+              speech_end: Optional[float] = None) -> float:
+        """يستبدل ما تبقى بـ lead (noise) + pcm + tail، ويرجع clock() عند نهاية الكلام"""
+        lead_n, tail_n = int(lead * self.rate), int(tail * self.rate)
+        with self._lock:
+            self._pending = np.concatenate([self._noise(lead_n), pcm.astype(np.int16), self._noise(tail_n)])
+            start = self.clock()
+        speech_end = len(pcm) / self.rate if speech_end is None else speech_end
+        return start + lead + speech_end
+
+    def append(self, pcm: np.ndarray) -> float:
+        """يضيف pcm بعد ما هو موجود، ويرجع clock() عند بدايته"""
+        with self._lock:
+            start = self.clock() + self.pending
+            self._pending = np.concatenate([self._pending, pcm.astype(np.int16)])
+        return start
+
+    def _noise(self, n: int) -> np.ndarray:
+        noise = self._rng.normal(0.0, self.noise_rms, n)
+        return np.clip(noise, -32768, 32767).astype(np.int16)
+
+    def read(self, frames: int, exception_on_overflow: bool = False) -> bytes:
+        if self.speed > 0:
+            # Real-time (or scaled) pacing: a read returns when the chunk would have been captured
+            now = time.perf_counter()
+            due = self._wall_start + (self._pos + frames) / self.rate / self.speed
+            if now - due > self.max_backlog:
+                # Not read for a while (STT / n8n / playback): the stream pauses instead of bursting
+                self._wall_start += now - due - self.max_backlog
+                due = now - self.max_backlog
+            delay = due - now
+            if delay > 0:
+                time.sleep(delay)
+        with self._lock:
+            take = self._pending[:frames]
+            self._pending = self._pending[frames:]
+            if len(take) < frames:
+                take = np.concatenate([take, self._noise(frames - len(take))])
+            self._pos += frames
+        return take.tobytes()
+
+    def stop_stream(self) -> None:
+        pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._pending = np.zeros(0, dtype=np.int16)
+
+
+def open_input(config: Optional[Config] = None, kind: Optional[str] = None):
+    """
+    kind (أو Config.AUDIO_INPUT): pyaudio | sounddevice | alsa | virtual
+    virtual: يعيد تشغيل AUDIO_INPUT_FILE (إن وجد) ثم noise floor، بسرعة AUDIO_VIRTUAL_SPEED
+    """
+    cfg = config or Config()
+    kind = (kind or getattr(cfg, "AUDIO_INPUT", "") or "pyaudio").lower()
+    rate = int(getattr(cfg, "REC_SAMPLE_RATE", 16000))
+    params = dict(rate=rate,
+                  channels=int(getattr(cfg, "REC_CHANNELS", 1)),
+                  width=int(getattr(cfg, "REC_WIDTH", 2)),
+                  chunk=int(getattr(cfg, "REC_CHUNK", 1024)))
+    if kind == "pyaudio":
+        return PyAudioInput(device_index=getattr(cfg, "REC_DEVICE_INDEX", None), **params)
+    if kind == "sounddevice":
+        return SoundDeviceInput(device=getattr(cfg, "REC_DEVICE_INDEX", None), **params)
+    if kind == "alsa":
+        return AlsaInput(device=getattr(cfg, "AUDIO_DEVICE", "default"), **params)
+    if kind == "virtual":
+        mic = VirtualInput(rate=rate, speed=float(getattr(cfg, "AUDIO_VIRTUAL_SPEED", 1.0)))
+        path = getattr(cfg, "AUDIO_INPUT_FILE", "")
+        if path:
+            mic.append(load_wav(path, rate))
+        return mic
+    raise ValueError(f"Unknown audio input: {kind}")
+
+
+# ==========================================
+# OUTPUTS
+# ==========================================
+
+class SoundDeviceOutput:
+    """sd.play غير حاجب (نفس ما كان TextToSpeech يستدعيه مباشرة)"""
+
+    def __init__(self):
+        if not _HAS_SOUNDDEVICE:
+            raise RuntimeError("sounddevice is not installed/available (pip install sounddevice)")
+
+    def play(self, pcm: np.ndarray, rate: int) -> None:
+        sd.play(pcm, samplerate=rate, blocking=False)
+
+    def is_active(self) -> bool:
+        stream = sd.get_stream()
+        return stream is not None and stream.active
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return _wait_inactive(self, timeout)
+
+    def stop(self) -> None:
+        sd.stop()
+
+    def close(self) -> None:
+        self.stop()
+
+
+class AlsaOutput:
+    """ALSA playback في thread كاتب (stop() يوقف بعد الـ period الحالي)"""
+
+    def __init__(self, device: str = "default", period: int = 1024):
+        if not _HAS_ALSA:
+            raise RuntimeError("pyalsaaudio is not installed/available (pip install pyalsaaudio)")
+        self.device = device
+        self.period = period
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def play(self, pcm: np.ndarray, rate: int) -> None:
+        self.stop()
+        self._stop.clear()
+        channels = pcm.shape[1] if pcm.ndim > 1 else 1
+        data = np.ascontiguousarray(pcm, dtype=np.int16).tobytes()
+        self._thread = threading.Thread(target=self._write, args=(data, rate, channels),
+                                        daemon=True, name="AlsaOutput")
+        self._thread.start()
+
+    def _write(self, data: bytes, rate: int, channels: int) -> None:
+        try:
+            out = alsaaudio.PCM(type=alsaaudio.PCM_PLAYBACK, mode=alsaaudio.PCM_NORMAL, device=self.device,
+                                channels=channels, rate=rate, format=alsaaudio.PCM_FORMAT_S16_LE,
+                                periodsize=self.period)
+        except Exception as e:
+            print(f"⚠️  [AudioIO] ALSA open error: {e}")
+            return
+        step = self.period * 2 * channels
+        try:
+            for i in range(0, len(data), step):
+                if self._stop.is_set():
+                    break
+                out.write(data[i:i + step])
+        finally:
+            out.close()
+
+    def is_active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return _wait_inactive(self, timeout)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def close(self) -> None:
+        self.stop()
+
+
+@dataclass
+class Playback:
+    """تشغيل واحد سجّله CaptureOutput (perf_counter timestamps)"""
+    source: str
+    rate: int
+    samples: int
+    started: float
+    ended: float                 # expected end, or the stop() time if interrupted
+    interrupted: bool = False
+    pcm: Optional[np.ndarray] = None
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.rate
+
+    def to_dict(self) -> dict:
+        return {"source": self.source, "rate": self.rate, "duration": round(self.duration, 4),
+                "started": self.started, "ended": self.ended,
+                "played": round(self.ended - self.started, 4), "interrupted": self.interrupted}
+
+
+class CaptureLog:
+    """سجل مشترك لكل الـ CaptureOutputs (TTS + AudioPlayer) بترتيب البداية"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items: List[Playback] = []
+
+    def add(self, playback: Playback) -> None:
+        with self._lock:
+            self._items.append(playback)
+
+    def playbacks(self, source: Optional[str] = None) -> List[Playback]:
+        with self._lock:
+            return [p for p in self._items if source is None or p.source == source]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+# Process-wide capture log (like render_scheduler.activity)
+capture_log = CaptureLog()
+
+
+class CaptureOutput:
+    """
+    خرج وهمي: لا يشغّل شيئاً، يسجّل ما كان سيُشغَّل.
+        out = CaptureOutput("tts", speed=1.0)    # is_active() صحيح طوال مدة الصوت (÷ speed)
+        out.play(pcm, 16000); out.wait()
+        capture_log.playbacks("tts")[-1].to_dict()
+    speed=0: ينتهي التشغيل فوراً (benchmarks بأقصى سرعة)
+    """
+
+    def __init__(self, source: str = "output", speed: float = 1.0, log: Optional[CaptureLog] = None,
+                 keep_audio: bool = False):
+        self.source = source
+        self.speed = float(speed)
+        self.log = log if log is not None else capture_log
+        self.keep_audio = keep_audio
+        self._lock = threading.Lock()
+        self._current: Optional[Playback] = None
+
+    def play(self, pcm: np.ndarray, rate: int) -> None:
+        self.stop()  # one sound at a time per output, like a real device handle
+        pcm = np.asarray(pcm)
+        now = time.perf_counter()
+        samples = pcm.shape[0]
+        length = samples / rate / self.speed if self.speed > 0 else 0.0
+        playback = Playback(self.source, rate, samples, now, now + length,
+                            pcm=pcm.copy() if self.keep_audio else None)
+        with self._lock:
+            self._current = playback
+        self.log.add(playback)
+
+    def is_active(self) -> bool:
+        with self._lock:
+            return self._current is not None and time.perf_counter() < self._current.ended
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return _wait_inactive(self, timeout)
+
+    def stop(self) -> None:
+        with self._lock:
+            playback = self._current
+            now = time.perf_counter()
+            if playback is not None and now < playback.ended:
+                playback.ended = now
+                playback.interrupted = True
+
+    def close(self) -> None:
+        self.stop()
+
+
+def _wait_inactive(output, timeout: Optional[float], poll: float = 0.01) -> bool:
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    while output.is_active():
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        time.sleep(poll)
+    return True
+
+
+def open_output(config: Optional[Config] = None, kind: Optional[str] = None, source: str = "output"):
+    """
+    kind (أو Config.AUDIO_OUTPUT): sounddevice | alsa | capture
+    "" → None: كل مكوّن يستخدم الـ backend الخاص به (pygame للـ AudioPlayer، AUDIO_BACKEND للـ TTS)
+    """
+    cfg = config or Config()
+    kind = (kind if kind is not None else getattr(cfg, "AUDIO_OUTPUT", "")).lower()
+    if not kind:
+        return None
+    if kind == "sounddevice":
+        return SoundDeviceOutput()
+    if kind == "alsa":
+        return AlsaOutput(device=getattr(cfg, "AUDIO_DEVICE", "default"))
+    if kind == "capture":
+        return CaptureOutput(source, speed=float(getattr(cfg, "AUDIO_VIRTUAL_SPEED", 1.0)))
+    raise ValueError(f"Unknown audio output: {kind}")
+
+
+# ✅ Quick check
+if __name__ == "__main__":
+    rate = 16000
+    t = np.arange(int(0.8 * rate)) / rate
+    tone = (4000 * np.sin(2 * np.pi * 300 * t)).astype(np.int16)
+
+    # Virtual mic at 4x real time: 1s of noise, the tone, then noise again
+    mic = VirtualInput(rate=rate, speed=4.0)
+    end_at = mic.queue(tone, lead=1.0, tail=0.5)
+    start = time.perf_counter()
+    levels = []
+    while mic.clock() < end_at + 0.5:
+        block = np.frombuffer(mic.read(320), dtype=np.int16).astype(np.float64)
+        levels.append(np.sqrt((block ** 2).mean()))
+    wall = time.perf_counter() - start
+    loud = [i for i, level in enumerate(levels) if level > 1000]
+    print(f"VirtualInput: {mic.clock():.2f}s of audio in {wall:.2f}s wall (speed 4), "
+          f"tone at {loud[0] * 0.02:.2f}–{(loud[-1] + 1) * 0.02:.2f}s")
+
+    # Capture output at real time, interrupted halfway through the second sound
+    out = CaptureOutput("demo", speed=1.0)
+    out.play(tone, rate)
+    out.wait()
+    out.play(tone, rate)
+    time.sleep(0.4)
+    out.stop()
+    for playback in capture_log.playbacks("demo"):
+        info = playback.to_dict()
+        print(f"CaptureOutput: {info['duration']:.2f}s sound, played {info['played']:.2f}s, "
+              f"interrupted={info['interrupted']}")
@@ -1,7 +1,8 @@
 # audio_player.py
 # -------------------------------------------------------------------
 # Unified audio playback (async + blocking) via a single worker thread
-# Uses pygame.mixer under the hood. Safe for concurrent calls.
+# Uses pygame.mixer under the hood, or an audio_io output (e.g. CaptureOutput
+# on machines without a sound card). Safe for concurrent calls.
 # -------------------------------------------------------------------
 
 from __future__ import annotations
@@ -11,7 +12,13 @@ from queue import Queue, Empty
 from typing import Optional
 import time
 import os
-import pygame
+
+try:
+    import pygame
+    _HAS_PYGAME = True
+except Exception:
+    pygame = None  # type: ignore
+    _HAS_PYGAME = False
 
 
 @dataclass
@@ -34,7 +41,7 @@ class AudioPlayer:
 
     ملاحظات:
       * احرص على استدعاء start() مرّة واحدة بعد الإنشاء.
-      * يدعم pygame فقط (بدون تخصيص خرج متقدّم).
+      * output=None: pygame.mixer. وإلا audio_io output (play/is_active/stop) لملفات WAV.
     """
 
     def __init__(
@@ -42,7 +49,8 @@ class AudioPlayer:
         sample_rate: int = 16000,
         channels: int = 1,
         buffer: int = 1024 ,
-        auto_init_mixer: bool = True
+        auto_init_mixer: bool = True,
+        output=None
     ) -> None:
         self._queue: Queue[AudioJob] = Queue(maxsize=8)
         self._worker: Optional[Thread] = None
@@ -52,6 +60,7 @@ class AudioPlayer:
         self._sample_rate = sample_rate
         self._channels = channels
         self._buffer = buffer
+        self._output = output
         # آخر تشغيل لنفس الملف (لـ debounce اختياري)
         self._last_play_ts: dict[str, float] = {}
         self._min_gap_sec: float = 0.35  # تجاهل تكرارات أسرع من 350ms
@@ -63,7 +72,7 @@ class AudioPlayer:
             if self._running:
                 return
             # تهيئة mixer بوضوح (مهم للـ RPi/Linux)
-            if self._auto_init_mixer:
+            if self._auto_init_mixer and self._output is None:
                 try:
                     pygame.mixer.pre_init(
                         frequency=self._sample_rate,
@@ -90,6 +99,9 @@ class AudioPlayer:
             pass
         if self._worker and self._worker.is_alive():
             self._worker.join(timeout=join_timeout)
+        if self._output is not None:
+            self._output.close()
+            return
         # اغلق الميكسـر بأمان
         try:
             pygame.mixer.music.stop()
@@ -125,12 +137,19 @@ class AudioPlayer:
     def stop_current(self) -> None:
         """إيقاف فوري لأي صوت جارٍ + إلغاء أي job جاري."""
         try:
-            pygame.mixer.music.stop()
+            if self._output is not None:
+                self._output.stop()
+            else:
+                pygame.mixer.music.stop()
         except:
             pass
         # ألغِ المهمة الحالية عبر إرسال job إلغاء خفيف (يُكتشف داخل _run)
         self._cancel_head_job()
 
+    def pending(self) -> int:
+        """عدد الـ jobs المنتظرة في الطابور (للـ telemetry)."""
+        return self._queue.qsize()
+
     # ---------------- Internal ----------------
 
     def _safe_put(self, job: AudioJob) -> None:
@@ -174,6 +193,9 @@ class AudioPlayer:
 
             current = job
             try:
+                if self._output is not None:
+                    self._play_output(job)
+                    continue
                 pygame.mixer.music.load(job.path)
                 pygame.mixer.music.set_volume(job.volume)
                 pygame.mixer.music.play()
@@ -198,6 +220,19 @@ class AudioPlayer:
                 self._last_play_ts[job.path] = time.time()
                 current = None
 
+    def _play_output(self, job: AudioJob) -> None:
+        """تشغيل WAV عبر audio_io output (نفس منطق الانتظار/الإلغاء)"""
+        from audio_io import load_wav
+        pcm = load_wav(job.path, self._sample_rate)
+        if job.volume != 1.0:
+            pcm = (pcm * job.volume).astype(pcm.dtype)
+        self._output.play(pcm, self._sample_rate)
+        while self._output.is_active():
+            if job.canceled.is_set():
+                self._output.stop()
+                break
+            time.sleep(0.02)
+
     def _cancel_head_job(self) -> None:
         """
         يطلب من المهمة الحالية التوقّف (عبر canceled Event).
@@ -14,12 +14,8 @@ import audioop
 import collections
 from typing import Optional
 
-try:
-    import pyaudio
-    _HAS_PYAUDIO = True
-except Exception:
-    _HAS_PYAUDIO = False
-    pyaudio = None  # type: ignore
+from audio_io import open_input
+from turn_trace import tracer
 
 try:
     import sys
@@ -47,7 +43,12 @@ class AudioRecorder:
     and feed the raw PCM bytes to STT.
     """
 
-    def __init__(self, config: Optional[Config] = None):
+    def __init__(self, config: Optional[Config] = None, stream=None):
+        """
+        stream: optional audio_io input (read(frames, exception_on_overflow=False)).
+                Default: audio_io.open_input(config), i.e. Config.AUDIO_INPUT.
+                The VAD timing follows stream.clock() if it has one (accelerated replay).
+        """
         self.cfg = config or Config()
 
         # Core audio params
@@ -58,58 +59,27 @@ class AudioRecorder:
         self.device_index = getattr(self.cfg, "REC_DEVICE_INDEX", None)
 
         # Internals
-        self._pa = None
-        self._stream = None
+        self._stream = stream
 
-        # Initialize backend
-        self._init_backend()
+        # Clock values of the last record_until_silence() speech start / VAD end (None: no speech)
+        self.speech_start_at = None
+        self.vad_end_at = None
+        # VAD state for telemetry: idle | calibrating | listening | speech | hold (plain stores, no lock)
+        self.vad_state = "idle"
 
-    # -------------------- Backend Init/Close --------------------
+        # Initialize backend (raises a clear RuntimeError if the backend is unavailable)
+        self._ensure_stream()
 
-    def _init_backend(self):
-        """Initialize PyAudio if available; raise clear error if not."""
-        if not _HAS_PYAUDIO:
-            raise RuntimeError(
-                "PyAudio is not installed/available. "
-                "Install it first (Windows: pip install pipwin && pipwin install pyaudio) "
-                "or on Linux: sudo apt-get install portaudio19-dev && pip install pyaudio."
-            )
-        try:
-            self._pa = pyaudio.PyAudio()
-        except Exception as ex:
-            raise RuntimeError(f"Failed to initialize PyAudio: {ex}")
+    # -------------------- Backend Init/Close --------------------
 
     def _ensure_stream(self):
-        """Open input stream if not opened yet."""
-        if self._stream is not None:
-            return
-        if self._pa is None:
-            raise RuntimeError("PyAudio handle is not initialized")
-
-        pa_format = self._pa.get_format_from_width(self.width)
-        kwargs = dict(
-            format=pa_format,
-            channels=self.channels,
-            rate=self.rate,
-            input=True,
-            frames_per_buffer=self.chunk
-        )
-        if self.device_index is not None:
-            kwargs["input_device_index"] = self.device_index
-
-        try:
-            self._stream = self._pa.open(**kwargs)
-        except Exception as ex:
-            raise RuntimeError(f"Failed to open input stream: {ex}")
-
-        # Prime the stream to reduce latency
-        try:
-            _ = self._stream.read(self.chunk, exception_on_overflow=False)
-        except Exception:
-            pass
+        """Open the input stream if not opened yet."""
+        if self._stream is None:
+            self._stream = open_input(self.cfg)
+        self._clock = getattr(self._stream, "clock", time.time)
 
     def close(self):
-        """Close the stream and terminate PyAudio."""
+        """Close the input stream."""
         try:
             if self._stream is not None:
                 try:
@@ -123,14 +93,6 @@ class AudioRecorder:
         finally:
             self._stream = None
 
-        try:
-            if self._pa is not None:
-                self._pa.terminate()
-        except Exception:
-            pass
-        finally:
-            self._pa = None
-
     # -------------------- Public Recording APIs --------------------
 
     def record_fixed(self, duration_sec: float = 5.0) -> bytes:
@@ -155,6 +117,7 @@ class AudioRecorder:
         pre_roll_ms: int = 300,
         min_speech_after_start: float = 1.8,
         threshold_boost: float = 2.0,
+        trace: bool = False,
     ) -> bytes:
         """
         Record until "real" silence is detected using hysteresis & padding.
@@ -169,6 +132,8 @@ class AudioRecorder:
         - pre_roll_ms:            Milliseconds kept from before speaking started.
         - min_speech_after_start: Minimum seconds after start before allowing end.
         - threshold_boost:        Multiplier applied to noise floor to form thresholds.
+        - trace:                  Start a new turn_trace turn at speech start and record
+                                  `vad_end` + the `capture` span (main listening loop only).
 
         Tuning tips:
         - Cuts too early? Increase `end_frames` (e.g., 18–22) and/or `post_silence_hold`.
@@ -176,9 +141,6 @@ class AudioRecorder:
         - Trims first word? Increase `pre_roll_ms` (e.g., 400–500ms).
         """
 
-        if _HAS_PYAUDIO is False:
-            raise RuntimeError("PyAudio backend not available")
-
         self._ensure_stream()
 
         bytes_per_frame = self.width * self.channels
@@ -188,11 +150,14 @@ class AudioRecorder:
         ring_pre = collections.deque(maxlen=pre_roll_blocks)
 
         frames = []
+        self.speech_start_at = None
+        self.vad_end_at = None
+        self.vad_state = "calibrating"
 
         # ---- 1) Noise calibration ----
-        calib_end = time.time() + max(0.0, noise_calib_duration)
+        calib_end = self._clock() + max(0.0, noise_calib_duration)
         noise_vals = []
-        while time.time() < calib_end:
+        while self._clock() < calib_end:
             data = self._stream.read(self.chunk, exception_on_overflow=False)
             rms = audioop.rms(data, self.width)
             noise_vals.append(rms)
@@ -211,14 +176,17 @@ class AudioRecorder:
         over_count = 0
         under_count = 0
         start_time = None
-        hard_deadline = time.time() + max_duration
+        hard_deadline = self._clock() + max_duration
 
         # seed pre-roll
         frames.extend(list(ring_pre))
+        self.vad_state = "listening"
 
         # ---- 3) Main loop ----
         while True:
-            if time.time() >= hard_deadline:
+            if self._clock() >= hard_deadline:
+                if trace and speaking:
+                    tracer.mark("vad_end", reason="max_duration")
                 break
 
             data = self._stream.read(self.chunk, exception_on_overflow=False)
@@ -230,8 +198,13 @@ class AudioRecorder:
                     over_count += 1
                     if over_count >= start_frames:
                         speaking = True
-                        start_time = time.time()
+                        start_time = self._clock()
+                        self.speech_start_at = start_time
+                        self.vad_state = "speech"
                         under_count = 0
+                        if trace:
+                            tracer.begin_turn()
+                            speech_start_ns = time.perf_counter_ns()
                 else:
                     over_count = 0
             else:
@@ -241,18 +214,26 @@ class AudioRecorder:
                     under_count = 0
 
                 # Enforce minimum speech time before allowing end
-                long_enough = (time.time() - start_time) >= min_speech_after_start if start_time else False
+                long_enough = (self._clock() - start_time) >= min_speech_after_start if start_time is not None else False
                 if long_enough and under_count >= end_frames:
+                    self.vad_end_at = self._clock()
+                    if trace:
+                        tracer.mark("vad_end")
                     # Post-silence hold
+                    self.vad_state = "hold"
                     hold_bytes = int(self.rate * post_silence_hold) * bytes_per_frame
                     hold_blocks = max(1, hold_bytes // (self.chunk * bytes_per_frame))
                     for _ in range(hold_blocks):
-                        if time.time() >= hard_deadline:
+                        if self._clock() >= hard_deadline:
                             break
                         extra = self._stream.read(self.chunk, exception_on_overflow=False)
                         frames.append(extra)
                     break
 
+        if trace and speaking:
+            # Speech start → audio handed to STT (includes the post-silence hold)
+            tracer.add("capture", speech_start_ns, time.perf_counter_ns())
+        self.vad_state = "idle"
         return b"".join(frames) if frames else b""
 
     # -------------------- Utilities --------------------
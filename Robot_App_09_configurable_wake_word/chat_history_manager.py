@@ -1,84 +1,380 @@
 # ------------------- Import Libraries -------------------
+import atexit
 import json
 import os
+import time
 from threading import Lock
 
-MEMORY_FILE = "chat-memory.json"
+from Config import Config
+from memory_store import MemoryStore, IMPORTANT, NOT_IMPORTANT, entry_size, exchange_tokens
+from memory_writer import MemoryWriter, atomic_write_json
+
+MEMORY_FILE = Config.MEMORY_FILE
+MEMORY_DB = Config.MEMORY_DB
+MEMORY_BACKEND = Config.MEMORY_BACKEND  # "sqlite" or "json"
 
 # Lock for protection in multi-threading
 memory_lock = Lock()
 
 # Cache for memory in RAM
 _memory_cache = None
-_cache_dirty = False
 
+# SQLite store (lazy-initialized)
+_store = None
+
+# Write-behind worker (lazy-initialized)
+_writer = None
+
+# True once a rolling summary is maintained (context_builder): retention keeps unsummarized rows
+_summary_guard = False
+
+def _get_store():
+    """Open the SQLite store once (and migrate the legacy JSON file)"""
+    global _store
+
+    if _store is not None:
+        return _store
+
+    with memory_lock:
+        if _store is None:
+            store = MemoryStore(MEMORY_DB, session_id=Config.MEMORY_SESSION_ID)
+            store.migrate_from_json(MEMORY_FILE)
+            _store = store
+
+    return _store
+
+def _use_sqlite():
+    return MEMORY_BACKEND == "sqlite"
+
+# ------------------- Write-behind persistence -------------------
+def _write_snapshot(memory):
+    """Runs on the writer thread: atomic JSON write"""
+    return atomic_write_json(MEMORY_FILE, memory)
+
+def _write_rows(rows):
+    """Runs on the writer thread: one transaction per batch, then the retention policy"""
+    store = _get_store()
+    store.append_many(rows)
+    store.enforce_retention(
+        keep_important=Config.MEMORY_KEEP_IMPORTANT,
+        keep_not_important=Config.MEMORY_KEEP_NOT_IMPORTANT,
+        max_bytes=Config.MEMORY_MAX_BYTES,
+        protect_after=store.get_summary()[1] if _summary_guard else None,
+    )
+
+def _entries_bytes(memory):
+    return sum(entry_size(e.get("user_input", ""), e.get("ai_response", ""))
+               for key in (IMPORTANT, NOT_IMPORTANT) for e in memory.get(key, []) if isinstance(e, dict))
+
+def _apply_retention(memory):
+    """
+    JSON backend: same policy as MemoryStore.enforce_retention —
+    last MEMORY_KEEP_* per category, then oldest Not Important out
+    until the entries fit in MEMORY_MAX_BYTES (Important is never dropped for size)
+    """
+    upto = (memory.get("Summary") or {}).get("upto", 0) if _summary_guard else float("inf")
+
+    def removable(entries, limit):
+        """Oldest entries that may go: at most `limit`, never past the summary watermark"""
+        n = 0
+        while n < min(limit, len(entries)) and entries[n].get("ts", 0.0) <= upto:
+            n += 1
+        return n
+
+    for key, keep in ((IMPORTANT, Config.MEMORY_KEEP_IMPORTANT),
+                      (NOT_IMPORTANT, Config.MEMORY_KEEP_NOT_IMPORTANT)):
+        entries = memory.get(key, [])
+        if len(entries) > max(0, keep):
+            memory[key] = entries[removable(entries, len(entries) - max(0, keep)):]
+
+    total = _entries_bytes(memory)
+    entries = memory.get(NOT_IMPORTANT, [])
+    limit = removable(entries, len(entries))
+    drop = 0
+    while total > Config.MEMORY_MAX_BYTES and drop < limit:
+        total -= entry_size(entries[drop].get("user_input", ""), entries[drop].get("ai_response", ""))
+        drop += 1
+    if drop:
+        memory[NOT_IMPORTANT] = entries[drop:]
+
+def _get_writer():
+    """Start the background writer once (None if write-behind is disabled)"""
+    global _writer
+
+    if not Config.MEMORY_WRITE_BEHIND:
+        return None
+
+    if _writer is not None:
+        return _writer
+
+    with memory_lock:
+        if _writer is None:
+            if _use_sqlite():
+                writer = MemoryWriter(write_rows=_write_rows,
+                                      flush_interval=Config.MEMORY_FLUSH_INTERVAL,
+                                      flush_bytes=Config.MEMORY_FLUSH_BYTES)
+            else:
+                writer = MemoryWriter(write_snapshot=_write_snapshot,
+                                      flush_interval=Config.MEMORY_FLUSH_INTERVAL,
+                                      flush_bytes=Config.MEMORY_FLUSH_BYTES)
+            _writer = writer.start()
+            atexit.register(shutdown)
+
+    return _writer
+
+def _flush_pending():
+    """Make pending writes visible before destructive operations"""
+    if _writer is not None:
+        _writer.flush()
+
+def _run_on_writer(op):
+    """
+    SQLite deletes / cleanup: queued on the writer thread, in order with the pending rows
+    (the caller does not wait for the disk). Direct call when write-behind is off.
+    """
+    writer = _get_writer()
+    if writer is not None:
+        writer.put_op(op)
+    else:
+        op()
+
+def _pending_rows():
+    return _writer.pending_rows() if _writer is not None else []
+
+def flush_memory(timeout=5.0):
+    """Force pending memory writes to disk"""
+    if _writer is not None:
+        return _writer.flush(timeout=timeout)
+    return True
+
+def get_memory_stats():
+    """Flush latency / queue depth of the write-behind worker (live: telemetry gauges)"""
+    if _writer is None:
+        return {}
+    return _writer.get_stats()
+
+def shutdown():
+    """Flush pending writes and close the store (call from cleanup())"""
+    global _writer, _store
+
+    writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+        stats = writer.get_stats()
+        if stats["flushes"]:
+            print(f"[Memory] 💾 {stats['flushes']} flushes, "
+                  f"avg {stats['avg_flush_ms']:.1f}ms, max {stats['max_flush_ms']:.1f}ms, "
+                  f"max queue {stats['max_queue_depth']}")
+
+    store, _store = _store, None
+    if store is not None:
+        store.close()
+
+# ------------------- Public API -------------------
 def load_memory():
     """Load memory with caching"""
     global _memory_cache
-    
+
+    if _use_sqlite():
+        memory = _get_store().as_memory_dict()
+        for u_input, ai_response, flag in _pending_rows():
+            key = IMPORTANT if flag == IMPORTANT else NOT_IMPORTANT
+            memory[key].append({"user_input": u_input, "ai_response": ai_response})
+        return memory
+
     if _memory_cache is not None:
         return _memory_cache
-    
+
     with memory_lock:
         if os.path.exists(MEMORY_FILE):
             with open(MEMORY_FILE, "r", encoding="utf-8") as file:
-                _memory_cache = json.load(file)
+                _memory_cache = _assign_legacy_ts(json.load(file))
         else:
-            _memory_cache = {"Important": [], "Not Important": []}
-    
+            _memory_cache = {IMPORTANT: [], NOT_IMPORTANT: []}
+
     return _memory_cache
 
+def _assign_legacy_ts(memory):
+    """
+    Legacy entries have no ts (the JSON row id): number them 1, 2, ... in file order,
+    ahead of any real time.time() ts, so the rolling summary can walk past them.
+    Saved with the next write, so the ids stay stable.
+    """
+    if not isinstance(memory, dict):
+        return memory
+    n = 0
+    for key in (IMPORTANT, NOT_IMPORTANT):
+        for entry in memory.get(key, []):
+            if isinstance(entry, dict) and "ts" not in entry:
+                n += 1
+                entry["ts"] = float(n)
+    return memory
+
 def save_memory(memory):
     """Save memory with optimization"""
-    global _memory_cache, _cache_dirty
-    
+    global _memory_cache
+
+    if _use_sqlite():
+        _flush_pending()
+        _get_store().replace_all(memory)
+        return
+
+    writer = _get_writer()
+
     with memory_lock:
         _memory_cache = memory
-        _cache_dirty = True
-        
-        # Direct save (can be deferred for optimization)
-        with open(MEMORY_FILE, "w", encoding="utf-8") as file:
-            json.dump(memory, file, indent=2, ensure_ascii=False)
-        
-        _cache_dirty = False
+
+        # Deferred save: the writer thread coalesces and writes atomically
+        if writer is not None:
+            writer.put_snapshot(memory)
+            return
+
+        # Direct save
+        atomic_write_json(MEMORY_FILE, memory)
 
 def update_memory(u_input, nova_response, flag):
     """Update memory with optimization"""
+    if _use_sqlite():
+        writer = _get_writer()
+        if writer is not None:
+            # Batched insert on the writer thread
+            writer.put_rows([(u_input, nova_response, flag)])
+            return
+
+        # Append-only insert + bounded retention (no whole-file rewrite)
+        _write_rows([(u_input, nova_response, flag)])
+        return
+
     memory = load_memory()
 
     if not isinstance(memory, dict):
-        memory = {"Important": [], "Not Important": []}
+        memory = {IMPORTANT: [], NOT_IMPORTANT: []}
 
-    entry = {"user_input": u_input, "ai_response": nova_response}
+    # ts orders entries across categories, tokens is the context-builder index
+    entry = {
+        "user_input": u_input,
+        "ai_response": nova_response,
+        "ts": time.time(),
+        "tokens": exchange_tokens(u_input, nova_response),
+    }
 
-    if flag == "Important":
-        memory["Important"].append(entry)
+    if flag == IMPORTANT:
+        memory[IMPORTANT].append(entry)
     else:
-        memory["Not Important"].append(entry)
+        memory[NOT_IMPORTANT].append(entry)
 
+    _apply_retention(memory)
     save_memory(memory)
 
+def parse_status(ai_response):
+    """Split '[Status, Response]' into (status, response)"""
+    if ai_response.startswith("[") and ai_response.endswith("]"):
+        try:
+            status, req_response = ai_response.strip('[]').split(", ", 1)
+            return status, req_response
+        except ValueError:
+            pass
+    return NOT_IMPORTANT, ai_response
+
+def record_turn(u_input, ai_response, flag):
+    """
+    Memory update after a complete answer.
+    Retention (MEMORY_KEEP_* + MEMORY_MAX_BYTES) is applied by the write itself,
+    on the writer thread when write-behind is on: nothing here waits for the disk.
+    """
+    update_memory(u_input, ai_response, flag)
+
 def get_limited_conversation_history(limit=5):
     """Get only last N messages"""
-    memory = load_memory()
+    if _use_sqlite():
+        # Indexed query: newest N across both categories, in chronological order
+        rows = [(row["user_input"], row["ai_response"]) for row in _get_store().recent(limit)]
+        rows += [(u_input, ai_response) for u_input, ai_response, _ in _pending_rows()]
+        return "\n".join(
+            f"User: {u_input}\nAI: {ai_response}"
+            for u_input, ai_response in rows[-limit:]
+        )
 
-    if not isinstance(memory, dict):
-        return ""
-
-    # Get last N messages from each category
-    important = memory.get("Important", [])[-limit:]
-    not_important = memory.get("Not Important", [])[-limit:]
-    
-    # Merge and sort by time (newest at the end by default)
-    all_messages = important + not_important
-    
+    # Newest N across both categories, sorted by time (oldest first)
     history = "\n".join(
-        f"User: {entry['user_input']}\nAI: {entry['ai_response']}"
-        for entry in all_messages[-limit:]
+        f"User: {row['user_input']}\nAI: {row['ai_response']}"
+        for row in reversed(_json_exchanges()[:limit])
     )
-    
+
     return history
 
+# ------------------- Context builder support -------------------
+def _json_exchanges():
+    """JSON backend: all entries newest-first (ts doubles as the id)"""
+    memory = load_memory()
+
+    if not isinstance(memory, dict):
+        return []
+
+    rows = [
+        {
+            "id": entry.get("ts", 0.0),
+            "importance": key,
+            "user_input": entry.get("user_input", ""),
+            "ai_response": entry.get("ai_response", ""),
+            "tokens": entry.get("tokens") or exchange_tokens(entry.get("user_input", ""),
+                                                             entry.get("ai_response", "")),
+        }
+        for key in [IMPORTANT, NOT_IMPORTANT]
+        for entry in memory.get(key, [])
+        if isinstance(entry, dict)
+    ]
+    # Legacy entries got ts 1, 2, ... in file order on load (_assign_legacy_ts)
+    rows.sort(key=lambda row: row["id"])
+    rows.reverse()
+    return rows
+
+def get_recent_exchanges(limit=50):
+    """
+    Newest-first exchanges with their token counts.
+    Each row: {id, importance, user_input, ai_response, tokens}
+    Rows still queued in the writer have id None (they are the newest).
+    """
+    if _use_sqlite():
+        pending = [
+            {"id": None, "importance": flag, "user_input": u_input,
+             "ai_response": ai_response, "tokens": exchange_tokens(u_input, ai_response)}
+            for u_input, ai_response, flag in reversed(_pending_rows())
+        ]
+        return (pending + _get_store().newest(limit))[:limit]
+
+    return _json_exchanges()[:limit]
+
+def get_exchanges_between(after_id, before_id):
+    """Chronological exchanges with after_id < id < before_id"""
+    if _use_sqlite():
+        return _get_store().between(after_id, before_id)
+
+    return [row for row in reversed(_json_exchanges()) if after_id < row["id"] < before_id]
+
+def load_summary():
+    """Returns: (summary, upto_id) of the rolling summary"""
+    if _use_sqlite():
+        return _get_store().get_summary()
+
+    summary = load_memory().get("Summary") or {}
+    return summary.get("text", ""), summary.get("upto", 0)
+
+def protect_unsummarized():
+    """context_builder: retention must not delete turns the rolling summary has not folded in yet"""
+    global _summary_guard
+    _summary_guard = True
+
+def save_summary(summary, upto_id):
+    """Persist the rolling summary of evicted turns"""
+    if _use_sqlite():
+        _get_store().set_summary(summary, upto_id)
+        return
+
+    memory = load_memory()
+    memory["Summary"] = {"text": summary, "upto": upto_id}
+    save_memory(memory)
+
 def get_conversation_history():
     """Get all conversations (for backward compatibility)"""
     memory = load_memory()
@@ -88,32 +384,43 @@ def get_conversation_history():
 
     history = "\n".join(
         f"User: {entry['user_input']}\nAI: {entry['ai_response']}"
-        for key in ["Important", "Not Important"]
+        for key in [IMPORTANT, NOT_IMPORTANT]
         for entry in memory.get(key, [])
     )
     return history
 
 def check_memory_percentage():
     """Check memory size"""
-    if os.path.exists(MEMORY_FILE):
-        with open(MEMORY_FILE, "r", encoding="utf-8") as file:
-            data = json.load(file)
-
-        json_string = json.dumps(data)
-        full_length = len(json_string)
-        max_length = 10000
-        percentage = (full_length / max_length) * 100
+    max_length = Config.MEMORY_MAX_BYTES
 
-        return percentage, full_length
+    if _use_sqlite():
+        # O(1): maintained by triggers, no re-read / re-serialize
+        full_length = _get_store().total_bytes()
+        full_length += sum(entry_size(u, a) for u, a, _ in _pending_rows())
+        return (full_length / max_length) * 100, full_length
 
-    return 0, 0
+    # Same measure as the SQLite triggers and the retention policy
+    memory = load_memory()
+    if not isinstance(memory, dict):
+        return 0, 0
+    full_length = _entries_bytes(memory)
+    return (full_length / max_length) * 100, full_length
 
 def delete_not_important_memory():
     """Delete non-important messages"""
+    if _use_sqlite():
+        def op():
+            if _get_store().delete_importance(NOT_IMPORTANT):
+                print("✅ Non-important messages deleted")
+            else:
+                print("⚠️ No non-important messages to delete")
+        _run_on_writer(op)
+        return
+
     memory = load_memory()
 
-    if "Not Important" in memory and memory["Not Important"]:
-        memory["Not Important"] = []
+    if NOT_IMPORTANT in memory and memory[NOT_IMPORTANT]:
+        memory[NOT_IMPORTANT] = []
         save_memory(memory)
         print("✅ Non-important messages deleted")
     else:
@@ -121,13 +428,20 @@ def delete_not_important_memory():
 
 def cleanup_old_messages(keep_important=20, keep_not_important=10):
     """Automatic cleanup of old messages"""
+    if _use_sqlite():
+        def op():
+            _get_store().enforce_retention(keep_important, keep_not_important, Config.MEMORY_MAX_BYTES)
+            print(f"✅ Memory cleaned up")
+        _run_on_writer(op)
+        return
+
     memory = load_memory()
-    
-    if "Important" in memory:
-        memory["Important"] = memory["Important"][-keep_important:]
-    
-    if "Not Important" in memory:
-        memory["Not Important"] = memory["Not Important"][-keep_not_important:]
-    
+
+    if IMPORTANT in memory:
+        memory[IMPORTANT] = memory[IMPORTANT][-keep_important:]
+
+    if NOT_IMPORTANT in memory:
+        memory[NOT_IMPORTANT] = memory[NOT_IMPORTANT][-keep_not_important:]
+
     save_memory(memory)
     print(f"✅ Memory cleaned up")
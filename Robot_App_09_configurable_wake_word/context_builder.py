@@ -0,0 +1,156 @@
+# context_builder.py
+# Token-budgeted prompt context for ai_model
+# - History assembled newest-first up to a token budget (uses the per-exchange token index)
+# - Evicted turns are folded into a rolling summary
+# - The summary is refreshed on a background thread (never on the response path)
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import chat_history_manager as history
+from memory_store import estimate_tokens, MESSAGE_TOKEN_OVERHEAD
+
+# summarizer(previous_summary, evicted_exchanges) -> new summary text
+Summarizer = Callable[[str, List[Dict]], str]
+
+
+class ContextBuilder:
+    """
+    يبني رسائل الـ chat للـ LLM ضمن ميزانية tokens ثابتة.
+
+    - build(system_prompt, user_input): system + summary + آخر المحادثات + رسالة المستخدم
+    - الرسائل القديمة التي لا تدخل في الميزانية تُلخّص في الخلفية
+    """
+
+    def __init__(
+        self,
+        summarizer: Optional[Summarizer] = None,
+        token_budget: int = 1500,
+        max_rows: int = 40,
+        summary_min_evicted: int = 4,
+    ):
+        self.summarizer = summarizer
+        self.token_budget = int(token_budget)
+        self.max_rows = int(max_rows)
+        self.summary_min_evicted = max(1, int(summary_min_evicted))
+        if summarizer is not None:
+            # Evicted turns must survive retention until they are folded into the summary
+            history.protect_unsummarized()
+
+        self._summary_lock = threading.Lock()
+        self._summary: Optional[str] = None
+        self._summary_upto = 0
+        self._refreshing = False
+
+        self.last_stats: Dict = {}
+
+    # ---------------- Summary cache ----------------
+
+    def _get_summary(self):
+        with self._summary_lock:
+            if self._summary is None:
+                self._summary, self._summary_upto = history.load_summary()
+            return self._summary, self._summary_upto
+
+    # ---------------- Build ----------------
+
+    def build(self, system_prompt: str, user_input: str) -> List[Dict[str, str]]:
+        """إرجاع قائمة messages جاهزة لـ chat.completions"""
+        start = time.perf_counter()
+
+        summary, _ = self._get_summary()
+        fixed = (estimate_tokens(system_prompt) + estimate_tokens(user_input)
+                 + estimate_tokens(summary) + 3 * MESSAGE_TOKEN_OVERHEAD)
+        budget = max(0, self.token_budget - fixed)
+
+        # Newest-first until the budget is used up
+        rows = history.get_recent_exchanges(self.max_rows)
+        picked = []
+        used = 0
+        for row in rows:
+            if used + row["tokens"] > budget:
+                break
+            picked.append(row)
+            used += row["tokens"]
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+
+        for row in reversed(picked):
+            messages.append({"role": "user", "content": row["user_input"]})
+            # Keep the [Status, Response] format the prompt asks for
+            messages.append({"role": "assistant", "content": f"[{row['importance']}, {row['ai_response']}]"})
+
+        messages.append({"role": "user", "content": user_input})
+
+        evicted = len(rows) - len(picked)
+        self.last_stats = {
+            "turns": len(picked),
+            "evicted": evicted,
+            "history_tokens": used,
+            "prompt_tokens": fixed + used,
+            "build_ms": (time.perf_counter() - start) * 1000.0,
+        }
+
+        # Oldest persisted turn still in the prompt: everything before it is evicted
+        boundary = next((row["id"] for row in reversed(picked) if row["id"] is not None), None)
+        if boundary is None and rows:
+            boundary = next((row["id"] for row in rows[len(picked):] if row["id"] is not None), None)
+            boundary = None if boundary is None else _after(boundary)
+        if boundary is not None and (evicted or len(rows) >= self.max_rows):
+            self.refresh_summary_async(boundary)
+
+        return messages
+
+    # ---------------- Rolling summary ----------------
+
+    def refresh_summary_async(self, before_id) -> bool:
+        """تشغيل تحديث الـ summary في ثريد خلفي (مرة واحدة في نفس الوقت)"""
+        if self.summarizer is None:
+            return False
+
+        with self._summary_lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+
+        threading.Thread(
+            target=self._refresh_summary,
+            args=(before_id,),
+            name="ContextSummary",
+            daemon=True
+        ).start()
+        return True
+
+    def _refresh_summary(self, before_id) -> None:
+        try:
+            summary, upto = self._get_summary()
+            evicted = history.get_exchanges_between(upto, before_id)
+            if len(evicted) < self.summary_min_evicted:
+                return
+
+            start = time.perf_counter()
+            new_summary = (self.summarizer(summary, evicted) or "").strip()
+            if not new_summary:
+                return
+
+            new_upto = evicted[-1]["id"]
+            history.save_summary(new_summary, new_upto)
+            with self._summary_lock:
+                self._summary, self._summary_upto = new_summary, new_upto
+
+            elapsed = time.perf_counter() - start
+            print(f"[Context] 📝 Summary refreshed ({len(evicted)} turns) in {elapsed:.2f}s")
+
+        except Exception as e:
+            print(f"[Context] ⚠️ Summary refresh failed: {e}")
+        finally:
+            with self._summary_lock:
+                self._refreshing = False
+
+
+def _after(row_id):
+    """أصغر id أكبر من row_id (الـ ids أعداد صحيحة في SQLite و timestamps في JSON)"""
+    return row_id + 1 if isinstance(row_id, int) else row_id + 1e-6
@@ -0,0 +1,344 @@
+# eye_atlas.py
+# Pre-rendered eye poses: iris position × blink level
+# - Positions = EyeMovementController.POSITIONS × the micro-jitter offsets (int-truncated ±2px / ±1px)
+# - Each pose is one composited iris tile; blink levels store only the tile rows they darken
+#   plus one darkened background per level
+# - Stored in RAM or as a memory-mapped .npy cache (Pi Zero: pages are loaded on demand)
+# - Render = restore the previous rect + copy a tile (no blending, no float math)
+# - Positions outside the atlas (mid-transition) use the live SpriteRenderer
+#
+# Benchmark: python eye_atlas.py --bench
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from eye_renderer import SpriteRenderer
+
+# int(pos + uniform(-2, 2)) / int(pos + uniform(-1, 1)) → these offsets only
+JITTER_X = (-2, -1, 0, 1)
+JITTER_Y = (-1, 0)
+
+# 4 levels: open, 1/3, 2/3, closed
+DEFAULT_BLINK_LEVELS = 4
+
+
+def blink_row_factors(height, blink_amount):
+    """
+    عامل التعتيم لكل سطر (نفس create_blink_overlay):
+    الجفن العلوي × 0.2، الجفن السفلي × 0.3
+    """
+    factors = np.ones(height, dtype=np.float32)
+    close_height = int(height * blink_amount * 0.5)
+    if close_height > 0:
+        factors[:close_height] = 0.2
+        bottom_close = int(close_height * 0.6)
+        if bottom_close > 0:
+            factors[height - bottom_close:] = 0.3
+    return factors
+
+
+def darken_rows(image, factors):
+    """image * factor لكل سطر (uint8 → uint8 بنفس تقريب create_blink_overlay)"""
+    return (image * factors[:, None, None]).astype(np.uint8)
+
+
+class EyeAtlas:
+    """
+    tiles[pos_index]          → مربع القزحية الجاهز والعين مفتوحة (th, tw, 3)
+    bands[start:start+n]      → الأسطر التي يغيّرها الرمش فقط (n, tw, 3)
+    band_index[pos, level]    → (start, row0, row1) داخل الـ tile (row1 == row0 → لا تغيير)
+    backgrounds[level]        → الخلفية مع الرمش (H, W, 3)
+    rects[pos_index]          → مكان المربع في الإطار (x0, y0, x1, y1)
+    """
+
+    def __init__(self, positions, blink_levels, tiles, bands, band_index, backgrounds, rects):
+        self.positions = [tuple(p) for p in positions]
+        self.blink_levels = np.asarray(blink_levels, dtype=np.float32)
+        self.tiles = tiles
+        self.bands = bands
+        self.band_index = np.asarray(band_index, dtype=np.int64)
+        self.backgrounds = backgrounds
+        self.rects = [tuple(r) for r in rects]
+        self.index = {p: i for i, p in enumerate(self.positions)}
+
+    @property
+    def nbytes(self):
+        return self.tiles.nbytes + self.bands.nbytes + self.backgrounds.nbytes
+
+    def level_index(self, blink_amount):
+        """أقرب مستوى رمش"""
+        if blink_amount <= 0:
+            return 0
+        return int(np.abs(self.blink_levels - blink_amount).argmin())
+
+    # ---------------- Build ----------------
+
+    @staticmethod
+    def expand_positions(targets, jitter_x=JITTER_X, jitter_y=JITTER_Y):
+        seen = []
+        for tx, ty in targets:
+            for dy in jitter_y:
+                for dx in jitter_x:
+                    p = (int(tx) + dx, int(ty) + dy)
+                    if p not in seen:
+                        seen.append(p)
+        return seen
+
+    @classmethod
+    def build(cls, background, iris, positions, blink_levels=DEFAULT_BLINK_LEVELS, out_dir=None, key=""):
+        """
+        بناء الـ atlas (في RAM أو في ملفات .npy داخل out_dir)
+        positions: [(x, y)] نفس إحداثيات overlay_iris
+        """
+        levels = np.linspace(0.0, 1.0, blink_levels, dtype=np.float32) if np.isscalar(blink_levels) \
+            else np.asarray(blink_levels, dtype=np.float32)
+
+        renderer = SpriteRenderer(background, iris)
+        bg = renderer.background
+        level_factors = [blink_row_factors(bg.shape[0], float(level)) for level in levels]
+
+        rects = []
+        for x, y in positions:
+            rect, _, _ = renderer._clip(int(x), int(y))
+            if rect is None:
+                raise ValueError(f"Iris at {(x, y)} is outside the frame")
+            rects.append(rect)
+
+        # Rows of each tile darkened by each blink level (first..last changed row)
+        band_index = np.zeros((len(positions), len(levels), 3), dtype=np.int64)
+        total = 0
+        for pi, (x0, y0, x1, y1) in enumerate(rects):
+            for li, factors in enumerate(level_factors):
+                changed = np.flatnonzero(factors[y0:y1] != 1.0)
+                if changed.size:
+                    r0, r1 = int(changed[0]), int(changed[-1]) + 1
+                    band_index[pi, li] = (total, r0, r1)
+                    total += r1 - r0
+
+        # All tiles have the sprite size unless clipped at the border
+        th = max(r[3] - r[1] for r in rects)
+        tw = max(r[2] - r[0] for r in rects)
+        shapes = {
+            "tiles": (len(positions), th, tw, 3),
+            "bands": (max(total, 1), tw, 3),
+            "bg": (len(levels),) + bg.shape,
+        }
+
+        if out_dir:
+            paths = _cache_paths(out_dir, key)
+            arrays = {name: np.lib.format.open_memmap(paths[name] + ".tmp", mode="w+",
+                                                     dtype=np.uint8, shape=shape)
+                      for name, shape in shapes.items()}
+        else:
+            arrays = {name: np.zeros(shape, dtype=np.uint8) for name, shape in shapes.items()}
+        tiles, bands, backgrounds = arrays["tiles"], arrays["bands"], arrays["bg"]
+
+        for li, factors in enumerate(level_factors):
+            backgrounds[li] = bg if levels[li] <= 0 else darken_rows(bg, factors)
+
+        for pi, (x, y) in enumerate(positions):
+            frame = renderer.render(x, y)
+            x0, y0, x1, y1 = rects[pi]
+            tile = frame[y0:y1, x0:x1]
+            tiles[pi, :y1 - y0, :x1 - x0] = tile
+            for li, factors in enumerate(level_factors):
+                start, r0, r1 = band_index[pi, li]
+                if r1 > r0:
+                    bands[start:start + r1 - r0, :x1 - x0] = darken_rows(tile[r0:r1], factors[y0 + r0:y0 + r1])
+
+        if not out_dir:
+            return cls(positions, levels, tiles, bands, band_index, backgrounds, rects)
+
+        for name, array in arrays.items():
+            array.flush()
+        del tiles, bands, backgrounds, arrays
+        for name in shapes:
+            os.replace(paths[name] + ".tmp", paths[name])
+        np.save(paths["band_index"], band_index)
+        with open(paths["index"], "w", encoding="utf-8") as f:
+            json.dump({"positions": positions, "blink_levels": levels.tolist(), "rects": rects}, f)
+        return cls.load(out_dir, key)
+
+    @classmethod
+    def load(cls, out_dir, key="", mmap=True):
+        """تحميل atlas محفوظ (None إذا غير موجود)"""
+        paths = _cache_paths(out_dir, key)
+        if not all(os.path.exists(path) for path in paths.values()):
+            return None
+        with open(paths["index"], "r", encoding="utf-8") as f:
+            index = json.load(f)
+        mode = "r" if mmap else None
+        return cls(
+            index["positions"], index["blink_levels"],
+            np.load(paths["tiles"], mmap_mode=mode),
+            np.load(paths["bands"], mmap_mode=mode),
+            np.load(paths["band_index"]),
+            np.load(paths["bg"], mmap_mode=mode),
+            index["rects"],
+        )
+
+
+def _cache_paths(out_dir, key):
+    stem = os.path.join(out_dir, f"eye_atlas_{key}" if key else "eye_atlas")
+    return {
+        "tiles": stem + "_tiles.npy",
+        "bands": stem + "_bands.npy",
+        "band_index": stem + "_band_index.npy",
+        "bg": stem + "_bg.npy",
+        "index": stem + ".json",
+    }
+
+
+def atlas_key(background_path, iris_path, positions, blink_levels):
+    """مفتاح الـ cache: يتغير مع الصور أو المواضع أو عدد مستويات الرمش"""
+    h = hashlib.sha1()
+    for path in (background_path, iris_path):
+        st = os.stat(path)
+        h.update(f"{os.path.abspath(path)}:{st.st_size}:{int(st.st_mtime)}".encode())
+    h.update(json.dumps([list(p) for p in positions]).encode())
+    h.update(str(blink_levels).encode())
+    return h.hexdigest()[:12]
+
+
+def load_or_build(background, iris, targets, background_path, iris_path,
+                  mode="ram", cache_dir="Resources/cache", blink_levels=DEFAULT_BLINK_LEVELS):
+    """
+    mode: "ram"  → بناء في الذاكرة عند التشغيل
+          "mmap" → cache على القرص (يُبنى مرة واحدة ثم np.load(mmap_mode="r"))
+    """
+    positions = EyeAtlas.expand_positions(targets)
+    start = time.perf_counter()
+
+    if mode == "mmap":
+        key = atlas_key(background_path, iris_path, positions, blink_levels)
+        atlas = EyeAtlas.load(cache_dir, key)
+        if atlas is not None:
+            print(f"[Atlas] ✅ Mapped {len(positions)} poses × {len(atlas.blink_levels)} blink levels "
+                  f"({atlas.nbytes / 1e6:.0f}MB on disk)")
+            return atlas
+        os.makedirs(cache_dir, exist_ok=True)
+        atlas = EyeAtlas.build(background, iris, positions, blink_levels, out_dir=cache_dir, key=key)
+    else:
+        atlas = EyeAtlas.build(background, iris, positions, blink_levels)
+
+    print(f"[Atlas] ✅ Built {len(positions)} poses × {len(atlas.blink_levels)} blink levels "
+          f"({atlas.nbytes / 1e6:.0f}MB, {mode}) in {time.perf_counter() - start:.1f}s")
+    return atlas
+
+
+class AtlasRenderer:
+    """
+    render(x, y, blink_amount) -> frame
+
+    - الموضع موجود في الـ atlas: نسخ tile جاهز (+ الخلفية عند تغيّر مستوى الرمش)
+    - غير موجود (أثناء الانتقال): SpriteRenderer الحي (الرمش بالـ LUT)
+    """
+
+    def __init__(self, atlas, background, iris):
+        self.atlas = atlas
+        self.frame = np.array(atlas.backgrounds[0])
+        self.live = SpriteRenderer(background, iris)
+
+        self._rect = None
+        self._level = 0
+        self._pos = None
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, x, y, blink_amount=0.0):
+        x, y = int(x), int(y)
+        pi = self.atlas.index.get((x, y))
+
+        if pi is None:
+            self.misses += 1
+            return self.live.render(x, y, blink_amount)
+
+        self.hits += 1
+        li = self.atlas.level_index(blink_amount)
+        if (pi, li) == self._pos:
+            return self.frame
+
+        base = self.atlas.backgrounds[li]
+        if li != self._level:
+            self.frame[...] = base
+            self._level = li
+        elif self._rect is not None:
+            x0, y0, x1, y1 = self._rect
+            self.frame[y0:y1, x0:x1] = base[y0:y1, x0:x1]
+
+        x0, y0, x1, y1 = self.atlas.rects[pi]
+        self.frame[y0:y1, x0:x1] = self.atlas.tiles[pi, :y1 - y0, :x1 - x0]
+        start, r0, r1 = self.atlas.band_index[pi, li]
+        if r1 > r0:
+            self.frame[y0 + r0:y0 + r1, x0:x1] = self.atlas.bands[start:start + r1 - r0, :x1 - x0]
+
+        self._rect = (x0, y0, x1, y1)
+        self._pos = (pi, li)
+        return self.frame
+
+
+# ==========================================
+# BENCHMARK: live compositing vs atlas
+# ==========================================
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import cv2
+
+    parser = argparse.ArgumentParser(description="Eye atlas builder / benchmark")
+    parser.add_argument("--mode", choices=["ram", "mmap"], default="ram")
+    parser.add_argument("--blink-levels", type=int, default=DEFAULT_BLINK_LEVELS)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--bench", action="store_true")
+    args = parser.parse_args()
+
+    bg_path, iris_path = "Resources/Eye-Background.png", "Resources/Eye-Ball.png"
+    background = cv2.imread(bg_path, cv2.IMREAD_UNCHANGED)
+    iris = cv2.imread(iris_path, cv2.IMREAD_UNCHANGED)
+
+    from eye_runner import EyeMovementController, overlay_iris, create_blink_overlay
+
+    atlas = load_or_build(background, iris, EyeMovementController.POSITIONS.values(),
+                          bg_path, iris_path, mode=args.mode, blink_levels=args.blink_levels)
+
+    if args.bench:
+        # Resting poses with micro-jitter, 1 frame in 8 blinking
+        random.seed(1)
+        targets = list(EyeMovementController.POSITIONS.values())
+        poses = []
+        for i in range(args.frames):
+            tx, ty = targets[(i // 30) % len(targets)]
+            blink = [0.0] * 7 + [random.choice([0.33, 0.66, 1.0])]
+            poses.append((int(tx + random.uniform(-2, 2)), int(ty + random.uniform(-1, 1)), blink[i % 8]))
+
+        def bench(name, fn):
+            fn(*poses[0])
+            cpu, wall = time.process_time(), time.perf_counter()
+            for pose in poses:
+                fn(*pose)
+            cpu = (time.process_time() - cpu) / len(poses) * 1000
+            wall = (time.perf_counter() - wall) / len(poses) * 1000
+            print(f"{name:28s} {wall:7.2f}ms wall  {cpu:7.2f}ms CPU per frame")
+            return cpu
+
+        def live_float(x, y, b):
+            frame = background.copy()
+            overlay_iris(frame, iris, x, y)
+            return create_blink_overlay(frame, b) if b > 0 else frame
+
+        sprite = SpriteRenderer(background, iris)
+
+        def live_sprite(x, y, b):
+            return sprite.render(x, y, b)
+
+        renderer = AtlasRenderer(atlas, background, iris)
+
+        base = bench("live (copy + float blend)", live_float)
+        bench("live (sprite + LUT lids)", live_sprite)
+        cpu = bench(f"atlas ({args.mode})", renderer.render)
+        print(f"Atlas hits: {renderer.hits}, misses: {renderer.misses}, speed-up vs float: {base / max(cpu, 1e-6):.0f}x")
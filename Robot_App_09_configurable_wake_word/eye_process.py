@@ -0,0 +1,427 @@
+# eye_process.py
+# Eye renderer in its own process (numpy blending / cv2.imshow no longer share the GIL
+# with pyaudio callbacks, the VAD loop and HTTP clients)
+# - Parent: EyeProcess("eye_runner") starts `python eye_process.py --model eye_runner ...`
+#   (a plain subprocess: main.py opens audio devices at import, so no multiprocessing spawn)
+# - Control state (running, talking, busy, emotion, gaze target, blink) lives in a small
+#   shared_memory struct: one writer (parent, seqlock), lock-free reader (child)
+# - Optional frame handoff: double-buffered frame in shared_memory (EYE_FRAME_SHM)
+# - Child: a bridge thread mirrors the struct into the eye module's own state
+#
+# Demo: python eye_process.py --demo
+
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+import audio_envelope
+import shm_util
+from render_scheduler import activity
+
+# ==========================================
+# SHARED CONTROL BLOCK
+# ==========================================
+
+EMOTIONS = ("neutral", "happy", "sad", "angry", "surprised", "sleepy")
+GAZE_TARGETS = ("center", "right", "left", "up", "down",
+                "up_right", "up_left", "down_right", "down_left")
+
+# seq, running, talking, busy, emotion, gaze_seq, gaze_idx, blink_seq
+_CONTROL = struct.Struct("<IBBBBIII")
+_FIELDS = ("running", "talking", "busy", "emotion", "gaze_seq", "gaze_idx", "blink_seq")
+# heartbeat (time.time), pid, frames
+_STATUS = struct.Struct("<dII")
+_STATUS_OFFSET = 64
+CONTROL_SIZE = _STATUS_OFFSET + _STATUS.size
+
+
+class ControlBlock:
+    """
+    Struct صغير في shared memory.
+    الكتابة: seqlock (seq فردي أثناء الكتابة) — الأب فقط يكتب الـ control
+    القراءة: إعادة المحاولة إذا تغيّر seq (بدون locks بين الـ processes)
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.owner = name is None
+        if self.owner:
+            self.shm = shm_util.create(CONTROL_SIZE)
+            self.shm.buf[:CONTROL_SIZE] = bytes(CONTROL_SIZE)
+        else:
+            self.shm = shm_util.attach(name)
+        self.name = self.shm.name
+        self._lock = threading.Lock()  # كتّاب متعددون داخل الأب (threads)
+        self._fields = [0, 1, 0, 0, 0, 0, 0, 0]
+        if self.owner:
+            _CONTROL.pack_into(self.shm.buf, 0, *self._fields)
+
+    # ---------------- Writer (parent) ----------------
+
+    def _write(self, changes) -> None:
+        fields = self._fields
+        for key, value in changes.items():
+            fields[1 + _FIELDS.index(key)] = int(value)
+        fields[0] += 1  # odd: write in progress
+        _CONTROL.pack_into(self.shm.buf, 0, *fields)
+        fields[0] += 1  # even: stable
+        struct.pack_into("<I", self.shm.buf, 0, fields[0])
+
+    def update(self, **changes) -> None:
+        with self._lock:
+            self._write(changes)
+
+    def bump(self, key: str, **changes) -> None:
+        """زيادة عدّاد حدث (gaze_seq / blink_seq) مع تغييرات أخرى"""
+        with self._lock:
+            changes[key] = self._fields[1 + _FIELDS.index(key)] + 1
+            self._write(changes)
+
+    # ---------------- Reader (child) ----------------
+
+    def read(self) -> Tuple[int, ...]:
+        """Returns (seq, running, talking, busy, emotion, gaze_seq, gaze_idx, blink_seq)"""
+        while True:
+            seq = struct.unpack_from("<I", self.shm.buf, 0)[0]
+            if seq & 1:
+                time.sleep(0)
+                continue
+            values = _CONTROL.unpack_from(self.shm.buf, 0)
+            if values[0] == seq:
+                return values
+
+    # ---------------- Status (child writes, parent reads) ----------------
+
+    def write_status(self, frames: int = 0) -> None:
+        _STATUS.pack_into(self.shm.buf, _STATUS_OFFSET, time.time(), os.getpid(), frames)
+
+    def read_status(self) -> Tuple[float, int, int]:
+        return _STATUS.unpack_from(self.shm.buf, _STATUS_OFFSET)
+
+    def close(self) -> None:
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except Exception:
+            pass
+
+
+# ==========================================
+# FRAME HANDOFF
+# ==========================================
+
+class SharedFrame:
+    """
+    Double buffer في shared memory: الكاتب يكتب في الـ back buffer ثم يقلب front.
+    header: seq (uint32), front (uint32)
+    """
+
+    HEADER = struct.Struct("<II")
+
+    def __init__(self, shape=(1080, 1920, 3), name: Optional[str] = None):
+        self.shape = tuple(shape)
+        frame_bytes = int(np.prod(self.shape))
+        size = 16 + 2 * frame_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shm_util.create(size)
+            self.HEADER.pack_into(self.shm.buf, 0, 0, 0)
+        else:
+            self.shm = shm_util.attach(name)
+        self.name = self.shm.name
+        self._frames = np.ndarray((2,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=16)
+
+    def write(self, frame: np.ndarray) -> None:
+        seq, front = self.HEADER.unpack_from(self.shm.buf, 0)
+        back = 1 - front
+        if frame.shape == self.shape:
+            self._frames[back][...] = frame
+        else:
+            h, w = min(frame.shape[0], self.shape[0]), min(frame.shape[1], self.shape[1])
+            self._frames[back][:h, :w] = frame[:h, :w, :3]
+        self.HEADER.pack_into(self.shm.buf, 0, seq + 1, back)
+
+    def read(self, copy: bool = True) -> Tuple[int, np.ndarray]:
+        """(seq, frame) — copy=False: view على الـ front buffer (قد يُكتب فوقه بعد إطارين)"""
+        seq, front = self.HEADER.unpack_from(self.shm.buf, 0)
+        frame = self._frames[front]
+        return seq, (frame.copy() if copy else frame)
+
+    def close(self) -> None:
+        self._frames = None
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except Exception:
+            pass
+
+
+# ==========================================
+# PARENT SIDE
+# ==========================================
+
+class EyeProcess:
+    """
+    بديل لـ `import eye_runner as eye` في main.py:
+        eye = EyeProcess("eye_runner")
+        threading.Thread(target=eye.run, daemon=True).start()
+        eye.set_talking(True) / eye.set_emotion("happy") / eye.look_at("left") / eye.blink()
+    """
+
+    def __init__(self, module: str, share_frames: bool = False, frame_shape=(1080, 1920, 3),
+                 restart_delay: float = 2.0, max_restarts: int = 3):
+        self.module = module
+        # TTS amplitude envelope (audio_envelope) readable from the renderer process
+        self.envelope_name = audio_envelope.envelope.share()
+        self.control = ControlBlock()
+        self.frames = SharedFrame(frame_shape) if share_frames else None
+        self.restart_delay = restart_delay
+        self.max_restarts = max_restarts
+        self.proc: Optional[subprocess.Popen] = None
+        self._stopping = False
+        # talking = explicit set_talking() OR TTS active (neither overrides the other)
+        self._talking = False
+        self._tts = False
+        self._talk_lock = threading.Lock()
+        # STT / TTS activity in this process → talking / busy flags in the renderer process
+        activity.subscribe(self._on_activity)
+
+    def _on_activity(self, active) -> None:
+        with self._talk_lock:
+            self._tts = "tts" in active
+            self.control.update(talking=self._talking or self._tts, busy=bool(active))
+
+    def start(self) -> None:
+        cmd = [sys.executable, os.path.abspath(__file__),
+               "--model", self.module, "--control", self.control.name,
+               "--envelope", self.envelope_name]
+        if self.frames is not None:
+            cmd += ["--frames", self.frames.name, "--frame-shape", ",".join(map(str, self.frames.shape))]
+        self.proc = subprocess.Popen(cmd)
+        print(f"👁️  [EyeProcess] {self.module} started (pid {self.proc.pid})")
+
+    def run(self) -> None:
+        """تشغيل ومراقبة الـ child (يُستدعى من thread مثل eye.run)"""
+        restarts = 0
+        self.start()
+        while not self._stopping:
+            code = self.proc.wait()
+            if self._stopping:
+                break
+            print(f"⚠️  [EyeProcess] renderer exited with code {code}")
+            if code == 0 or restarts >= self.max_restarts:
+                break
+            restarts += 1
+            time.sleep(self.restart_delay)
+            self.start()
+
+    # ---------------- Control API ----------------
+
+    def set_talking(self, talking: bool) -> None:
+        with self._talk_lock:
+            self._talking = bool(talking)
+            self.control.update(talking=self._talking or self._tts)
+
+    def set_emotion(self, emotion: str) -> None:
+        if emotion in EMOTIONS:
+            self.control.update(emotion=EMOTIONS.index(emotion))
+
+    def look_at(self, target: str) -> None:
+        if target in GAZE_TARGETS:
+            self.control.bump("gaze_seq", gaze_idx=GAZE_TARGETS.index(target))
+
+    def blink(self) -> None:
+        self.control.bump("blink_seq")
+
+    def is_alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def heartbeat_age(self) -> float:
+        heartbeat = self.control.read_status()[0]
+        return time.time() - heartbeat if heartbeat else float("inf")
+
+    def latest_frame(self, copy: bool = True):
+        return self.frames.read(copy) if self.frames is not None else (0, None)
+
+    def cleanup(self, timeout: float = 3.0) -> None:
+        self._stopping = True
+        activity.unsubscribe(self._on_activity)
+        self.control.update(running=False)
+        if self.proc is not None:
+            try:
+                self.proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.proc.terminate()
+                try:
+                    self.proc.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    self.proc.kill()
+        self.control.close()
+        if self.frames is not None:
+            self.frames.close()
+        print("✅ [EyeProcess] stopped")
+
+
+# ==========================================
+# CHILD SIDE
+# ==========================================
+
+def _bridge(control: ControlBlock, eye, poll: float = 0.02) -> None:
+    """يقرأ الـ control block ويطبّقه على حالة الـ eye module (داخل الـ child)"""
+    state = getattr(eye, "eye_state", None)
+    parent = os.getppid()
+    last = None
+    while True:
+        seq, running, talking, busy, emotion, gaze_seq, gaze_idx, blink_seq = control.read()
+        orphaned = os.getppid() != parent
+        if not running or orphaned:
+            if state is not None and hasattr(state, "stop"):
+                state.stop()
+            for name in ("stop", "stop_player"):
+                if hasattr(eye, name):
+                    getattr(eye, name)()
+            return
+
+        if last is None or seq != last[0]:
+            if last is None or talking != last[2]:
+                if state is not None and hasattr(state, "set_talking"):
+                    state.set_talking(bool(talking))
+                elif hasattr(eye, "set_talking"):
+                    eye.set_talking(bool(talking))
+            if last is None or busy != last[3]:
+                # Same adaptive FPS as in-process: busy_fps while STT/TTS runs in the parent
+                activity.set("remote", bool(busy))
+            if last is not None and emotion != last[4]:
+                name = EMOTIONS[emotion] if emotion < len(EMOTIONS) else EMOTIONS[0]
+                if state is not None and hasattr(state, "set_emotion"):
+                    state.set_emotion(name)
+                elif hasattr(eye, "set_emotion"):
+                    eye.set_emotion(name)
+            if last is not None and gaze_seq != last[5] and gaze_idx < len(GAZE_TARGETS):
+                if state is not None and hasattr(state, "request_look"):
+                    state.request_look(GAZE_TARGETS[gaze_idx])
+            if last is not None and blink_seq != last[7]:
+                if state is not None and hasattr(state, "request_blink"):
+                    state.request_blink()
+            last = (seq, running, talking, busy, emotion, gaze_seq, gaze_idx, blink_seq)
+
+        frames = getattr(state, "frames_presented", 0) if state is not None else 0
+        control.write_status(frames)
+        time.sleep(poll)
+
+
+def child_main(module: str, control_name: str, frames_name: Optional[str] = None,
+               frame_shape=(1080, 1920, 3), envelope_name: Optional[str] = None) -> None:
+    import importlib
+
+    control = ControlBlock(control_name)
+    if envelope_name:
+        # Before the eye module is imported: it samples audio_envelope.envelope
+        audio_envelope.envelope = audio_envelope.EnvelopeChannel(name=envelope_name)
+    eye = importlib.import_module(module)
+
+    frames = None
+    state = getattr(eye, "eye_state", None)
+    if frames_name and state is not None and hasattr(state, "frame_sink"):
+        frames = SharedFrame(frame_shape, name=frames_name)
+        state.frame_sink = frames.write
+
+    threading.Thread(target=_bridge, args=(control, eye), daemon=True, name="EyeBridge").start()
+    try:
+        eye.run()
+    finally:
+        if frames is not None:
+            frames.close()
+        control.close()
+
+
+# ==========================================
+# MAIN
+# ==========================================
+
+def _demo() -> None:
+    """Parent/child round trip with a headless fake renderer (no display needed)"""
+    import tempfile
+
+    fake = (
+        "import threading, time\n"
+        "class _State:\n"
+        "    def __init__(self):\n"
+        "        self.running = True; self.talking = False; self.frames_presented = 0\n"
+        "        self.frame_sink = None; self.log = []\n"
+        "    def set_talking(self, t): self.talking = t; self.log.append(('talking', t))\n"
+        "    def set_emotion(self, e): self.log.append(('emotion', e))\n"
+        "    def request_look(self, p): self.log.append(('look', p))\n"
+        "    def request_blink(self): self.log.append(('blink',))\n"
+        "    def stop(self): self.running = False\n"
+        "eye_state = _State()\n"
+        "def run():\n"
+        "    import numpy as np\n"
+        "    frame = np.zeros((4, 6, 3), np.uint8)\n"
+        "    while eye_state.running:\n"
+        "        frame[:] = eye_state.frames_presented % 256\n"
+        "        if eye_state.frame_sink: eye_state.frame_sink(frame)\n"
+        "        eye_state.frames_presented += 1\n"
+        "        time.sleep(1 / 30)\n"
+        "    print('[child] events:', eye_state.log)\n"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "fake_eye.py"), "w", encoding="utf-8") as f:
+            f.write(fake)
+        os.environ["PYTHONPATH"] = tmp + os.pathsep + os.environ.get("PYTHONPATH", "")
+
+        eye = EyeProcess("fake_eye", share_frames=True, frame_shape=(4, 6, 3))
+        runner = threading.Thread(target=eye.run, daemon=True)
+        runner.start()
+        time.sleep(1.0)
+
+        with activity.busy("tts"):
+            time.sleep(0.2)
+        eye.set_emotion("happy")
+        eye.look_at("left")
+        eye.blink()
+
+        # Parent-side write cost (what the audio threads pay per state change)
+        n = 20000
+        start = time.perf_counter()
+        for i in range(n):
+            eye.set_talking(i & 1 == 0)
+        per_update_us = (time.perf_counter() - start) / n * 1e6
+        eye.set_talking(False)
+        time.sleep(0.3)
+
+        seq, frame = eye.latest_frame()
+        _, pid, presented = eye.control.read_status()
+        print(f"child pid {pid}, alive {eye.is_alive()}, heartbeat age {eye.heartbeat_age() * 1000:.0f}ms")
+        print(f"frames presented {presented}, shared frame seq {seq}, pixel {frame[0, 0, 0]}")
+        print(f"control update: {per_update_us:.2f} µs")
+        eye.cleanup()
+        runner.join(timeout=2)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Eye renderer process")
+    parser.add_argument("--model", default="eye_runner")
+    parser.add_argument("--control")
+    parser.add_argument("--frames")
+    parser.add_argument("--frame-shape", default="1080,1920,3")
+    parser.add_argument("--envelope")
+    parser.add_argument("--demo", action="store_true")
+    args = parser.parse_args()
+
+    if args.demo:
+        _demo()
+    elif args.control:
+        child_main(args.model, args.control, args.frames,
+                   tuple(int(v) for v in args.frame_shape.split(",")), args.envelope)
+    else:
+        parser.error("--control is required (started by EyeProcess)")
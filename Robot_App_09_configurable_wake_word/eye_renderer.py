@@ -0,0 +1,305 @@
+# eye_renderer.py
+# Dirty-rect iris renderer for eye_runner.py / face_tracker.py
+# - Iris sprite trimmed to its alpha bounding box and premultiplied once at load (uint16 fixed point)
+# - Persistent framebuffer: only the iris rectangle is blended each frame
+# - The previous iris rect is restored from the background tile (no full-frame copy)
+# - Eyelids: in-place cv2.LUT on the band rows that changed since the previous frame
+
+import cv2
+import numpy as np
+
+
+def alpha_bbox(alpha):
+    """(y0, y1, x0, x1) of the non-transparent area (None if fully transparent)"""
+    rows = np.flatnonzero(alpha.any(axis=1))
+    cols = np.flatnonzero(alpha.any(axis=0))
+    if rows.size == 0 or cols.size == 0:
+        return None
+    return rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+
+class IrisSprite:
+    """
+    صورة القزحية بعد التجهيز المسبق:
+    - قص الحواف الشفافة
+    - premul = color * a   و   inv = 256 - a   (a من 0 إلى 256)
+    out = (premul + dst * inv + 128) >> 8   — كله uint16 بدون float
+    """
+
+    def __init__(self, iris, opacity=1.0):
+        if iris.ndim != 3 or iris.shape[2] != 4:
+            raise ValueError("IrisSprite needs a BGRA image")
+
+        alpha = iris[:, :, 3]
+        if opacity < 1.0:
+            alpha = (alpha.astype(np.float32) * opacity).astype(np.uint8)
+
+        bbox = alpha_bbox(alpha)
+        if bbox is None:
+            y0 = y1 = x0 = x1 = 0
+        else:
+            y0, y1, x0, x1 = bbox
+
+        # Offset of the trimmed sprite inside the original image
+        self.offset_x = int(x0)
+        self.offset_y = int(y0)
+
+        a = alpha[y0:y1, x0:x1].astype(np.uint16)
+        a += a >> 7  # 0..255 → 0..256 so that fully opaque is exact
+
+        self.premul = np.ascontiguousarray(iris[y0:y1, x0:x1, :3].astype(np.uint16) * a[:, :, None])
+        self.inv = np.ascontiguousarray((256 - a)[:, :, None])
+        self.height, self.width = a.shape
+
+        # Scratch buffer reused by every blend
+        self._work = np.empty((self.height, self.width, 3), dtype=np.uint16)
+
+    def blend(self, dst, src, sy, sx):
+        """
+        dst[...] = sprite over src
+        dst/src: views of the same shape, sy/sx: matching slices into the sprite
+        """
+        h, w = dst.shape[:2]
+        work = self._work[:h, :w]
+        np.multiply(src, self.inv[sy, sx], out=work)
+        work += self.premul[sy, sx]
+        work += 128
+        work >>= 8
+        dst[...] = work
+
+
+class EyelidLUT:
+    """
+    الرمش بدون float: جدولان uint8 (نفس تقريب create_blink_overlay)
+    الجفن العلوي × 0.2، الجفن السفلي × 0.3 — مستوى الرمش يغيّر ارتفاع الشريط فقط
+    """
+
+    TOP_FACTOR = 0.2
+    BOTTOM_FACTOR = 0.3
+
+    def __init__(self):
+        self.top = (np.arange(256) * self.TOP_FACTOR).astype(np.uint8)
+        self.bottom = (np.arange(256) * self.BOTTOM_FACTOR).astype(np.uint8)
+
+    @staticmethod
+    def bands(height, blink_amount):
+        """(top_rows, bottom_rows) المعتمة لمستوى الرمش"""
+        if blink_amount <= 0:
+            return 0, 0
+        close_height = int(height * blink_amount * 0.5)
+        return close_height, int(close_height * 0.6)
+
+
+class SpriteRenderer:
+    """
+    Framebuffer ثابت + رسم القزحية في المستطيل المتغير فقط.
+
+    render(x, y, blink_amount) -> frame   (x, y = موضع صورة القزحية الأصلية كما في overlay_iris)
+    الرمش يُطبق في نفس الـ framebuffer: فقط الأسطر التي دخلت أو خرجت من الشريط منذ الإطار السابق
+    last_dirty: المستطيلات التي تغيرت في آخر render (للعرض الجزئي)
+    """
+
+    def __init__(self, background, iris, opacity=1.0):
+        self.background = np.ascontiguousarray(background[:, :, :3])
+        self.frame = self.background.copy()
+        self.sprite = IrisSprite(iris, opacity)
+        self.lids = EyelidLUT()
+
+        self._rect = None   # (x0, y0, x1, y1) drawn in the framebuffer
+        self._slices = None
+        self._pos = None
+        self._bands = (0, 0)  # (top, bottom) darkened rows
+        self.last_dirty = []
+
+    def _clip(self, x, y):
+        """Framebuffer rect + sprite slices for the sprite at (x, y)"""
+        s = self.sprite
+        fh, fw = self.frame.shape[:2]
+        x0, y0 = x + s.offset_x, y + s.offset_y
+        x1, y1 = x0 + s.width, y0 + s.height
+
+        cx0, cy0 = max(0, x0), max(0, y0)
+        cx1, cy1 = min(fw, x1), min(fh, y1)
+        if cx1 <= cx0 or cy1 <= cy0:
+            return None, None, None
+
+        sy = slice(cy0 - y0, cy1 - y0)
+        sx = slice(cx0 - x0, cx1 - x0)
+        return (cx0, cy0, cx1, cy1), sy, sx
+
+    def restore(self, rect):
+        """إرجاع مستطيل من الخلفية"""
+        x0, y0, x1, y1 = rect
+        self.frame[y0:y1, x0:x1] = self.background[y0:y1, x0:x1]
+
+    # ---------------- Eyelids ----------------
+
+    def _darken(self, x0, y0, x1, y1):
+        """تطبيق الجفون على مستطيل غير معتم حالياً (cv2.LUT في نفس المكان)"""
+        h = self.frame.shape[0]
+        top, bottom = self._bands
+        if top > y0:
+            view = self.frame[y0:min(y1, top), x0:x1]
+            cv2.LUT(view, self.lids.top, dst=view)
+        if bottom and h - bottom < y1:
+            view = self.frame[max(y0, h - bottom):y1, x0:x1]
+            cv2.LUT(view, self.lids.bottom, dst=view)
+
+    def _undarken_rows(self, r0, r1):
+        """إرجاع أسطر كاملة بدون رمش: الخلفية + القزحية"""
+        self.frame[r0:r1] = self.background[r0:r1]
+        if self._rect is None:
+            return
+        x0, y0, x1, y1 = self._rect
+        a, b = max(r0, y0), min(r1, y1)
+        if a < b:
+            sy, sx = self._slices
+            rows = slice(sy.start + a - y0, sy.start + b - y0)
+            self.sprite.blend(self.frame[a:b, x0:x1], self.background[a:b, x0:x1], rows, sx)
+
+    def _update_lids(self, blink_amount):
+        """تعديل الأسطر التي تغيّرت حالتها فقط"""
+        h, w = self.frame.shape[:2]
+        old_top, old_bottom = self._bands
+        top, bottom = EyelidLUT.bands(h, blink_amount)
+        if (top, bottom) == (old_top, old_bottom):
+            return []
+
+        dirty = []
+
+        # Upper lid: rows [0, top)
+        if top > old_top:
+            view = self.frame[old_top:top]
+            cv2.LUT(view, self.lids.top, dst=view)
+            dirty.append((0, old_top, w, top))
+        elif top < old_top:
+            self._undarken_rows(top, old_top)
+            dirty.append((0, top, w, old_top))
+
+        # Lower lid: rows [h - bottom, h)
+        if bottom > old_bottom:
+            view = self.frame[h - bottom:h - old_bottom]
+            cv2.LUT(view, self.lids.bottom, dst=view)
+            dirty.append((0, h - bottom, w, h - old_bottom))
+        elif bottom < old_bottom:
+            self._undarken_rows(h - old_bottom, h - bottom)
+            dirty.append((0, h - old_bottom, w, h - bottom))
+
+        self._bands = (top, bottom)
+        return dirty
+
+    # ---------------- Render ----------------
+
+    def render(self, x, y, blink_amount=0.0):
+        x, y = int(x), int(y)
+
+        # 1) Eyelid bands for the current iris position
+        dirty = self._update_lids(blink_amount)
+
+        if (x, y) == self._pos:
+            self.last_dirty = dirty
+            return self.frame
+
+        # 2) Iris: restore old ∪ new rect from the clean background, blend, re-apply the lids
+        rect, sy, sx = self._clip(x, y)
+        area = self._rect
+        if rect is not None:
+            area = rect if area is None else (min(area[0], rect[0]), min(area[1], rect[1]),
+                                              max(area[2], rect[2]), max(area[3], rect[3]))
+
+        if area is not None:
+            self.restore(area)
+            if rect is not None:
+                x0, y0, x1, y1 = rect
+                # Blend against the clean background tile, straight into the framebuffer
+                self.sprite.blend(self.frame[y0:y1, x0:x1], self.background[y0:y1, x0:x1], sy, sx)
+            self._darken(*area)
+            dirty.append(area)
+
+        self._rect = rect
+        self._slices = (sy, sx)
+        self._pos = (x, y)
+        self.last_dirty = dirty
+        return self.frame
+
+    def reset(self):
+        """Framebuffer كامل من الخلفية (بعد أي رسم خارجي عليه)"""
+        self.frame[...] = self.background
+        self._rect = None
+        self._slices = None
+        self._pos = None
+        self._bands = (0, 0)
+
+
+# ✅ Quick check: same output as the float path, and per-frame cost
+if __name__ == "__main__":
+    import time
+
+    background = cv2.imread("Resources/Eye-Background.png", cv2.IMREAD_UNCHANGED)
+    iris = cv2.imread("Resources/Eye-Ball.png", cv2.IMREAD_UNCHANGED)
+
+    def overlay_float(frame, iris, x, y):
+        h = min(iris.shape[0], frame.shape[0] - y)
+        w = min(iris.shape[1], frame.shape[1] - x)
+        iris = iris[:h, :w]
+        alpha = np.stack([iris[:, :, 3] / 255.0] * 3, axis=2)
+        frame[y:y+h, x:x+w, :3] = (alpha * iris[:, :, :3] + (1 - alpha) * frame[y:y+h, x:x+w, :3]).astype(np.uint8)
+
+    renderer = SpriteRenderer(background, iris)
+    positions = [(325 + dx, 225 + dy) for dx in (-2, 0, 2, 75, -75) for dy in (-1, 0, 1, 25)]
+
+    ref = background.copy()
+    overlay_float(ref, iris, 400, 225)
+    out = renderer.render(400, 225)
+    print(f"Sprite: {renderer.sprite.width}x{renderer.sprite.height} "
+          f"(from {iris.shape[1]}x{iris.shape[0]}), max diff vs float: "
+          f"{int(np.abs(out.astype(int) - ref[:, :, :3].astype(int)).max())}")
+
+    n = 200
+    start = time.perf_counter()
+    for i in range(n):
+        x, y = positions[i % len(positions)]
+        frame = background.copy()
+        overlay_float(frame, iris, x, y)
+    float_ms = (time.perf_counter() - start) / n * 1000
+
+    start = time.perf_counter()
+    for i in range(n):
+        x, y = positions[i % len(positions)]
+        renderer.render(x, y)
+    sprite_ms = (time.perf_counter() - start) / n * 1000
+
+    print(f"copy + float overlay: {float_ms:.2f}ms/frame")
+    print(f"dirty-rect sprite:    {sprite_ms:.2f}ms/frame ({float_ms / sprite_ms:.1f}x)")
+
+    # Blink: in-place LUT vs background.copy() + float bands
+    def blink_overlay_float(frame, amount):
+        out = frame.copy()
+        top, bottom = EyelidLUT.bands(out.shape[0], amount)
+        if top:
+            out[:top] = (out[:top] * 0.2).astype(np.uint8)
+        if bottom:
+            out[-bottom:] = (out[-bottom:] * 0.3).astype(np.uint8)
+        return out
+
+    blink = [min(t, 2 - t) for t in np.arange(0, 2.0, 0.15)] * 10
+    clean = SpriteRenderer(background, iris)
+    worst = 0
+    for i, amount in enumerate(blink[:len(blink) // 10]):
+        x, y = positions[i % len(positions)]
+        ref = blink_overlay_float(clean.render(x, y), amount)
+        worst = max(worst, int(np.abs(renderer.render(x, y, amount).astype(int) - ref.astype(int)).max()))
+    print(f"Blink max diff vs float bands: {worst}")
+
+    start = time.perf_counter()
+    for i, amount in enumerate(blink):
+        blink_overlay_float(clean.render(325, 225), amount)
+    float_blink_ms = (time.perf_counter() - start) / len(blink) * 1000
+
+    start = time.perf_counter()
+    for i, amount in enumerate(blink):
+        renderer.render(325, 225, amount)
+    lut_blink_ms = (time.perf_counter() - start) / len(blink) * 1000
+
+    print(f"blink copy + float:   {float_blink_ms:.2f}ms/frame")
+    print(f"blink in-place LUT:   {lut_blink_ms:.2f}ms/frame ({float_blink_ms / max(lut_blink_ms, 1e-6):.1f}x)")
@@ -8,6 +8,10 @@ import numpy as np
 import threading
 from pathlib import Path
 from Config import Config
+from eye_renderer import SpriteRenderer
+from render_scheduler import RenderScheduler
+from eye_atlas import AtlasRenderer, load_or_build
+import audio_envelope
 
 # ==========================================
 # GLOBAL STATE
@@ -17,19 +21,54 @@ class EyeState:
         self.running = True
         self.blink_enabled = True
         self.talking = False  # للتكامل مع TTS
+        self.emotion = "neutral"
+        self._look_request = None
+        self._blink_request = False
+        self.frame_sink = None  # eye_process: نسخ الإطار المعروض إلى shared memory
+        self.frames_presented = 0
         self._lock = threading.Lock()
+        self.changed = threading.Event()  # يوقظ الـ render loop من وضع idle
     
     def set_talking(self, talking: bool):
         with self._lock:
             self.talking = talking
+        self.changed.set()
     
     def is_talking(self) -> bool:
         with self._lock:
             return self.talking
     
+    def set_emotion(self, emotion: str):
+        with self._lock:
+            self.emotion = emotion
+        self.changed.set()
+    
+    def request_look(self, position: str):
+        """طلب نظر لموضع معين (من thread / process آخر)"""
+        with self._lock:
+            self._look_request = position
+        self.changed.set()
+    
+    def request_blink(self):
+        with self._lock:
+            self._blink_request = True
+        self.changed.set()
+    
+    def amplitude(self) -> float:
+        """مستوى صوت الـ TTS الآن (0..1) للـ talking animation — بدون locks"""
+        return audio_envelope.envelope.level()
+    
+    def take_requests(self):
+        """Returns (look_position or None, blink_requested) ويمسحها"""
+        with self._lock:
+            look, blink = self._look_request, self._blink_request
+            self._look_request, self._blink_request = None, False
+        return look, blink
+    
     def stop(self):
         with self._lock:
             self.running = False
+        self.changed.set()
 
 # Global state instance
 eye_state = EyeState()
@@ -50,9 +89,12 @@ EYE_IRIS = Path("Resources/Eye-Ball.png")
 WINDOW_NAME = "Robot Eyes"
 FULLSCREEN = True
 DISPLAY_OFFSET = getattr(cfg, 'SCREEN_MOVEMENT', 0)  # للشاشات المتعددة
+EYE_ATLAS = getattr(cfg, 'EYE_ATLAS', 'off')  # off | ram | mmap
 
 # Performance settings
-FPS_TARGET = 30
+FPS_TARGET = getattr(cfg, 'EYE_FPS', 30)
+BUSY_FPS = getattr(cfg, 'EYE_BUSY_FPS', 15)  # أثناء STT / TTS
+STATS_INTERVAL = getattr(cfg, 'EYE_STATS_EVERY', 0.0)  # ثواني بين طباعة إحصائيات الإطارات، 0 = off
 FACE_DETECTION_INTERVAL = 2  # كل كم frame نكشف الوجه
 
 # ==========================================
@@ -161,28 +203,31 @@ class BlinkController:
     def __init__(self):
         self.is_blinking = False
         self.blink_progress = 0.0
-        self.blink_speed = 0.15  # سرعة الرمش
-        self.last_blink_time = time.time()
+        self.blink_speed = 4.5  # سرعة الرمش (progress/second — كان 0.15 لكل frame عند 30 FPS)
+        self.last_blink_time = time.perf_counter()
         self.blink_interval = random.uniform(2.5, 5.0)
         self.double_blink = False  # رمش مزدوج أحياناً
     
     def update(self, dt: float) -> float:
         """
         تحديث حالة الرمش
+        dt: الزمن منذ الإطار السابق (ثواني)
         Returns: blink_amount (0-1)
         """
-        current_time = time.time()
+        current_time = time.perf_counter()
         
-        # بدء رمش جديد
-        if not self.is_blinking and current_time - self.last_blink_time >= self.blink_interval:
+        # بدء رمش جديد (التقدّم يُحسب من موعد الرمش، لا من dt بعد نوم طويل)
+        overdue = current_time - self.last_blink_time - self.blink_interval
+        if not self.is_blinking and overdue >= 0:
             self.is_blinking = True
             self.blink_progress = 0.0
+            dt = min(dt, overdue)
             # 10% فرصة للرمش المزدوج
             self.double_blink = random.random() < 0.1
         
         # تحديث الرمش
         if self.is_blinking:
-            self.blink_progress += self.blink_speed
+            self.blink_progress += self.blink_speed * dt
             
             # انتهى الرمش
             if self.blink_progress >= 2.0:
@@ -209,6 +254,17 @@ class BlinkController:
             blink_amount = ease_in_out(2.0 - self.blink_progress)
         
         return blink_amount if self.is_blinking else 0.0
+    
+    def trigger(self):
+        """رمش فوري (يبدأ في الـ update التالي)"""
+        if not self.is_blinking:
+            self.blink_interval = time.perf_counter() - self.last_blink_time
+    
+    def next_event(self) -> float:
+        """موعد التغيير التالي (perf_counter)؛ 0 = يتحرك الآن"""
+        if self.is_blinking:
+            return 0.0
+        return self.last_blink_time + self.blink_interval
 
 
 # ==========================================
@@ -242,20 +298,22 @@ class EyeMovementController:
         # Micro-movements (حركات صغيرة واقعية)
         self.micro_x = 0
         self.micro_y = 0
-        self.micro_time = time.time()
+        self.micro_time = time.perf_counter()
         
         # Transition
         self.is_transitioning = False
         self.transition_progress = 0.0
-        self.transition_speed = 0.08
+        self.transition_speed = 2.4  # progress/second (كان 0.08 لكل frame عند 30 FPS)
+        self.start_x = self.current_x
+        self.start_y = self.current_y
         
         # Timing
-        self.last_movement_time = time.time()
+        self.last_movement_time = time.perf_counter()
         self.hold_duration = random.uniform(2.0, 4.0)
     
     def update(self, dt: float):
-        """تحديث موضع العين"""
-        current_time = time.time()
+        """تحديث موضع العين (dt بالثواني)"""
+        current_time = time.perf_counter()
         
         # Micro-movements (كل 100ms)
         if current_time - self.micro_time > 0.1:
@@ -264,12 +322,14 @@ class EyeMovementController:
             self.micro_time = current_time
         
         # بدء حركة جديدة
-        if not self.is_transitioning and current_time - self.last_movement_time >= self.hold_duration:
+        overdue = current_time - self.last_movement_time - self.hold_duration
+        if not self.is_transitioning and overdue >= 0:
             self.start_new_movement()
+            dt = min(dt, overdue)
         
         # Smooth transition
         if self.is_transitioning:
-            self.transition_progress += self.transition_speed
+            self.transition_progress += self.transition_speed * dt
             
             if self.transition_progress >= 1.0:
                 self.is_transitioning = False
@@ -277,10 +337,10 @@ class EyeMovementController:
                 self.current_x = self.target_x
                 self.current_y = self.target_y
             else:
-                # Smooth interpolation with easing
+                # Smooth interpolation with easing (from the start point: FPS-independent)
                 t = ease_in_out(self.transition_progress)
-                self.current_x = lerp(self.current_x, self.target_x, t)
-                self.current_y = lerp(self.current_y, self.target_y, t)
+                self.current_x = lerp(self.start_x, self.target_x, t)
+                self.current_y = lerp(self.start_y, self.target_y, t)
         
         # الموضع النهائي مع micro-movements
         final_x = int(self.current_x + self.micro_x)
@@ -288,10 +348,17 @@ class EyeMovementController:
         
         return final_x, final_y
     
+    def next_event(self) -> float:
+        """موعد التغيير التالي (perf_counter): micro-movement أو نهاية الـ hold؛ 0 = يتحرك الآن"""
+        if self.is_transitioning:
+            return 0.0
+        return min(self.micro_time + 0.1, self.last_movement_time + self.hold_duration)
+    
     def start_new_movement(self):
         """بدء حركة عين جديدة"""
         self.is_transitioning = True
         self.transition_progress = 0.0
+        self.start_x, self.start_y = self.current_x, self.current_y
         self.current_pos = self.target_pos
         
         # اختيار موضع جديد
@@ -307,7 +374,7 @@ class EyeMovementController:
         self.target_y = float(self.POSITIONS[self.target_pos][1])
         
         
-        self.last_movement_time = time.time()
+        self.last_movement_time = time.perf_counter()
         # مدة أطول عند النظر للمركز
         if self.target_pos == 'center':
             self.hold_duration = random.uniform(3.0, 5.0)
@@ -320,6 +387,7 @@ class EyeMovementController:
             self.target_pos = position
             self.target_x = float(self.POSITIONS[position][0])
             self.target_y = float(self.POSITIONS[position][1])
+            self.start_x, self.start_y = self.current_x, self.current_y
             self.is_transitioning = True
             self.transition_progress = 0.0
             
@@ -341,6 +409,22 @@ def run():
     if background_img is None or iris_img is None:
         print("❌ Cannot load eye images")
         return
+
+    # Persistent framebuffer: only the iris rectangle is redrawn each frame
+    renderer = SpriteRenderer(background_img, iris_img)
+
+    # Pre-rendered resting poses × blink levels (frames picked by index)
+    atlas_renderer = None
+    if EYE_ATLAS in ("ram", "mmap"):
+        try:
+            atlas = load_or_build(
+                background_img, iris_img, EyeMovementController.POSITIONS.values(),
+                str(EYE_BACKGROUND), str(EYE_IRIS),
+                mode=EYE_ATLAS, cache_dir=cfg.EYE_ATLAS_DIR, blink_levels=cfg.EYE_ATLAS_BLINK_LEVELS
+            )
+            atlas_renderer = AtlasRenderer(atlas, background_img, iris_img)
+        except Exception as e:
+            print(f"⚠️  Eye atlas disabled: {e}")
     
     
     # Controllers
@@ -352,37 +436,54 @@ def run():
     if FULLSCREEN:
         cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
     
-    # FPS control
-    frame_time = 1.0 / FPS_TARGET
-    last_time = time.time()
+    # Frame scheduler (perf_counter deadlines, lower FPS while STT/TTS is busy)
+    # Idle: ينام حتى الحدث التالي (micro-movement / رمش / حركة) أو حتى eye_state.changed
+    scheduler = RenderScheduler(fps=FPS_TARGET, busy_fps=BUSY_FPS, wake=eye_state.changed)
+    last_stats = time.perf_counter()
+    last_state = None  # (x, y, blink) آخر إطار معروض
+    next_event = None
     
-    print(f"✅ Eye movement started (FPS: {FPS_TARGET})")
+    print(f"✅ Eye movement started (FPS: {FPS_TARGET}, busy: {BUSY_FPS})")
     print("   Press 'q' or ESC to quit")
     print("   Press 'b' to toggle blinking")
     print("   Press 'c' to look at center")
     
     try:
         while eye_state.running:
-            current_time = time.time()
-            dt = current_time - last_time
-            last_time = current_time
+            dt = scheduler.wait(until=next_event)
+            scheduler.begin()
+            
+            # Requests from other threads / eye_process
+            look, blink = eye_state.take_requests()
+            if look:
+                movement_ctrl.look_at_position(look)
+            if blink:
+                blink_ctrl.trigger()
             
             # Update controllers
             iris_x, iris_y = movement_ctrl.update(dt)
             blink_amount = blink_ctrl.update(dt) if eye_state.blink_enabled else 0.0
             
-            # رسم العين
-            frame = background_img.copy()
-            overlay_iris(frame, iris_img, iris_x, iris_y)
-            
-            # تطبيق الرمش
-            if blink_amount > 0:
-                frame = create_blink_overlay(frame, blink_amount)
-            
-            # عرض
-            cv2.imshow(WINDOW_NAME, frame)
-            if DISPLAY_OFFSET > 0:
-                cv2.moveWindow(WINDOW_NAME, -DISPLAY_OFFSET, 0)
+            # لا تغيير → لا recompose ولا imshow
+            state = (iris_x, iris_y, blink_amount)
+            presented = state != last_state
+            if presented:
+                last_state = state
+                
+                # رسم العين
+                # الرمش داخل الـ atlas / في نفس الـ framebuffer (LUT)
+                if atlas_renderer is not None:
+                    frame = atlas_renderer.render(iris_x, iris_y, blink_amount)
+                else:
+                    frame = renderer.render(iris_x, iris_y, blink_amount)
+                
+                # عرض
+                cv2.imshow(WINDOW_NAME, frame)
+                if DISPLAY_OFFSET > 0:
+                    cv2.moveWindow(WINDOW_NAME, -DISPLAY_OFFSET, 0)
+                if eye_state.frame_sink is not None:
+                    eye_state.frame_sink(frame)
+                eye_state.frames_presented += 1
             
             # Keyboard input
             key = cv2.waitKey(1) & 0xFF
@@ -395,10 +496,13 @@ def run():
                 movement_ctrl.look_at_position('center')
                 print("Looking at center")
             
-            # FPS limiting
-            elapsed = time.time() - current_time
-            if elapsed < frame_time:
-                time.sleep(frame_time - elapsed)
+            scheduler.end(presented)
+            next_event = movement_ctrl.next_event()
+            if eye_state.blink_enabled:
+                next_event = min(next_event, blink_ctrl.next_event())
+            if STATS_INTERVAL and time.perf_counter() - last_stats >= STATS_INTERVAL:
+                last_stats = time.perf_counter()
+                print(f"[Eyes] {scheduler.format_stats()}")
     
     except KeyboardInterrupt:
         print("\n⚠️  Interrupted by user")
@@ -1,13 +1,105 @@
 # -*- coding: utf-8 -*-
-import os, time, platform
+# eye_runner_zero.py
+# Procedural "drawing" eyes for the Pi Zero (pygame, software renderer)
+# - Time-based animation: blink / gaze / emotion lids are computed from elapsed time,
+#   the loop never sleeps inside a blink (events and requests are handled every tick)
+# - Dirty rectangles: only the eye that changed is cleared, redrawn and pushed with
+#   pygame.display.update(rects); nothing is drawn while the state is unchanged
+# - Pupils (gaze), emotion lids (happy / sad / angry / sleepy / surprised), slight squint with TTS amplitude
+# - eye_state: same interface as eye_runner (talking / emotion / look / blink requests from eye_process)
+import os, time, platform, random, threading
 import pygame
 
+from Config import Config
+from render_scheduler import RenderScheduler
+import audio_envelope
+
 RENDER_W, RENDER_H = 480, 320
 BG_COLOR  = (0, 0, 0)
 EYE_COLOR = (255, 255, 255)
 EYE_SIZE  = 120
-BLINK_DELAY = 0.25
-BLINK_PAUSE = 2.5
+EYE_SPACING = 60
+BLINK_DELAY = 0.25   # مدة كل مرحلة من مراحل الرمش
+BLINK_PAUSE = 2.5    # بين نهاية رمشة وبداية التالية
+BLINK_LEVELS = (1.0, 0.5, 0.1, 0.5, 1.0)  # نفس تسلسل الرسم القديم [0, 1, 2, 1, 0]
+
+PUPIL_RADIUS = int(EYE_SIZE * 0.18)
+PUPIL_RANGE = (EYE_SIZE * 0.25, EYE_SIZE * 0.2)  # أقصى إزاحة للبؤبؤ (x, y)
+SACCADE_TIME = 0.12  # زمن انتقال النظرة
+LID_TIME = 0.2       # زمن انتقال الجفون عند تغيير الـ emotion
+STATS_INTERVAL = Config.EYE_STATS_EVERY  # 0 = off
+
+GAZE_OFFSETS = {
+    'center': (0.0, 0.0), 'right': (1.0, 0.0), 'left': (-1.0, 0.0),
+    'up': (0.0, -1.0), 'down': (0.0, 1.0),
+    'up_right': (0.7, -0.7), 'up_left': (-0.7, -0.7),
+    'down_right': (0.7, 0.7), 'down_left': (-0.7, 0.7),
+}
+
+# emotion → (top lid slope: +inner / -outer, top lid height, bottom lid height, eye scale, pupil scale)
+EMOTION_SHAPES = {
+    'neutral':   (0.0, 0.0, 0.0, 1.0, 1.0),
+    'happy':     (0.0, 0.0, 0.45, 1.0, 1.0),
+    'sad':       (-0.35, 0.25, 0.0, 1.0, 1.1),
+    'angry':     (0.4, 0.3, 0.0, 1.0, 0.9),
+    'surprised': (0.0, 0.0, 0.0, 1.15, 0.7),
+    'sleepy':    (0.0, 0.45, 0.0, 1.0, 1.0),
+}
+
+# ==========================================
+# GLOBAL STATE
+# ==========================================
+class EyeState:
+    def __init__(self):
+        self.running = True
+        self.blink_enabled = True
+        self.talking = False
+        self.emotion = "neutral"
+        self._look_request = None
+        self._blink_request = False
+        self.frames_presented = 0
+        self._lock = threading.Lock()
+        self.changed = threading.Event()  # يوقظ الـ render loop من وضع idle
+
+    def set_talking(self, talking: bool):
+        with self._lock:
+            self.talking = talking
+        self.changed.set()
+
+    def is_talking(self) -> bool:
+        with self._lock:
+            return self.talking
+
+    def set_emotion(self, emotion: str):
+        with self._lock:
+            self.emotion = emotion
+        self.changed.set()
+
+    def request_look(self, position: str):
+        with self._lock:
+            self._look_request = position
+        self.changed.set()
+
+    def request_blink(self):
+        with self._lock:
+            self._blink_request = True
+        self.changed.set()
+
+    def amplitude(self) -> float:
+        return audio_envelope.envelope.level()
+
+    def take_requests(self):
+        with self._lock:
+            look, blink = self._look_request, self._blink_request
+            self._look_request, self._blink_request = None, False
+        return look, blink
+
+    def stop(self):
+        with self._lock:
+            self.running = False
+        self.changed.set()
+
+eye_state = EyeState()
 
 def is_pi():
     m = platform.machine().lower()
@@ -47,52 +139,223 @@ def init_display():
             continue
     raise RuntimeError(f"Failed to init display with software renderer. Last error: {last_err}")
 
-# --- نفس دالة الرسم بتاعتك ---
-def draw_eyes(screen, state):
-    screen.fill(BG_COLOR)
-    spacing = 60
-    total_width = (EYE_SIZE * 2) + spacing
-    start_x = (RENDER_W - total_width) // 2
-    y_center = RENDER_H // 2
-
-    if state == 0:
-        h_factor = 1.0
-    elif state == 1:
-        h_factor = 0.5
-    else:
-        h_factor = 0.1
+def _ease(t):
+    return t * t * (3 - 2 * t)
+
+# ==========================================
+# ANIMATION (time-based, no sleeps)
+# ==========================================
+class EyeAnimator:
+    """
+    كل الحالة تُحسب من الوقت: update(now) → EyePose (tuple بالـ pixels)
+    نفس الـ pose مرتين = لا رسم
+    """
+
+    def __init__(self):
+        now = time.perf_counter()
+        # Blink
+        self.blink_start = None
+        self.next_blink = now + BLINK_PAUSE
+        # Gaze (unit offsets, eased between saccades)
+        self.gaze_from = self.gaze_to = (0.0, 0.0)
+        self.gaze_start = now - SACCADE_TIME
+        self.next_saccade = now + random.uniform(2.0, 5.0)
+        # Emotion lids
+        self.shape_from = self.shape_to = EMOTION_SHAPES['neutral']
+        self.emotion = 'neutral'
+        self.lid_start = now - LID_TIME
 
-    new_h = int(EYE_SIZE * h_factor)
-    y_top = y_center - new_h // 2
+    def blink(self, now):
+        if self.blink_start is None:
+            self.blink_start = now
 
-    pygame.draw.rect(screen, EYE_COLOR, (start_x, y_top, EYE_SIZE, new_h))
-    pygame.draw.rect(screen, EYE_COLOR, (start_x + EYE_SIZE + spacing, y_top, EYE_SIZE, new_h))
-    pygame.display.flip()
+    def look(self, position, now, hold=None):
+        offset = GAZE_OFFSETS.get(position)
+        if offset is None:
+            return
+        self.gaze_from = self._gaze(now)
+        self.gaze_to = offset
+        self.gaze_start = now
+        self.next_saccade = now + (hold if hold is not None else random.uniform(2.0, 5.0))
+
+    def set_emotion(self, emotion, now):
+        if emotion == self.emotion or emotion not in EMOTION_SHAPES:
+            return
+        self.shape_from = self._shape(now)
+        self.shape_to = EMOTION_SHAPES[emotion]
+        self.emotion = emotion
+        self.lid_start = now
+
+    def _gaze(self, now):
+        t = min(1.0, (now - self.gaze_start) / SACCADE_TIME)
+        k = _ease(t)
+        return tuple(a + (b - a) * k for a, b in zip(self.gaze_from, self.gaze_to))
+
+    def _shape(self, now):
+        t = min(1.0, (now - self.lid_start) / LID_TIME)
+        k = _ease(t)
+        return tuple(a + (b - a) * k for a, b in zip(self.shape_from, self.shape_to))
+
+    def _openness(self, now, blink_enabled):
+        if self.blink_start is None and blink_enabled and now >= self.next_blink:
+            self.blink_start = self.next_blink
+        if self.blink_start is None:
+            return 1.0
+        step = int((now - self.blink_start) / BLINK_DELAY)
+        if step >= len(BLINK_LEVELS):
+            self.blink_start = None
+            self.next_blink = now + BLINK_PAUSE
+            return 1.0
+        return BLINK_LEVELS[step]
+
+    def update(self, now, blink_enabled=True, talking=False, amplitude=0.0):
+        if now >= self.next_saccade:
+            # 60% العودة للمركز، غير ذلك نظرة عشوائية قصيرة
+            if self.gaze_to != (0.0, 0.0) and random.random() < 0.6:
+                self.look('center', now, random.uniform(3.0, 5.0))
+            else:
+                self.look(random.choice(list(GAZE_OFFSETS)), now, random.uniform(1.5, 3.0))
+
+        openness = self._openness(now, blink_enabled)
+        slope, top, bottom, scale, pupil_scale = self._shape(now)
+        if talking:
+            openness *= 1.0 - 0.08 * amplitude  # slight squint with the voice
+        gx, gy = self._gaze(now)
+
+        h = max(2, int(EYE_SIZE * scale * openness))
+        w = int(EYE_SIZE * scale)
+        return (w, h,
+                int(gx * PUPIL_RANGE[0]), int(gy * PUPIL_RANGE[1] * openness),
+                int(PUPIL_RADIUS * pupil_scale),
+                int(slope * h), int(top * h), int(bottom * h))
+
+    def next_event(self, now, blink_enabled=True, talking=False):
+        """موعد التغيير التالي (perf_counter)؛ 0 = يتحرك الآن"""
+        moving = (now - self.gaze_start < SACCADE_TIME or now - self.lid_start < LID_TIME
+                  or self.blink_start is not None)
+        if moving:
+            # Blink steps change every BLINK_DELAY: sleep until the next step only
+            if self.blink_start is not None and now - self.gaze_start >= SACCADE_TIME \
+                    and now - self.lid_start >= LID_TIME:
+                step = int((now - self.blink_start) / BLINK_DELAY) + 1
+                return self.blink_start + step * BLINK_DELAY
+            return 0.0
+        if talking:
+            return 0.0  # amplitude squint
+        nxt = self.next_saccade
+        if blink_enabled:
+            nxt = min(nxt, self.next_blink)
+        return nxt
+
+# ==========================================
+# RENDERER (dirty rectangles)
+# ==========================================
+class EyeRenderer:
+    """
+    كل عين لها slot ثابت (أكبر حجم ممكن): عند التغيير → fill الـ slot + رسم + update(slot)
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        total_width = (EYE_SIZE * 2) + EYE_SPACING
+        start_x = (RENDER_W - total_width) // 2
+        self.y_center = RENDER_H // 2
+        self.centers = (start_x + EYE_SIZE // 2, start_x + EYE_SIZE + EYE_SPACING + EYE_SIZE // 2)
+        big = int(EYE_SIZE * max(s[3] for s in EMOTION_SHAPES.values())) + 4
+        self.slots = [pygame.Rect(cx - big // 2, self.y_center - big // 2, big, big) for cx in self.centers]
+        self.last_pose = None
+        self.pixels = 0  # pushed to the display (stats)
+
+    def _draw_eye(self, index, pose):
+        w, h, px, py, pr, slope, top, bottom = pose
+        cx = self.centers[index]
+        eye = pygame.Rect(cx - w // 2, self.y_center - h // 2, w, h)
+        screen = self.screen
+        screen.fill(BG_COLOR, self.slots[index])
+        screen.fill(EYE_COLOR, eye)
+
+        screen.set_clip(eye)
+        # Pupil
+        if pr > 0:
+            pygame.draw.circle(screen, BG_COLOR, (cx + px, self.y_center + py), pr)
+        # Top lid: slope > 0 lowers the inner corner (angry), < 0 the outer corner (sad)
+        if top > 0 or slope:
+            inner_left = index == 1  # right eye: inner corner on the left
+            inner, outer = (top + max(0, slope), top + max(0, -slope))
+            left_drop, right_drop = (inner, outer) if inner_left else (outer, inner)
+            pygame.draw.polygon(screen, BG_COLOR, [
+                (eye.left, eye.top - 1), (eye.right, eye.top - 1),
+                (eye.right, eye.top + right_drop), (eye.left, eye.top + left_drop)])
+        # Bottom lid (happy): ellipse rising from below
+        if bottom > 0:
+            pygame.draw.ellipse(screen, BG_COLOR, pygame.Rect(
+                eye.left - w // 4, eye.bottom - bottom, w + w // 2, bottom * 2))
+        screen.set_clip(None)
+
+    def draw(self, pose, full=False):
+        """يرسم فقط إذا تغيّر الـ pose؛ يرجع True إذا عُرض شيء"""
+        if pose == self.last_pose and not full:
+            return False
+        self.last_pose = pose
+        if full:
+            self.screen.fill(BG_COLOR)
+        for index in range(2):
+            self._draw_eye(index, pose)
+        if full:
+            pygame.display.flip()
+            self.pixels += RENDER_W * RENDER_H
+        else:
+            pygame.display.update(self.slots)
+            self.pixels += sum(r.width * r.height for r in self.slots)
+        return True
 
 def run():
     # pygame.init()
     screen = init_display()  # ← الجديد
-    blink_sequence = [0, 1, 2, 1, 0]
-    running = True
-    last_blink = time.time()
+    animator = EyeAnimator()
+    renderer = EyeRenderer(screen)
+    scheduler = RenderScheduler(fps=Config.EYE_FPS, busy_fps=Config.EYE_BUSY_FPS, wake=eye_state.changed)
 
     # ارسم أول لقطة مفتوحة فورًا
-    draw_eyes(screen, 0)
+    renderer.draw(animator.update(time.perf_counter()), full=True)
+    next_event = None
+    last_stats = time.perf_counter()
 
     try:
-        while running:
+        while eye_state.running:
+            scheduler.wait(until=next_event)
+            scheduler.begin()
+
             for e in pygame.event.get():
                 if e.type == pygame.QUIT:
-                    running = False
+                    eye_state.stop()
                 elif e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE:
-                    running = False
-
-            now = time.time()
-            if now - last_blink >= BLINK_PAUSE:
-                for state in blink_sequence:
-                    draw_eyes(screen, state)
-                    time.sleep(BLINK_DELAY)
-                last_blink = time.time()
+                    eye_state.stop()
+                elif e.type == pygame.VIDEOEXPOSE:
+                    renderer.draw(renderer.last_pose, full=True)  # window content lost
+
+            now = time.perf_counter()
+            look, blink = eye_state.take_requests()
+            if look:
+                animator.look(look, now)
+            if blink:
+                animator.blink(now)
+            animator.set_emotion(eye_state.emotion, now)
+
+            talking = eye_state.is_talking()
+            pose = animator.update(now, eye_state.blink_enabled, talking,
+                                   eye_state.amplitude() if talking else 0.0)
+            presented = renderer.draw(pose)
+            if presented:
+                eye_state.frames_presented += 1
+
+            scheduler.end(presented)
+            next_event = animator.next_event(time.perf_counter(), eye_state.blink_enabled, talking)
+            if STATS_INTERVAL and time.perf_counter() - last_stats >= STATS_INTERVAL:
+                last_stats = time.perf_counter()
+                frames = max(1, eye_state.frames_presented)
+                print(f"[Eyes] {scheduler.format_stats()}, "
+                      f"{renderer.pixels / frames / (RENDER_W * RENDER_H) * 100:.0f}% of the screen per frame")
     except KeyboardInterrupt:
         print("\n⚠️  Interrupted by user")
     finally:
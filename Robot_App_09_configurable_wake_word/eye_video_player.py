@@ -2,6 +2,8 @@
 # مشغل فيديو بسيط يعمل على Raspberry Pi بدون threading
 import cv2
 import os
+from Config import Config
+from frame_store import open_store, parse_size
 
 # علم تحكم للإيقاف
 _stop_flag = False
@@ -32,12 +34,22 @@ def play(video_path="Resources/eye_videos/01.mp4", fullscreen=True, scale=1.0):
                     print(f"📂 تم العثور على {f} في {root}")
         return
 
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print(f"❌ فشل في فتح الفيديو: {video_path}")
-        return
+    # Raw frame store (frame_store.py): mmap + index، بدون decode ولا seek عند الإعادة
+    store = None
+    if Config.VIDEO_STORE:
+        store = open_store(video_path, Config.VIDEO_STORE_DIR, parse_size(Config.VIDEO_STORE_SIZE))
+
+    cap = None
+    if store is not None:
+        fps = store.fps
+        print(f"✅ Frame store: {store.path.name} ({len(store)} frames)")
+    else:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            print(f"❌ فشل في فتح الفيديو: {video_path}")
+            return
+        fps = cap.get(cv2.CAP_PROP_FPS)
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
     delay = int(1000 / fps) if fps and fps > 0 else 33  # تأخير آمن
 
     window_name = "Eye"
@@ -48,14 +60,21 @@ def play(video_path="Resources/eye_videos/01.mp4", fullscreen=True, scale=1.0):
         cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
 
     loops = 0
+    index = 0
 
     try:
         while not _stop_flag:
-            ret, frame = cap.read()
-            if not ret:
-                loops += 1
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                continue
+            if store is not None:
+                frame = store.frame(index)
+                index += 1
+                if index % len(store) == 0:
+                    loops += 1
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    loops += 1
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
 
             if not fullscreen and scale != 1.0:
                 h, w = frame.shape[:2]
@@ -77,8 +96,11 @@ def play(video_path="Resources/eye_videos/01.mp4", fullscreen=True, scale=1.0):
     except KeyboardInterrupt:
         pass
     finally:
-        cap.release()
+        if cap is not None:
+            cap.release()
         cv2.destroyAllWindows()
+        if store is not None:
+            store.close()
         print(f"✅ تم الإيقاف بعد {loops} دورة إعادة.")
 
 
@@ -8,6 +8,9 @@ import numpy as np
 from pathlib import Path
 from typing import Optional, List
 from Config import Config
+from video_frame_source import FrameSource
+from video_transitions import TransitionEngine
+from frame_store import parse_size
 
 # ==========================================
 # CONFIGURATION
@@ -28,6 +31,17 @@ FULLSCREEN = True
 DISPLAY_OFFSET = getattr(cfg, 'SCREEN_MOVEMENT', 0)
 FPS_TARGET = 30
 
+# Frame cache (Pi Zero: VIDEO_CACHE_MB=24, VIDEO_SCALE=0.5, VIDEO_STORAGE=gray)
+VIDEO_CACHE_MB = getattr(cfg, 'VIDEO_CACHE_MB', 64.0)
+VIDEO_SCALE = getattr(cfg, 'VIDEO_SCALE', 1.0)
+VIDEO_STORAGE = getattr(cfg, 'VIDEO_STORAGE', 'bgr')  # bgr | gray
+VIDEO_READAHEAD = getattr(cfg, 'VIDEO_READAHEAD', 8)
+# Transitions: ramp levels and working scale (0.5 = blend at half resolution)
+TRANSITION_STEPS = getattr(cfg, 'VIDEO_TRANSITION_STEPS', 32)
+TRANSITION_SCALE = getattr(cfg, 'VIDEO_TRANSITION_SCALE', 1.0)
+# Clips transcoded by frame_store.py are memory-mapped instead of decoded
+VIDEO_STORE_DIR = getattr(cfg, 'VIDEO_STORE_DIR', None) if getattr(cfg, 'VIDEO_STORE', False) else None
+
 # ==========================================
 # STATE MANAGEMENT
 # ==========================================
@@ -86,96 +100,66 @@ player_state = VideoPlayerState()
 # ==========================================
 
 class VideoLoader:
-    """محمل فيديوهات مع caching"""
+    """
+    محمل فيديوهات lazy: decode thread لكل فيديو + LRU محدود بالذاكرة (VIDEO_CACHE_MB)
+    بدل تحميل كل الـ frames عند البدء
+    """
     
     def __init__(self):
-        self.videos = {}
-        self.load_all_videos()
-    
-    def load_all_videos(self):
-        """تحميل كل الفيديوهات المتاحة"""
-        print("📹 Loading videos...")
-        
-        for name, path in VIDEO_PATHS.items():
-            if not path.exists():
-                print(f"⚠️  Video not found: {name} ({path})")
-                continue
-            
-            cap = cv2.VideoCapture(str(path))
-            if not cap.isOpened():
-                print(f"❌ Cannot open: {name}")
-                continue
-            
-            # تحميل كل الـ frames (للسرعة)
-            frames = []
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                frames.append(frame)
-            
-            cap.release()
-            
-            if frames:
-                self.videos[name] = frames
-                print(f"✅ Loaded {name}: {len(frames)} frames")
-            else:
-                print(f"⚠️  Empty video: {name}")
+        self.source = FrameSource(
+            VIDEO_PATHS,
+            max_mb=VIDEO_CACHE_MB,
+            scale=VIDEO_SCALE,
+            storage=VIDEO_STORAGE,
+            readahead=VIDEO_READAHEAD,
+            store_dir=VIDEO_STORE_DIR,
+            store_size=parse_size(getattr(cfg, 'VIDEO_STORE_SIZE', '')),
+        )
+        self.videos = self.source.clips
         
         if not self.videos:
             print("❌ No videos loaded!")
         else:
-            print(f"✅ Total videos loaded: {len(self.videos)}")
+            for name, clip in self.videos.items():
+                print(f"✅ Opened {name}: {clip.frame_count} frames @ {clip.fps:.0f} FPS")
+            print(f"✅ Total videos: {len(self.videos)} (cache {VIDEO_CACHE_MB:.0f}MB, "
+                  f"scale {VIDEO_SCALE}, {VIDEO_STORAGE})")
     
     def get_frame(self, video_name: str, frame_index: int) -> Optional[np.ndarray]:
-        """الحصول على frame معين"""
-        if video_name not in self.videos:
-            return None
-        
-        frames = self.videos[video_name]
-        if not frames:
-            return None
-        
-        # Loop the video
-        index = frame_index % len(frames)
-        return frames[index].copy()
+        """الحصول على frame معين (read-only من الـ cache، بدون copy)"""
+        # Loop the video (index % frame_count inside the source)
+        return self.source.get_frame(video_name, frame_index)
     
     def get_frame_count(self, video_name: str) -> int:
         """عدد الـ frames"""
-        if video_name not in self.videos:
-            return 0
-        return len(self.videos[video_name])
+        return self.source.get_frame_count(video_name)
+    
+    def close(self):
+        print(f"[Video] {self.source.format_stats()}")
+        self.source.close()
 
 
 # ==========================================
 # TRANSITION EFFECTS
 # ==========================================
 
+# Precomputed fade ramp + preallocated output buffers (outputs are reused: display them immediately)
+transitions = TransitionEngine(steps=TRANSITION_STEPS, work_scale=TRANSITION_SCALE)
+
+
 def blend_frames(frame1: np.ndarray, frame2: np.ndarray, alpha: float) -> np.ndarray:
     """مزج بين frameين"""
-    return cv2.addWeighted(frame1, 1 - alpha, frame2, alpha, 0)
+    return transitions.fade(frame1, frame2, alpha)
 
 
 def fade_transition(frame1: np.ndarray, frame2: np.ndarray, progress: float) -> np.ndarray:
     """Fade transition"""
-    return blend_frames(frame1, frame2, progress)
+    return transitions.fade(frame1, frame2, progress)
 
 
 def slide_transition(frame1: np.ndarray, frame2: np.ndarray, progress: float, direction='left') -> np.ndarray:
     """Slide transition"""
-    h, w = frame1.shape[:2]
-    offset = int(w * progress)
-    
-    result = np.zeros_like(frame1)
-    
-    if direction == 'left':
-        result[:, :w-offset] = frame1[:, offset:]
-        result[:, w-offset:] = frame2[:, :offset]
-    else:  # right
-        result[:, offset:] = frame1[:, :w-offset]
-        result[:, :offset] = frame2[:, w-offset:]
-    
-    return result
+    return transitions.slide(frame1, frame2, progress, direction)
 
 
 # ==========================================
@@ -228,6 +212,7 @@ def run(default_video='idle'):
             # Update transition
             transition_completed = player_state.update_transition(dt)
             if transition_completed:
+                transitions.finish()
                 current_frame_index = 0
                 print(f"✅ Switched to: {player_state.get_current_video()}")
             
@@ -242,6 +227,8 @@ def run(default_video='idle'):
             
             # Apply transition if active
             if player_state.is_transitioning and player_state.next_video:
+                if transitions.current != (current_video, player_state.next_video):
+                    transitions.begin(current_video, player_state.next_video)
                 next_frame = loader.get_frame(player_state.next_video, previous_frame_index)
                 if next_frame is not None:
                     frame = fade_transition(frame, next_frame, player_state.transition_progress)
@@ -269,7 +256,9 @@ def run(default_video='idle'):
             # Update frame index
             if not player_state.is_transitioning:
                 previous_frame_index = current_frame_index
-                current_frame_index = (current_frame_index + 1) % loader.get_frame_count(current_video)
+                frame_count = loader.get_frame_count(current_video)
+                # 0 = العدد غير معروف بعد (header ناقص): الـ source يلف الـ index بنفسه
+                current_frame_index = (current_frame_index + 1) % frame_count if frame_count else current_frame_index + 1
             
             # FPS limiting
             elapsed = time.time() - current_time
@@ -283,6 +272,7 @@ def run(default_video='idle'):
         import traceback
         traceback.print_exc()
     finally:
+        loader.close()
         cleanup()
 
 
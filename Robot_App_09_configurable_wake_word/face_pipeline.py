@@ -0,0 +1,499 @@
+# face_pipeline.py
+# Decoupled camera / face detection pipeline for face_tracker.trackUserFace
+# - CameraGrabber: capture thread that keeps only the latest frame (stale frames are dropped,
+#   the driver queue is kept at 1 so frames never pile up behind a slow detector)
+# - DetectionWorker: face detection on its own thread, on downscaled frames, at an adaptive rate
+#   (interval follows the measured inference time; slower while no face is visible)
+# - Detect-then-track (optional): between detections a TemplateTracker follows the face
+#   (matchTemplate on a small grayscale search window, ~1ms). The detector re-runs only when the
+#   match score drops or every `redetect_every` steps, first on an ROI around the last box.
+#   High-confidence matches refresh the template (follows slow pose / lighting changes)
+# - GazeLatency: capture→gaze latency (smoothing itself is gaze_motion.OneEuroFilter)
+# - Metrics: camera FPS, stale / failed frames, detection FPS, inference ms, detector CPU share,
+#   capture→gaze latency
+#
+# Demo (synthetic camera + slow fake detector): python face_pipeline.py
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[float, float, float, float]  # x, y, w, h
+
+
+@dataclass
+class Detection:
+    """نتيجة كشف واحدة (إحداثيات الإطار الكامل)"""
+    seq: int
+    captured: float                  # perf_counter when the camera frame arrived
+    detected: float                  # perf_counter when inference finished
+    frame_size: Tuple[int, int]      # (width, height)
+    box: Optional[Box] = None        # None = no face in this frame
+
+    @property
+    def center(self) -> Optional[Tuple[float, float]]:
+        if self.box is None:
+            return None
+        x, y, w, h = self.box
+        return x + w / 2.0, y + h / 2.0
+
+
+def cvzone_detect(detector) -> Callable[[np.ndarray], List[Box]]:
+    """cvzone FaceDetector (mediapipe) → detect_fn(img) -> [(x, y, w, h), ...]"""
+    def detect(img: np.ndarray) -> List[Box]:
+        _, bboxs = detector.findFaces(img, draw=False)
+        return [tuple(b["bbox"]) for b in bboxs] if bboxs else []
+    return detect
+
+
+# ==========================================
+# STAGE 1: CAPTURE
+# ==========================================
+
+class CameraGrabber:
+    """
+    Thread يقرأ الكاميرا باستمرار ويحتفظ بآخر frame فقط.
+        seq, frame, captured = grabber.latest(after_seq)
+    """
+
+    def __init__(self, cap, flip: bool = False):
+        self.cap = cap
+        self.flip = flip
+        try:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # not every backend supports it
+        except Exception:
+            pass
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._captured = 0.0
+        self._taken = 0
+        self.seq = 0
+        self._running = False
+        self._thread = None
+
+        # Stats
+        self.failures = 0
+        self.stale = 0  # frames replaced before anyone took them
+        self._times = deque(maxlen=60)
+
+    def start(self) -> "CameraGrabber":
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="CameraGrabber")
+        self._thread.start()
+        return self
+
+    def _loop(self) -> None:
+        while self._running:
+            ok, frame = self.cap.read()
+            captured = time.perf_counter()
+            if not ok:
+                self.failures += 1
+                if self.failures % 50 == 1:
+                    print("⚠️  [FacePipeline] Failed to read from camera")
+                time.sleep(0.1)
+                continue
+            if self.flip:
+                frame = cv2.flip(frame, 0)
+            with self._cond:
+                if self._frame is not None and self._taken != self.seq:
+                    self.stale += 1
+                self._frame, self._captured = frame, captured
+                self.seq += 1
+                self._times.append(captured)
+                self._cond.notify_all()
+
+    def latest(self, after_seq: int = 0, timeout: float = 0.5):
+        """أحدث frame بعد after_seq: (seq, frame, captured) أو None عند انتهاء المهلة"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.seq > after_seq or not self._running, timeout):
+                return None
+            if self.seq <= after_seq:
+                return None
+            self._taken = self.seq
+            return self.seq, self._frame, self._captured
+
+    def fps(self) -> float:
+        with self._cond:
+            times = list(self._times)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def stop(self) -> None:
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+# ==========================================
+# STAGE 2: DETECTION (+ TRACKING)
+# ==========================================
+
+def _clip_box(box, width: int, height: int, margin: float = 0.0) -> Tuple[int, int, int, int]:
+    """box (x, y, w, h) موسّع بـ margin × حجمه من كل جهة → (x0, y0, x1, y1) داخل الإطار"""
+    x, y, w, h = box
+    mx, my = w * margin, h * margin
+    x0, y0 = max(0, int(x - mx)), max(0, int(y - my))
+    x1, y1 = min(width, int(x + w + mx)), min(height, int(y + h + my))
+    return x0, y0, x1, y1
+
+
+class TemplateTracker:
+    """
+    Tracker رخيص بين الـ detections: template الوجه من آخر كشف،
+    والبحث عنه بـ matchTemplate في نافذة حول الموضع السابق فقط.
+    score (TM_CCOEFF_NORMED) هو مقياس الثقة؛ score ≥ refresh_score → الـ template يُحدَّث
+    من الموضع الجديد (وإلا ينجرف الوجه عن template قديم حتى الكشف التالي)
+    """
+
+    def __init__(self, search: float = 0.5, min_size: int = 8, refresh_score: float = 0.85):
+        self.search = float(search)  # search window margin, fraction of the box size
+        self.min_size = min_size
+        self.refresh_score = float(refresh_score)
+        self.refreshes = 0
+        self.template = None
+        self.box = None
+
+    def init(self, gray: np.ndarray, box: Box) -> bool:
+        x0, y0, x1, y1 = _clip_box(box, gray.shape[1], gray.shape[0])
+        if x1 - x0 < self.min_size or y1 - y0 < self.min_size:
+            self.template = self.box = None
+            return False
+        self.template = gray[y0:y1, x0:x1].copy()
+        self.box = (x0, y0, x1 - x0, y1 - y0)
+        return True
+
+    def update(self, gray: np.ndarray) -> Tuple[Optional[Box], float]:
+        if self.template is None:
+            return None, 0.0
+        x0, y0, x1, y1 = _clip_box(self.box, gray.shape[1], gray.shape[0], self.search)
+        th, tw = self.template.shape[:2]
+        if x1 - x0 < tw or y1 - y0 < th:
+            return None, 0.0
+        result = cv2.matchTemplate(gray[y0:y1, x0:x1], self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, loc = cv2.minMaxLoc(result)
+        bx, by = x0 + loc[0], y0 + loc[1]
+        self.box = (bx, by, tw, th)
+        if score >= self.refresh_score:
+            self.template = gray[by:by + th, bx:bx + tw].copy()
+            self.refreshes += 1
+        return self.box, float(score)
+
+
+class DetectionWorker:
+    """
+    Thread الكشف: يأخذ أحدث frame، يصغّره، يشغّل detect_fn ثم ينام حسب الـ interval التكيّفي.
+    interval (بداية خطوة → بداية التالية) = زمن الخطوة / duty، بين 1/max_fps و 1/idle_fps (لا وجه → idle_fps)
+    tracker: TemplateTracker بين الـ detections (detect-then-track)؛ None = كشف كامل كل خطوة
+    """
+
+    def __init__(self, grabber: CameraGrabber, detect_fn: Callable[[np.ndarray], List[Box]],
+                 scale: float = 0.5, gray: bool = False, max_fps: float = 15.0,
+                 idle_fps: float = 4.0, duty: float = 0.5,
+                 notify: Optional[threading.Event] = None,
+                 tracker: Optional[TemplateTracker] = None, redetect_every: int = 15,
+                 min_score: float = 0.6, roi_margin: float = 1.0):
+        self.grabber = grabber
+        self.detect_fn = detect_fn
+        self.scale = float(scale)
+        self.gray = gray  # only for detectors that accept single-channel input (mediapipe does not)
+        self.min_interval = 1.0 / max(0.1, max_fps)
+        self.idle_interval = max(self.min_interval, 1.0 / max(0.1, idle_fps))
+        self.duty = min(1.0, max(0.05, duty))
+        self.notify = notify
+        self.tracker = tracker
+        self.redetect_every = max(1, int(redetect_every))
+        self.min_score = float(min_score)
+        self.roi_margin = float(roi_margin)
+        self._tracked_box: Optional[Box] = None  # last known box (small-frame coords)
+        self._since_detect = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._detection: Optional[Detection] = None
+        self.seq = 0
+
+        # Stats
+        self.inference_ms = 0.0  # EMA of one step (detection or tracking)
+        self.interval = self.min_interval
+        self._times = deque(maxlen=30)
+        self.errors = 0
+        self.detections = 0
+        self.roi_detections = 0
+        self.tracked = 0
+        self.track_failures = 0
+        self.detect_ms_total = 0.0
+        self._started = time.perf_counter()
+
+    def start(self) -> "DetectionWorker":
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="FaceDetection")
+        self._thread.start()
+        return self
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if self.gray and frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def _detect(self, small: np.ndarray, roi=None) -> Optional[Box]:
+        """detect_fn على الإطار أو على ROI (x0, y0, x1, y1) منه"""
+        t0 = time.perf_counter()
+        try:
+            if roi is None:
+                boxes = self.detect_fn(small)
+            else:
+                x0, y0, x1, y1 = roi
+                boxes = [(x + x0, y + y0, w, h) for x, y, w, h in self.detect_fn(small[y0:y1, x0:x1])]
+        except Exception as e:
+            self.errors += 1
+            if self.errors % 50 == 1:
+                print(f"⚠️  [FacePipeline] detection error: {e}")
+            boxes = []
+        self.detect_ms_total += (time.perf_counter() - t0) * 1000.0
+        self.detections += 1
+        if roi is not None:
+            self.roi_detections += 1
+        return tuple(boxes[0]) if boxes else None
+
+    def _step(self, small: np.ndarray) -> Optional[Box]:
+        """خطوة واحدة: tracking إذا أمكن، وإلا كشف (ROI حول آخر موضع أولاً ثم الإطار كاملاً)"""
+        if self.tracker is None:
+            return self._detect(small)
+
+        gray = small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self._tracked_box is not None and self._since_detect < self.redetect_every:
+            box, score = self.tracker.update(gray)
+            if box is not None and score >= self.min_score:
+                self._tracked_box = box
+                self._since_detect += 1
+                self.tracked += 1
+                return box
+            self.track_failures += 1
+
+        box = None
+        if self._tracked_box is not None:
+            roi = _clip_box(self._tracked_box, small.shape[1], small.shape[0], self.roi_margin)
+            box = self._detect(small, roi)
+        if box is None:
+            box = self._detect(small)
+        self._since_detect = 0
+        self._tracked_box = box if box is not None and self.tracker.init(gray, box) else None
+        return box
+
+    def _next_interval(self, face: bool) -> float:
+        # Start-to-start: the step itself is inside the interval, so step / duty keeps
+        # the detector at `duty` of one core (step × (1/duty − 1) is only the idle part)
+        interval = max(self.min_interval, (self.inference_ms / 1000.0) / self.duty)
+        return interval if face else max(interval, self.idle_interval)
+
+    def _loop(self) -> None:
+        frame_seq = 0
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            got = self.grabber.latest(frame_seq, timeout=0.5)
+            if got is None:
+                continue
+            frame_seq, frame, captured = got
+
+            t0 = time.perf_counter()
+            box = self._step(self._prepare(frame))
+            detected = time.perf_counter()
+            ms = (detected - t0) * 1000.0
+            self.inference_ms = ms if self.inference_ms == 0.0 else self.inference_ms * 0.8 + ms * 0.2
+
+            if box is not None:
+                x, y, w, h = box
+                inv = 1.0 / self.scale
+                box = (x * inv, y * inv, w * inv, h * inv)
+            with self._lock:
+                self.seq += 1
+                self._detection = Detection(self.seq, captured, detected,
+                                            (frame.shape[1], frame.shape[0]), box)
+                self._times.append(detected)
+            if self.notify is not None:
+                self.notify.set()
+
+            self.interval = self._next_interval(box is not None)
+            self._stop.wait(max(0.0, started + self.interval - time.perf_counter()))
+
+    def latest(self) -> Optional[Detection]:
+        with self._lock:
+            return self._detection
+
+    def fps(self) -> float:
+        with self._lock:
+            times = list(self._times)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def detector_cpu(self) -> float:
+        """نسبة الوقت التي قضاها الـ detector (من core واحد) منذ البدء"""
+        elapsed = time.perf_counter() - self._started
+        return (self.detect_ms_total / 1000.0) / elapsed if elapsed > 0 else 0.0
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+class FacePipeline:
+    """
+        pipeline = FacePipeline(cap, cvzone_detect(detector), flip=CAMERA_FLIP).start()
+        det = pipeline.latest()          # من الـ render loop (لا يحجب)
+        pipeline.stop()
+    """
+
+    def __init__(self, cap, detect_fn, flip: bool = False, scale: float = 0.5, gray: bool = False,
+                 max_fps: float = 15.0, idle_fps: float = 4.0, duty: float = 0.5,
+                 notify: Optional[threading.Event] = None, track: bool = False,
+                 redetect_every: int = 15, min_score: float = 0.6, roi_margin: float = 1.0):
+        self.grabber = CameraGrabber(cap, flip)
+        self.worker = DetectionWorker(self.grabber, detect_fn, scale, gray, max_fps,
+                                      idle_fps, duty, notify,
+                                      tracker=TemplateTracker() if track else None,
+                                      redetect_every=redetect_every, min_score=min_score,
+                                      roi_margin=roi_margin)
+
+    def start(self) -> "FacePipeline":
+        self.grabber.start()
+        self.worker.start()
+        return self
+
+    def latest(self) -> Optional[Detection]:
+        return self.worker.latest()
+
+    def format_stats(self) -> str:
+        g, w = self.grabber, self.worker
+        text = (f"camera {g.fps():.1f} FPS (stale {g.stale}, failed {g.failures}), "
+                f"detect {w.fps():.1f} FPS (step {w.inference_ms:.1f}ms, "
+                f"interval {w.interval * 1000:.0f}ms), detector CPU {w.detector_cpu() * 100:.0f}%")
+        if w.tracker is not None:
+            text += (f" [{w.detections} detections ({w.roi_detections} ROI), {w.tracked} tracked, "
+                     f"{w.track_failures} lost]")
+        return text
+
+    def stop(self) -> None:
+        self.worker.stop()
+        self.grabber.stop()
+
+
+# ==========================================
+# STAGE 3: RENDER-SIDE LATENCY
+# ==========================================
+
+class GazeLatency:
+    """زمن التقاط الكاميرا → أول إطار معروض يحمل نتيجة الكشف"""
+
+    def __init__(self, stats_window: int = 120):
+        self._pending_capture: Optional[float] = None
+        self._latency_ms = deque(maxlen=stats_window)
+
+    def mark(self, captured: float) -> None:
+        if self._pending_capture is None:
+            self._pending_capture = captured
+
+    def presented(self, now: Optional[float] = None) -> None:
+        if self._pending_capture is not None:
+            now = time.perf_counter() if now is None else now
+            self._latency_ms.append((now - self._pending_capture) * 1000.0)
+            self._pending_capture = None
+
+    def format_stats(self) -> str:
+        ms = sorted(self._latency_ms)
+        if not ms:
+            return "capture→gaze n/a"
+        return (f"capture→gaze avg {sum(ms) / len(ms):.0f}ms "
+                f"p95 {ms[int(0.95 * (len(ms) - 1))]:.0f}ms")
+
+
+# ==========================================
+# DEMO
+# ==========================================
+
+if __name__ == "__main__":
+    from gaze_motion import OneEuroFilter
+
+    class SyntheticCamera:
+        """30 FPS camera with a bright 'face' moving left and right"""
+
+        def __init__(self, fps: float = 30.0, size: Tuple[int, int] = (640, 480)):
+            self.period = 1.0 / fps
+            self.size = size
+            self.next = time.perf_counter()
+            self.t0 = self.next
+
+        def set(self, *args):
+            return False
+
+        def read(self):
+            self.next += self.period
+            time.sleep(max(0.0, self.next - time.perf_counter()))
+            w, h = self.size
+            frame = np.zeros((h, w, 3), np.uint8)
+            cx = int(w / 2 + w * 0.35 * math.sin(time.perf_counter() - self.t0))
+            cv2.circle(frame, (cx, h // 2), 60, (200, 200, 200), -1)
+            for dx in (-22, 22):  # eyes: texture for the template tracker
+                cv2.circle(frame, (cx + dx, h // 2 - 15), 9, (40, 40, 40), -1)
+            cv2.ellipse(frame, (cx, h // 2 + 25), (22, 8), 0, 0, 180, (60, 60, 60), 3)
+            return True, frame
+
+    def slow_detect(img: np.ndarray) -> List[Box]:
+        time.sleep(0.045)  # ~mediapipe on a Pi
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        points = cv2.findNonZero(gray)
+        return [cv2.boundingRect(points)] if points is not None else []
+
+    def run(track: bool, seconds: float = 6.0) -> None:
+        camera = SyntheticCamera()
+        pipeline = FacePipeline(camera, slow_detect, track=track).start()
+        smooth = OneEuroFilter(n=1, min_cutoff=1.0, beta=0.05)
+        latency = GazeLatency()
+        target = 325.0
+        period = 1.0 / 30
+        last_seq = 0
+        frame_ms = []
+        errors = []
+        start = time.perf_counter()
+        next_t = start
+        while time.perf_counter() - start < seconds:
+            t0 = time.perf_counter()
+            det = pipeline.latest()
+            if det is not None and det.seq != last_seq:
+                last_seq = det.seq
+                if det.center is not None:
+                    cx = det.center[0] / det.frame_size[0]  # 0..1
+                    target = 250 + 150 * cx
+                    latency.mark(det.captured)
+            x = float(smooth(target, period)[0])
+            latency.presented()
+            frame_ms.append((time.perf_counter() - t0) * 1000)
+            # tracking error against the true face position right now
+            true_x = 250 + 150 * (0.5 + 0.35 * math.sin(time.perf_counter() - camera.t0))
+            errors.append(abs(x - true_x))
+            next_t += period
+            time.sleep(max(0.0, next_t - time.perf_counter()))
+        pipeline.stop()
+
+        print(f"[Demo] {'detect-then-track' if track else 'detect every step'}:")
+        print(f"   render loop {len(frame_ms) / seconds:.1f} FPS, max {max(frame_ms):.2f}ms per frame")
+        print(f"   {pipeline.format_stats()}")
+        print(f"   {latency.format_stats()}, mean gaze error {np.mean(errors):.1f}px")
+
+    run(track=False)
+    run(track=True)
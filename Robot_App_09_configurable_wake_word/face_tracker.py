@@ -8,6 +8,11 @@ import numpy as np
 import threading
 from pathlib import Path
 from Config import Config
+from eye_renderer import SpriteRenderer
+from render_scheduler import RenderScheduler
+from face_pipeline import FacePipeline, GazeLatency, cvzone_detect
+from gaze_motion import GazeMapper, OneEuroFilter, ServoRateLimiter
+from servo_channel import ServoChannel
 
 try:
     from cvzone.FaceDetectionModule import FaceDetector
@@ -28,10 +33,12 @@ class EyeState:
         self.blink_enabled = True
         self.talking = False  # للتكامل مع TTS
         self._lock = threading.Lock()
+        self.changed = threading.Event()  # يوقظ الـ render loop من وضع idle
     
     def set_talking(self, talking: bool):
         with self._lock:
             self.talking = talking
+        self.changed.set()
     
     def is_talking(self) -> bool:
         with self._lock:
@@ -40,6 +47,7 @@ class EyeState:
     def set_mode(self, mode: str):
         with self._lock:
             self.mode = mode
+        self.changed.set()
     
     def get_mode(self) -> str:
         with self._lock:
@@ -48,6 +56,7 @@ class EyeState:
     def stop(self):
         with self._lock:
             self.running = False
+        self.changed.set()
 
 # Global state instance
 eye_state = EyeState()
@@ -70,8 +79,32 @@ FULLSCREEN = True
 DISPLAY_OFFSET = getattr(cfg, 'SCREEN_MOVEMENT', 0)  # للشاشات المتعددة
 
 # Performance settings
-FPS_TARGET = 30
-FACE_DETECTION_INTERVAL = 2  # كل كم frame نكشف الوجه
+FPS_TARGET = getattr(cfg, 'EYE_FPS', 30)
+BUSY_FPS = getattr(cfg, 'EYE_BUSY_FPS', 15)  # أثناء STT / TTS
+STATS_INTERVAL = getattr(cfg, 'EYE_STATS_EVERY', 0.0)  # ثواني بين طباعة إحصائيات الإطارات، 0 = off
+
+# Face detection pipeline (face_pipeline.py): الكشف في thread خاص بمعدل تكيّفي
+FACE_DETECT_SCALE = getattr(cfg, 'FACE_DETECT_SCALE', 0.5)
+FACE_DETECT_MAX_FPS = getattr(cfg, 'FACE_DETECT_MAX_FPS', 15.0)
+FACE_DETECT_IDLE_FPS = getattr(cfg, 'FACE_DETECT_IDLE_FPS', 4.0)
+FACE_DETECT_DUTY = getattr(cfg, 'FACE_DETECT_DUTY', 0.5)
+FACE_TRACK = getattr(cfg, 'FACE_TRACK', True)  # detect-then-track
+FACE_REDETECT_EVERY = getattr(cfg, 'FACE_REDETECT_EVERY', 15)
+FACE_TRACK_MIN_SCORE = getattr(cfg, 'FACE_TRACK_MIN_SCORE', 0.6)
+FACE_ROI_MARGIN = getattr(cfg, 'FACE_ROI_MARGIN', 1.0)
+
+# Continuous gaze (gaze_motion.py)
+GAZE_MIN_CUTOFF = getattr(cfg, 'GAZE_MIN_CUTOFF', 1.0)
+GAZE_BETA = getattr(cfg, 'GAZE_BETA', 0.05)
+GAZE_RELEASE_AFTER = getattr(cfg, 'GAZE_RELEASE_AFTER', 1.5)  # ثواني بلا وجه قبل release()
+GAZE_RANGE_X = getattr(cfg, 'GAZE_RANGE_X', 75.0)
+GAZE_RANGE_Y = getattr(cfg, 'GAZE_RANGE_Y', 25.0)
+SERVO_MAX_SPEED = getattr(cfg, 'SERVO_MAX_SPEED', 120.0)  # °/s
+SERVO_DEADBAND = getattr(cfg, 'SERVO_DEADBAND', 1.0)
+SERVO_MIN_INTERVAL = getattr(cfg, 'SERVO_MIN_INTERVAL', 0.05)
+SERVO_MAX_RATE = getattr(cfg, 'SERVO_MAX_RATE', 20.0)  # serial frames/s (servo_channel.py)
+SERVO_ACK = getattr(cfg, 'SERVO_ACK', False)
+SERVO_ACK_TIMEOUT = getattr(cfg, 'SERVO_ACK_TIMEOUT', 0.2)
 
 # ==========================================
 # UTILITY FUNCTIONS
@@ -159,6 +192,21 @@ def create_blink_overlay(background, blink_amount):
     return overlay
 
 
+def open_arduino():
+    """
+    Arduino خلف ServoChannel: sendData لا يحجب الـ render loop
+    (الكتابة في thread منفصل، آخر قيمة فقط، بمعدل أقصى SERVO_MAX_RATE)
+    """
+    try:
+        arduino = ServoChannel(SerialObject(digits=3), servos=3, max_rate=SERVO_MAX_RATE,
+                               ack=SERVO_ACK, ack_timeout=SERVO_ACK_TIMEOUT)
+        print("✅ Arduino initialized")
+        return arduino
+    except Exception as e:
+        print(f"⚠️  Arduino not available: {e}")
+        return None
+
+
 def lerp(start, end, t):
     """Linear interpolation"""
     return start + (end - start) * t
@@ -179,28 +227,31 @@ class BlinkController:
     def __init__(self):
         self.is_blinking = False
         self.blink_progress = 0.0
-        self.blink_speed = 0.15  # سرعة الرمش
-        self.last_blink_time = time.time()
+        self.blink_speed = 4.5  # سرعة الرمش (progress/second — كان 0.15 لكل frame عند 30 FPS)
+        self.last_blink_time = time.perf_counter()
         self.blink_interval = random.uniform(2.5, 5.0)
         self.double_blink = False  # رمش مزدوج أحياناً
     
     def update(self, dt: float) -> float:
         """
         تحديث حالة الرمش
+        dt: الزمن منذ الإطار السابق (ثواني)
         Returns: blink_amount (0-1)
         """
-        current_time = time.time()
+        current_time = time.perf_counter()
         
-        # بدء رمش جديد
-        if not self.is_blinking and current_time - self.last_blink_time >= self.blink_interval:
+        # بدء رمش جديد (التقدّم يُحسب من موعد الرمش، لا من dt بعد نوم طويل)
+        overdue = current_time - self.last_blink_time - self.blink_interval
+        if not self.is_blinking and overdue >= 0:
             self.is_blinking = True
             self.blink_progress = 0.0
+            dt = min(dt, overdue)
             # 10% فرصة للرمش المزدوج
             self.double_blink = random.random() < 0.1
         
         # تحديث الرمش
         if self.is_blinking:
-            self.blink_progress += self.blink_speed
+            self.blink_progress += self.blink_speed * dt
             
             # انتهى الرمش
             if self.blink_progress >= 2.0:
@@ -227,6 +278,12 @@ class BlinkController:
             blink_amount = ease_in_out(2.0 - self.blink_progress)
         
         return blink_amount if self.is_blinking else 0.0
+    
+    def next_event(self) -> float:
+        """موعد التغيير التالي (perf_counter)؛ 0 = يتحرك الآن"""
+        if self.is_blinking:
+            return 0.0
+        return self.last_blink_time + self.blink_interval
 
 
 # ==========================================
@@ -234,7 +291,13 @@ class BlinkController:
 # ==========================================
 
 class EyeMovementController:
-    """تحكم في حركة العين الطبيعية"""
+    """
+    تحكم في حركة العين (نفس المحرك للوضعين):
+    - natural: حركات عشوائية مع ease-in-out
+    - tracking: follow(x, y) → One-Euro filter مستمر على x و y
+      (release_if_lost: بعد release_after ثانية بلا follow يعود لـ natural)
+    الـ servo يتبع الهدف بسرعة محدودة (ServoRateLimiter) في الوضعين
+    """
     
     # مواضع العين (x, y)
     POSITIONS = {
@@ -262,7 +325,7 @@ class EyeMovementController:
         'down_left': 110,
     }
     
-    def __init__(self, arduino=None):
+    def __init__(self, arduino=None, release_after: float = GAZE_RELEASE_AFTER):
         self.arduino = arduino
         self.current_pos = 'center'
         self.target_pos = 'center'
@@ -274,20 +337,33 @@ class EyeMovementController:
         # Micro-movements (حركات صغيرة واقعية)
         self.micro_x = 0
         self.micro_y = 0
-        self.micro_time = time.time()
+        self.micro_time = time.perf_counter()
         
         # Transition
         self.is_transitioning = False
         self.transition_progress = 0.0
-        self.transition_speed = 0.08
+        self.transition_speed = 2.4  # progress/second (كان 0.08 لكل frame عند 30 FPS)
+        self.start_x = self.current_x
+        self.start_y = self.current_y
         
         # Timing
-        self.last_movement_time = time.time()
+        self.last_movement_time = time.perf_counter()
         self.hold_duration = random.uniform(2.0, 4.0)
+        
+        # Tracking (continuous gaze): الهدف يمر عبر One-Euro filter كل frame
+        self.following = False
+        self.follow_xy = np.array([self.current_x, self.current_y])
+        self.release_after = float(release_after)
+        self.last_follow = 0.0
+        self.gaze_filter = OneEuroFilter(2, GAZE_MIN_CUTOFF, GAZE_BETA)
+        
+        # Servo: زاوية مستمرة بسرعة محدودة بدل إرسال زاوية نهائية فوراً
+        self.servo = ServoRateLimiter(self.ARDUINO_ANGLES['center'], SERVO_MAX_SPEED,
+                                      SERVO_DEADBAND, SERVO_MIN_INTERVAL)
     
     def update(self, dt: float):
-        """تحديث موضع العين"""
-        current_time = time.time()
+        """تحديث موضع العين (dt بالثواني)"""
+        current_time = time.perf_counter()
         
         # Micro-movements (كل 100ms)
         if current_time - self.micro_time > 0.1:
@@ -295,13 +371,21 @@ class EyeMovementController:
             self.micro_y = random.uniform(-1, 1)
             self.micro_time = current_time
         
+        if self.following:
+            x, y = self.gaze_filter(self.follow_xy, dt)
+            self.current_x, self.current_y = float(x), float(y)
+            self._drive_servo(current_time)
+            return int(self.current_x + self.micro_x), int(self.current_y + self.micro_y)
+        
         # بدء حركة جديدة
-        if not self.is_transitioning and current_time - self.last_movement_time >= self.hold_duration:
+        overdue = current_time - self.last_movement_time - self.hold_duration
+        if not self.is_transitioning and overdue >= 0:
             self.start_new_movement()
+            dt = min(dt, overdue)
         
         # Smooth transition
         if self.is_transitioning:
-            self.transition_progress += self.transition_speed
+            self.transition_progress += self.transition_speed * dt
             
             if self.transition_progress >= 1.0:
                 self.is_transitioning = False
@@ -309,10 +393,12 @@ class EyeMovementController:
                 self.current_x = self.target_x
                 self.current_y = self.target_y
             else:
-                # Smooth interpolation with easing
+                # Smooth interpolation with easing (from the start point: FPS-independent)
                 t = ease_in_out(self.transition_progress)
-                self.current_x = lerp(self.current_x, self.target_x, t)
-                self.current_y = lerp(self.current_y, self.target_y, t)
+                self.current_x = lerp(self.start_x, self.target_x, t)
+                self.current_y = lerp(self.start_y, self.target_y, t)
+        
+        self._drive_servo(current_time)
         
         # الموضع النهائي مع micro-movements
         final_x = int(self.current_x + self.micro_x)
@@ -320,10 +406,59 @@ class EyeMovementController:
         
         return final_x, final_y
     
+    def _drive_servo(self, now: float):
+        """خطوة الـ servo (محدودة السرعة)؛ يُرسل فقط عند تغيّر الزاوية فعلاً"""
+        if not self.arduino:
+            return
+        angle = self.servo.step(now)
+        if angle is not None:
+            try:
+                self.arduino.sendData([0, 0, angle])
+            except Exception as e:
+                print(f"⚠️  Arduino error: {e}")
+    
+    def follow(self, x: float, y: float, servo_angle=None):
+        """Tracking: النظر إلى (x, y) بشكل مستمر (الهدف يُنعَّم بالـ filter)"""
+        if not self.following:
+            self.following = True
+            self.is_transitioning = False
+            self.gaze_filter.reset((self.current_x, self.current_y))
+        self.follow_xy[0] = x
+        self.follow_xy[1] = y
+        self.last_follow = time.perf_counter()
+        if servo_angle is not None:
+            self.servo.set_target(servo_angle)
+    
+    def release(self):
+        """العودة للحركة الطبيعية من الموضع الحالي"""
+        self.following = False
+        self.target_x, self.target_y = self.current_x, self.current_y
+        self.last_movement_time = time.perf_counter()
+    
+    def release_if_lost(self, now: float) -> bool:
+        """الوجه اختفى لمدة release_after → release(); True إذا حدث الآن"""
+        if not self.following or now - self.last_follow < self.release_after:
+            return False
+        self.release()
+        return True
+    
+    def next_event(self) -> float:
+        """موعد التغيير التالي (perf_counter): micro-movement أو نهاية الـ hold؛ 0 = يتحرك الآن"""
+        if self.is_transitioning or (self.arduino and not self.servo.settled()):
+            return 0.0
+        if self.following:
+            settled = (abs(self.follow_xy[0] - self.current_x) < 0.5 and
+                       abs(self.follow_xy[1] - self.current_y) < 0.5)
+            if not settled:
+                return 0.0
+            return min(self.micro_time + 0.1, self.last_follow + self.release_after)
+        return min(self.micro_time + 0.1, self.last_movement_time + self.hold_duration)
+    
     def start_new_movement(self):
         """بدء حركة عين جديدة"""
         self.is_transitioning = True
         self.transition_progress = 0.0
+        self.start_x, self.start_y = self.current_x, self.current_y
         self.current_pos = self.target_pos
         
         # اختيار موضع جديد
@@ -338,15 +473,10 @@ class EyeMovementController:
         self.target_x = float(self.POSITIONS[self.target_pos][0])
         self.target_y = float(self.POSITIONS[self.target_pos][1])
         
-        # Arduino control
-        if self.arduino:
-            angle = self.ARDUINO_ANGLES[self.target_pos]
-            try:
-                self.arduino.sendData([0, 0, angle])
-            except Exception as e:
-                print(f"⚠️  Arduino error: {e}")
+        # Arduino control (rate-limited in update)
+        self.servo.set_target(self.ARDUINO_ANGLES[self.target_pos])
         
-        self.last_movement_time = time.time()
+        self.last_movement_time = time.perf_counter()
         # مدة أطول عند النظر للمركز
         if self.target_pos == 'center':
             self.hold_duration = random.uniform(3.0, 5.0)
@@ -359,15 +489,11 @@ class EyeMovementController:
             self.target_pos = position
             self.target_x = float(self.POSITIONS[position][0])
             self.target_y = float(self.POSITIONS[position][1])
+            self.start_x, self.start_y = self.current_x, self.current_y
+            self.following = False
             self.is_transitioning = True
             self.transition_progress = 0.0
-            
-            if self.arduino:
-                angle = self.ARDUINO_ANGLES[position]
-                try:
-                    self.arduino.sendData([0, 0, angle])
-                except Exception:
-                    pass
+            self.servo.set_target(self.ARDUINO_ANGLES[position])
 
 
 # ==========================================
@@ -385,15 +511,12 @@ def naturalEyeMovement(enable_arduino=False):
     if background_img is None or iris_img is None:
         print("❌ Cannot load eye images")
         return
+
+    # Persistent framebuffer: only the iris rectangle is redrawn each frame
+    renderer = SpriteRenderer(background_img, iris_img)
     
     # Arduino (اختياري)
-    arduino = None
-    if enable_arduino:
-        try:
-            arduino = SerialObject(digits=3)
-            print("✅ Arduino initialized")
-        except Exception as e:
-            print(f"⚠️  Arduino not available: {e}")
+    arduino = open_arduino() if enable_arduino else None
     
     # Controllers
     blink_ctrl = BlinkController()
@@ -404,37 +527,41 @@ def naturalEyeMovement(enable_arduino=False):
     if FULLSCREEN:
         cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
     
-    # FPS control
-    frame_time = 1.0 / FPS_TARGET
-    last_time = time.time()
+    # Frame scheduler (perf_counter deadlines, lower FPS while STT/TTS is busy)
+    # Idle: ينام حتى الحدث التالي (micro-movement / رمش / حركة) أو حتى eye_state.changed
+    scheduler = RenderScheduler(fps=FPS_TARGET, busy_fps=BUSY_FPS, wake=eye_state.changed)
+    last_stats = time.perf_counter()
+    last_state = None  # (x, y, blink) آخر إطار معروض
+    next_event = None
     
-    print(f"✅ Eye movement started (FPS: {FPS_TARGET})")
+    print(f"✅ Eye movement started (FPS: {FPS_TARGET}, busy: {BUSY_FPS})")
     print("   Press 'q' or ESC to quit")
     print("   Press 'b' to toggle blinking")
     print("   Press 'c' to look at center")
     
     try:
         while eye_state.running:
-            current_time = time.time()
-            dt = current_time - last_time
-            last_time = current_time
+            dt = scheduler.wait(until=next_event)
+            scheduler.begin()
             
             # Update controllers
             iris_x, iris_y = movement_ctrl.update(dt)
             blink_amount = blink_ctrl.update(dt) if eye_state.blink_enabled else 0.0
             
-            # رسم العين
-            frame = background_img.copy()
-            overlay_iris(frame, iris_img, iris_x, iris_y)
-            
-            # تطبيق الرمش
-            if blink_amount > 0:
-                frame = create_blink_overlay(frame, blink_amount)
-            
-            # عرض
-            cv2.imshow(WINDOW_NAME, frame)
-            if DISPLAY_OFFSET > 0:
-                cv2.moveWindow(WINDOW_NAME, -DISPLAY_OFFSET, 0)
+            # لا تغيير → لا recompose ولا imshow
+            state = (iris_x, iris_y, blink_amount)
+            presented = state != last_state
+            if presented:
+                last_state = state
+                
+                # رسم العين
+                # الرمش في نفس الـ framebuffer (LUT على الأسطر المتغيرة فقط)
+                frame = renderer.render(iris_x, iris_y, blink_amount)
+                
+                # عرض
+                cv2.imshow(WINDOW_NAME, frame)
+                if DISPLAY_OFFSET > 0:
+                    cv2.moveWindow(WINDOW_NAME, -DISPLAY_OFFSET, 0)
             
             # Keyboard input
             key = cv2.waitKey(1) & 0xFF
@@ -447,10 +574,15 @@ def naturalEyeMovement(enable_arduino=False):
                 movement_ctrl.look_at_position('center')
                 print("Looking at center")
             
-            # FPS limiting
-            elapsed = time.time() - current_time
-            if elapsed < frame_time:
-                time.sleep(frame_time - elapsed)
+            scheduler.end(presented)
+            next_event = movement_ctrl.next_event()
+            if eye_state.blink_enabled:
+                next_event = min(next_event, blink_ctrl.next_event())
+            if STATS_INTERVAL and time.perf_counter() - last_stats >= STATS_INTERVAL:
+                last_stats = time.perf_counter()
+                print(f"[Eyes] {scheduler.format_stats()}")
+                if arduino:
+                    print(f"[Servo] {arduino.format_stats()}")
     
     except KeyboardInterrupt:
         print("\n⚠️  Interrupted by user")
@@ -477,6 +609,9 @@ def trackUserFace(enable_arduino=False):
     background_img, iris_img = load_eye_images()
     if background_img is None or iris_img is None:
         return
+
+    # Persistent framebuffer: only the iris rectangle is redrawn each frame
+    renderer = SpriteRenderer(background_img, iris_img)
     
     # الكاميرا
     cap = cv2.VideoCapture(CAMERA_INDEX)
@@ -488,110 +623,111 @@ def trackUserFace(enable_arduino=False):
     detector = FaceDetector(minDetectionCon=0.7)
     
     # PID controller للحركة السلسة
-    xPID = PID([0.03, 0, 0.06], 640 // 2, axis=0)
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 640
+    xPID = PID([0.03, 0, 0.06], frame_width // 2, axis=0)
     
     # Arduino
-    arduino = None
+    arduino = open_arduino() if enable_arduino else None
     xAngle = 90
-    if enable_arduino:
-        try:
-            arduino = SerialObject(digits=3)
-            print("✅ Arduino initialized")
-        except Exception as e:
-            print(f"⚠️  Arduino not available: {e}")
     
     # Blink controller
     blink_ctrl = BlinkController()
     
-    # Eye positions (simplified for tracking)
-    iris_position = (325, 225)
+    # Continuous gaze: face center → iris (x, y) → One-Euro filter في EyeMovementController
+    movement_ctrl = EyeMovementController(arduino)
+    gaze_mapper = GazeMapper(EyeMovementController.POSITIONS['center'], (GAZE_RANGE_X, GAZE_RANGE_Y),
+                             mirror_x=CAMERA_FLIP)
+    latency = GazeLatency()
     
     # إنشاء نافذة
     cv2.namedWindow(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN)
     if FULLSCREEN:
         cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
     
-    # FPS control
-    frame_count = 0
-    last_time = time.time()
+    # Capture + detection threads: the render loop only reads the latest detection
+    # (أي detection جديد يوقظ الـ loop عبر eye_state.changed)
+    pipeline = FacePipeline(cap, cvzone_detect(detector), flip=CAMERA_FLIP,
+                            scale=FACE_DETECT_SCALE, max_fps=FACE_DETECT_MAX_FPS,
+                            idle_fps=FACE_DETECT_IDLE_FPS, duty=FACE_DETECT_DUTY,
+                            notify=eye_state.changed, track=FACE_TRACK,
+                            redetect_every=FACE_REDETECT_EVERY, min_score=FACE_TRACK_MIN_SCORE,
+                            roi_margin=FACE_ROI_MARGIN).start()
+    
+    # Frame scheduler (perf_counter deadlines, lower FPS while STT/TTS is busy)
+    scheduler = RenderScheduler(fps=FPS_TARGET, busy_fps=BUSY_FPS, wake=eye_state.changed)
+    last_stats = time.perf_counter()
+    last_seq = 0
+    last_state = None
+    next_event = None
     
     print("✅ Face tracking started")
     print("   Press 'q' or ESC to quit")
     
     try:
         while eye_state.running:
-            success, img = cap.read()
-            if not success:
-                print("⚠️  Failed to read from camera")
-                time.sleep(0.1)
-                continue
-            
-            if CAMERA_FLIP:
-                img = cv2.flip(img, 0)
+            dt = scheduler.wait(until=next_event)
+            scheduler.begin()
             
-            # Face detection (كل بضعة frames للأداء)
-            if frame_count % FACE_DETECTION_INTERVAL == 0:
-                img, bboxs = detector.findFaces(img, draw=False)
+            # Detection جديد؟ (لا انتظار للكاميرا أو للـ inference هنا)
+            detection = pipeline.latest()
+            if detection is not None and detection.seq != last_seq:
+                last_seq = detection.seq
+                center = detection.center
                 
-                if bboxs:
-                    cx = bboxs[0]['center'][0]
-                    resultX = int(xPID.update(cx))
+                if center is not None:
+                    cx, cy = center
+                    target = gaze_mapper(cx, cy, *detection.frame_size)
                     
-                    # تحديد موضع القزحية
-                    if CAMERA_FLIP:
-                        if resultX > 1:
-                            iris_position = (400, 225)
-                        elif resultX < -1:
-                            iris_position = (250, 225)
-                        else:
-                            iris_position = (325, 225)
-                    else:
-                        if resultX > 1:
-                            iris_position = (250, 225)
-                        elif resultX < -1:
-                            iris_position = (400, 225)
-                        else:
-                            iris_position = (325, 225)
+                    # Arduino: PID يقرّب الوجه من مركز الكاميرا (الإرسال rate-limited)
+                    servo_angle = None
+                    if arduino:
+                        resultX = int(xPID.update(cx))
+                        if abs(resultX) > 2:
+                            xAngle = max(60, min(120, xAngle + resultX))  # clamp
+                            servo_angle = xAngle
                     
-                    # Arduino control
-                    if arduino and abs(resultX) > 2:
-                        xAngle += resultX
-                        xAngle = max(60, min(120, xAngle))  # clamp
-                        try:
-                            arduino.sendData([0, 0, xAngle])
-                        except Exception:
-                            pass
-            
-            # Update blink
-            blink_amount = blink_ctrl.update(0.033) if eye_state.blink_enabled else 0.0
+                    movement_ctrl.follow(target[0], target[1], servo_angle)
+                    latency.mark(detection.captured)
             
-            # رسم العين
-            frame = background_img.copy()
-            overlay_iris(frame, iris_img, iris_position[0], iris_position[1])
+            # لا وجه منذ GAZE_RELEASE_AFTER → العودة للحركة الطبيعية من الموضع الحالي
+            movement_ctrl.release_if_lost(time.perf_counter())
             
-            if blink_amount > 0:
-                frame = create_blink_overlay(frame, blink_amount)
+            # Filtered gaze (يتحرك بسلاسة بين الـ detections)
+            iris_x, iris_y = movement_ctrl.update(dt)
             
-            # عرض
-            cv2.imshow(WINDOW_NAME, frame)
-            if DISPLAY_OFFSET > 0:
-                cv2.moveWindow(WINDOW_NAME, -DISPLAY_OFFSET, 0)
+            # Update blink
+            blink_amount = blink_ctrl.update(dt) if eye_state.blink_enabled else 0.0
             
-            # (اختياري) عرض الكاميرا للتشخيص
-            # cv2.imshow("Camera", cv2.resize(img, (320, 240)))
+            state = (iris_x, iris_y, blink_amount)
+            presented = state != last_state
+            if presented:
+                last_state = state
+                
+                # رسم العين
+                frame = renderer.render(iris_x, iris_y, blink_amount)
+                
+                # عرض
+                cv2.imshow(WINDOW_NAME, frame)
+                if DISPLAY_OFFSET > 0:
+                    cv2.moveWindow(WINDOW_NAME, -DISPLAY_OFFSET, 0)
+            latency.presented()
             
             key = cv2.waitKey(1) & 0xFF
             if key == ord('q') or key == 27:
                 break
             
-            frame_count += 1
+            scheduler.end(presented)
+            next_event = movement_ctrl.next_event()
+            if eye_state.blink_enabled:
+                next_event = min(next_event, blink_ctrl.next_event())
             
             # FPS info
-            if frame_count % 30 == 0:
-                current_time = time.time()
-                fps = 30 / (current_time - last_time)
-                last_time = current_time
-                print(f"FPS: {fps:.1f}")
+            if STATS_INTERVAL and time.perf_counter() - last_stats >= STATS_INTERVAL:
+                last_stats = time.perf_counter()
+                print(f"[Eyes] {scheduler.format_stats()}")
+                print(f"[Face] {pipeline.format_stats()}, {latency.format_stats()}")
+                if arduino:
+                    print(f"[Servo] {arduino.format_stats()}")
     
     except KeyboardInterrupt:
         print("\n⚠️  Interrupted by user")
@@ -600,6 +736,7 @@ def trackUserFace(enable_arduino=False):
         import traceback
         traceback.print_exc()
     finally:
+        pipeline.stop()
         cap.release()
         cleanup(arduino)
 
@@ -611,6 +748,7 @@ def cleanup(arduino=None):
     if arduino:
         try:
             arduino.sendData([0, 0, 90])  # مركز
+            arduino.close()  # يرسل القيمة الأخيرة قبل الإيقاف
             print("✅ Arduino reset")
         except Exception:
             pass
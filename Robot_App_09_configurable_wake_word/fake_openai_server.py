@@ -0,0 +1,189 @@
+# fake_openai_server.py
+# Local OpenAI-compatible server for testing ai_model without the network
+# - POST /v1/chat/completions (stream=True → SSE chunks, stream=False → JSON)
+# - Configurable reply, first-token delay and per-token delay
+#
+# Usage:
+#   python fake_openai_server.py --port 8808
+#   OPEN_AI_BASE_URL=http://127.0.0.1:8808/v1 AI_BACKEND=openai python main.py
+#
+#   python fake_openai_server.py --demo     # time-to-first-sentence of ai_model.chat_stream
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "[Not Important, Hello! I am Ziko, your robot assistant. "
+    "The weather looks great today, so it is a good time for a walk. "
+    "Tell me if you need anything else.]"
+)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """يرد على chat.completions بنفس صيغة OpenAI"""
+
+    server_version = "FakeOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_error(400)
+            return
+
+        self.server.requests += 1
+        model = request.get("model", "fake-model")
+        reply = self.server.reply
+
+        time.sleep(self.server.first_token_delay)
+
+        if request.get("stream"):
+            self._stream(model, reply)
+        else:
+            self._complete(model, reply)
+
+    def _complete(self, model, reply):
+        body = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, model, reply):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            send({"role": "assistant", "content": ""})
+            # Word-sized tokens (keeps the trailing space with each word)
+            for token in re.findall(r"\S+\s*", reply):
+                send({"content": token})
+                time.sleep(self.server.token_delay)
+            send({}, finish_reason="stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.server.completed += 1
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_fake_server(host="127.0.0.1", port=0, reply=DEFAULT_REPLY,
+                      first_token_delay=0.3, token_delay=0.05):
+    """
+    تشغيل السيرفر في ثريد خلفي
+    Returns: (server, base_url) — server.shutdown() للإيقاف
+    """
+    server = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.reply = reply
+    server.first_token_delay = first_token_delay
+    server.token_delay = token_delay
+    server.requests = 0
+    server.completed = 0  # streams sent through [DONE] (a closed client never gets there)
+
+    threading.Thread(target=server.serve_forever, name="FakeOpenAI", daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    return server, base_url
+
+
+def run_demo(args):
+    """قياس زمن أول جملة في ai_model.chat_stream مقابل chat"""
+    import tempfile
+
+    server, base_url = start_fake_server(
+        port=args.port, first_token_delay=args.first_token_delay, token_delay=args.token_delay
+    )
+
+    # Must be set before ai_model / Config are imported
+    tmp = tempfile.mkdtemp(prefix="fake-openai-")
+    os.environ["OPEN_AI_BASE_URL"] = base_url
+    os.environ["OPEN_AI_API_KEY"] = "sk-fake"
+    os.environ["MEMORY_DB"] = os.path.join(tmp, "chat-memory.db")
+    os.environ["MEMORY_FILE"] = os.path.join(tmp, "chat-memory.json")
+
+    import ai_model
+    import chat_history_manager as history
+
+    print(f"Fake server: {base_url}")
+
+    start = time.perf_counter()
+    reply = ai_model.chat("Hello")
+    blocking = time.perf_counter() - start
+    print(f"chat():        {blocking:.2f}s  → {reply!r}")
+
+    start = time.perf_counter()
+    first = None
+    for i, sentence in enumerate(ai_model.chat_stream("Hello again")):
+        if first is None:
+            first = time.perf_counter() - start
+        print(f"  [{time.perf_counter() - start:.2f}s] sentence {i + 1}: {sentence!r}")
+    total = time.perf_counter() - start
+    print(f"chat_stream(): first sentence {first:.2f}s, done {total:.2f}s")
+
+    history.flush_memory()
+    print(f"Memory rows: {len(history.get_recent_exchanges(10))}")
+    history.shutdown()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    parser.add_argument("--demo", action="store_true", help="Run ai_model against the fake server")
+    args = parser.parse_args()
+
+    if args.demo:
+        run_demo(args)
+    else:
+        server, base_url = start_fake_server(
+            args.host, args.port,
+            first_token_delay=args.first_token_delay, token_delay=args.token_delay
+        )
+        print(f"✅ Fake OpenAI server on {base_url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,228 @@
+# frame_store.py
+# Raw frame store for the eye videos (transcode once, then memory-map)
+# - transcode(): decode an MP4 once, resize to the display resolution and write raw frames
+#   after a fixed index header (count, shape, fps, source size/mtime, data offset)
+# - FrameStore: np.memmap of the frames; frame(i) is a zero-copy view, looping is just i % count
+#   (no VideoCapture, no seek hiccup at the loop point, pages come from the page cache)
+# - Stale files (source changed / different target size) are ignored and rebuilt by the CLI
+#
+# One-time step: python frame_store.py Resources/eye_videos --size 1280x720
+# Benchmark:     python frame_store.py Resources/eye_videos/02.mp4 --bench
+
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+MAGIC = b"EYEFRM1\0"
+VERSION = 1
+# magic, version, count, height, width, channels, fps, src_size, src_mtime, data_offset
+_HEADER = struct.Struct("<8sIIIIIdQdI")
+DATA_OFFSET = 4096  # page-aligned frames
+
+
+def parse_size(text: Optional[str]) -> Optional[Tuple[int, int]]:
+    """'1280x720' → (1280, 720)؛ فارغ = نفس حجم الفيديو"""
+    if not text:
+        return None
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def store_path(src, cache_dir="Resources/cache/frames", size=None, gray=False) -> Path:
+    src = Path(src)
+    tag = f"{size[0]}x{size[1]}" if size else "native"
+    if gray:
+        tag += "_gray"
+    return Path(cache_dir) / f"{src.stem}_{tag}.frames"
+
+
+# ==========================================
+# TRANSCODE
+# ==========================================
+
+def transcode(src, dst, size: Optional[Tuple[int, int]] = None, gray: bool = False) -> Path:
+    """
+    فك ترميز الفيديو مرة واحدة وكتابة raw frames (uint8) بعد الـ header.
+    الكتابة في .tmp ثم rename (لا ملفات ناقصة إذا انقطع التحويل)
+    """
+    src, dst = Path(src), Path(dst)
+    cap = cv2.VideoCapture(str(src))
+    if not cap.isOpened():
+        raise IOError(f"Cannot open {src}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_suffix(dst.suffix + ".tmp")
+    count, shape = 0, None
+    start = time.perf_counter()
+    try:
+        with open(tmp, "wb") as f:
+            f.write(bytes(DATA_OFFSET))  # header written once the frame count is known
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                if size and (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                if gray:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                if shape is None:
+                    shape = frame.shape
+                f.write(np.ascontiguousarray(frame).tobytes())
+                count += 1
+
+            if count == 0:
+                raise IOError(f"No frames decoded from {src}")
+            height, width = shape[:2]
+            channels = shape[2] if len(shape) == 3 else 1
+            st = src.stat()
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, count, height, width, channels, fps,
+                                 st.st_size, st.st_mtime, DATA_OFFSET))
+        os.replace(tmp, dst)
+    finally:
+        cap.release()
+        if tmp.exists():
+            tmp.unlink()
+
+    mb = os.path.getsize(dst) / 1e6
+    print(f"✅ [FrameStore] {src.name} → {dst.name}: {count} frames {shape}, "
+          f"{mb:.0f}MB in {time.perf_counter() - start:.1f}s")
+    return dst
+
+
+# ==========================================
+# MEMORY-MAPPED READER
+# ==========================================
+
+class FrameStore:
+    """
+        store = FrameStore("Resources/cache/frames/01_1280x720.frames")
+        frame = store.frame(i)    # view على الـ mmap (read-only، بدون نسخ)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise IOError(f"Truncated frame store: {self.path}")
+        (magic, version, self.frame_count, height, width, channels, self.fps,
+         self.src_size, self.src_mtime, offset) = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise IOError(f"Not a frame store (or old version): {self.path}")
+
+        self.shape = (height, width, channels) if channels > 1 else (height, width)
+        self.frames = np.memmap(self.path, dtype=np.uint8, mode="r", offset=offset,
+                                shape=(self.frame_count,) + self.shape)
+
+    def frame(self, index: int) -> np.ndarray:
+        return self.frames[index % self.frame_count]
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def matches(self, src) -> bool:
+        """الملف ما زال مطابقاً للفيديو الأصلي؟"""
+        try:
+            st = Path(src).stat()
+        except OSError:
+            return True  # source removed: the store is all we have
+        return st.st_size == self.src_size and abs(st.st_mtime - self.src_mtime) < 1e-3
+
+    def close(self) -> None:
+        mm = getattr(self.frames, "_mmap", None)
+        self.frames = None
+        if mm is not None:
+            mm.close()
+
+
+def open_store(src, cache_dir="Resources/cache/frames", size=None, gray=False,
+               build: bool = False) -> Optional[FrameStore]:
+    """
+    FrameStore لفيديو إذا كان محوّلاً ومطابقاً؛ وإلا None (أو تحويل الآن إذا build=True)
+    """
+    path = store_path(src, cache_dir, size, gray)
+    if path.exists():
+        try:
+            store = FrameStore(path)
+            if store.matches(src):
+                return store
+            store.close()
+            print(f"⚠️  [FrameStore] {path.name} is stale")
+        except (IOError, ValueError) as e:
+            print(f"⚠️  [FrameStore] {e}")
+    if not build:
+        return None
+    return FrameStore(transcode(src, path, size, gray))
+
+
+# ==========================================
+# CLI
+# ==========================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Transcode eye videos to memory-mapped raw frames")
+    parser.add_argument("source", nargs="?", default="Resources/eye_videos",
+                        help="video file or directory of .mp4 files")
+    parser.add_argument("--out", default="Resources/cache/frames")
+    parser.add_argument("--size", default="", help="display resolution, e.g. 1280x720")
+    parser.add_argument("--gray", action="store_true")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--bench", action="store_true", help="compare looping VideoCapture vs the store")
+    parser.add_argument("--frames", type=int, default=1500)
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    source = Path(args.source)
+    videos = sorted(source.glob("*.mp4")) if source.is_dir() else [source]
+
+    for video in videos:
+        path = store_path(video, args.out, size, args.gray)
+        existing = None if args.force else open_store(video, args.out, size, args.gray)
+        if existing is None:
+            transcode(video, path, size, args.gray)
+        else:
+            existing.close()
+            print(f"✅ [FrameStore] {path.name} up to date")
+
+    if args.bench:
+        video = videos[0]
+
+        # VideoCapture loop (eye_video_player.play): decode + seek to 0 at the end
+        cap = cv2.VideoCapture(str(video))
+        times, loop_ms = [], []
+        for _ in range(args.frames):
+            t0 = time.perf_counter()
+            ok, frame = cap.read()
+            if not ok:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = cap.read()
+                loop_ms.append((time.perf_counter() - t0) * 1000)
+            if size and (frame.shape[1], frame.shape[0]) != size:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            times.append((time.perf_counter() - t0) * 1000)
+        cap.release()
+        print(f"VideoCapture: avg {np.mean(times):.2f}ms, max {np.max(times):.1f}ms, "
+              f"loop frames {['%.1f' % m for m in loop_ms]}ms")
+
+        t0 = time.perf_counter()
+        store = open_store(video, args.out, size, args.gray)
+        open_ms = (time.perf_counter() - t0) * 1000
+        times = []
+        scratch = np.empty(store.shape, dtype=np.uint8)
+        for i in range(args.frames):
+            t0 = time.perf_counter()
+            frame = store.frame(i)
+            np.copyto(scratch, frame)  # read every page, like the display upload does
+            times.append((time.perf_counter() - t0) * 1000)
+        print(f"FrameStore:   open {open_ms:.1f}ms, avg {np.mean(times):.2f}ms, "
+              f"max {np.max(times):.2f}ms ({len(store)} frames, looped {args.frames // len(store)}x)")
+        store.close()
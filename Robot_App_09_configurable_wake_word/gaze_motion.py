@@ -0,0 +1,173 @@
+# gaze_motion.py
+# Continuous gaze for face_tracker.EyeMovementController
+# - GazeMapper: face center in the camera frame → iris position (x and y), continuous and clamped
+#   (replaces the three fixed iris positions 250 / 325 / 400)
+# - OneEuroFilter: adaptive low-pass on both axes at once (smooth when still, fast on big moves),
+#   numpy with preallocated state: no allocation per frame
+# - ServoRateLimiter: continuous servo angle, limited in deg/s, with a deadband and a minimum
+#   interval between serial writes
+#
+# Demo: python gaze_motion.py
+
+import math
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class OneEuroFilter:
+    """
+    One-Euro filter (Casiez et al.) على n محاور.
+        out = f(measurement, dt)    # out: مصفوفة داخلية يُعاد استخدامها (انسخها إذا احتجت الاحتفاظ بها)
+    min_cutoff: نعومة عند الثبات (Hz)، beta: سرعة الاستجابة عند الحركة
+    """
+
+    def __init__(self, n: int = 2, min_cutoff: float = 1.0, beta: float = 0.05, d_cutoff: float = 1.0):
+        self.min_cutoff = float(min_cutoff)
+        self.beta = float(beta)
+        self.d_cutoff = float(d_cutoff)
+        self.value = np.zeros(n, dtype=np.float64)
+        self._prev = np.zeros(n, dtype=np.float64)
+        self._dx = np.zeros(n, dtype=np.float64)
+        self._tmp = np.zeros(n, dtype=np.float64)
+        self._alpha = np.zeros(n, dtype=np.float64)
+        self._ready = False
+
+    def reset(self, value) -> None:
+        self.value[:] = value
+        self._prev[:] = value
+        self._dx[:] = 0.0
+        self._ready = True
+
+    def __call__(self, x, dt: float) -> np.ndarray:
+        if not self._ready:
+            self.reset(x)
+            return self.value
+        dt = max(dt, 1e-4)
+
+        # Derivative of the raw signal, low-passed at d_cutoff
+        np.subtract(x, self._prev, out=self._tmp)
+        self._tmp /= dt
+        a_d = 1.0 / (1.0 + 1.0 / (2.0 * math.pi * self.d_cutoff * dt))
+        np.subtract(self._tmp, self._dx, out=self._tmp)
+        self._tmp *= a_d
+        self._dx += self._tmp
+
+        # Adaptive cutoff per axis: min_cutoff + beta * |dx|
+        np.abs(self._dx, out=self._alpha)
+        self._alpha *= self.beta
+        self._alpha += self.min_cutoff
+        # alpha = 1 / (1 + 1 / (2π · cutoff · dt))
+        self._alpha *= 2.0 * math.pi * dt
+        np.reciprocal(self._alpha, out=self._alpha)
+        self._alpha += 1.0
+        np.reciprocal(self._alpha, out=self._alpha)
+
+        self._prev[:] = x
+        np.subtract(x, self.value, out=self._tmp)
+        self._tmp *= self._alpha
+        self.value += self._tmp
+        return self.value
+
+
+class GazeMapper:
+    """
+    مركز الوجه (pixels) → موضع القزحية.
+    center / range من EyeMovementController.POSITIONS (المركز ±75 أفقياً، ±25 عمودياً)
+    """
+
+    def __init__(self, center: Tuple[float, float] = (325.0, 225.0), range_xy: Tuple[float, float] = (75.0, 25.0),
+                 mirror_x: bool = False, gain: float = 1.0):
+        self.center = np.asarray(center, dtype=np.float64)
+        self.range = np.asarray(range_xy, dtype=np.float64)
+        if mirror_x:
+            self.range[0] = -self.range[0]
+        self.gain = float(gain)
+        self.out = np.zeros(2, dtype=np.float64)
+
+    def __call__(self, face_x: float, face_y: float, frame_w: int, frame_h: int) -> np.ndarray:
+        # Normalized offset from the frame center, -1..1 on each axis
+        out = self.out
+        out[0] = (face_x / frame_w - 0.5) * 2.0
+        out[1] = (face_y / frame_h - 0.5) * 2.0
+        out *= self.gain
+        np.clip(out, -1.0, 1.0, out=out)
+        out *= self.range
+        out += self.center
+        return out
+
+
+class ServoRateLimiter:
+    """
+    زاوية servo مستمرة: تقترب من الهدف بسرعة max_speed (°/s) على الأكثر.
+    step() ترجع الزاوية التي يجب إرسالها الآن أو None (تغيّر أقل من deadband / قبل min_interval)
+    """
+
+    def __init__(self, angle: float = 90.0, max_speed: float = 120.0, deadband: float = 1.0,
+                 min_interval: float = 0.05, limits: Tuple[float, float] = (60.0, 120.0)):
+        self.angle = float(angle)
+        self.target = float(angle)
+        self.max_speed = float(max_speed)
+        self.deadband = float(deadband)
+        self.min_interval = float(min_interval)
+        self.limits = limits
+        self.sent: Optional[int] = None
+        self._last_step: Optional[float] = None
+        self._last_sent = 0.0
+        self.writes = 0
+
+    def set_target(self, angle: float) -> None:
+        self.target = min(self.limits[1], max(self.limits[0], float(angle)))
+
+    def step(self, now: Optional[float] = None) -> Optional[int]:
+        now = time.perf_counter() if now is None else now
+        elapsed = 0.0 if self._last_step is None else now - self._last_step
+        self._last_step = now
+
+        max_move = self.max_speed * elapsed
+        delta = self.target - self.angle
+        self.angle += max(-max_move, min(max_move, delta))
+
+        angle = int(round(self.angle))
+        if self.sent is not None and abs(angle - self.sent) < self.deadband:
+            return None
+        if self.sent is not None and now - self._last_sent < self.min_interval:
+            return None
+        self.sent = angle
+        self._last_sent = now
+        self.writes += 1
+        return angle
+
+    def settled(self) -> bool:
+        return abs(self.target - self.angle) < 0.5
+
+
+# ✅ Quick check
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    mapper = GazeMapper()
+    euro = OneEuroFilter(min_cutoff=1.0, beta=0.05)
+    servo = ServoRateLimiter()
+
+    # Face at rest for 1s (detector jitter ±6px), then a fast move across the frame
+    fps, dt = 30, 1 / 30
+    raw, filtered = [], []
+    for i in range(fps * 2):
+        face_x = 200.0 if i < fps else 480.0
+        target = mapper(face_x + rng.normal(0, 6), 240 + rng.normal(0, 6), 640, 480)
+        raw.append(target.copy())
+        filtered.append(euro(target, dt).copy())
+        servo.set_target(90 - (target[0] - 325) * 30 / 75)
+        servo.step(i * dt)
+    raw, filtered = np.array(raw), np.array(filtered)
+    still = slice(10, fps)
+    print(f"Jitter at rest: raw {raw[still, 0].std():.2f}px → filtered {filtered[still, 0].std():.2f}px")
+    settle = next(i for i in range(fps, 2 * fps) if abs(filtered[i, 0] - raw[fps:, 0].mean()) < 3)
+    print(f"Move settled within 3px after {(settle - fps) * dt * 1000:.0f}ms")
+    print(f"Servo: {servo.writes} writes in 2s (30 frames/s), final angle {servo.sent}")
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        euro(mapper(320.0, 240.0, 640, 480), dt)
+    print(f"map + filter: {(time.perf_counter() - start) * 100:.2f}µs per frame")
@@ -0,0 +1,414 @@
+# llm_router.py
+# One chat() interface over n8n / OpenAI / Gemini
+# - Hedged requests: a second backend fires if the first has not answered within its p90 latency
+# - Circuit breaker per backend (skip a host that keeps failing, probe it again later)
+# - Per-backend latency / error EWMA (orders the fallbacks)
+# - Only the winning answer is stored in memory
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty
+from typing import Callable, Dict, List, Optional
+
+import chat_history_manager as history
+from Config import Config
+
+ERROR_RESPONSE = "Sorry, an error occurred during processing"
+
+
+class CircuitBreaker:
+    """
+    closed → (failures >= threshold) → open → (reset_timeout) → half_open
+    half_open: طلب تجريبي واحد — نجاح يغلق الدائرة وفشل يفتحها من جديد
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """هل يُسمح بإرسال طلب الآن؟"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class BackendStats:
+    """EWMA للزمن ونسبة الأخطاء + نافذة لحساب p90"""
+
+    def __init__(self, alpha: float = 0.2, window: int = 50):
+        self.alpha = float(alpha)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.wins = 0
+        self.hedges = 0
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.ewma_error += self.alpha * ((0.0 if ok else 1.0) - self.ewma_error)
+            if ok:
+                self._latencies.append(elapsed)
+                if self.ewma_latency is None:
+                    self.ewma_latency = elapsed
+                else:
+                    self.ewma_latency += self.alpha * (elapsed - self.ewma_latency)
+            else:
+                self.failures += 1
+
+    def note_hedge(self) -> None:
+        with self._lock:
+            self.hedges += 1
+
+    def note_win(self) -> None:
+        with self._lock:
+            self.wins += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self._latencies)
+
+    def score(self, default_latency: float) -> float:
+        """أقل = أفضل: الزمن المتوقع مع عقوبة على الأخطاء"""
+        with self._lock:
+            latency = self.ewma_latency if self.ewma_latency is not None else default_latency
+            return latency * (1.0 + 4.0 * self.ewma_error)
+
+    def as_dict(self) -> Dict:
+        p50, p90 = self.percentile(0.5), self.percentile(0.9)
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "wins": self.wins,
+                "hedges": self.hedges,
+                "ewma_latency": self.ewma_latency,
+                "ewma_error": self.ewma_error,
+                "p50": p50,
+                "p90": p90,
+            }
+
+
+class LLMBackend:
+    """
+    Backend واحد:
+    - call(user_input) -> raw answer (raise أو "" عند الفشل)
+    - finalize(user_input, raw) -> النص النهائي (يُستدعى للفائز فقط: تخزين الذاكرة)
+    """
+
+    def __init__(self, name: str, call: Callable[[str], str],
+                 finalize: Optional[Callable[[str, str], str]] = None,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0, alpha: float = 0.2):
+        self.name = name
+        self.call = call
+        self.finalize = finalize
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.stats = BackendStats(alpha)
+
+
+class LLMRouter:
+    """
+    chat(user_input) -> str
+
+    الترتيب: أول backend متاح (breaker مغلق) هو الأساسي، الباقي مرتب حسب الـ EWMA.
+    إذا لم يرد الأساسي خلال p90 من زمنه يُطلق الـ backend التالي بالتوازي،
+    وإذا فشل يُطلق التالي فوراً. أول رد ناجح يفوز.
+    """
+
+    def __init__(self, backends: List[LLMBackend], hedge: bool = True,
+                 hedge_delay: float = 3.0, hedge_min: float = 0.8, hedge_max: float = 6.0,
+                 timeout: float = 20.0, min_samples: int = 5):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.hedge_delay = float(hedge_delay)
+        self.hedge_min = float(hedge_min)
+        self.hedge_max = float(hedge_max)
+        self.timeout = float(timeout)
+        self.min_samples = int(min_samples)
+
+        # Losing requests keep running until their own timeout
+        self._executor = ThreadPoolExecutor(max_workers=len(self.backends) * 2,
+                                            thread_name_prefix="LLMRouter")
+
+    # ---------------- Planning ----------------
+
+    def _hedge_after(self, backend: LLMBackend) -> float:
+        """زمن انتظار الـ backend قبل إطلاق الـ hedge (p90 محصور بين min و max)"""
+        if backend.stats.samples() < self.min_samples:
+            delay = self.hedge_delay
+        else:
+            delay = backend.stats.percentile(0.9)
+        return min(self.hedge_max, max(self.hedge_min, delay))
+
+    def _plan(self) -> List[LLMBackend]:
+        primary, *rest = self.backends
+        rest.sort(key=lambda b: b.stats.score(self.hedge_delay))
+        return [primary] + rest
+
+    # ---------------- Chat ----------------
+
+    def chat(self, user_input: str) -> str:
+        if not user_input or not user_input.strip():
+            return ""
+
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        done: Queue = Queue()
+        plan = self._plan()
+        in_flight = 0
+        launched = []
+
+        def launch(reason: str) -> bool:
+            nonlocal in_flight
+            while plan:
+                backend = plan.pop(0)
+                if not backend.breaker.allow():
+                    print(f"[Router] ⛔ {backend.name} skipped (circuit {backend.breaker.state})")
+                    continue
+                if launched:
+                    backend.stats.note_hedge()
+                    print(f"[Router] 🔀 {reason}: firing {backend.name}")
+                self._executor.submit(self._run, backend, user_input, done)
+                launched.append(backend)
+                in_flight += 1
+                return True
+            return False
+
+        if not launch("primary"):
+            # Every breaker is open: better a late answer than silence
+            print("[Router] ⚠️ All circuits open, trying the primary anyway")
+            self._executor.submit(self._run, self.backends[0], user_input, done)
+            launched.append(self.backends[0])
+            in_flight = 1
+
+        hedge_at = time.perf_counter() + self._hedge_after(launched[-1])
+
+        while in_flight:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+
+            wait = deadline - now
+            if self.hedge and plan:
+                wait = min(wait, max(0.0, hedge_at - now))
+
+            try:
+                backend, ok, raw = done.get(timeout=wait)
+            except Empty:
+                if self.hedge and plan and time.perf_counter() >= hedge_at:
+                    slow = launched[-1].name
+                    if launch(f"{slow} slower than p90"):
+                        hedge_at = time.perf_counter() + self._hedge_after(launched[-1])
+                continue
+
+            in_flight -= 1
+            if ok:
+                backend.stats.note_win()
+                elapsed = time.perf_counter() - start
+                print(f"[Router] ✅ {backend.name} answered in {elapsed:.2f}s")
+                return self._finalize(backend, user_input, raw)
+
+            # Failed: fire the next backend immediately
+            if launch(f"{backend.name} failed"):
+                hedge_at = time.perf_counter() + self._hedge_after(launched[-1])
+
+        print(f"[Router] ❌ No backend answered ({', '.join(b.name for b in launched)})")
+        return ERROR_RESPONSE
+
+    def _run(self, backend: LLMBackend, user_input: str, done: Queue) -> None:
+        start = time.perf_counter()
+        ok = False
+        raw = ""
+        try:
+            raw = backend.call(user_input) or ""
+            ok = bool(raw.strip())
+        except Exception as e:
+            print(f"[Router] ⚠️ {backend.name} error: {e}")
+
+        elapsed = time.perf_counter() - start
+        backend.stats.record(ok, elapsed)
+        if ok:
+            backend.breaker.record_success()
+        else:
+            backend.breaker.record_failure()
+        done.put((backend, ok, raw))
+
+    def _finalize(self, backend: LLMBackend, user_input: str, raw: str) -> str:
+        if backend.finalize is None:
+            return raw.strip()
+        try:
+            return backend.finalize(user_input, raw)
+        except Exception as e:
+            print(f"[Router] ⚠️ {backend.name} finalize error: {e}")
+            return history.parse_status(raw.strip())[1]
+
+    # ---------------- Stats ----------------
+
+    def get_stats(self) -> Dict[str, Dict]:
+        return {
+            b.name: dict(b.stats.as_dict(), state=b.breaker.state, hedge_after=self._hedge_after(b))
+            for b in self.backends
+        }
+
+    def print_stats(self) -> None:
+        for name, s in self.get_stats().items():
+            p90 = f"{s['p90']:.2f}s" if s["p90"] is not None else "-"
+            ewma = f"{s['ewma_latency']:.2f}s" if s["ewma_latency"] is not None else "-"
+            print(f"[Router] {name:7s} {s['state']:9s} calls={s['calls']} wins={s['wins']} "
+                  f"hedges={s['hedges']} ewma={ewma} p90={p90} err={s['ewma_error']:.2f}")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ==========================================
+# Default backends (Config.LLM_BACKENDS)
+# ==========================================
+
+def _remember_turn(user_input: str, raw: str) -> str:
+    """Store the winning turn so any backend can continue the conversation"""
+    status, req_response = history.parse_status(raw.strip())
+    history.record_turn(user_input, req_response, status)
+    return req_response
+
+
+def _make_backend(name: str) -> Optional[LLMBackend]:
+    if name == "n8n":
+        if not Config.N8N_URL:
+            return None
+        from ai_n8n import N8nClient
+        client = N8nClient()
+        # n8n keeps its own memory; the local copy lets direct models continue the conversation
+        return LLMBackend("n8n", lambda text: client.chat(Config.N8N_SESSION_ID, text), _remember_turn)
+
+    if name == "openai":
+        if not Config.OPEN_AI_API_KEY:
+            return None
+        try:
+            import ai_model
+        except ImportError as e:
+            print(f"[Router] ⚠️ openai backend unavailable: {e}")
+            return None
+        return LLMBackend("openai", ai_model.generate, ai_model.remember)
+
+    if name == "gemini":
+        import ai_gemini
+        if not ai_gemini.is_available():
+            return None
+        return LLMBackend("gemini", ai_gemini.generate, ai_gemini.remember)
+
+    print(f"[Router] ⚠️ Unknown backend '{name}'")
+    return None
+
+
+def build_default_router() -> LLMRouter:
+    """Router من إعدادات Config (الـ backends غير المتاحة تُتجاهل)"""
+    backends = []
+    for name in Config.LLM_BACKENDS:
+        backend = _make_backend(name)
+        if backend is None:
+            print(f"[Router] ⚠️ {name} not configured, skipping")
+            continue
+        backend.breaker = CircuitBreaker(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_RESET)
+        backend.stats = BackendStats(Config.LLM_EWMA_ALPHA)
+        backends.append(backend)
+
+    print(f"[Router] ✅ Backends: {', '.join(b.name for b in backends) or 'none'}")
+    return LLMRouter(
+        backends,
+        hedge=Config.LLM_HEDGE,
+        hedge_delay=Config.LLM_HEDGE_DELAY,
+        hedge_min=Config.LLM_HEDGE_MIN,
+        hedge_max=Config.LLM_HEDGE_MAX,
+        timeout=Config.LLM_TIMEOUT,
+    )
+
+
+# ✅ Quick check (fake backends, no network)
+if __name__ == "__main__":
+    import random
+
+    def fake(name, latency, fail_rate=0.0):
+        def call(text):
+            time.sleep(latency() if callable(latency) else latency)
+            if random.random() < fail_rate:
+                raise RuntimeError("boom")
+            return f"[Not Important, {name} says hi]"
+        return call
+
+    router = LLMRouter(
+        [
+            # n8n: usually 0.3s, sometimes stuck for 5s (hedge_max caps the wait)
+            LLMBackend("n8n", fake("n8n", lambda: 5.0 if random.random() < 0.1 else random.uniform(0.2, 0.4)),
+                       lambda u, raw: history.parse_status(raw)[1]),
+            LLMBackend("openai", fake("openai", lambda: random.uniform(0.4, 0.7)),
+                       lambda u, raw: history.parse_status(raw)[1]),
+            LLMBackend("gemini", fake("gemini", 0.5, fail_rate=0.5),
+                       lambda u, raw: history.parse_status(raw)[1]),
+        ],
+        hedge_delay=1.0, hedge_min=0.3, hedge_max=1.5, timeout=8.0,
+    )
+
+    worst = 0.0
+    for i in range(25):
+        start = time.perf_counter()
+        reply = router.chat(f"hello {i}")
+        worst = max(worst, time.perf_counter() - start)
+    print(f"Worst turn: {worst:.2f}s (n8n stalls are 5s)")
+    router.print_stats()
+    router.close()
@@ -17,6 +17,7 @@ import traceback
 import threading
 from queue import Queue, Empty
 import argparse
+import importlib
 
 from Config import Config
 from utilities import WakeWordDetector, StopCommandDetector
@@ -24,6 +25,11 @@ from utilities import WakeWordDetector, StopCommandDetector
 #from local_commands import get_handler
 from local_commands import LocalCommandHandler
 from audio_player import AudioPlayer
+from audio_io import open_output
+import chat_history_manager as history
+from render_scheduler import activity
+from turn_trace import tracer
+from telemetry import telemetry
 eye = None
 
 # ------------------- Environment Setup -------------------
@@ -135,12 +141,15 @@ allow_wake_word = True
 device = "raspi5"
 eye_model = "img"
 has_eye_model = False
+ai_stream = None  # ai_model when AI_BACKEND == "openai" (sentence streaming)
+ai_router = None  # LLMRouter when AI_BACKEND == "router" (n8n / openai / gemini)
 # ------------------- Queues for Thread Communication -------------------
 audio_queue = Queue(maxsize=3)
 system_state = SystemState()
 stopCommandDetector = StopCommandDetector()
 wakewordDetector = WakeWordDetector()
-audio_player = AudioPlayer(sample_rate=16000, channels=1, buffer=512)
+# AUDIO_OUTPUT=capture: cues are recorded instead of played (no sound card needed)
+audio_player = AudioPlayer(sample_rate=16000, channels=1, buffer=512, output=open_output(source="player"))
 
 #localCommandHandler = get_handler(enable_stats=True)
 localCommandHandler = LocalCommandHandler(language_preference='english ', enable_stats = False)
@@ -182,11 +191,74 @@ def speak_safe(text: str):
     except Exception:
         pass
     try:
-        tts.say(text)
+        # Eye renderer drops to EYE_BUSY_FPS while TTS fetches / plays
+        with activity.busy("tts"), telemetry.inflight("tts"):
+            tts.say(text)
     except Exception as ex:
         print(f"❌ Speech error: {ex}")
 
 
+def speak_stream(sentences, spoken=None):
+    """
+    Speak sentences as they arrive from a generator.
+    The producer thread keeps pulling from the LLM while TTS speaks the previous sentence.
+    The generator is closed once speaking ends (on interruption this also stops the
+    LLM stream); `spoken` collects the sentences actually said, so ai_model.chat_stream
+    stores only what the user heard. A None item from the generator marks the end.
+    Returns the full spoken text.
+    """
+    sentence_queue = Queue()
+    spoken = [] if spoken is None else spoken
+    done = threading.Event()
+
+    def producer():
+        try:
+            with telemetry.inflight("llm"):
+                for sentence in sentences:
+                    if sentence is None or done.is_set():
+                        break
+                    sentence_queue.put(sentence)
+        except Exception as ex:
+            print(f"❌ AI stream error: {ex}")
+        finally:
+            sentence_queue.put(None)
+            # Close from this thread (the one iterating), after `spoken` is final
+            done.wait()
+            if hasattr(sentences, "close"):
+                sentences.close()
+
+    threading.Thread(target=producer, name="AIStream", daemon=True).start()
+
+    first = True
+    try:
+        while True:
+            sentence = sentence_queue.get()
+            if sentence is None:
+                break
+            if first:
+                tracer.mark("llm_first_sentence")
+            if not first and tts.is_interrupted():
+                print("⚠️ Speech interrupted, dropping the rest of the stream")
+                break
+            print(f"🤖 AI Sentence: {sentence}")
+            spoken.append(sentence)
+            try:
+                if first:
+                    tts.interrupt()
+                first = False
+                with activity.busy("tts"), telemetry.inflight("tts"):
+                    ok = tts.say(sentence)
+                if not ok and tts.is_interrupted():
+                    break
+            except Exception as ex:
+                print(f"❌ Speech error: {ex}")
+                break
+    finally:
+        done.set()
+
+    return " ".join(spoken)
+
+
 def safe_put(q, item):
     try:
         q.put_nowait(item)
@@ -197,7 +269,7 @@ def safe_put(q, item):
 # ------------------- Utility Methods END-------------------
 # ===================== Initialize Global Settings =====================
 def initialize_settings():
-    global allow_interruption, allow_wake_word, device, eye_model, has_eye_model, eye
+    global allow_interruption, allow_wake_word, device, eye_model, has_eye_model, eye, ai_stream, ai_router
 
     args = parse_args()
 
@@ -215,16 +287,27 @@ def initialize_settings():
         has_eye_model = True
 
         # Dynamic import based on eye_model value
-        if eye_model == "drawing":
-            import eye_runner_zero as eye
-        elif eye_model == "img":
-            import eye_runner as eye
-        elif eye_model == "video":
-            import eye_video_player as eye
-        else:
+        eye_modules = {"drawing": "eye_runner_zero", "img": "eye_runner", "video": "eye_video_player"}
+        module_name = eye_modules.get(eye_model)
+        if module_name is None:
             print(f"⚠️ Unknown eye_model '{eye_model}', skipping eye initialization.")
             eye = None
             has_eye_model = False
+        elif config.EYE_PROCESS:
+            # Renderer in its own process (no GIL contention with audio capture);
+            # eye.run() supervises the child, STT/TTS activity is mirrored through shared memory
+            from eye_process import EyeProcess
+            eye = EyeProcess(module_name, share_frames=config.EYE_FRAME_SHM)
+        else:
+            eye = importlib.import_module(module_name)
+
+    # Direct OpenAI streaming (sentences go to TTS as soon as they form)
+    if config.AI_BACKEND == "openai":
+        import ai_model as ai_stream
+    # Hedged requests across n8n / OpenAI / Gemini (a slow n8n host no longer means silence)
+    elif config.AI_BACKEND == "router":
+        from llm_router import build_default_router
+        ai_router = build_default_router()
 
     # Print configuration summary
     print("\n========= CONFIGURATION =========")
@@ -233,6 +316,8 @@ def initialize_settings():
     print(f"device             = {device}")
     print(f"eye_model          = {eye_model}")
     print(f"has_eye_model      = {has_eye_model}")
+    print(f"eye_process        = {config.EYE_PROCESS}")
+    print(f"ai_backend         = {config.AI_BACKEND}")
     print("=================================\n")
 
 # ===================== ========================= =====================
@@ -245,6 +330,12 @@ def cleanup():
     except Exception:
         pass
     '''
+    # Renderer process (safe to stop from here, unlike an in-process cv2 window)
+    if eye is not None and hasattr(eye, "control"):
+        try:
+            eye.cleanup()
+        except Exception:
+            pass
     try:
         recorder.close()
     except Exception:
@@ -260,12 +351,48 @@ def cleanup():
         pass
 
     audio_player.shutdown()
+    telemetry.stop()
+
+    if config.TRACE_EXPORT:
+        try:
+            tracer.export(config.TRACE_EXPORT)
+        except Exception as ex:
+            print(f"⚠️ Trace export error: {ex}")
+
+    if ai_router is not None:
+        try:
+            ai_router.print_stats()
+            ai_router.close()
+        except Exception:
+            pass
+
+    # Flush conversation memory still queued in the write-behind worker
+    try:
+        history.shutdown()
+    except Exception:
+        pass
     
 
 
 
 
 
+def start_status_monitor():
+    """
+    Runtime telemetry (Config.STATUS_MONITOR): CPU / RSS / per-thread CPU / temperature,
+    queue depths, VAD state and in-flight requests, served on Config.STATUS_ADDR
+    """
+    telemetry.gauge("audio_queue", audio_queue.qsize)
+    telemetry.gauge("player_queue", audio_player.pending)
+    telemetry.gauge("vad", lambda: recorder.vad_state)
+    telemetry.gauge("speaking", lambda: system_state.is_speaking)
+    telemetry.gauge("turn", lambda: tracer.turn)
+    # Write-behind memory: rows / ops waiting for the writer thread and its last flush time
+    telemetry.gauge("memory_queue", lambda: history.get_memory_stats().get("queue_depth", 0))
+    telemetry.gauge("memory_flush_ms", lambda: round(history.get_memory_stats().get("last_flush_ms", 0.0), 1))
+    telemetry.start(config.STATUS_ADDR)
+
+
 def interruption_thread():
     """
     Always-on short-window listener for 'stop' (with/without wake word).
@@ -294,7 +421,8 @@ def interruption_thread():
 
                 # Transcribe the small window. Use the same STT engine.
                 try:
-                    partial = stt.transcribe_bytes(audio_buf)
+                    with activity.busy("stt"), telemetry.inflight("stt"):
+                        partial = stt.transcribe_bytes(audio_buf)
                 except Exception:
                     # If STT fails for a tiny chunk, just skip silently.
                     continue
@@ -304,6 +432,7 @@ def interruption_thread():
 
                 # If user said a stop command (with/without wake), interrupt immediately.
                 if stopCommandDetector.is_stop_with_optional_wake(partial):
+                    tracer.mark("barge_in")
                     system_state.interrupt()
                     print("🛑 BARGE-IN: stop detected (with/without wake).")
                     #audio_player.play_blocking("Resources/voice_msgs/cancelled.wav")
@@ -333,6 +462,9 @@ def main_thread():
     last_status = time.time()
     is_first_time=True
     while system_state.is_active:
+        # Turn tracing: the recorder begins a new turn at speech start, it is closed in `finally`
+        last_turn = tracer.turn
+        turn_status = "ignored"
         try:
             system_state.pause_interruption()
             
@@ -355,7 +487,8 @@ def main_thread():
                 post_silence_hold=0.35,
                 pre_roll_ms=350,
                 min_speech_after_start=1.8,
-                threshold_boost=3.0       # قللها لو ما بيلتقطش أصوات منخفضة
+                threshold_boost=3.0,      # قللها لو ما بيلتقطش أصوات منخفضة
+                trace=True
             )
             if not audio_buffer:
                 print("❌ there is no audio_buffer")
@@ -363,8 +496,10 @@ def main_thread():
 
             # --- 2) Speech to Text ---
             try:
-                user_input = stt.transcribe_bytes(audio_buffer)
+                with activity.busy("stt"), tracer.span("stt", bytes=len(audio_buffer)), telemetry.inflight("stt"):
+                    user_input = stt.transcribe_bytes(audio_buffer)
             except Exception as ex:
+                turn_status = "error"
                 print(f"❌ STT error: {ex}")
                 continue
             if not user_input:
@@ -378,12 +513,14 @@ def main_thread():
                     system_state.interrupt()
                 except Exception:
                     pass
+                turn_status = "stopped"
                 print("⚠️ Stop command detected, cancelled speech.")
                 continue
             user_message = user_input        
             if allow_wake_word:
                 # 4) Enforce wake word (Ziko/زيكو variants)
-                has_wake, remaining, wake_form = wakewordDetector.extract_after_wake(user_message)
+                with tracer.span("wake_check"):
+                    has_wake, remaining, wake_form = wakewordDetector.extract_after_wake(user_message)
                 if not has_wake:
                     print("⏭️ Ignored (no wake word).")
                     # اختياري: تشغيل نغمة خفيفة تدل إن النظام لم يلتقط نداء زيكو
@@ -401,7 +538,8 @@ def main_thread():
 
             # 5) Local commands THEN AI (using the remainder only)
             try:
-                should_continue, local_response, action, pass_text = localCommandHandler.handle(user_message)
+                with tracer.span("local_commands"):
+                    should_continue, local_response, action, pass_text = localCommandHandler.handle(user_message)
                 print(f"should_continue:{should_continue} / local_response:{local_response} / action:{action}")
             except Exception as ex:
                 print(f"❌ Local command error: {ex}")
@@ -416,6 +554,7 @@ def main_thread():
                 print("✅ System resumed.")
                 '''
 
+            turn_status = "done"
             if local_response:
                 print(f"🤖 Local Response: {local_response}")
                 speak_safe(local_response)
@@ -430,7 +569,17 @@ def main_thread():
 
                     # NOTE: pass_text (if greetings trimmed) else remainder
                     prompt_text = pass_text if pass_text else user_message
-                    ai_response = n8n.chat("123456", prompt_text)
+                    if ai_stream is not None:
+                        # First sentence is spoken while the rest is still generating
+                        spoken = []
+                        speak_stream(ai_stream.chat_stream(prompt_text, spoken), spoken)
+                        ai_response = None
+                    elif ai_router is not None:
+                        with tracer.span("llm"), telemetry.inflight("llm"):
+                            ai_response = ai_router.chat(prompt_text)
+                    else:
+                        with tracer.span("n8n"), telemetry.inflight("n8n"):
+                            ai_response = n8n.chat(Config.N8N_SESSION_ID, prompt_text)
                     if ai_response:
                         print(f"🤖 AI Response: {ai_response}")
                         # tell user that we got answer untill we convert the AI response into sound
@@ -441,6 +590,7 @@ def main_thread():
             
                     system_state.pause_interruption()
                 except Exception as ex:
+                    turn_status = "error"
                     print(f"❌ AI error: {ex}")
                     traceback.print_exc()
 
@@ -451,6 +601,9 @@ def main_thread():
             print(f"❌ Loop error: {loop_ex}")
             traceback.print_exc()
             time.sleep(0.2)
+        finally:
+            if tracer.turn != last_turn:
+                tracer.end_turn(turn_status)
 
     cleanup()
     print("✅ System stopped successfully.")
@@ -461,6 +614,8 @@ def main():
 
     initialize_settings()
     audio_player.start()
+    if config.STATUS_MONITOR:
+        start_status_monitor()
 
 
     # Create and start threads
@@ -0,0 +1,439 @@
+# memory_store.py
+# SQLite storage engine for conversation memory (WAL mode, append-only inserts)
+# - Indexed by session and importance
+# - O(1) size accounting via triggers (no file re-read / re-serialize)
+# - Bounded retention policies
+# - Token-count index per exchange + rolling summary (for the context builder)
+# - One-time migration from the legacy chat-memory.json format
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+IMPORTANT = "Important"
+NOT_IMPORTANT = "Not Important"
+CATEGORIES = (IMPORTANT, NOT_IMPORTANT)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS exchanges (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id  TEXT    NOT NULL,
+    importance  TEXT    NOT NULL,
+    user_input  TEXT    NOT NULL,
+    ai_response TEXT    NOT NULL,
+    created_at  REAL    NOT NULL,
+    size        INTEGER NOT NULL,
+    tokens      INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_exchanges_session
+    ON exchanges(session_id, id);
+
+CREATE INDEX IF NOT EXISTS idx_exchanges_importance
+    ON exchanges(session_id, importance, id);
+
+CREATE TABLE IF NOT EXISTS summaries (
+    session_id  TEXT PRIMARY KEY,
+    summary     TEXT    NOT NULL,
+    upto_id     INTEGER NOT NULL,
+    tokens      INTEGER NOT NULL,
+    updated_at  REAL    NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS stats (
+    session_id  TEXT PRIMARY KEY,
+    total_bytes INTEGER NOT NULL DEFAULT 0,
+    total_rows  INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_exchanges_insert AFTER INSERT ON exchanges
+BEGIN
+    INSERT OR IGNORE INTO stats(session_id) VALUES (NEW.session_id);
+    UPDATE stats
+       SET total_bytes = total_bytes + NEW.size,
+           total_rows  = total_rows + 1
+     WHERE session_id = NEW.session_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_exchanges_delete AFTER DELETE ON exchanges
+BEGIN
+    UPDATE stats
+       SET total_bytes = total_bytes - OLD.size,
+           total_rows  = total_rows - 1
+     WHERE session_id = OLD.session_id;
+END;
+"""
+
+
+_AR_CHARS = re.compile(r'[\u0600-\u06FF]')
+
+# Per chat message overhead (role + separators)
+MESSAGE_TOKEN_OVERHEAD = 4
+
+
+def entry_size(user_input: str, ai_response: str) -> int:
+    """حجم الإدخال بنفس طريقة القياس القديمة (json.dumps)"""
+    return len(json.dumps({"user_input": user_input, "ai_response": ai_response}))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    تقدير سريع لعدد الـ tokens بدون tokenizer:
+    ~4 حروف/token للإنجليزي، ~2 حروف/token للعربي
+    """
+    if not text:
+        return 0
+    ar = len(_AR_CHARS.findall(text))
+    return max(1, (len(text) - ar + 3) // 4 + (ar + 1) // 2)
+
+
+def exchange_tokens(user_input: str, ai_response: str) -> int:
+    """tokens لمحادثة كاملة (رسالة user + رسالة assistant)"""
+    return (estimate_tokens(user_input) + estimate_tokens(ai_response)
+            + 2 * MESSAGE_TOKEN_OVERHEAD)
+
+
+class MemoryStore:
+    """
+    SQLite-backed conversation memory.
+
+    - append(): إدخال واحد (INSERT فقط، بدون إعادة كتابة الملف)
+    - recent(): آخر N رسائل عبر query مفهرس
+    - total_bytes(): حساب الحجم O(1) من جدول stats
+    - enforce_retention(): حدود للاحتفاظ بالرسائل
+    """
+
+    def __init__(self, path: str = "chat-memory.db", session_id: str = "robot-1"):
+        self.path = path
+        self.session_id = session_id
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+
+        # ✅ WAL: appends بدون إعادة كتابة + قراءة متزامنة
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # ✅ NORMAL كافي مع WAL ويقلل fsync على كرت SD
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.executescript(_SCHEMA)
+        self._ensure_token_index()
+
+    def _ensure_token_index(self):
+        """ترقية قواعد البيانات القديمة: إضافة عمود tokens وتعبئته"""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(exchanges)")}
+        if "tokens" not in columns:
+            self._conn.execute("ALTER TABLE exchanges ADD COLUMN tokens INTEGER NOT NULL DEFAULT 0")
+
+        missing = self._conn.execute(
+            "SELECT id, user_input, ai_response FROM exchanges WHERE tokens = 0"
+        ).fetchall()
+        if missing:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE exchanges SET tokens = ? WHERE id = ?",
+                [(exchange_tokens(r["user_input"], r["ai_response"]), r["id"]) for r in missing]
+            )
+            self._conn.execute("COMMIT")
+
+    # ---------------- Writes ----------------
+
+    def append(self, user_input: str, ai_response: str, importance: str = NOT_IMPORTANT) -> int:
+        """إضافة محادثة واحدة وإرجاع الـ id"""
+        importance = importance if importance in CATEGORIES else NOT_IMPORTANT
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO exchanges(session_id, importance, user_input, ai_response, created_at, size, tokens) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.session_id, importance, user_input, ai_response, time.time(),
+                 entry_size(user_input, ai_response), exchange_tokens(user_input, ai_response))
+            )
+            return cur.lastrowid
+
+    def append_many(self, rows: Iterable[Tuple[str, str, str]]) -> int:
+        """
+        إضافة عدة محادثات في transaction واحدة
+        rows: (user_input, ai_response, importance)
+        """
+        now = time.time()
+        params = [
+            (self.session_id,
+             imp if imp in CATEGORIES else NOT_IMPORTANT,
+             u, a, now, entry_size(u, a), exchange_tokens(u, a))
+            for u, a, imp in rows
+        ]
+        if not params:
+            return 0
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO exchanges(session_id, importance, user_input, ai_response, created_at, size, tokens) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    params
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(params)
+
+    def replace_all(self, memory: Dict[str, List[Dict[str, str]]]) -> None:
+        """استبدال كل ذاكرة الجلسة (للتوافق مع save_memory القديمة)"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM exchanges WHERE session_id = ?", (self.session_id,))
+                # ids change, so the old summary watermark is meaningless
+                self._conn.execute("DELETE FROM summaries WHERE session_id = ?", (self.session_id,))
+                now = time.time()
+                for importance in CATEGORIES:
+                    for entry in memory.get(importance, []):
+                        u = entry.get("user_input", "")
+                        a = entry.get("ai_response", "")
+                        self._conn.execute(
+                            "INSERT INTO exchanges(session_id, importance, user_input, ai_response, created_at, size, tokens) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (self.session_id, importance, u, a, now, entry_size(u, a), exchange_tokens(u, a))
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_importance(self, importance: str) -> int:
+        """حذف كل رسائل تصنيف معين"""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM exchanges WHERE session_id = ? AND importance = ?",
+                (self.session_id, importance)
+            )
+            return cur.rowcount
+
+    def enforce_retention(
+        self,
+        keep_important: int = 200,
+        keep_not_important: int = 50,
+        max_bytes: Optional[int] = None,
+        protect_after: Optional[int] = None,
+    ) -> int:
+        """
+        تطبيق حدود الاحتفاظ:
+        - آخر keep_* رسائل لكل تصنيف
+        - (اختياري) سقف للحجم: يحذف الأقدم من Not Important فقط
+          (Important محدود بـ keep_important وحده: لا تُحذف حقيقة مهمة بسبب الحجم)
+        - protect_after: الرسائل ذات id أكبر منه لا تُحذف أبداً
+          (upto الـ rolling summary: لم تُلخّص بعد)
+        Returns: عدد الرسائل المحذوفة
+        """
+        upto = (1 << 62) if protect_after is None else int(protect_after)
+        deleted = 0
+        with self._lock:
+            for importance, keep in ((IMPORTANT, keep_important), (NOT_IMPORTANT, keep_not_important)):
+                if keep <= 0:
+                    cur = self._conn.execute(
+                        "DELETE FROM exchanges WHERE session_id = ? AND importance = ? AND id <= ?",
+                        (self.session_id, importance, upto)
+                    )
+                    deleted += max(0, cur.rowcount)
+                    continue
+                cur = self._conn.execute(
+                    "DELETE FROM exchanges WHERE session_id = ? AND importance = ? AND id <= ? AND id < ("
+                    "  SELECT id FROM exchanges WHERE session_id = ? AND importance = ?"
+                    "  ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (self.session_id, importance, upto, self.session_id, importance, keep - 1)
+                )
+                deleted += max(0, cur.rowcount)
+
+            if max_bytes is not None:
+                while self._total_bytes_locked() > max_bytes:
+                    cur = self._conn.execute(
+                        "DELETE FROM exchanges WHERE id = ("
+                        "  SELECT id FROM exchanges WHERE session_id = ? AND importance = ? AND id <= ?"
+                        "  ORDER BY id ASC LIMIT 1)",
+                        (self.session_id, NOT_IMPORTANT, upto)
+                    )
+                    if cur.rowcount <= 0:
+                        break
+                    deleted += cur.rowcount
+        return deleted
+
+    # ---------------- Reads ----------------
+
+    def recent(self, limit: int = 5, importance: Optional[str] = None) -> List[Dict]:
+        """آخر N رسائل (بالترتيب الزمني) عبر الفهرس"""
+        sql = "SELECT id, importance, user_input, ai_response, created_at FROM exchanges WHERE session_id = ?"
+        params: list = [self.session_id]
+        if importance:
+            sql += " AND importance = ?"
+            params.append(importance)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(int(limit))
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(r) for r in reversed(rows)]
+
+    def all(self, importance: Optional[str] = None) -> List[Dict]:
+        """كل رسائل الجلسة (بالترتيب الزمني)"""
+        sql = "SELECT id, importance, user_input, ai_response, created_at FROM exchanges WHERE session_id = ?"
+        params: list = [self.session_id]
+        if importance:
+            sql += " AND importance = ?"
+            params.append(importance)
+        sql += " ORDER BY id ASC"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+    def newest(self, limit: int = 50) -> List[Dict]:
+        """آخر N رسائل من الأحدث للأقدم (مع عدد الـ tokens)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, importance, user_input, ai_response, tokens FROM exchanges "
+                "WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (self.session_id, int(limit))
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def between(self, after_id: int, before_id: int) -> List[Dict]:
+        """الرسائل بين id معينين (بالترتيب الزمني) — للـ rolling summary"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, importance, user_input, ai_response, tokens FROM exchanges "
+                "WHERE session_id = ? AND id > ? AND id < ? ORDER BY id ASC",
+                (self.session_id, int(after_id), int(before_id))
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_summary(self) -> Tuple[str, int]:
+        """Returns: (summary, upto_id)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, upto_id FROM summaries WHERE session_id = ?", (self.session_id,)
+            ).fetchone()
+        return (row["summary"], int(row["upto_id"])) if row else ("", 0)
+
+    def set_summary(self, summary: str, upto_id: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries(session_id, summary, upto_id, tokens, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.session_id, summary, int(upto_id), estimate_tokens(summary), time.time())
+            )
+
+    def as_memory_dict(self) -> Dict[str, List[Dict[str, str]]]:
+        """تحويل للشكل القديم {"Important": [...], "Not Important": [...]}"""
+        memory = {IMPORTANT: [], NOT_IMPORTANT: []}
+        for row in self.all():
+            memory[row["importance"]].append(
+                {"user_input": row["user_input"], "ai_response": row["ai_response"]}
+            )
+        return memory
+
+    def _total_bytes_locked(self) -> int:
+        row = self._conn.execute(
+            "SELECT total_bytes FROM stats WHERE session_id = ?", (self.session_id,)
+        ).fetchone()
+        return int(row["total_bytes"]) if row else 0
+
+    def total_bytes(self) -> int:
+        """حجم الذاكرة O(1)"""
+        with self._lock:
+            return self._total_bytes_locked()
+
+    def count(self) -> int:
+        """عدد الرسائل O(1)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT total_rows FROM stats WHERE session_id = ?", (self.session_id,)
+            ).fetchone()
+        return int(row["total_rows"]) if row else 0
+
+    # ---------------- Migration ----------------
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """
+        ترحيل chat-memory.json القديم (مرة واحدة).
+        لو قاعدة البيانات فيها رسائل: دمج (الرسائل الموجودة مسبقًا لا تتكرر).
+        الملف يُعاد تسميته إلى *.migrated فقط بعد نجاح الإدخال.
+        Returns: عدد الرسائل المُرحّلة
+        """
+        if not json_path or not os.path.exists(json_path):
+            return 0
+
+        try:
+            with open(json_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"[Memory] ⚠️ Cannot read {json_path}: {e}")
+            return 0
+
+        if not isinstance(data, dict):
+            return 0
+
+        rows = [
+            (entry.get("user_input", ""), entry.get("ai_response", ""), importance)
+            for importance in CATEGORIES
+            for entry in data.get(importance, [])
+            if isinstance(entry, dict)
+        ]
+
+        if self.count():
+            # Merge: an earlier run may have imported part of the file before failing to rename it
+            existing = {(row["user_input"], row["ai_response"]) for row in self.all()}
+            rows = [row for row in rows if (row[0], row[1]) not in existing]
+
+        try:
+            migrated = self.append_many(rows)
+        except sqlite3.Error as e:
+            print(f"[Memory] ⚠️ Cannot migrate {json_path} (kept as is): {e}")
+            return 0
+
+        try:
+            os.replace(json_path, json_path + ".migrated")
+        except OSError as e:
+            print(f"[Memory] ⚠️ Cannot rename {json_path}: {e}")
+
+        if migrated:
+            print(f"[Memory] ✅ Migrated {migrated} messages from {json_path}")
+        return migrated
+
+    # ---------------- Lifecycle ----------------
+
+    def close(self):
+        """إغلاق الاتصال"""
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+
+# ✅ Quick check
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "chat-memory.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump({IMPORTANT: [{"user_input": "my name is Sam", "ai_response": "Noted, Sam."}],
+                       NOT_IMPORTANT: []}, f)
+
+        store = MemoryStore(os.path.join(tmp, "chat-memory.db"), session_id="test")
+        print(f"Migrated: {store.migrate_from_json(legacy)}")
+
+        for i in range(100):
+            store.append(f"question {i}", f"answer {i}", NOT_IMPORTANT)
+
+        print(f"Rows: {store.count()} | Bytes: {store.total_bytes()}")
+        print(f"Deleted by retention: {store.enforce_retention(keep_not_important=10, max_bytes=600)}")
+        print(f"Rows: {store.count()} | Bytes: {store.total_bytes()}")
+        print(f"Recent: {[r['user_input'] for r in store.recent(3)]}")
+        store.close()
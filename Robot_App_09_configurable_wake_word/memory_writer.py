@@ -0,0 +1,310 @@
+# memory_writer.py
+# Write-behind persistence for conversation memory
+# - Caller thread only enqueues (no disk I/O on the AI response path)
+# - Coalesces dirty state (latest JSON snapshot wins, SQLite rows are batched)
+# - Store operations (deletes / cleanup) are queued too and run in order with the rows
+# - Flushes on interval or byte threshold
+# - Atomic JSON writes via temp file + rename
+# - Reports flush latency and queue depth
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+Row = Tuple[str, str, str]  # (user_input, ai_response, importance)
+
+
+def atomic_write_json(path: str, data, indent: Optional[int] = 2) -> int:
+    """
+    كتابة JSON بشكل ذري: ملف مؤقت في نفس المجلد ثم os.replace
+    Returns: عدد البايتات المكتوبة
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    payload = json.dumps(data, indent=indent, ensure_ascii=False).encode("utf-8")
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(payload)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return len(payload)
+
+
+class MemoryWriter:
+    """
+    Background persistence worker.
+
+    - put_snapshot(memory): حالة كاملة (JSON) — يُحفظ آخر snapshot فقط
+    - put_rows(rows): إدخالات جديدة (SQLite) — تُجمع وتُكتب في transaction واحدة
+    - put_op(fn): عملية على الـ store (حذف / تنظيف) تُنفَّذ في ثريد الكتابة بعد الصفوف التي سبقتها
+    - flush(): كتابة فورية وانتظار انتهائها
+    - stop(): إيقاف الثريد مع flush أخير
+    """
+
+    def __init__(
+        self,
+        write_snapshot: Optional[Callable[[Dict], int]] = None,
+        write_rows: Optional[Callable[[List[Row]], None]] = None,
+        flush_interval: float = 2.0,
+        flush_bytes: int = 4096,
+        name: str = "MemoryWriter",
+    ):
+        self._write_snapshot = write_snapshot
+        self._write_rows = write_rows
+        self.flush_interval = max(0.05, float(flush_interval))
+        self.flush_bytes = max(1, int(flush_bytes))
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flushed = threading.Condition(self._lock)
+
+        # Pending (dirty) state
+        self._snapshot: Optional[Dict] = None
+        self._rows: List[Row] = []
+        self._ops: List[Tuple[int, Callable[[], None]]] = []  # (rows queued before it, fn)
+        self._pending_bytes = 0
+
+        # Flush generations (for flush() waiters)
+        self._requested_gen = 0
+        self._done_gen = 0
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Stats
+        self._stats = {
+            "flushes": 0,
+            "errors": 0,
+            "rows_written": 0,
+            "bytes_written": 0,
+            "coalesced": 0,
+            "ops": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    # ---------------- Lifecycle ----------------
+
+    def start(self) -> "MemoryWriter":
+        with self._lock:
+            if self._running:
+                return self
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """إيقاف الثريد مع flush أخير لكل ما هو معلّق"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+        self._wake.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        # Anything enqueued after the worker exited
+        self._flush_once()
+
+    # ---------------- Producer API (non-blocking) ----------------
+
+    def put_snapshot(self, memory: Dict) -> None:
+        """تسجيل snapshot جديد (يحل محل أي snapshot سابق لم يُكتب بعد)"""
+        # Shallow-copy the lists so the caller can keep mutating its cache
+        snapshot = {key: list(value) if isinstance(value, list) else value
+                    for key, value in memory.items()}
+        size = sum(
+            len(e.get("user_input", "")) + len(e.get("ai_response", ""))
+            for value in snapshot.values() if isinstance(value, list)
+            for e in value if isinstance(e, dict)
+        )
+        with self._lock:
+            if self._snapshot is not None:
+                self._stats["coalesced"] += 1
+            self._snapshot = snapshot
+            self._pending_bytes = max(self._pending_bytes, size)
+            self._note_depth_locked()
+            trigger = self._pending_bytes >= self.flush_bytes
+        if trigger:
+            self._wake.set()
+
+    def put_rows(self, rows: List[Row]) -> None:
+        """إضافة صفوف جديدة للدفعة القادمة"""
+        if not rows:
+            return
+        size = sum(len(u) + len(a) for u, a, _ in rows)
+        with self._lock:
+            self._rows.extend(rows)
+            self._pending_bytes += size
+            self._note_depth_locked()
+            trigger = self._pending_bytes >= self.flush_bytes
+        if trigger:
+            self._wake.set()
+
+    def put_op(self, fn: Callable[[], None]) -> None:
+        """عملية تُنفَّذ في ثريد الكتابة (بدون انتظار) — ترى كل الصفوف المضافة قبلها"""
+        with self._lock:
+            self._ops.append((len(self._rows), fn))
+            self._note_depth_locked()
+        self._wake.set()
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """طلب flush فوري وانتظار انتهائه"""
+        with self._lock:
+            if not self._running:
+                running = False
+            else:
+                running = True
+                self._requested_gen += 1
+                target = self._requested_gen
+        if not running:
+            self._flush_once()
+            return True
+
+        self._wake.set()
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._done_gen >= target, timeout=timeout)
+
+    # ---------------- Read-your-writes helpers ----------------
+
+    def pending_rows(self) -> List[Row]:
+        with self._lock:
+            return list(self._rows)
+
+    def pending_bytes(self) -> int:
+        with self._lock:
+            return self._pending_bytes
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._depth_locked()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queue_depth"] = self._depth_locked()
+            stats["pending_bytes"] = self._pending_bytes
+        stats["avg_flush_ms"] = (stats["total_flush_ms"] / stats["flushes"]) if stats["flushes"] else 0.0
+        return stats
+
+    # ---------------- Worker ----------------
+
+    def _depth_locked(self) -> int:
+        return len(self._rows) + len(self._ops) + (1 if self._snapshot is not None else 0)
+
+    def _note_depth_locked(self) -> None:
+        depth = self._depth_locked()
+        if depth > self._stats["max_queue_depth"]:
+            self._stats["max_queue_depth"] = depth
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(timeout=self.flush_interval)
+            self._wake.clear()
+
+            self._flush_once()
+
+            with self._lock:
+                if not self._running:
+                    break
+
+    def _flush_once(self) -> None:
+        with self._lock:
+            snapshot, self._snapshot = self._snapshot, None
+            rows, self._rows = self._rows, []
+            ops, self._ops = self._ops, []
+            self._pending_bytes = 0
+            gen = self._requested_gen
+
+        if snapshot is not None or rows or ops:
+            start = time.perf_counter()
+            written = 0
+            done = 0      # rows written
+            ops_done = 0
+            try:
+                if snapshot is not None and self._write_snapshot:
+                    written += int(self._write_snapshot(snapshot) or 0)
+                    snapshot = None
+                # Rows and ops in queue order: an op sees exactly the rows queued before it
+                for at, fn in ops + [(len(rows), None)]:
+                    if at > done and self._write_rows:
+                        self._write_rows(rows[done:at])
+                        written += sum(len(u) + len(a) for u, a, _ in rows[done:at])
+                    done = at
+                    if fn is not None:
+                        ops_done += 1
+                        try:
+                            fn()
+                        except Exception as e:
+                            # Not retried: a failing delete should not block the rows behind it
+                            print(f"[Memory] ❌ Store operation error: {e}")
+                ok = True
+            except Exception as e:
+                ok = False
+                print(f"[Memory] ❌ Flush error: {e}")
+                # Put the unwritten data back so the next flush retries it
+                with self._lock:
+                    if snapshot is not None and self._snapshot is None:
+                        self._snapshot = snapshot
+                    rest = rows[done:]
+                    self._ops = ([(at - done, fn) for at, fn in ops[ops_done:]]
+                                 + [(at + len(rest), fn) for at, fn in self._ops])
+                    self._rows = rest + self._rows
+
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            with self._lock:
+                self._stats["ops"] += ops_done
+                self._stats["rows_written"] += done
+                if ok:
+                    self._stats["flushes"] += 1
+                    self._stats["bytes_written"] += written
+                    self._stats["last_flush_ms"] = elapsed_ms
+                    self._stats["total_flush_ms"] += elapsed_ms
+                    self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed_ms)
+                else:
+                    self._stats["errors"] += 1
+
+        with self._flushed:
+            if gen > self._done_gen:
+                self._done_gen = gen
+            self._flushed.notify_all()
+
+
+# ✅ Quick check
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chat-memory.json")
+        writer = MemoryWriter(
+            write_snapshot=lambda memory: atomic_write_json(path, memory),
+            flush_interval=0.5,
+        ).start()
+
+        memory = {"Important": [], "Not Important": []}
+        start = time.perf_counter()
+        for i in range(200):
+            memory["Not Important"].append({"user_input": f"q{i}", "ai_response": f"a{i}"})
+            writer.put_snapshot(memory)
+        enqueue_us = (time.perf_counter() - start) / 200 * 1_000_000
+
+        writer.stop()
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+
+        print(f"Enqueue: {enqueue_us:.1f}μs per call")
+        print(f"Saved entries: {len(saved['Not Important'])}")
+        print(f"Stats: {writer.get_stats()}")
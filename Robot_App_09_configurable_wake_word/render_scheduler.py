@@ -0,0 +1,242 @@
+# render_scheduler.py
+# Shared frame scheduler for the eye renderers (eye_runner.py / face_tracker.py)
+# - perf_counter deadlines (no drift, no time.time jumps)
+# - dt for animation (speed no longer depends on the achieved FPS)
+# - Frame-drop accounting (missed deadlines are skipped, not bursted)
+# - Adaptive FPS: lower render rate while STT / TTS is busy (see `activity`)
+# - Per-frame timing stats
+# - Idle mode: wait(until=next_event) sleeps until the next animation event
+#   (or until invalidate() is called) instead of ticking at full FPS
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class Activity:
+    """
+    سجل بسيط لحالة النظام (STT / TTS / ...) يقرأه الـ renderer.
+    main.py: with activity.busy("stt"): ...
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._listeners = []
+
+    def set(self, name: str, active: bool) -> None:
+        with self._lock:
+            count = self._counts.get(name, 0) + (1 if active else -1)
+            if count > 0:
+                self._counts[name] = count
+            else:
+                self._counts.pop(name, None)
+            names = sorted(self._counts)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(names)
+            except Exception as e:
+                print(f"⚠️  [Activity] listener error: {e}")
+
+    def subscribe(self, listener) -> None:
+        """listener(active_names) يُستدعى عند كل تغيير (مثلاً EyeProcess → shared memory)"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    @contextmanager
+    def busy(self, name: str):
+        self.set(name, True)
+        try:
+            yield
+        finally:
+            self.set(name, False)
+
+    def is_busy(self) -> bool:
+        with self._lock:
+            return bool(self._counts)
+
+    def active(self):
+        with self._lock:
+            return sorted(self._counts)
+
+
+# Process-wide activity registry (eye_process.EyeProcess mirrors it into the renderer process)
+activity = Activity()
+
+
+class RenderScheduler:
+    """
+    loop:
+        dt = scheduler.wait()        # ينام حتى الـ deadline التالي ويرجع dt
+        scheduler.begin()
+        ... update(dt) + render ...
+        scheduler.end()
+
+    fps: المعدل العادي، busy_fps: المعدل أثناء STT/TTS
+    wait(until=t): لا شيء يتحرك قبل t → نوم حتى t (أو حتى invalidate())
+    wake: Event مشترك (مثلاً EyeState.changed) يوقظ الـ loop عند تغيّر الحالة من ثريد آخر
+    """
+
+    def __init__(self, fps: float = 30.0, busy_fps: Optional[float] = 15.0,
+                 activity_source: Optional[Activity] = None, max_dt: float = 0.25,
+                 max_idle: float = 0.5, wake: Optional[threading.Event] = None,
+                 stats_window: int = 120):
+        self.fps = float(fps)
+        self.busy_fps = float(busy_fps) if busy_fps else self.fps
+        self.activity = activity_source if activity_source is not None else activity
+        self.max_dt = float(max_dt)
+        self.max_idle = float(max_idle)
+        self._wake = wake if wake is not None else threading.Event()
+
+        self._next = None
+        self._last = None
+        self._frame_start = 0.0
+        self._busy = False
+
+        # Stats
+        self.frames = 0
+        self.dropped = 0
+        self.skipped = 0      # wake-ups with nothing to present
+        self.idle_waits = 0
+        self.idle_time = 0.0
+        self._created = time.perf_counter()
+        self._frame_ms = deque(maxlen=stats_window)
+        self._intervals = deque(maxlen=stats_window)
+        self._max_frame_ms = 0.0
+
+    @property
+    def target_fps(self) -> float:
+        return self.busy_fps if self._busy else self.fps
+
+    @property
+    def period(self) -> float:
+        return 1.0 / self.target_fps
+
+    # ---------------- Timing ----------------
+
+    def invalidate(self) -> None:
+        """إيقاظ الـ loop فوراً (تغيّرت الحالة من ثريد آخر)"""
+        self._wake.set()
+
+    def wait(self, until: Optional[float] = None) -> float:
+        """
+        النوم حتى موعد الإطار التالي؛ يرجع dt بالثواني منذ الإطار السابق
+        until: وقت الحدث التالي (perf_counter) إذا لا يوجد أي حركة قبله
+        """
+        self._busy = self.activity.is_busy() if self.activity is not None else False
+        period = self.period
+        now = time.perf_counter()
+
+        if self._next is None:
+            self._next = now
+            self._last = now - period
+
+        idle = until is not None and until > self._next
+        target = min(until, now + self.max_idle) if idle else self._next
+
+        delay = target - now
+        if delay > 0:
+            slept_from = now
+            if self._wake.wait(delay):
+                idle = True  # woken early: re-anchor like an idle wake-up
+            now = time.perf_counter()
+            if idle:
+                self.idle_time += now - slept_from
+        self._wake.clear()
+
+        if idle:
+            # Nothing was due: no dropped frames, next deadline from now
+            self.idle_waits += 1
+            self._next = now + period
+        else:
+            # Missed whole periods: count them and re-anchor instead of bursting
+            late = now - self._next
+            if late >= period:
+                missed = int(late / period)
+                self.dropped += missed
+                self._next = now + period
+            else:
+                self._next += period
+
+        dt = now - self._last
+        self._last = now
+        self._intervals.append(dt)
+        return min(dt, self.max_dt)
+
+    def begin(self) -> None:
+        self._frame_start = time.perf_counter()
+
+    def end(self, presented: bool = True) -> float:
+        """نهاية عمل الإطار؛ يرجع زمن الإطار بالـ ms (presented=False: لا شيء تغيّر)"""
+        ms = (time.perf_counter() - self._frame_start) * 1000.0
+        if not presented:
+            self.skipped += 1
+            return ms
+        self.frames += 1
+        self._frame_ms.append(ms)
+        if ms > self._max_frame_ms:
+            self._max_frame_ms = ms
+        return ms
+
+    def reset(self) -> None:
+        """بعد توقف طويل (مثلاً وضع idle) حتى لا يُحسب كـ dropped"""
+        self._next = None
+        self._last = None
+
+    # ---------------- Stats ----------------
+
+    def get_stats(self) -> Dict:
+        frame_ms = sorted(self._frame_ms)
+        intervals = list(self._intervals)
+        avg_interval = sum(intervals) / len(intervals) if intervals else 0.0
+        uptime = max(1e-9, time.perf_counter() - self._created)
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "idle_waits": self.idle_waits,
+            "idle_ratio": min(1.0, self.idle_time / uptime),
+            "target_fps": self.target_fps,
+            "fps": (1.0 / avg_interval) if avg_interval > 0 else 0.0,
+            "avg_frame_ms": (sum(frame_ms) / len(frame_ms)) if frame_ms else 0.0,
+            "p95_frame_ms": frame_ms[int(0.95 * (len(frame_ms) - 1))] if frame_ms else 0.0,
+            "max_frame_ms": self._max_frame_ms,
+            "busy": self._busy,
+        }
+
+    def format_stats(self) -> str:
+        s = self.get_stats()
+        return (f"{s['fps']:.1f}/{s['target_fps']:.0f} FPS, frame avg {s['avg_frame_ms']:.1f}ms "
+                f"p95 {s['p95_frame_ms']:.1f}ms max {s['max_frame_ms']:.1f}ms, "
+                f"dropped {s['dropped']}/{s['frames'] + s['dropped']}, "
+                f"idle {s['idle_ratio'] * 100:.0f}% ({s['skipped']} unchanged)")
+
+
+# ✅ Quick check
+if __name__ == "__main__":
+    scheduler = RenderScheduler(fps=30, busy_fps=10)
+    start = time.perf_counter()
+    position = 0.0
+
+    for i in range(90):
+        if i == 30:
+            activity.set("stt", True)
+        if i == 60:
+            activity.set("stt", False)
+        dt = scheduler.wait()
+        scheduler.begin()
+        position += 100.0 * dt  # 100 px/s regardless of FPS
+        time.sleep(0.05 if i == 75 else 0.002)  # one slow frame
+        scheduler.end()
+
+    elapsed = time.perf_counter() - start
+    print(f"Moved {position:.0f}px in {elapsed:.2f}s (expected ≈ {100 * elapsed:.0f}px)")
+    print(scheduler.format_stats())
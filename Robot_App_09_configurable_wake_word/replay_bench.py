@@ -0,0 +1,614 @@
+# replay_bench.py
+# Reproducible offline benchmark of the full voice pipeline (replaces live-API benchmark_script.py / zico.py)
+# - Replays a corpus of WAV utterances through the real AudioRecorder VAD via a virtual input
+#   (audio_io.VirtualInput: real-time or accelerated clock, noise floor between utterances)
+# - TTS plays into audio_io.CaptureOutput (same clock): first audio out / playback end are real
+# - STT / n8n / TTS are local stand-in servers (separate process, so their CPU is not counted)
+#   with configurable latency distributions: 0.3 | uniform:0.2:0.6 | normal:0.4:0.1 | lognormal:0.4:0.5
+# - Same turn logic as main.main_thread: stop → wake word → local commands → n8n → TTS
+# - Stage timings come from turn_trace; reports p50 / p95 / p99 per stage and end to end,
+#   CPU% / CPU ms per turn and RSS
+# - Baseline: --save-baseline FILE, then --baseline FILE flags regressions (exit code 1)
+#
+# Corpus: a directory with corpus.json:
+#   [{"file": "ar_time.wav", "text": "زيكو كم الساعة", "lang": "ar", "wake": true, "noisy": false,
+#     "expect": "local"}, ...]
+#   text = what the STT stand-in returns for that utterance, expect = route (optional check).
+#   python replay_bench.py --make-corpus bench_corpus     # synthetic speech-like corpus
+#
+# Usage:
+#   python replay_bench.py --corpus bench_corpus --repeat 3 --out run.json
+#   python replay_bench.py --corpus bench_corpus --speed 1 --n8n-latency lognormal:1.2:0.4
+#   python replay_bench.py --corpus bench_corpus --save-baseline bench_baseline.json
+#   python replay_bench.py --corpus bench_corpus --baseline bench_baseline.json --threshold 0.15
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# Project modules (audio_io, Config, ...) are imported inside the functions:
+# Config reads the environment at import time and the stand-in URLs are set first.
+
+RATE = 16000
+
+# Same capture parameters as main.main_thread
+RECORD_ARGS = dict(
+    max_duration=25.0,
+    noise_calib_duration=0.8,
+    start_frames=3,
+    end_frames=18,
+    post_silence_hold=0.35,
+    pre_roll_ms=350,
+    min_speech_after_start=1.8,
+    threshold_boost=3.0,
+)
+
+# Report order: spans (duration), then marks relative to the end of speech
+SPAN_STAGES = ("capture", "stt", "wake_check", "local_commands", "n8n", "speak")
+MARK_STAGES = ("tts_first_byte", "first_audio_out", "playback_end")
+
+
+# ==========================================
+# LATENCY DISTRIBUTIONS
+# ==========================================
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    "0.3" / "const:0.3"        ثابت
+    "uniform:0.2:0.6"          منتظم
+    "normal:0.4:0.1"           mean, std (≥ 0)
+    "lognormal:0.4:0.5"        median, sigma (ذيل طويل مثل الـ APIs الحقيقية)
+    """
+    parts = str(spec).strip().split(":")
+    kind, args = (parts[0].lower(), [float(p) for p in parts[1:]]) if len(parts) > 1 else ("const", [float(parts[0])])
+    if kind == "const":
+        return lambda rng: args[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if kind == "lognormal":
+        import math
+        mu = math.log(max(args[0], 1e-6))
+        return lambda rng: rng.lognormvariate(mu, args[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+# ==========================================
+# STAND-IN SERVERS (STT / n8n / TTS)
+# ==========================================
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    POST /v1/speech-to-text            → {"text": <النص المسجّل عبر /_control>}
+    POST /webhook/n8n                  → {"output": ...}
+    POST /v1/text-to-speech/<voice>    → WAV أو PCM (?output_format=pcm_16000)، أول chunk بعد tts latency
+    POST /_control                     → {"stt_text": ...} قبل كل utterance
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the pooled sessions in the real clients
+    server_version = "ReplayStub/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _json(self, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _sleep(self, name: str) -> None:
+        with self.server.rng_lock:
+            delay = self.server.latency[name](self.server.rng)
+        time.sleep(delay)
+
+    def do_POST(self):
+        body = self._body()
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/_control":
+            self.server.stt_text = json.loads(body or b"{}").get("stt_text", "")
+            self._json({"ok": True})
+        elif path.endswith("/speech-to-text"):
+            self._sleep("stt")
+            self._json({"text": self.server.stt_text})
+        elif path.startswith("/webhook"):
+            message = json.loads(body or b"{}").get("message", "")
+            self._sleep("n8n")
+            self._json({"output": f"Here is a short answer about {message[:40]}. I hope that helps."})
+        elif "/text-to-speech/" in path:
+            text = json.loads(body or b"{}").get("text", "")
+            self._tts(text, pcm_only="output_format=pcm_" in self.path)
+        else:
+            self.send_error(404)
+
+    def _tts(self, text: str, pcm_only: bool = False) -> None:
+        # ~60ms of audio per character (a 220Hz tone)
+        n = int(RATE * max(0.3, 0.06 * len(text)))
+        tone = (3000 * np.sin(2 * np.pi * 220 * np.arange(n) / RATE)).astype(np.int16)
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(RATE)
+            wf.writeframes(tone.tobytes())
+        audio = tone.tobytes() if pcm_only else buf.getvalue()
+
+        self._sleep("tts")
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        try:
+            for i in range(0, len(audio), 8192):
+                self.wfile.write(audio[i:i + 8192])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def _serve(latency_specs: Dict[str, str], seed: int, port_queue) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.latency = {name: parse_latency(spec) for name, spec in latency_specs.items()}
+    server.rng = random.Random(seed)
+    server.rng_lock = threading.Lock()
+    server.stt_text = ""
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub_servers(latency_specs: Dict[str, str], seed: int = 0):
+    """
+    تشغيل الـ stand-in servers في process منفصل
+    Returns: (process, base_url) — process.terminate() للإيقاف
+    """
+    import multiprocessing
+    ctx = multiprocessing.get_context("spawn")
+    port_queue = ctx.Queue()
+    process = ctx.Process(target=_serve, args=(latency_specs, seed, port_queue), name="ReplayStubs", daemon=True)
+    process.start()
+    port = port_queue.get(timeout=15)
+    return process, f"http://127.0.0.1:{port}"
+
+
+# ==========================================
+# CORPUS
+# ==========================================
+
+def speech_end(pcm: np.ndarray) -> float:
+    """نهاية الكلام (ثواني): آخر frame 20ms طاقته > 10% من الأعلى"""
+    frame = RATE // 50
+    n = len(pcm) // frame
+    if n == 0:
+        return len(pcm) / RATE
+    rms = np.sqrt((pcm[:n * frame].astype(np.float64).reshape(n, frame) ** 2).mean(axis=1))
+    voiced = np.nonzero(rms > 0.1 * rms.max())[0]
+    return (voiced[-1] + 1) * frame / RATE if len(voiced) else len(pcm) / RATE
+
+
+def load_corpus(directory: str) -> List[dict]:
+    from audio_io import load_wav
+    with open(os.path.join(directory, "corpus.json"), encoding="utf-8") as f:
+        items = json.load(f)
+    for item in items:
+        item["pcm"] = load_wav(os.path.join(directory, item["file"]), RATE)
+        item["speech_end"] = speech_end(item["pcm"])
+    return items
+
+
+# (text, lang, wake, expected route)
+SYNTHETIC_UTTERANCES = [
+    ("Ziko what time is it", "en", True, "local"),
+    ("Ziko tell me a short story about robots", "en", True, "ai"),
+    ("what is the weather like today", "en", False, "ignored"),
+    ("Ziko", "en", True, "wake_only"),
+    ("stop", "en", False, "stop"),
+    ("زيكو كم الساعة", "ar", True, "local"),
+    ("زيكو احكي لي قصة قصيرة عن الفضاء", "ar", True, "ai"),
+    ("كيف حالك اليوم", "ar", False, "ignored"),
+    ("توقف", "ar", False, "stop"),
+]
+
+
+def synth_utterance(text: str, rng: np.random.Generator, noisy: bool) -> np.ndarray:
+    """
+    إشارة تشبه الكلام: مقاطع voiced (f0 + harmonics) بطول يتناسب مع النص، فواصل قصيرة بينها.
+    noisy: ضوضاء بيضاء عند SNR ~15dB
+    """
+    duration = max(0.6, 0.075 * len(text))
+    out = []
+    t = 0.0
+    f0 = rng.uniform(110, 220)
+    while t < duration:
+        syllable = rng.uniform(0.12, 0.25)
+        n = int(syllable * RATE)
+        ts = np.arange(n) / RATE
+        pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(2, 5) * ts))
+        phase = 2 * np.pi * np.cumsum(pitch) / RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 9))
+        envelope = np.sin(np.pi * np.arange(n) / n) ** 0.5
+        out.append(voiced * envelope * rng.uniform(3000, 6000))
+        gap = int(rng.uniform(0.03, 0.08) * RATE)
+        out.append(np.zeros(gap))
+        t += syllable + gap / RATE
+    pcm = np.concatenate(out)
+    if noisy:
+        rms = np.sqrt((pcm ** 2).mean())
+        pcm = pcm + rng.normal(0, rms / 5.6, len(pcm))  # ~15 dB
+    return np.clip(pcm, -32768, 32767).astype(np.int16)
+
+
+def make_corpus(directory: str, seed: int = 0) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    manifest = []
+    for index, (text, lang, wake, expect) in enumerate(SYNTHETIC_UTTERANCES):
+        for noisy in (False, True):
+            name = f"{index:02d}_{lang}_{'wake' if wake else 'nowake'}{'_noisy' if noisy else ''}.wav"
+            pcm = synth_utterance(text, rng, noisy)
+            with wave.open(os.path.join(directory, name), "wb") as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(RATE)
+                wf.writeframes(pcm.tobytes())
+            manifest.append({"file": name, "text": text, "lang": lang, "wake": wake,
+                             "noisy": noisy, "expect": expect})
+    with open(os.path.join(directory, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"✅ {len(manifest)} utterances → {directory}")
+    return manifest
+
+
+# ==========================================
+# RESOURCES
+# ==========================================
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class ResourceSampler:
+    """CPU (os.times) + RSS كل interval ثانية في thread خلفي"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.rss: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="ResourceSampler")
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.rss.append(_rss_mb())
+
+    def start(self) -> "ResourceSampler":
+        times = os.times()
+        self._cpu0 = times.user + times.system
+        self._wall0 = time.perf_counter()
+        self.rss.append(_rss_mb())
+        self._thread.start()
+        return self
+
+    def stop(self) -> dict:
+        self._stop.set()
+        self._thread.join(timeout=1)
+        times = os.times()
+        cpu = times.user + times.system - self._cpu0
+        wall = time.perf_counter() - self._wall0
+        return {
+            "cpu_s": cpu,
+            "wall_s": wall,
+            "cpu_percent": 100.0 * cpu / wall if wall > 0 else 0.0,
+            "rss_mean_mb": float(np.mean(self.rss)),
+            "rss_peak_mb": float(np.max(self.rss)),
+        }
+
+
+# ==========================================
+# PIPELINE (main.main_thread without audio cues / eyes)
+# ==========================================
+
+def configure_env(base_url: str, speed: float) -> None:
+    """قبل أي import لـ Config: الـ clients تشير للـ stand-ins، والخرج CaptureOutput"""
+    os.environ["ELEVEN_STT_URL"] = f"{base_url}/v1/speech-to-text"
+    os.environ["ELEVEN_TTS_URL"] = f"{base_url}/v1/text-to-speech"
+    os.environ["N8N_URL"] = f"{base_url}/webhook/n8n"
+    os.environ["AUDIO_OUTPUT"] = "capture"
+    os.environ["AUDIO_VIRTUAL_SPEED"] = str(speed)
+    if not os.environ.get("ELEVENLABS_API_KEY"):
+        os.environ["ELEVENLABS_API_KEY"] = "replay-bench"  # only ever sent to the stand-ins
+
+
+class Pipeline:
+    def __init__(self, source, base_url: str):
+        from Config import Config
+        from audio_recorder import AudioRecorder
+        from speech_to_text import SpeechToText
+        from text_to_speech import TextToSpeech
+        from ai_n8n import N8nClient
+        from utilities import WakeWordDetector, StopCommandDetector
+        from local_commands import LocalCommandHandler
+        from turn_trace import tracer
+        import requests
+
+        self.cfg = Config()
+        self.base_url = base_url
+        self.tracer = tracer
+        tracer.enabled = True  # stage timings come from the tracer, whatever TRACE_ENABLED says
+        self.control = requests.Session()
+        self.recorder = AudioRecorder(stream=source)
+        self.stt = SpeechToText()
+        self.tts = TextToSpeech()
+        self.n8n = N8nClient()
+        self.wake = WakeWordDetector()
+        self.stop = StopCommandDetector()
+        self.local = LocalCommandHandler(language_preference='english ', enable_stats=False)
+
+    def speak(self, text: str) -> None:
+        # Fetch + playback into the CaptureOutput (marks tts_first_byte / first_audio_out / playback_end)
+        with self.tracer.span("speak"):
+            self.tts.say(text)
+
+    def turn(self, text: str) -> str:
+        """turn واحد بنفس منطق main_thread، يرجع الـ route"""
+        self.control.post(f"{self.base_url}/_control", json={"stt_text": text}, timeout=5)
+        last_turn = self.tracer.turn
+        audio = self.recorder.record_until_silence(**RECORD_ARGS, trace=True)
+        if self.tracer.turn == last_turn:
+            return "no_speech"
+
+        with self.tracer.span("stt", bytes=len(audio)):
+            user_input = self.stt.transcribe_bytes(audio)
+        if not user_input:
+            return "empty"
+        if self.stop.is_stop_command(user_input):
+            return "stop"
+        with self.tracer.span("wake_check"):
+            has_wake, remaining, _ = self.wake.extract_after_wake(user_input)
+        if not has_wake:
+            return "ignored"
+        if not remaining:
+            return "wake_only"
+
+        with self.tracer.span("local_commands"):
+            should_continue, local_response, _, pass_text = self.local.handle(remaining)
+        if local_response:
+            self.speak(local_response)
+        if not should_continue:
+            return "local"
+        with self.tracer.span("n8n"):
+            reply = self.n8n.chat("replay-bench", pass_text or remaining)
+        if reply:
+            self.speak(reply)
+        return "ai"
+
+    def close(self) -> None:
+        for closer in (self.recorder.close, self.stt.cleanup, self.n8n.close, self.control.close):
+            try:
+                closer()
+            except Exception:
+                pass
+
+
+# ==========================================
+# REPORT / BASELINE
+# ==========================================
+
+def percentiles(values: List[float]) -> dict:
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "n": int(arr.size),
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "mean": float(arr.mean()),
+    }
+
+
+def run(args) -> dict:
+    specs = {"stt": args.stt_latency, "n8n": args.n8n_latency, "tts": args.tts_latency}
+    process, base_url = start_stub_servers(specs, seed=args.seed)
+    configure_env(base_url, args.speed)
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        import tempfile
+        directory = os.path.join(tempfile.gettempdir(), "replay_bench_corpus")
+        make_corpus(directory, seed=args.seed)
+        corpus = load_corpus(directory)
+
+    from audio_io import VirtualInput, capture_log
+    source = VirtualInput(rate=RATE, speed=args.speed, noise_rms=args.noise_rms, seed=args.seed)
+    pipeline = Pipeline(source, base_url)
+
+    samples: Dict[str, List[float]] = {}
+    routes: Dict[str, int] = {}
+    mismatches = []
+    turns = 0
+    sampler = ResourceSampler().start()
+    try:
+        for rep in range(args.repeat):
+            for item in corpus:
+                tail = max(1.0, RECORD_ARGS["min_speech_after_start"] + 0.5 - item["speech_end"])
+                speech_end_at = source.queue(item["pcm"], lead=1.2, tail=tail, speech_end=item["speech_end"])
+                route = pipeline.turn(item["text"])
+                turns += 1
+                routes[route] = routes.get(route, 0) + 1
+                if item.get("expect") and item["expect"] != route:
+                    mismatches.append({"file": item["file"], "expect": item["expect"], "got": route})
+                if route == "no_speech":
+                    print(f"⚠️  [Bench] {item['file']}: no speech detected")
+                    continue
+
+                summary = pipeline.tracer.end_turn(route, verbose=False)
+                if summary is None:
+                    continue
+                for name in SPAN_STAGES:
+                    if name in summary["spans"]:
+                        samples.setdefault(name, []).append(summary["spans"][name])
+                marks = summary["marks"]
+                for name in MARK_STAGES:
+                    if name in marks and "vad_end" in marks:
+                        samples.setdefault(name, []).append(marks[name] - marks["vad_end"])
+                if "total_ms" in summary:
+                    samples.setdefault("end_to_end", []).append(summary["total_ms"])
+                if pipeline.recorder.vad_end_at is not None:
+                    # Audio time from the real end of speech to the VAD decision
+                    samples.setdefault("vad_end_delay", []).append(
+                        (pipeline.recorder.vad_end_at - speech_end_at) * 1000.0)
+                if args.verbose:
+                    print(f"   [{rep + 1}] {item['file']:<28} {route:<9} "
+                          f"{pipeline.tracer.format_summary(summary)}")
+    finally:
+        resources = sampler.stop()
+        pipeline.close()
+        process.terminate()
+
+    resources["cpu_ms_per_turn"] = 1000.0 * resources["cpu_s"] / max(1, turns)
+    playbacks = capture_log.playbacks("tts")
+    return {
+        "meta": {
+            "corpus": args.corpus or "synthetic",
+            "utterances": len(corpus),
+            "repeat": args.repeat,
+            "speed": args.speed,
+            "latency": specs,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "stages": {name: percentiles(values) for name, values in samples.items()},
+        "resources": resources,
+        "routes": routes,
+        "playback": {
+            "count": len(playbacks),
+            "audio_s": round(sum(p.duration for p in playbacks), 2),
+            "interrupted": sum(1 for p in playbacks if p.interrupted),
+        },
+        "mismatches": mismatches,
+    }
+
+
+def print_report(result: dict) -> None:
+    print("\n" + "=" * 66)
+    print(f"  Replay benchmark: {result['meta']['utterances']} utterances × {result['meta']['repeat']}, "
+          f"speed {result['meta']['speed'] or 'max'}")
+    print("=" * 66)
+    print(f"{'stage':<18}{'n':>5}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'mean ms':>11}")
+    order = list(SPAN_STAGES) + ["vad_end_delay"] + list(MARK_STAGES) + ["end_to_end"]
+    for name in order:
+        s = result["stages"].get(name)
+        if s:
+            print(f"{name:<18}{s['n']:>5}{s['p50']:>11.1f}{s['p95']:>11.1f}{s['p99']:>11.1f}{s['mean']:>11.1f}")
+    r = result["resources"]
+    print(f"\nCPU {r['cpu_percent']:.1f}% ({r['cpu_ms_per_turn']:.0f}ms per turn), "
+          f"RSS mean {r['rss_mean_mb']:.1f}MB peak {r['rss_peak_mb']:.1f}MB")
+    print(f"Routes: {result['routes']}")
+    p = result["playback"]
+    print(f"TTS playback (captured): {p['count']} sounds, {p['audio_s']:.1f}s of audio, {p['interrupted']} interrupted")
+    for m in result["mismatches"]:
+        print(f"⚠️  {m['file']}: expected {m['expect']}, got {m['got']}")
+
+
+def compare(result: dict, baseline: dict, threshold: float, min_ms: float = 5.0) -> List[str]:
+    """
+    مقارنة p50 / p95 لكل مرحلة + CPU ms/turn مع الـ baseline.
+    regression: أبطأ بأكثر من threshold (نسبة) وبأكثر من min_ms (ضجيج القياس)
+    """
+    regressions = []
+    print(f"\n{'vs baseline':<18}{'p50 ms':>18}{'p95 ms':>18}")
+    for name, base in baseline.get("stages", {}).items():
+        new = result["stages"].get(name)
+        if not new:
+            continue
+        cells = []
+        for key in ("p50", "p95"):
+            old, cur = base[key], new[key]
+            change = (cur - old) / old if old > 0 else 0.0
+            flag = change > threshold and cur - old > min_ms
+            if flag:
+                regressions.append(f"{name} {key} {old:.1f} → {cur:.1f}ms ({change:+.0%})")
+            cells.append(f"{old:.0f}→{cur:.0f} {change:+.0%}{'!' if flag else ' '}")
+        print(f"{name:<18}{cells[0]:>18}{cells[1]:>18}")
+
+    old_cpu = baseline.get("resources", {}).get("cpu_ms_per_turn")
+    cur_cpu = result["resources"]["cpu_ms_per_turn"]
+    if old_cpu:
+        change = (cur_cpu - old_cpu) / old_cpu
+        print(f"{'cpu ms/turn':<18}{old_cpu:>9.0f}→{cur_cpu:.0f} {change:+.0%}")
+        if change > threshold and cur_cpu - old_cpu > min_ms:
+            regressions.append(f"cpu_ms_per_turn {old_cpu:.0f} → {cur_cpu:.0f}ms ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay-based offline benchmark of the voice pipeline")
+    parser.add_argument("--corpus", help="Directory with corpus.json + WAV files (default: synthetic)")
+    parser.add_argument("--make-corpus", metavar="DIR", help="Write the synthetic corpus to DIR and exit")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=0.0, help="0 = as fast as possible, 1 = real time")
+    parser.add_argument("--noise-rms", type=float, default=30.0, help="Mic noise floor between utterances")
+    parser.add_argument("--stt-latency", default="lognormal:0.45:0.3")
+    parser.add_argument("--n8n-latency", default="lognormal:1.2:0.4")
+    parser.add_argument("--tts-latency", default="lognormal:0.35:0.3", help="Time to first byte")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON result here")
+    parser.add_argument("--baseline", help="Compare against this JSON result")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write the JSON result as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown vs baseline (0.15 = 15%%)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every turn")
+    args = parser.parse_args(argv)
+
+    if args.make_corpus:
+        make_corpus(args.make_corpus, seed=args.seed)
+        return 0
+
+    result = run(args)
+    print_report(result)
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            print(f"💾 {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print("\n❌ Regressions:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("\n✅ No regression beyond the threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
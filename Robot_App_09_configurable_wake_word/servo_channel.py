@@ -0,0 +1,342 @@
+# servo_channel.py
+# Asynchronous serial channel for the servo Arduino (replaces arduino.sendData on the render thread)
+# - set() / sendData() only store the latest target per servo and return immediately
+# - A writer thread sends one frame with the newest values, at most max_rate times per second
+#   (targets that change faster are coalesced: only the latest value is written)
+# - Same wire format as cvzone SerialObject.sendData: "$" + each value zero-padded to `digits`
+# - Optional ack tracking: after each frame wait up to ack_timeout for a reply line
+# - Write errors are counted and logged, not swallowed; frames with more values than servos are
+#   rejected in the caller (sendData returns False) instead of raising in the render thread
+# - Targets start at the neutral 90° until the first set() / sendData()
+# - FakeServoDevice: pty-backed fake Arduino (parses frames, optional acks, UART-speed pacing)
+#
+# Demo: python servo_channel.py
+
+import os
+import select
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Sequence
+
+NEUTRAL = 90  # degrees: same rest angle as face_tracker
+
+
+class ServoChannel:
+    """
+        channel = ServoChannel(SerialObject(digits=3), servos=3, max_rate=20)
+        channel.sendData([0, 0, angle])     # لا يحجب أبداً (drop-in مكان SerialObject)
+        channel.set(2, angle)               # servo واحد
+        channel.close()                     # يرسل آخر قيمة ثم يوقف الـ thread
+    """
+
+    def __init__(self, device, servos: int = 3, digits: Optional[int] = None, max_rate: float = 20.0,
+                 ack: bool = False, ack_timeout: float = 0.2, initial: Optional[Sequence[int]] = None):
+        self.device = device
+        # Raw port: cvzone SerialObject.ser (pyserial) or anything with write(); else device.sendData
+        self.port = getattr(device, "ser", None) or (device if hasattr(device, "write") else None)
+        self.digits = digits if digits is not None else getattr(device, "digits", 3)
+        self.min_interval = 1.0 / max(0.1, max_rate)
+        self.ack = ack and self.port is not None and hasattr(self.port, "readline")
+        self.ack_timeout = float(ack_timeout)
+        if self.ack and hasattr(self.port, "timeout"):
+            self.port.timeout = self.ack_timeout
+
+        self.servos = int(servos)
+        self._targets: List[int] = [int(v) for v in initial] if initial is not None else [NEUTRAL] * self.servos
+        if len(self._targets) != self.servos:
+            raise ValueError(f"initial has {len(self._targets)} values for {self.servos} servos")
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._running = True
+        self._last_write = 0.0
+
+        # Stats
+        self.requests = 0
+        self.coalesced = 0
+        self.writes = 0
+        self.errors = 0
+        self.rejected = 0
+        self.acks = 0
+        self.timeouts = 0
+        self._write_ms = deque(maxlen=120)
+        self._ack_ms = deque(maxlen=120)
+
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="ServoWriter")
+        self._thread.start()
+
+    # ---------------- Producer side (render thread) ----------------
+
+    def set(self, index: int, value) -> None:
+        if not 0 <= index < self.servos:
+            raise IndexError(f"servo {index} out of range (0..{self.servos - 1})")
+        with self._cond:
+            self._update(((index, value),))
+
+    def sendData(self, data: Sequence) -> bool:
+        """نفس توقيع cvzone SerialObject.sendData: كل القيم دفعة واحدة (False: frame مرفوض)"""
+        if len(data) > self.servos:
+            self.rejected += 1
+            if self.rejected % 50 == 1:
+                print(f"⚠️  [Servo] {len(data)} values for {self.servos} servos, frame dropped")
+            return False
+        with self._cond:
+            self._update(enumerate(data))
+        return True
+
+    def _update(self, items) -> None:
+        self.requests += 1
+        changed = False
+        for index, value in items:
+            value = int(value)
+            if self._targets[index] != value:
+                self._targets[index] = value
+                changed = True
+        if not changed:
+            return  # same as the pending / last written frame
+        if self._dirty:
+            self.coalesced += 1  # the previous target was never written
+        self._dirty = True
+        self._cond.notify()
+
+    # ---------------- Writer thread ----------------
+
+    def _encode(self, values: Sequence[int]) -> bytes:
+        return ("$" + "".join(str(v).zfill(self.digits) for v in values)).encode()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._dirty and self._running:
+                    self._cond.wait()
+                if not self._dirty:
+                    break  # closed and flushed
+                wait = self._last_write + self.min_interval - time.perf_counter()
+                if wait > 0 and self._running:
+                    self._cond.wait(wait)  # newer targets arriving meanwhile are coalesced
+                    continue
+                values = list(self._targets)
+                self._dirty = False
+            self._write(values)
+
+    def _write(self, values: List[int]) -> None:
+        start = time.perf_counter()
+        self._last_write = start
+        try:
+            if self.port is not None:
+                self.port.write(self._encode(values))
+            else:
+                self.device.sendData(values)
+        except Exception as e:
+            self.errors += 1
+            if self.errors % 50 == 1:
+                print(f"⚠️  [Servo] write error: {e}")
+            return
+        self.writes += 1
+        sent = time.perf_counter()
+        self._write_ms.append((sent - start) * 1000.0)
+
+        if self.ack:
+            try:
+                line = self.port.readline()
+            except Exception:
+                line = b""
+            if line:
+                self.acks += 1
+                self._ack_ms.append((time.perf_counter() - sent) * 1000.0)
+            else:
+                self.timeouts += 1
+                if self.timeouts % 50 == 1:
+                    print(f"⚠️  [Servo] no ack within {self.ack_timeout * 1000:.0f}ms")
+
+    # ---------------- Lifecycle / stats ----------------
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """انتظار إرسال آخر قيمة"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            with self._cond:
+                if not self._dirty:
+                    return True
+            time.sleep(0.005)
+        return False
+
+    def close(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=2)
+
+    def stats(self) -> dict:
+        write_ms = list(self._write_ms)
+        ack_ms = list(self._ack_ms)
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "writes": self.writes,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "acks": self.acks,
+            "timeouts": self.timeouts,
+            "avg_write_ms": (sum(write_ms) / len(write_ms)) if write_ms else 0.0,
+            "max_write_ms": max(write_ms) if write_ms else 0.0,
+            "avg_ack_ms": (sum(ack_ms) / len(ack_ms)) if ack_ms else 0.0,
+        }
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        text = (f"{s['writes']} writes for {s['requests']} requests ({s['coalesced']} coalesced), "
+                f"write avg {s['avg_write_ms']:.1f}ms max {s['max_write_ms']:.1f}ms, errors {s['errors']}")
+        if self.ack:
+            text += f", acks {s['acks']} ({s['avg_ack_ms']:.1f}ms avg), timeouts {s['timeouts']}"
+        return text
+
+
+# ==========================================
+# FAKE DEVICE (tests / demo, no Arduino needed)
+# ==========================================
+
+class FdPort:
+    """port بسيط فوق file descriptor (طرف الـ pty): write + readline(timeout) بنفس سلوك pyserial"""
+
+    def __init__(self, fd: int, timeout: float = 0.2, baud: int = 0):
+        self.fd = fd
+        self.timeout = timeout
+        self.baud = baud  # >0: pace writes like a real UART (10 bits per byte)
+        self._buf = b""
+
+    def write(self, data: bytes) -> int:
+        view = memoryview(data)
+        while view:
+            n = os.write(self.fd, view)
+            view = view[n:]
+        if self.baud:
+            time.sleep(len(data) * 10.0 / self.baud)
+        return len(data)
+
+    def readline(self) -> bytes:
+        deadline = time.perf_counter() + self.timeout
+        while b"\n" not in self._buf:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                break
+            chunk = os.read(self.fd, 256)
+            if not chunk:
+                break
+            self._buf += chunk
+        if b"\n" not in self._buf:
+            return b""  # timeout (partial data stays buffered)
+        line, self._buf = self._buf.split(b"\n", 1)
+        return line + b"\n"
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FakeServoDevice:
+    """
+    Arduino وهمي على pty: يقرأ frames "$000000090"، يحفظ آخر القيم، ويرد "#ok" (اختياري).
+        device = FakeServoDevice(ack=True)
+        channel = ServoChannel(device.port, servos=3, digits=3, ack=True)
+    """
+
+    def __init__(self, servos: int = 3, digits: int = 3, ack: bool = False,
+                 latency: float = 0.0, baud: int = 0):
+        import tty
+        self.servos = servos
+        self.digits = digits
+        self.ack = ack
+        self.latency = latency
+        self.frame_len = 1 + servos * digits
+        self.values: List[Optional[int]] = [None] * servos
+        self.frames = 0
+        self.history = []
+
+        self._master, slave = os.openpty()
+        tty.setraw(slave)  # no echo / line discipline
+        self.port_name = os.ttyname(slave)
+        self.port = FdPort(slave, baud=baud)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="FakeServo")
+        self._thread.start()
+
+    def _loop(self) -> None:
+        buf = b""
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                chunk = os.read(self._master, 1024)
+            except OSError:
+                break
+            buf += chunk
+            while True:
+                start = buf.find(b"$")
+                if start < 0 or len(buf) - start < self.frame_len:
+                    buf = buf[start:] if start >= 0 else b""
+                    break
+                frame = buf[start + 1:start + self.frame_len].decode()
+                buf = buf[start + self.frame_len:]
+                self.values = [int(frame[i * self.digits:(i + 1) * self.digits]) for i in range(self.servos)]
+                self.frames += 1
+                self.history.append((time.perf_counter(), list(self.values)))
+                if self.ack:
+                    if self.latency:
+                        time.sleep(self.latency)
+                    os.write(self._master, b"#ok\n")
+
+    def close(self) -> None:
+        self._running = False
+        self._thread.join(timeout=1)
+        for fd in (self._master, self.port.fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+# ✅ Quick check
+if __name__ == "__main__":
+    import math
+
+    frames = 90  # 3s of rendering at 30 FPS, a new angle every frame
+    angles = [int(90 + 30 * math.sin(i / 10)) for i in range(frames)]
+
+    # Synchronous writes from the render loop (9600 baud device)
+    device = FakeServoDevice(baud=9600)
+    blocked = []
+    for angle in angles:
+        t0 = time.perf_counter()
+        device.port.write(("$000000" + str(angle).zfill(3)).encode())
+        blocked.append((time.perf_counter() - t0) * 1000)
+        time.sleep(1 / 30)
+    time.sleep(0.1)
+    print(f"Sync:  render thread blocked avg {sum(blocked) / frames:.2f}ms max {max(blocked):.2f}ms "
+          f"per frame, {device.frames} frames on the wire")
+    device.close()
+
+    # Async channel (20 Hz cap, acks after 5ms)
+    device = FakeServoDevice(ack=True, latency=0.005, baud=9600)
+    channel = ServoChannel(device.port, servos=3, digits=3, max_rate=20, ack=True)
+    blocked = []
+    start = time.perf_counter()
+    for angle in angles:
+        t0 = time.perf_counter()
+        channel.sendData([0, 0, angle])
+        blocked.append((time.perf_counter() - t0) * 1000)
+        time.sleep(1 / 30)
+    channel.flush()
+    elapsed = time.perf_counter() - start
+    time.sleep(0.05)
+    print(f"Async: render thread blocked avg {sum(blocked) / frames * 1000:.1f}µs max "
+          f"{max(blocked) * 1000:.1f}µs per frame, {device.frames} frames on the wire "
+          f"({device.frames / elapsed:.1f}/s)")
+    print(f"       {channel.format_stats()}")
+    print(f"       device ended at {device.values}, last target {angles[-1]}")
+    channel.close()
+    device.close()
@@ -0,0 +1,30 @@
+# shm_util.py
+# Shared-memory helpers used by eye_process.py (control block, frames) and audio_envelope.py
+# - create(size): new block owned by this process (unlinked by its owner on close)
+# - attach(name): open an existing block without letting resource_tracker unlink it
+#   when the attaching process (the eye renderer child) exits
+
+from multiprocessing import shared_memory
+
+_created = set()  # blocks created by this process (their tracker registration must stay)
+
+
+def create(size: int) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    _created.add(shm.name)
+    return shm
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    """فتح shared memory موجود بدون أن يحذفه resource_tracker عند خروج الـ child"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if shm.name not in _created:
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return shm
@@ -0,0 +1,359 @@
+# telemetry.py
+# Runtime telemetry for the assistant (Config.STATUS_MONITOR): what the Pi is doing right now
+# - Sampler thread, one sample every STATUS_INTERVAL s:
+#   process CPU% (os.times) and RSS (/proc/self/statm), per-thread state + CPU%
+#   (/proc/self/task/*/stat, named after the Python threads), load, SoC temperature,
+#   CPU clock and the firmware throttle flags when the board exposes them
+# - Gauges: callables registered by main.py (audio_queue / player queue depth, VAD state, ...)
+# - In-flight counters: `with telemetry.inflight("n8n"):` around network calls
+# - Samples live in a fixed-size ring (deque(maxlen=STATUS_HISTORY)): no growth in the field
+# - Endpoint (STATUS_ADDR), local only:
+#     curl 127.0.0.1:8765/status          → latest sample
+#     curl 127.0.0.1:8765/history?n=60    → last n samples
+#     curl --unix-socket /tmp/zico-status.sock http://x/status
+# - No psutil: /proc reads only (Linux); elsewhere the /proc parts are just left out
+#
+# Demo: python telemetry.py
+
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from Config import Config
+
+try:
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # Windows
+    _CLK_TCK = 100
+    _PAGE_SIZE = 4096
+
+# Raspberry Pi / generic Linux sysfs files (read only if present)
+_TEMP_PATH = "/sys/class/thermal/thermal_zone0/temp"                          # m°C
+_FREQ_PATH = "/sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq"          # kHz
+_THROTTLED_PATH = "/sys/devices/platform/soc/soc:firmware/get_throttled"      # hex flags (Pi)
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except (OSError, ValueError):
+        return None
+
+
+def read_rss_mb() -> Optional[float]:
+    text = _read_text("/proc/self/statm")
+    if not text:
+        return None
+    return int(text.split()[1]) * _PAGE_SIZE / (1024 * 1024)
+
+
+def read_thread_ticks() -> Dict[int, tuple]:
+    """{tid: (state, utime + stime ticks)} من /proc/self/task/<tid>/stat"""
+    ticks = {}
+    try:
+        tids = os.listdir("/proc/self/task")
+    except OSError:
+        return ticks
+    for tid in tids:
+        text = _read_text(f"/proc/self/task/{tid}/stat")
+        if not text:
+            continue  # thread exited between listdir and read
+        # "tid (comm) S ppid ..." — comm may contain spaces / parens, so split after the last ')'
+        fields = text[text.rfind(")") + 2:].split()
+        ticks[int(tid)] = (fields[0], int(fields[11]) + int(fields[12]))
+    return ticks
+
+
+def read_system() -> dict:
+    system = {}
+    try:
+        system["load1"] = round(os.getloadavg()[0], 2)
+    except (AttributeError, OSError):
+        pass
+    temp = _read_text(_TEMP_PATH)
+    if temp:
+        system["temp_c"] = round(int(temp) / 1000, 1)
+    freq = _read_text(_FREQ_PATH)
+    if freq:
+        system["cpu_mhz"] = int(freq) // 1000
+    throttled = _read_text(_THROTTLED_PATH)
+    if throttled:
+        # bit 0: under-voltage, 1: arm freq capped, 2: throttled, 3: soft temp limit (now)
+        system["throttled"] = hex(int(throttled, 16))
+    return system
+
+
+class Telemetry:
+    """
+        telemetry.gauge("audio_queue", audio_queue.qsize)   # أي callable يرجع قيمة
+        with telemetry.inflight("n8n"): ...                 # عدّاد الطلبات الجارية
+        telemetry.start("127.0.0.1:8765")                   # sampler + endpoint
+        telemetry.latest() / telemetry.history(60)
+    """
+
+    def __init__(self, interval: float = 1.0, history: int = 300, print_every: float = 0.0):
+        self.interval = max(0.05, float(interval))
+        self.print_every = print_every
+        self._samples = deque(maxlen=max(1, int(history)))
+        self._gauges: Dict[str, Callable[[], object]] = {}
+        self._inflight: Dict[str, int] = {}
+        self._inflight_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._server = None
+        self._unix_path = None
+        self._started_at = time.time()
+        self._prev_wall = None
+        self._prev_cpu = None
+        self._prev_threads: Dict[int, tuple] = {}
+
+    # ---------------- Sources ----------------
+
+    def gauge(self, name: str, fn: Callable[[], object]) -> None:
+        """fn يُستدعى مرة في كل عينة من ثريد الـ sampler (يجب أن يكون سريعًا وغير حاجب)"""
+        self._gauges[name] = fn
+
+    @contextmanager
+    def inflight(self, name: str):
+        with self._inflight_lock:
+            self._inflight[name] = self._inflight.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            with self._inflight_lock:
+                self._inflight[name] -= 1
+
+    # ---------------- Sampling ----------------
+
+    def sample(self) -> dict:
+        """عينة واحدة (يستدعيها الـ sampler؛ CPU% محسوبة من الفرق مع العينة السابقة)"""
+        t0 = time.perf_counter()
+        wall = time.time()
+        times = os.times()
+        cpu = times.user + times.system
+        dt = (wall - self._prev_wall) if self._prev_wall is not None else 0.0
+
+        names = {t.native_id: t.name for t in threading.enumerate()}
+        thread_ticks = read_thread_ticks()
+        threads = []
+        for tid, (state, ticks) in thread_ticks.items():
+            prev = self._prev_threads.get(tid)
+            cpu_pct = ((ticks - prev[1]) / _CLK_TCK / dt * 100) if prev and dt > 0 else 0.0
+            threads.append({"tid": tid, "name": names.get(tid, "?"), "state": state,
+                            "cpu_pct": round(cpu_pct, 1)})
+        threads.sort(key=lambda t: -t["cpu_pct"])
+
+        gauges = {}
+        for name, fn in list(self._gauges.items()):
+            try:
+                gauges[name] = fn()
+            except Exception as ex:
+                gauges[name] = f"error: {ex}"
+        with self._inflight_lock:
+            inflight = dict(self._inflight)
+
+        sample = {
+            "t": round(wall, 3),
+            "cpu_pct": round((cpu - self._prev_cpu) / dt * 100, 1) if dt > 0 else 0.0,
+            "rss_mb": None,
+            "threads": threads,
+            "gauges": gauges,
+            "inflight": inflight,
+            "system": read_system(),
+        }
+        rss = read_rss_mb()
+        if rss is not None:
+            sample["rss_mb"] = round(rss, 1)
+        self._prev_wall, self._prev_cpu, self._prev_threads = wall, cpu, thread_ticks
+        sample["sample_ms"] = round((time.perf_counter() - t0) * 1000, 3)  # cost of this sample
+        self._samples.append(sample)
+        return sample
+
+    def latest(self) -> Optional[dict]:
+        return self._samples[-1] if self._samples else None
+
+    def history(self, n: Optional[int] = None) -> List[dict]:
+        samples = list(self._samples)
+        return samples[-n:] if n else samples
+
+    @staticmethod
+    def format_line(sample: dict) -> str:
+        parts = [f"cpu {sample['cpu_pct']:.0f}%"]
+        if sample["rss_mb"] is not None:
+            parts.append(f"rss {sample['rss_mb']:.1f}MB")
+        system = sample["system"]
+        if "temp_c" in system:
+            parts.append(f"{system['temp_c']:.1f}°C" + (f" {system['cpu_mhz']}MHz" if "cpu_mhz" in system else ""))
+        if system.get("throttled", "0x0") != "0x0":
+            parts.append(f"throttled {system['throttled']}")
+        parts.extend(f"{name} {value}" for name, value in sample["gauges"].items())
+        busy = [f"{name} {count}" for name, count in sample["inflight"].items() if count]
+        if busy:
+            parts.append("in-flight " + ", ".join(busy))
+        top = [t for t in sample["threads"] if t["cpu_pct"] >= 5]
+        if top:
+            parts.append("top " + ", ".join(f"{t['name']} {t['cpu_pct']:.0f}%" for t in top[:3]))
+        return " | ".join(parts)
+
+    def _run(self) -> None:
+        last_print = time.monotonic()
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                sample = self.sample()
+                if self.print_every > 0 and time.monotonic() - last_print >= self.print_every:
+                    last_print = time.monotonic()
+                    print(f"ℹ️ [Status] {self.format_line(sample)}")
+            except Exception as ex:
+                print(f"⚠️ [Status] sample error: {ex}")
+            next_at += self.interval
+            self._stop.wait(max(0.0, next_at - time.monotonic()))
+
+    # ---------------- Lifecycle ----------------
+
+    def start(self, addr: str = "") -> None:
+        """يبدأ الـ sampler، والـ endpoint لو addr غير فارغ"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.sample()  # CPU% baseline for the first real sample
+        self._thread = threading.Thread(target=self._run, name="StatusMonitor", daemon=True)
+        self._thread.start()
+        if addr:
+            try:
+                self.serve(addr)
+            except OSError as ex:
+                print(f"⚠️ [Status] endpoint {addr} unavailable: {ex}")
+
+    def serve(self, addr: str) -> None:
+        handler = _make_handler(self)
+        if addr.startswith("unix:"):
+            path = addr[len("unix:"):]
+            if os.path.exists(path):
+                os.unlink(path)  # stale socket from a previous run
+            self._server = _UnixHTTPServer(path, handler)
+            self._unix_path = path
+        else:
+            host, _, port = addr.rpartition(":")
+            self._server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+            self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="StatusServer", daemon=True).start()
+        print(f"📡 [Status] serving on {addr} (/status, /history?n=60)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._unix_path:
+            try:
+                os.unlink(self._unix_path)
+            except OSError:
+                pass
+            self._unix_path = None
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _make_handler(telemetry: Telemetry):
+    class StatusHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path in ("/", "/status"):
+                body = {"uptime_s": round(time.time() - telemetry._started_at, 1),
+                        "interval": telemetry.interval, "sample": telemetry.latest()}
+            elif url.path == "/history":
+                n = parse_qs(url.query).get("n", [None])[0]
+                body = {"interval": telemetry.interval,
+                        "samples": telemetry.history(int(n) if n and n.isdigit() else None)}
+            else:
+                self.send_error(404)
+                return
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def address_string(self):
+            return "unix" if isinstance(self.client_address, str) else super().address_string()
+
+        def log_message(self, *args):
+            pass  # keep the assistant's console clean
+
+    return StatusHandler
+
+
+# Process-wide telemetry (like turn_trace.tracer); the sampler runs only after start()
+telemetry = Telemetry(Config.STATUS_INTERVAL, Config.STATUS_HISTORY, Config.STATUS_PRINT_EVERY)
+
+
+# ✅ Quick check
+if __name__ == "__main__":
+    import tempfile
+    import urllib.request
+    from queue import Queue
+
+    demo = Telemetry(interval=0.2, history=50, print_every=0.6)
+    jobs = Queue()
+    demo.gauge("jobs", jobs.qsize)
+
+    def busy(seconds: float):
+        end = time.time() + seconds
+        while time.time() < end:
+            sum(range(1000))
+
+    def fake_request():
+        with demo.inflight("n8n"):
+            time.sleep(0.8)
+
+    demo.start("127.0.0.1:0")
+    port = demo._server.server_address[1]
+    threading.Thread(target=busy, args=(1.2,), name="Busy").start()
+    threading.Thread(target=fake_request, name="AIWorker").start()
+    for i in range(5):
+        jobs.put(i)
+    time.sleep(1.0)
+
+    status = json.load(urllib.request.urlopen(f"http://127.0.0.1:{port}/status"))
+    print(json.dumps(status["sample"], indent=1)[:900])
+    history = json.load(urllib.request.urlopen(f"http://127.0.0.1:{port}/history?n=3"))
+    print(f"history: {len(history['samples'])} samples")
+    demo.stop()
+
+    if hasattr(socketserver, "UnixStreamServer"):
+        import socket
+        path = os.path.join(tempfile.gettempdir(), "telemetry_demo.sock")
+        demo.start(f"unix:{path}")
+        time.sleep(0.3)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        client.sendall(b"GET /status HTTP/1.0\r\n\r\n")
+        reply = b""
+        while chunk := client.recv(65536):
+            reply += chunk
+        client.close()
+        status_line = reply.split(b"\r\n", 1)[0].decode()
+        print(f"unix socket: {status_line}, {len(reply)} bytes")
+        demo.stop()
+
+    costs = [demo.sample()["sample_ms"] for _ in range(200)]
+    print(f"sample(): {sorted(costs)[100]:.3f}ms median")
@@ -0,0 +1,17 @@
+# conftest.py
+# - Modules live next to main.py (no package install): put that folder on sys.path
+# - Config reads the environment at import: point keys / memory files at throwaway values first
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_TMP = tempfile.mkdtemp(prefix="robot-tests-")
+os.environ.setdefault("ELEVENLABS_API_KEY", "x")
+os.environ.setdefault("OPEN_AI_API_KEY", "sk-fake")
+os.environ["MEMORY_DB"] = os.path.join(_TMP, "chat-memory.db")
+os.environ["MEMORY_FILE"] = os.path.join(_TMP, "chat-memory.json")
@@ -0,0 +1,79 @@
+# test_audio_envelope.py
+# - rms_envelope values and partial last hop
+# - EnvelopeChannel publish / append / clear sampled at explicit times, local and shared
+
+import numpy as np
+import pytest
+
+from audio_envelope import EnvelopeChannel, rms_envelope
+
+RATE = 16000
+
+
+def _tone(seconds, amplitude):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * 32767 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+
+def test_rms_envelope_of_a_sine():
+    env = rms_envelope(_tone(0.2, 0.5), RATE)
+    assert len(env) == 10
+    assert env == pytest.approx(0.5 / np.sqrt(2), abs=0.01)
+
+
+def test_rms_envelope_partial_hop_and_float_input():
+    pcm = np.ones(RATE // 50 + 10, dtype=np.float32) * 0.25
+    env = rms_envelope(pcm, RATE)
+    assert len(env) == 2
+    assert env == pytest.approx(0.25)
+    assert rms_envelope(np.zeros((640, 2), np.int16), RATE) == pytest.approx([0.0, 0.0])
+
+
+def test_publish_then_sample_by_time():
+    channel = EnvelopeChannel(max_seconds=2.0)
+    pcm = np.concatenate([_tone(0.1, 0.5), np.zeros(RATE // 10, np.int16)])
+    n = channel.publish(pcm, RATE, start_time=10.0)
+    assert n == 10
+    assert channel.sample(9.99) == 0.0                    # before the utterance
+    assert channel.sample(10.05) == pytest.approx(0.354, abs=0.01)
+    assert channel.sample(10.15) == 0.0                   # silent half
+    assert channel.sample(10.25) == 0.0                   # after the end
+    assert channel.level(10.05) == pytest.approx(1.0)     # clipped at reference
+
+
+def test_append_extends_the_current_utterance():
+    channel = EnvelopeChannel(max_seconds=1.0)
+    channel.publish(_tone(0.1, 0.2), RATE, start_time=0.0)
+    assert channel.sample(0.15) == 0.0
+    assert channel.append(_tone(0.1, 0.4), RATE) == 5
+    assert channel.sample(0.15) == pytest.approx(0.4 / np.sqrt(2), abs=0.01)
+
+
+def test_append_stops_at_capacity():
+    channel = EnvelopeChannel(max_seconds=0.1)  # 5 hops
+    channel.publish(_tone(0.08, 0.2), RATE, start_time=0.0)
+    assert channel.append(_tone(0.1, 0.2), RATE) == 1
+    assert channel.append(_tone(0.1, 0.2), RATE) == 0
+
+
+def test_clear_and_republish_flip_buffers():
+    channel = EnvelopeChannel(max_seconds=1.0)
+    channel.publish(_tone(0.1, 0.5), RATE, start_time=0.0)
+    channel.clear()
+    assert channel.sample(0.05) == 0.0
+    channel.publish(_tone(0.1, 0.1), RATE, start_time=1.0)
+    assert channel.sample(1.05) == pytest.approx(0.1 / np.sqrt(2), abs=0.01)
+
+
+def test_shared_reader_sees_the_writer():
+    writer = EnvelopeChannel(max_seconds=1.0)
+    writer.publish(_tone(0.1, 0.5), RATE, start_time=5.0)
+    name = writer.share()  # existing values move into shared memory
+    reader = EnvelopeChannel(max_seconds=1.0, name=name)
+    try:
+        assert reader.sample(5.05) == pytest.approx(0.354, abs=0.01)
+        writer.publish(_tone(0.1, 0.1), RATE, start_time=6.0)
+        assert reader.sample(6.05) == pytest.approx(0.0707, abs=0.01)
+    finally:
+        reader.close()
+        writer.close()
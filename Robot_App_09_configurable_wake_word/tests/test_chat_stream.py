@@ -0,0 +1,91 @@
+# test_chat_stream.py
+# - StatusPrefixParser / SentenceSplitter on split deltas
+# - chat_stream barge-in against fake_openai_server: the HTTP stream is closed and
+#   only the spoken sentences are stored
+
+import time
+
+import pytest
+
+import ai_model
+import chat_history_manager as history
+from fake_openai_server import start_fake_server, DEFAULT_REPLY
+
+
+def _feed_all(parser, splitter, text, size):
+    out = []
+    for i in range(0, len(text), size):
+        out += splitter.feed(parser.feed(text[i:i + size]))
+    return out
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_status_prefix_is_never_spoken(size):
+    parser, splitter = ai_model.StatusPrefixParser(), ai_model.SentenceSplitter()
+    sentences = _feed_all(parser, splitter, DEFAULT_REPLY, size)
+    tail = splitter.flush()
+    assert parser.status == "Not Important"
+    assert parser.has_prefix
+    assert not any("[" in s or "Not Important" in s for s in sentences)
+    assert sentences[0].startswith("Hello!")
+    assert tail.endswith("]")  # chat_stream strips the closing bracket
+
+
+def test_no_prefix_passes_text_through():
+    parser = ai_model.StatusPrefixParser()
+    spoken = parser.feed("Plain answer without a status.")
+    assert spoken == "Plain answer without a status."
+    assert not parser.has_prefix
+    assert parser.status == "Not Important"
+
+
+def test_important_prefix():
+    parser = ai_model.StatusPrefixParser()
+    assert parser.feed("[Impor") == ""
+    assert parser.feed("tant, My name") == "My name"
+    assert parser.status == "Important"
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    from openai import OpenAI
+    server, base_url = start_fake_server(first_token_delay=0.0, token_delay=0.05)
+    monkeypatch.setattr(ai_model, "client", OpenAI(api_key="sk-fake", base_url=base_url))
+    yield server
+    server.shutdown()
+
+
+def _last_turn():
+    history.flush_memory()
+    return history.get_recent_exchanges(1)[0]
+
+
+def test_full_answer_is_recorded_once_everything_was_spoken(fake_llm):
+    spoken = []
+    stream = ai_model.chat_stream("Hello full", spoken)
+    for sentence in stream:
+        if sentence is None:
+            break
+        spoken.append(sentence)
+    stream.close()
+
+    turn = _last_turn()
+    assert turn["user_input"] == "Hello full"
+    assert ai_model.INTERRUPTED_MARK not in turn["ai_response"]
+    assert turn["ai_response"].startswith("Hello! I am Ziko")
+    assert fake_llm.completed == 1
+
+
+def test_barge_in_closes_stream_and_records_only_spoken(fake_llm):
+    spoken = []
+    stream = ai_model.chat_stream("Hello barge-in", spoken)
+    spoken.append(next(stream))
+    stream.close()  # user talked over the first sentence
+
+    # The server would need ~1s more to finish the reply: it must never get there
+    time.sleep(1.5)
+    assert fake_llm.completed == 0
+
+    turn = _last_turn()
+    assert turn["user_input"] == "Hello barge-in"
+    assert turn["ai_response"] == f"{spoken[0]} {ai_model.INTERRUPTED_MARK}"
@@ -0,0 +1,114 @@
+# test_eye_process.py
+# - ControlBlock seqlock: reader attached by name sees consistent, even-seq snapshots
+# - EyeProcess talking = explicit set_talking() OR TTS activity (no child process started)
+
+import threading
+
+import numpy as np
+import pytest
+
+import eye_process
+from eye_process import ControlBlock, EMOTIONS, GAZE_TARGETS
+from render_scheduler import Activity
+
+
+@pytest.fixture
+def block():
+    owner = ControlBlock()
+    reader = ControlBlock(owner.name)
+    yield owner, reader
+    reader.close()
+    owner.close()
+
+
+def test_defaults_and_updates(block):
+    owner, reader = block
+    seq, running, talking, busy, emotion, gaze_seq, gaze_idx, blink_seq = reader.read()
+    assert seq % 2 == 0
+    assert (running, talking, busy, emotion) == (1, 0, 0, 0)
+
+    owner.update(talking=True, emotion=EMOTIONS.index("happy"))
+    owner.bump("gaze_seq", gaze_idx=GAZE_TARGETS.index("left"))
+    owner.bump("blink_seq")
+    values = reader.read()
+    assert values[0] > seq and values[0] % 2 == 0
+    assert values[2] == 1
+    assert EMOTIONS[values[4]] == "happy"
+    assert (values[5], GAZE_TARGETS[values[6]], values[7]) == (1, "left", 1)
+
+
+def test_status_round_trip(block):
+    owner, reader = block
+    reader.write_status(frames=42)
+    heartbeat, pid, frames = owner.read_status()
+    assert heartbeat > 0 and frames == 42
+
+
+def test_reader_never_sees_a_torn_write(block):
+    owner, reader = block
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            # talking and busy always change together: a torn read would split them
+            owner.update(talking=i & 1, busy=i & 1, gaze_idx=i % 9, emotion=i % 6)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(20000):
+            seq, _, talking, busy, *_ = reader.read()
+            assert seq % 2 == 0
+            assert talking == busy
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_shared_frame_double_buffer():
+    frames = eye_process.SharedFrame((4, 6, 3))
+    reader = eye_process.SharedFrame((4, 6, 3), name=frames.name)
+    try:
+        frames.write(np.full((4, 6, 3), 7, np.uint8))
+        seq, frame = reader.read()
+        assert seq == 1 and frame[0, 0, 0] == 7
+        frames.write(np.full((2, 2, 3), 9, np.uint8))  # smaller: top-left only
+        seq, frame = reader.read()
+        assert seq == 2 and frame[0, 0, 0] == 9 and frame[3, 5, 0] == 0
+    finally:
+        reader.close()
+        frames.close()
+
+
+@pytest.fixture
+def eyes(monkeypatch):
+    monkeypatch.setattr(eye_process, "activity", Activity())
+    proc = eye_process.EyeProcess("unused")  # start() is never called: no child
+    yield proc
+    proc.cleanup()
+
+
+def _talking(proc):
+    return proc.control.read()[2]
+
+
+def test_tts_activity_does_not_clobber_explicit_talking(eyes):
+    eyes.set_talking(True)
+    eye_process.activity.set("tts", True)
+    eye_process.activity.set("tts", False)
+    assert _talking(eyes) == 1  # still talking: set_talking(True) was never undone
+
+    eyes.set_talking(False)
+    assert _talking(eyes) == 0
+
+
+def test_explicit_false_does_not_cut_tts(eyes):
+    eye_process.activity.set("tts", True)
+    eyes.set_talking(False)
+    assert _talking(eyes) == 1
+    assert eyes.control.read()[3] == 1  # busy
+    eye_process.activity.set("tts", False)
+    assert _talking(eyes) == 0
+    assert eyes.control.read()[3] == 0
@@ -0,0 +1,83 @@
+# test_face_pipeline.py
+# - DetectionWorker duty cap: a slow detector uses ≈ duty of one core
+# - TemplateTracker follows a moving patch and refreshes its template on confident matches
+
+import time
+
+import numpy as np
+import pytest
+
+from face_pipeline import DetectionWorker, TemplateTracker
+
+
+class InstantGrabber:
+    """CameraGrabber stand-in: a new frame is always available"""
+
+    def __init__(self):
+        self.seq = 0
+        self.frame = np.zeros((48, 64, 3), np.uint8)
+
+    def latest(self, after_seq=0, timeout=0.5):
+        self.seq += 1
+        return self.seq, self.frame, time.perf_counter()
+
+
+def _sleeping_detector(step):
+    def detect(img):
+        time.sleep(step)
+        return [(10, 10, 20, 20)]
+    return detect
+
+
+@pytest.mark.parametrize("duty", [0.25, 0.5])
+def test_duty_caps_detector_cpu(duty):
+    worker = DetectionWorker(InstantGrabber(), _sleeping_detector(0.04), scale=1.0,
+                             max_fps=1000, idle_fps=1000, duty=duty).start()
+    time.sleep(1.5)
+    worker.stop()
+    assert worker.detector_cpu() == pytest.approx(duty, abs=0.1)
+    assert worker.interval == pytest.approx(0.04 / duty, rel=0.3)
+
+
+def test_max_fps_still_bounds_a_fast_detector():
+    worker = DetectionWorker(InstantGrabber(), _sleeping_detector(0.0), scale=1.0,
+                             max_fps=20, idle_fps=20, duty=0.5).start()
+    time.sleep(0.6)
+    worker.stop()
+    assert worker.interval == pytest.approx(0.05)
+    assert worker.fps() <= 22
+
+
+def _scene(x, shade=200):
+    img = np.zeros((120, 160), np.uint8)
+    img[40:80, x:x + 40] = shade
+    img[50:55, x + 8:x + 14] = 30   # texture so the match is unambiguous
+    img[50:55, x + 26:x + 32] = 30
+    img[68:72, x + 12:x + 28] = 60
+    return img
+
+
+def test_tracker_follows_and_refreshes_the_template():
+    tracker = TemplateTracker(refresh_score=0.85)
+    assert tracker.init(_scene(40), (40, 40, 40, 40))
+    box, score = None, 0.0
+    for x in range(42, 60, 2):
+        box, score = tracker.update(_scene(x))
+        assert score > 0.9
+    assert box[0] == 58
+    assert tracker.refreshes == 9
+
+    # Slow lighting drift: each refresh keeps the template close to the current face
+    for shade in range(195, 150, -5):
+        _, score = tracker.update(_scene(58, shade))
+        assert score > 0.85
+    assert tracker.template[0, 0] < 200
+
+
+def test_low_confidence_keeps_the_old_template():
+    tracker = TemplateTracker(refresh_score=0.85)
+    tracker.init(_scene(40), (40, 40, 40, 40))
+    before = tracker.template.copy()
+    _, score = tracker.update(np.full((120, 160), 90, np.uint8))
+    assert score < 0.85
+    assert np.array_equal(tracker.template, before)
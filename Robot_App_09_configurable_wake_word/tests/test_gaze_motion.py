@@ -0,0 +1,95 @@
+# test_gaze_motion.py
+# - OneEuroFilter: first sample passes through, jitter is damped at rest, big moves converge fast
+# - GazeMapper clamping / mirroring, ServoRateLimiter speed, deadband and write interval
+# - EyeMovementController: follow → release after the face is lost → natural movement
+
+import numpy as np
+import pytest
+
+from gaze_motion import GazeMapper, OneEuroFilter, ServoRateLimiter
+
+DT = 1 / 30
+
+
+def test_first_sample_passes_through_and_output_is_reused():
+    euro = OneEuroFilter(n=2)
+    out = euro(np.array([10.0, 20.0]), DT)
+    assert out.tolist() == [10.0, 20.0]
+    assert euro(np.array([11.0, 21.0]), DT) is out  # preallocated, no allocation per call
+
+
+def test_constant_input_is_a_fixed_point():
+    euro = OneEuroFilter(n=1)
+    for _ in range(50):
+        value = euro(5.0, DT)
+    assert value[0] == pytest.approx(5.0)
+
+
+def test_jitter_is_damped_at_rest():
+    rng = np.random.default_rng(0)
+    euro = OneEuroFilter(n=1, min_cutoff=1.0, beta=0.05)
+    raw = 325.0 + rng.normal(0, 1.5, 120)  # ±6px detector jitter after GazeMapper (iris units)
+    filtered = np.array([euro(x, DT)[0] for x in raw])
+    assert filtered[20:].std() < raw[20:].std() / 2
+
+
+def test_higher_beta_tracks_a_jump_faster():
+    def settle_frames(beta):
+        euro = OneEuroFilter(n=1, min_cutoff=1.0, beta=beta)
+        euro(0.0, DT)
+        for i in range(1, 300):
+            if abs(euro(100.0, DT)[0] - 100.0) < 3.0:
+                return i
+        return 300
+
+    assert settle_frames(0.5) < settle_frames(0.0)
+    assert settle_frames(0.05) <= 15  # ~0.5s at 30 FPS with the face_tracker defaults
+
+
+def test_reset_jumps_without_lag():
+    euro = OneEuroFilter(n=2)
+    euro(np.zeros(2), DT)
+    euro.reset([50.0, 60.0])
+    assert euro(np.array([50.0, 60.0]), DT).tolist() == pytest.approx([50.0, 60.0])
+
+
+def test_mapper_centers_clamps_and_mirrors():
+    mapper = GazeMapper(center=(325.0, 225.0), range_xy=(75.0, 25.0))
+    assert mapper(320, 240, 640, 480).tolist() == [325.0, 225.0]
+    assert mapper(0, 0, 640, 480).tolist() == [250.0, 200.0]
+    assert GazeMapper(gain=3.0)(640, 480, 640, 480).tolist() == [400.0, 250.0]  # clamped
+    assert GazeMapper(mirror_x=True)(0, 240, 640, 480)[0] == 400.0
+
+
+def test_servo_rate_limit_deadband_and_interval():
+    servo = ServoRateLimiter(angle=90, max_speed=100, deadband=1.0, min_interval=0.05, limits=(60, 120))
+    assert servo.step(0.0) == 90
+    servo.set_target(200)                      # clamped to the limit
+    assert servo.target == 120
+    assert servo.step(0.1) == 100              # 100 °/s for 0.1s
+    assert servo.step(0.12) is None            # moved but within min_interval
+    assert servo.step(0.2) == 110
+    servo.set_target(110.4)
+    assert servo.step(0.3) is None             # within the deadband of the last write
+    assert servo.settled()
+
+
+def test_lost_face_releases_to_natural_movement():
+    from face_tracker import EyeMovementController
+    ctrl = EyeMovementController(release_after=1.0)
+    ctrl.follow(380.0, 210.0)
+    for _ in range(60):
+        x, y = ctrl.update(DT)
+    assert ctrl.following and abs(ctrl.current_x - 380.0) < 1.0
+
+    assert not ctrl.release_if_lost(ctrl.last_follow + 0.5)  # face only briefly missing
+    assert ctrl.next_event() <= ctrl.last_follow + 1.0       # the loop wakes up for the release
+    assert ctrl.release_if_lost(ctrl.last_follow + 1.0)
+    assert not ctrl.following
+    assert not ctrl.release_if_lost(ctrl.last_follow + 5.0)  # already natural
+
+    # Natural movement picks up from where the gaze was, not from the old target
+    held = (ctrl.current_x, ctrl.current_y)
+    ctrl.hold_duration = 0.0
+    ctrl.update(DT)
+    assert ctrl.is_transitioning and (ctrl.start_x, ctrl.start_y) == held
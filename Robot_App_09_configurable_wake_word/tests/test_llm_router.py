@@ -0,0 +1,146 @@
+# test_llm_router.py
+# - CircuitBreaker state machine
+# - BackendStats EWMA / percentiles
+# - LLMRouter hedging, failover and finalize-only-the-winner (in-process fake backends)
+
+import threading
+import time
+
+import pytest
+
+from llm_router import BackendStats, CircuitBreaker, LLMBackend, LLMRouter, ERROR_RESPONSE
+
+
+def test_breaker_opens_after_threshold_and_probes_once():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()       # the probe
+    assert not breaker.allow()   # only one at a time
+    breaker.record_failure()     # failed probe: open again
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_stats_ewma_and_percentiles():
+    stats = BackendStats(alpha=0.5)
+    for elapsed in (1.0, 2.0, 3.0, 4.0):
+        stats.record(True, elapsed)
+    stats.record(False, 10.0)
+    assert stats.samples() == 4           # failures add no latency sample
+    assert stats.percentile(0.5) == 3.0
+    assert stats.percentile(0.9) == 4.0
+    assert stats.ewma_latency == pytest.approx(3.125)
+    assert stats.ewma_error == pytest.approx(0.5)
+    assert stats.score(1.0) == pytest.approx(3.125 * 3.0)
+    d = stats.as_dict()
+    assert (d["calls"], d["failures"]) == (5, 1)
+
+
+def _backend(name, delay=0.0, answer=None, fail=False, finalized=None, **kw):
+    def call(text):
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{name} down")
+        return answer if answer is not None else f"{name}: {text}"
+
+    def finalize(text, raw):
+        finalized.append(name)
+        return raw
+
+    return LLMBackend(name, call, finalize if finalized is not None else None, **kw)
+
+
+def _router(backends, **kw):
+    kw.setdefault("hedge_delay", 0.05)
+    kw.setdefault("hedge_min", 0.01)
+    kw.setdefault("timeout", 2.0)
+    return LLMRouter(backends, **kw)
+
+
+def test_fast_primary_answers_without_hedging():
+    finalized = []
+    a, b = _backend("a", finalized=finalized), _backend("b", finalized=finalized)
+    router = _router([a, b])
+    try:
+        assert router.chat("hi") == "a: hi"
+    finally:
+        router.close()
+    assert finalized == ["a"]
+    assert b.stats.calls == 0 and b.stats.hedges == 0
+    assert a.stats.wins == 1
+
+
+def test_slow_primary_is_hedged_and_only_the_winner_is_finalized():
+    finalized = []
+    slow = _backend("slow", delay=0.5, finalized=finalized)
+    fast = _backend("fast", finalized=finalized)
+    router = _router([slow, fast])
+    try:
+        start = time.perf_counter()
+        assert router.chat("hi") == "fast: hi"
+        assert time.perf_counter() - start < 0.4
+        time.sleep(0.6)  # let the loser finish
+    finally:
+        router.close()
+    assert finalized == ["fast"]
+    assert fast.stats.hedges == 1 and fast.stats.wins == 1
+    assert slow.stats.wins == 0 and slow.stats.calls == 1
+
+
+def test_failure_fires_the_next_backend_immediately():
+    broken = _backend("broken", fail=True)
+    empty = _backend("empty", answer="  ")
+    good = _backend("good")
+    router = _router([broken, empty, good], hedge_delay=5.0, hedge_min=5.0)
+    try:
+        start = time.perf_counter()
+        assert router.chat("hi") == "good: hi"
+        assert time.perf_counter() - start < 1.0
+    finally:
+        router.close()
+    assert broken.stats.failures == 1 and empty.stats.failures == 1
+
+
+def test_all_failing_returns_the_error_response():
+    router = _router([_backend("a", fail=True), _backend("b", fail=True)])
+    try:
+        assert router.chat("hi") == ERROR_RESPONSE
+        assert router.chat("   ") == ""
+    finally:
+        router.close()
+
+
+def test_open_circuit_skips_the_backend():
+    broken = _backend("broken", fail=True, failure_threshold=1, reset_timeout=60)
+    good = _backend("good")
+    router = _router([broken, good])
+    try:
+        router.chat("one")
+        assert broken.breaker.state == CircuitBreaker.OPEN
+        assert router.chat("two") == "good: two"
+    finally:
+        router.close()
+    assert broken.stats.calls == 1
+
+
+def test_hedge_counter_is_consistent_under_concurrency():
+    stats = BackendStats()
+    threads = [threading.Thread(target=lambda: [stats.note_hedge() for _ in range(1000)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert stats.as_dict()["hedges"] == 8000
@@ -0,0 +1,172 @@
+# test_memory_store.py
+# - Size / row accounting kept by the triggers
+# - Retention: per-category keep limits, then the byte cap (Not Important first)
+# - Legacy JSON migration, including the merge into a non-empty DB
+# - Summary watermark: unsummarized rows survive retention; legacy JSON rows get stable ids
+
+import json
+import os
+
+import pytest
+
+from memory_store import MemoryStore, IMPORTANT, NOT_IMPORTANT, entry_size
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = MemoryStore(str(tmp_path / "memory.db"), session_id="test")
+    yield s
+    s.close()
+
+
+def _sizes(store):
+    return sum(entry_size(r["user_input"], r["ai_response"]) for r in store.all())
+
+
+def test_triggers_track_bytes_and_rows(store):
+    store.append("hi", "hello", IMPORTANT)
+    store.append_many([("a", "b", NOT_IMPORTANT), ("c", "d", "bogus")])
+    assert store.count() == 3
+    assert store.total_bytes() == _sizes(store)
+
+    store.delete_importance(NOT_IMPORTANT)
+    assert store.count() == 1
+    assert store.total_bytes() == _sizes(store)
+
+
+def test_sessions_are_accounted_separately(tmp_path):
+    path = str(tmp_path / "memory.db")
+    a, b = MemoryStore(path, session_id="a"), MemoryStore(path, session_id="b")
+    try:
+        a.append("x", "y")
+        assert a.count() == 1 and b.count() == 0
+        assert b.total_bytes() == 0
+    finally:
+        a.close()
+        b.close()
+
+
+def test_retention_keeps_newest_per_category(store):
+    for i in range(10):
+        store.append(f"imp {i}", "r", IMPORTANT)
+        store.append(f"not {i}", "r", NOT_IMPORTANT)
+    deleted = store.enforce_retention(keep_important=4, keep_not_important=2)
+    assert deleted == 14
+    assert [r["user_input"] for r in store.all(IMPORTANT)] == [f"imp {i}" for i in range(6, 10)]
+    assert [r["user_input"] for r in store.all(NOT_IMPORTANT)] == ["not 8", "not 9"]
+    assert store.total_bytes() == _sizes(store)
+
+
+def test_byte_cap_only_drops_not_important(store):
+    for i in range(5):
+        store.append(f"imp {i}", "x" * 50, IMPORTANT)
+        store.append(f"not {i}", "x" * 50, NOT_IMPORTANT)
+    row = entry_size("imp 0", "x" * 50)
+    store.enforce_retention(keep_important=100, keep_not_important=100, max_bytes=6 * row)
+    assert store.total_bytes() <= 6 * row
+    assert len(store.all(IMPORTANT)) == 5
+    assert [r["user_input"] for r in store.all(NOT_IMPORTANT)] == ["not 4"]
+
+    # Over the cap with only Important left: facts are kept (bounded by keep_important)
+    store.enforce_retention(keep_important=100, keep_not_important=100, max_bytes=2 * row)
+    assert store.all(NOT_IMPORTANT) == []
+    assert len(store.all(IMPORTANT)) == 5
+    store.enforce_retention(keep_important=3, keep_not_important=100, max_bytes=2 * row)
+    assert [r["user_input"] for r in store.all(IMPORTANT)] == ["imp 2", "imp 3", "imp 4"]
+
+
+def test_keep_zero_clears_the_category(store):
+    store.append("a", "b", NOT_IMPORTANT)
+    store.append("c", "d", IMPORTANT)
+    store.enforce_retention(keep_important=5, keep_not_important=0)
+    assert store.all(NOT_IMPORTANT) == []
+    assert store.count() == 1
+
+
+def _legacy(tmp_path, memory):
+    path = tmp_path / "chat-memory.json"
+    path.write_text(json.dumps(memory), encoding="utf-8")
+    return str(path)
+
+
+def test_migration_imports_and_renames(store, tmp_path):
+    legacy = _legacy(tmp_path, {
+        IMPORTANT: [{"user_input": "my name is Ali", "ai_response": "Nice to meet you"}],
+        NOT_IMPORTANT: [{"user_input": "hi", "ai_response": "hello"}],
+    })
+    assert store.migrate_from_json(legacy) == 2
+    assert not os.path.exists(legacy)
+    assert os.path.exists(legacy + ".migrated")
+    assert store.count() == 2
+
+
+def test_migration_merges_into_a_non_empty_db(store, tmp_path):
+    store.append("hi", "hello", NOT_IMPORTANT)
+    legacy = _legacy(tmp_path, {
+        IMPORTANT: [{"user_input": "my name is Ali", "ai_response": "Nice to meet you"}],
+        NOT_IMPORTANT: [{"user_input": "hi", "ai_response": "hello"}],
+    })
+    assert store.migrate_from_json(legacy) == 1  # the duplicate is skipped, nothing is lost
+    assert store.count() == 2
+    assert store.all(IMPORTANT)[0]["user_input"] == "my name is Ali"
+
+
+def test_migration_keeps_an_unreadable_file(store, tmp_path):
+    path = tmp_path / "chat-memory.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert store.migrate_from_json(str(path)) == 0
+    assert path.exists()
+
+
+def test_json_backend_applies_the_same_policy(monkeypatch):
+    import chat_history_manager as history
+    monkeypatch.setattr(history.Config, "MEMORY_KEEP_IMPORTANT", 3)
+    monkeypatch.setattr(history.Config, "MEMORY_KEEP_NOT_IMPORTANT", 100)
+    row = entry_size("imp 0", "x" * 50)
+    monkeypatch.setattr(history.Config, "MEMORY_MAX_BYTES", 4 * row)
+    memory = {
+        IMPORTANT: [{"user_input": f"imp {i}", "ai_response": "x" * 50} for i in range(5)],
+        NOT_IMPORTANT: [{"user_input": f"not {i}", "ai_response": "x" * 50} for i in range(5)],
+    }
+    history._apply_retention(memory)
+    assert [e["user_input"] for e in memory[IMPORTANT]] == ["imp 2", "imp 3", "imp 4"]
+    assert [e["user_input"] for e in memory[NOT_IMPORTANT]] == ["not 4"]
+
+
+def test_retention_never_drops_rows_past_the_summary(store):
+    store.append_many([(f"not {i}", "x" * 50, NOT_IMPORTANT) for i in range(6)])
+    upto = store.newest(6)[-2]["id"]  # only "not 0" and "not 1" are summarized
+    store.enforce_retention(keep_important=10, keep_not_important=1, max_bytes=0, protect_after=upto)
+    assert [r["user_input"] for r in store.all()] == [f"not {i}" for i in range(2, 6)]
+
+
+def test_json_retention_respects_the_summary_watermark(monkeypatch):
+    import chat_history_manager as history
+    monkeypatch.setattr(history, "_summary_guard", True)
+    monkeypatch.setattr(history.Config, "MEMORY_KEEP_NOT_IMPORTANT", 1)
+    memory = {
+        IMPORTANT: [],
+        NOT_IMPORTANT: [{"user_input": f"not {i}", "ai_response": "x", "ts": float(i + 1)} for i in range(5)],
+        "Summary": {"text": "s", "upto": 2.0},
+    }
+    history._apply_retention(memory)
+    assert [e["user_input"] for e in memory[NOT_IMPORTANT]] == ["not 2", "not 3", "not 4"]
+
+
+def test_legacy_json_entries_get_stable_ids(monkeypatch, tmp_path):
+    import chat_history_manager as history
+    path = tmp_path / "legacy.json"
+    path.write_text(json.dumps({
+        IMPORTANT: [{"user_input": "imp", "ai_response": "a"}],
+        NOT_IMPORTANT: [{"user_input": "old", "ai_response": "b"},
+                        {"user_input": "new", "ai_response": "c", "ts": 1_700_000_000.0}],
+    }), encoding="utf-8")
+    monkeypatch.setattr(history, "MEMORY_BACKEND", "json")
+    monkeypatch.setattr(history, "MEMORY_FILE", str(path))
+    monkeypatch.setattr(history, "_memory_cache", None)
+
+    rows = history.get_exchanges_between(0, float("inf"))
+    assert [r["user_input"] for r in rows] == ["imp", "old", "new"]
+    assert [r["id"] for r in rows[:2]] == [1.0, 2.0]
+    # Summarized up to the first legacy row: the rest is still reachable
+    assert [r["user_input"] for r in history.get_exchanges_between(rows[0]["id"], float("inf"))] == ["old", "new"]
@@ -0,0 +1,130 @@
+# test_memory_writer.py
+# - Snapshot coalescing (latest wins), row batching, op ordering against rows
+# - Failed flushes put the data back; flush() / stop() drain everything
+
+import json
+import os
+
+from memory_writer import MemoryWriter, atomic_write_json
+
+
+class Sink:
+    def __init__(self, fail_rows: int = 0):
+        self.snapshots = []
+        self.batches = []
+        self.events = []
+        self.fail_rows = fail_rows
+
+    def write_snapshot(self, memory):
+        self.snapshots.append(memory)
+        return 1
+
+    def write_rows(self, rows):
+        if self.fail_rows:
+            self.fail_rows -= 1
+            raise OSError("disk full")
+        self.batches.append(list(rows))
+        self.events += [("row", u) for u, _, _ in rows]
+
+
+def test_latest_snapshot_wins():
+    sink = Sink()
+    writer = MemoryWriter(write_snapshot=sink.write_snapshot)  # not started: flush() writes inline
+    for i in range(5):
+        writer.put_snapshot({"Not Important": [{"user_input": str(i), "ai_response": ""}]})
+    assert writer.flush()
+    assert len(sink.snapshots) == 1
+    assert sink.snapshots[0]["Not Important"][0]["user_input"] == "4"
+    assert writer.get_stats()["coalesced"] == 4
+
+
+def test_snapshot_is_decoupled_from_the_callers_lists():
+    sink = Sink()
+    writer = MemoryWriter(write_snapshot=sink.write_snapshot)
+    memory = {"Important": []}
+    writer.put_snapshot(memory)
+    memory["Important"].append({"user_input": "late", "ai_response": ""})
+    writer.flush()
+    assert sink.snapshots[0]["Important"] == []
+
+
+def test_rows_are_batched_into_one_write():
+    sink = Sink()
+    writer = MemoryWriter(write_rows=sink.write_rows, flush_interval=60)
+    for i in range(10):
+        writer.put_rows([(f"u{i}", "a", "Not Important")])
+    assert writer.queue_depth() == 10
+    assert len(writer.pending_rows()) == 10
+    writer.flush()
+    assert len(sink.batches) == 1
+    assert writer.queue_depth() == 0
+    assert writer.get_stats()["rows_written"] == 10
+
+
+def test_ops_run_after_the_rows_queued_before_them():
+    sink = Sink()
+    writer = MemoryWriter(write_rows=sink.write_rows)
+    writer.put_rows([("a", "", "Not Important"), ("b", "", "Not Important")])
+    writer.put_op(lambda: sink.events.append(("op", "cleanup")))
+    writer.put_rows([("c", "", "Not Important")])
+    writer.flush()
+    assert sink.events == [("row", "a"), ("row", "b"), ("op", "cleanup"), ("row", "c")]
+    assert writer.get_stats()["ops"] == 1
+
+
+def test_failing_op_does_not_block_rows():
+    sink = Sink()
+    writer = MemoryWriter(write_rows=sink.write_rows)
+
+    def broken():
+        raise RuntimeError("boom")
+
+    writer.put_op(broken)
+    writer.put_rows([("a", "", "Not Important")])
+    writer.flush()
+    assert sink.events == [("row", "a")]
+    assert writer.queue_depth() == 0
+
+
+def test_failed_rows_are_retried_in_order():
+    sink = Sink(fail_rows=1)
+    writer = MemoryWriter(write_rows=sink.write_rows)
+    writer.put_rows([("a", "", "Not Important")])
+    writer.put_op(lambda: sink.events.append(("op", "x")))
+    writer.flush()
+    assert sink.events == []
+    assert writer.get_stats()["errors"] == 1
+    assert writer.queue_depth() == 2
+
+    writer.put_rows([("b", "", "Not Important")])
+    writer.flush()
+    assert sink.events == [("row", "a"), ("op", "x"), ("row", "b")]
+    assert writer.get_stats()["rows_written"] == 2
+
+
+def test_byte_threshold_wakes_the_worker():
+    sink = Sink()
+    writer = MemoryWriter(write_rows=sink.write_rows, flush_interval=60, flush_bytes=10).start()
+    try:
+        writer.put_rows([("x" * 20, "", "Not Important")])
+        assert writer.flush(timeout=2.0)
+        assert sink.events == [("row", "x" * 20)]
+    finally:
+        writer.stop()
+
+
+def test_stop_flushes_everything():
+    sink = Sink()
+    writer = MemoryWriter(write_rows=sink.write_rows, flush_interval=60).start()
+    writer.put_rows([("a", "", "Not Important")])
+    writer.stop()
+    assert sink.events == [("row", "a")]
+
+
+def test_atomic_write_json(tmp_path):
+    path = str(tmp_path / "memory.json")
+    size = atomic_write_json(path, {"k": "قيمة"})
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"k": "قيمة"}
+    assert size == os.path.getsize(path)
+    assert [p for p in os.listdir(tmp_path) if p.startswith(".tmp-")] == []
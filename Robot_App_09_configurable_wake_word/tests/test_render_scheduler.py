@@ -0,0 +1,139 @@
+# test_render_scheduler.py
+# - RenderScheduler deadlines on a fake clock: steady ticks, drops re-anchor, busy FPS, idle waits
+# - Activity nesting and listeners
+
+import pytest
+
+import render_scheduler
+from render_scheduler import Activity, RenderScheduler
+
+
+class FakeClock:
+    """perf_counter + Event whose wait() advances the clock instead of sleeping"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.woken_at = None  # clock value at which the wake event fires
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    # Event API
+    def wait(self, timeout):
+        if self.woken_at is not None and self.woken_at <= self.now + timeout:
+            self.now = max(self.now, self.woken_at)
+            self.woken_at = None
+            return True
+        self.now += timeout
+        return False
+
+    def set(self):
+        self.woken_at = self.now
+
+    def clear(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(render_scheduler, "time", clock)
+    return clock
+
+
+def _scheduler(clock, **kw):
+    return RenderScheduler(activity_source=Activity(), wake=clock, **kw)
+
+
+def test_steady_ticks_follow_the_period(clock):
+    scheduler = _scheduler(clock, fps=10)
+    scheduler.wait()
+    starts = []
+    for _ in range(5):
+        dt = scheduler.wait()
+        starts.append(clock.now)
+        assert dt == pytest.approx(0.1)
+        clock.sleep(0.02)  # frame work
+    assert [b - a for a, b in zip(starts, starts[1:])] == pytest.approx([0.1] * 4)
+    assert scheduler.dropped == 0
+
+
+def test_late_frames_are_dropped_not_bursted(clock):
+    scheduler = _scheduler(clock, fps=10, max_dt=0.25)
+    scheduler.wait()
+    clock.sleep(0.35)  # one very slow frame: deadlines at +0.1, +0.2, +0.3 passed
+    dt = scheduler.wait()
+    assert scheduler.dropped == 2  # the frame drawn now serves one of them
+    assert dt == 0.25  # clamped for the animation
+    # Re-anchored: the next frame is a full period later, not immediately
+    before = clock.now
+    scheduler.wait()
+    assert clock.now - before == pytest.approx(0.1)
+
+
+def test_busy_activity_lowers_the_rate(clock):
+    scheduler = _scheduler(clock, fps=30, busy_fps=10)
+    scheduler.wait()
+    scheduler.activity.set("tts", True)
+    scheduler.wait()  # deadline already planned at 30 FPS
+    before = clock.now
+    scheduler.wait()
+    assert scheduler.target_fps == 10
+    assert clock.now - before == pytest.approx(0.1)
+    scheduler.activity.set("tts", False)
+    scheduler.wait()
+    assert scheduler.target_fps == 30
+
+
+def test_idle_wait_sleeps_until_the_next_event(clock):
+    scheduler = _scheduler(clock, fps=30, max_idle=0.5)
+    scheduler.wait()
+    before = clock.now
+    scheduler.wait(until=before + 0.3)
+    assert clock.now - before == pytest.approx(0.3)
+    before = clock.now
+    scheduler.wait(until=before + 10.0)  # capped by max_idle
+    assert clock.now - before == pytest.approx(0.5)
+    assert scheduler.idle_waits == 2
+    assert scheduler.dropped == 0
+
+
+def test_invalidate_wakes_an_idle_wait(clock):
+    scheduler = _scheduler(clock, fps=30)
+    scheduler.wait()
+    clock.woken_at = clock.now + 0.05
+    before = clock.now
+    scheduler.wait(until=before + 0.4)
+    assert clock.now - before == pytest.approx(0.05)
+    assert scheduler.dropped == 0
+
+
+def test_frame_stats(clock):
+    scheduler = _scheduler(clock, fps=10)
+    for presented in (True, True, False):
+        scheduler.wait()
+        scheduler.begin()
+        clock.sleep(0.01)
+        scheduler.end(presented)
+    stats = scheduler.get_stats()
+    assert (stats["frames"], stats["skipped"]) == (2, 1)
+    assert stats["avg_frame_ms"] == pytest.approx(10.0)
+
+
+def test_activity_nesting_and_listeners():
+    activity = Activity()
+    seen = []
+    activity.subscribe(seen.append)
+    with activity.busy("tts"):
+        with activity.busy("tts"):
+            activity.set("stt", True)
+        assert activity.active() == ["stt", "tts"]
+    activity.set("stt", False)
+    assert not activity.is_busy()
+    activity.unsubscribe(seen.append)
+    activity.set("x", True)
+    assert seen[-1] == []
+    assert seen[0] == ["tts"]
@@ -0,0 +1,96 @@
+# test_servo_channel.py
+# - ServoChannel coalescing, rate cap, length validation and neutral start (in-memory device)
+
+import time
+
+import pytest
+
+from servo_channel import ServoChannel, NEUTRAL
+
+
+class RecordingDevice:
+    """cvzone-like device: sendData(values) only, optionally slow"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.frames = []
+
+    def sendData(self, values):
+        if self.delay:
+            time.sleep(self.delay)
+        self.frames.append(list(values))
+
+
+def test_targets_start_neutral():
+    channel = ServoChannel(RecordingDevice(), servos=3)
+    try:
+        assert channel._targets == [NEUTRAL] * 3
+        channel.set(2, NEUTRAL)  # no change from the neutral start: nothing to write
+        assert channel.flush()
+        assert channel.writes == 0
+    finally:
+        channel.close()
+
+
+def test_too_many_values_are_rejected_not_raised():
+    device = RecordingDevice()
+    channel = ServoChannel(device, servos=3)
+    try:
+        assert channel.sendData([1, 2, 3, 4]) is False
+        assert channel.stats()["rejected"] == 1
+        assert channel.sendData([1, 2, 3]) is True
+        assert channel.flush()
+        assert device.frames[-1] == [1, 2, 3]
+    finally:
+        channel.close()
+
+
+def test_bad_index_and_initial_length():
+    with pytest.raises(ValueError):
+        ServoChannel(RecordingDevice(), servos=3, initial=[90, 90])
+    channel = ServoChannel(RecordingDevice(), servos=2)
+    try:
+        with pytest.raises(IndexError):
+            channel.set(2, 10)
+    finally:
+        channel.close()
+
+
+def test_fast_targets_are_coalesced_to_the_latest():
+    device = RecordingDevice(delay=0.05)
+    channel = ServoChannel(device, servos=3, max_rate=10)
+    try:
+        for angle in range(60, 120):
+            channel.sendData([0, 0, angle])
+        assert channel.flush(timeout=2.0)
+    finally:
+        channel.close()
+    assert device.frames[-1] == [0, 0, 119]
+    assert len(device.frames) < 10
+    assert channel.coalesced >= 50
+    assert channel.requests == 60
+
+
+def test_rate_cap_spaces_writes():
+    device = RecordingDevice()
+    channel = ServoChannel(device, servos=1, max_rate=20)
+    stamps = []
+    device.sendData = lambda values: stamps.append(time.perf_counter())
+    try:
+        for angle in range(5):
+            channel.set(0, angle)
+            assert channel.flush()
+    finally:
+        channel.close()
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert len(stamps) == 5
+    assert min(gaps) >= 0.045
+
+
+def test_close_writes_the_last_target():
+    device = RecordingDevice()
+    channel = ServoChannel(device, servos=2, max_rate=1)
+    channel.sendData([10, 20])
+    channel.sendData([30, 40])
+    channel.close()
+    assert device.frames[-1] == [30, 40]
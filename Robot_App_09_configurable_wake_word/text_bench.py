@@ -0,0 +1,344 @@
+# text_bench.py
+# Microbenchmarks for the per-turn text hot paths (replaces the ad-hoc __main__ stress loops
+# in utilities.py / local_commands.py for performance work)
+# - Benches: WakeWordDetector.extract_after_wake, StopCommandDetector.is_stop_with_optional_wake,
+#   LocalCommandHandler.handle and the normalization helpers
+# - Input: a seeded corpus of realistic STT transcripts (Arabic / English / code-switched,
+#   wake / near-miss wake, stop, local commands, long AI questions, STT junk)
+# - Method: warmup passes, then N timed passes over the whole corpus (gc off while timing);
+#   passes are interleaved across benches; ops/s comes from the best pass (noise only adds
+#   time), median / p90 ns per call and the IQR spread show how noisy the run was
+# - "reference" is a fixed builtin-only workload: baseline ops/s are scaled by its ratio so a
+#   baseline saved on another machine (or a busier Pi) still gives a usable comparison
+# - hits = how many corpus items each bench accepts: a change in hits is a behavior change,
+#   reported as a failure like a slowdown
+# - Gate: compared against the committed text_bench_baseline.json by default, exit code 1 when
+#   a bench is slower than the threshold allows
+#
+# Usage:
+#   python text_bench.py                                  # run + compare with the committed baseline
+#   python text_bench.py --filter wake --reps 50 --out run.json
+#   python text_bench.py --threshold 0.1
+#   python text_bench.py --save-baseline text_bench_baseline.json   # after an intended change
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from local_commands import LocalCommandHandler
+from utilities import StopCommandDetector, WakeWordDetector
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "text_bench_baseline.json")
+
+
+# ============================================================
+# Corpus
+# ============================================================
+
+WAKE_EN = ["Ziko", "ziko", "Zico,", "hey zico", "Hey Ziko,", "hello ziko,", "Zeeko", "ZEeCo,",
+           "Dziko,", "Dico", "zyko", "Zeko."]
+WAKE_AR = ["زيكو", "يا زيكو", "زيكو،", "يا زيكو،", "زيكو:", "زِيكو", "يازيكو"]
+NEAR_MISS = ["Nico open the calendar", "Zika is a virus", "sorry, ziko open mail", "Z.",
+             "the echo in this room is loud", "نيكو افتح البريد", "قلت لزيكو امس", "zebra crossing ahead"]
+
+COMMANDS_EN = ["play some music", "what's the weather", "open settings", "read my latest email",
+               "turn on the lights", "set a timer for ten minutes", "what's up", "tell me a joke",
+               "call mom", "remind me to buy milk tomorrow", "how far is the moon"]
+COMMANDS_AR = ["افتح البريد", "ابحث عن الأخبار", "شغل موسيقى", "كم درجة الحرارة اليوم",
+               "احكيلي نكتة", "شغّل الأضواء", "ذكرني أشتري حليب بكرة", "اتصل بأمي", "وش الأخبار"]
+
+STOP_EN = ["stop", "Stop.", "stop!", "enough", "cancel that", "quit", "exit", "halt"]
+STOP_AR = ["وقف", "توقف", "خلاص", "بس", "اسكت", "كفاية", "خلاص كده", "وقف التشغيل", "ستوب"]
+
+LOCAL_EN = ["hello", "hi there", "good morning", "what time is it", "what's the time?",
+            "what date is it", "what day is it", "thank you", "thanks a lot", "how are you",
+            "what's up", "what can you do", "help", "goodbye", "see you", "good night",
+            "wake up", "are you there", "hello, what's the capital of France?"]
+LOCAL_AR = ["مرحبا", "السلام عليكم", "صباح الخير", "كم الساعة", "الوقت الان", "ما التاريخ",
+            "اي يوم اليوم", "شكرا", "شكرا جزيلا", "يعطيك العافية", "كيف حالك", "شلونك",
+            "مساعدة", "مع السلامة", "تصبح على خير", "استيقظ", "موجود", "مرحبا كيف اطبخ الرز"]
+
+QUESTION_EN = [
+    "can you explain how photosynthesis works in simple words",
+    "what is the difference between a virus and a bacteria",
+    "I was thinking about going to the beach this weekend but the forecast says it might rain, "
+    "what do you think I should do instead",
+    "who wrote the book one hundred years of solitude and when was it published",
+    "give me three ideas for a healthy dinner with chicken and rice",
+    "why is the sky blue during the day and red at sunset",
+]
+QUESTION_AR = [
+    "ممكن تشرح لي كيف تعمل الطاقة الشمسية",
+    "ما هو الفرق بين الفيروس والبكتيريا",
+    "كنت أفكر أروح البحر نهاية الأسبوع بس الجو ممكن يمطر، شو رأيك أسوي بدالها",
+    "مين كتب رواية مئة عام من العزلة وامتى نشرت",
+    "اعطني ثلاث أفكار لعشاء صحي بالدجاج والرز",
+    "لماذا تكون السماء زرقاء في النهار وحمراء عند الغروب",
+]
+MIXED = ["زيكو play some music", "hey ziko شو الأخبار", "زيكو open settings", "ziko شغل الأغاني",
+         "ok زيكو stop", "يا زيكو what time is it"]
+JUNK = ["", " ", "...", "uh", "um, hmm", "[music]", "Thank you.", "Thanks for watching!",
+        "اشتركوا في القناة", "ترجمة نانسي قنقر", "you", "ok"]
+TAILS_EN = ["", "", "", " please", " now", " right now please", "?", "!"]
+TAILS_AR = ["", "", "", " لو سمحت", " الحين", " من فضلك", "؟"]
+
+# (weight, category)
+MIX = [(18, "wake_en"), (18, "wake_ar"), (10, "stop"), (6, "wake_stop"), (16, "local"),
+       (14, "question"), (5, "mixed"), (6, "near_miss"), (7, "junk")]
+
+
+def _decorate(rng: random.Random, text: str) -> str:
+    """تنويعات STT: حروف كبيرة، مسافات زائدة، تطويل عربي"""
+    roll = rng.random()
+    if roll < 0.08:
+        return text.upper()
+    if roll < 0.16:
+        return "  " + text + " "
+    if roll < 0.22 and "ا" in text:
+        return text.replace("ا", "ـا", 1)
+    return text
+
+
+def make_corpus(size: int = 4000, seed: int = 0) -> List[str]:
+    """Seeded, deterministic corpus of STT-like transcripts"""
+    rng = random.Random(seed)
+    categories = [c for w, c in MIX for _ in range(w)]
+    corpus = []
+    for _ in range(size):
+        category = rng.choice(categories)
+        arabic = rng.random() < 0.5
+        if category == "wake_en":
+            text = f"{rng.choice(WAKE_EN)} {rng.choice(COMMANDS_EN + LOCAL_EN)}{rng.choice(TAILS_EN)}"
+        elif category == "wake_ar":
+            text = f"{rng.choice(WAKE_AR)} {rng.choice(COMMANDS_AR + LOCAL_AR)}{rng.choice(TAILS_AR)}"
+        elif category == "stop":
+            text = rng.choice(STOP_AR if arabic else STOP_EN)
+        elif category == "wake_stop":
+            text = f"{rng.choice(WAKE_AR)} {rng.choice(STOP_AR)}" if arabic \
+                else f"{rng.choice(WAKE_EN)} {rng.choice(STOP_EN)}"
+        elif category == "local":
+            text = rng.choice(LOCAL_AR) + rng.choice(TAILS_AR) if arabic \
+                else rng.choice(LOCAL_EN) + rng.choice(TAILS_EN)
+        elif category == "question":
+            pool = QUESTION_AR if arabic else QUESTION_EN
+            text = rng.choice(pool)
+            if rng.random() < 0.3:  # long turn: two sentences
+                text += ("، و" if arabic else ", and ") + rng.choice(pool)
+            if rng.random() < 0.3:
+                text = f"{rng.choice(WAKE_AR if arabic else WAKE_EN)} {text}"
+        elif category == "mixed":
+            text = rng.choice(MIXED)
+        elif category == "near_miss":
+            text = rng.choice(NEAR_MISS)
+        else:
+            text = rng.choice(JUNK)
+        corpus.append(_decorate(rng, text))
+    return corpus
+
+
+# ============================================================
+# Benches
+# ============================================================
+
+def _reference(text: str) -> bytes:
+    """Builtins only (no project code): machine-speed yardstick for scaling the baseline"""
+    return " ".join(text.lower().split()).replace("ـ", "").encode("utf-8")
+
+
+def make_benches() -> Dict[str, Callable[[str], object]]:
+    """Same wiring as main.py (stop detection here also strips the wake word first)"""
+    wake = WakeWordDetector()
+    stop = StopCommandDetector(extract_after_wake_func=wake.extract_after_wake)
+    local = LocalCommandHandler(language_preference="auto", enable_stats=False)
+    local.handle("warm up")  # compiles the lazy patterns outside the timed passes
+    return {
+        "reference": _reference,
+        "wake.extract_after_wake": wake.extract_after_wake,
+        "stop.is_stop_with_optional_wake": stop.is_stop_with_optional_wake,
+        "local.handle": lambda text: not local.handle(text)[0],  # hit = handled locally
+        "norm.wake_normalize_ar": wake._normalize_ar,
+        "norm.stop_normalize_ar": stop._normalize_ar,
+        "norm.normalize_text": LocalCommandHandler.normalize_text,
+        "norm.detect_language": lambda text: LocalCommandHandler.detect_language(text) == "arabic",
+    }
+
+
+def _hit(value) -> bool:
+    return bool(value[0] if isinstance(value, tuple) else value)
+
+
+def _pass_ns(fn: Callable[[str], object], corpus: List[str]) -> int:
+    start = time.perf_counter_ns()
+    for text in corpus:
+        fn(text)
+    return time.perf_counter_ns() - start
+
+
+def _stats(per_call: List[float], hits: int) -> dict:
+    per_call = sorted(per_call)
+    reps = len(per_call)
+    median = statistics.median(per_call)
+    q1, _, q3 = statistics.quantiles(per_call, n=4) if reps >= 2 else (median, median, median)
+    best = per_call[0]
+    return {
+        "ns_per_call": {
+            "min": round(best, 1),
+            "median": round(median, 1),
+            "mean": round(statistics.fmean(per_call), 1),
+            "p90": round(per_call[min(reps - 1, int(reps * 0.9))], 1),
+            "stdev": round(statistics.stdev(per_call), 1) if reps >= 2 else 0.0,
+        },
+        "iqr_pct": round((q3 - q1) / median * 100, 1) if median else 0.0,
+        "ops_per_s": round(1e9 / best) if best else 0,
+        "hits": hits,
+    }
+
+
+def bench_all(benches: Dict[str, Callable[[str], object]], corpus: List[str], reps: int,
+              warmup: int) -> Dict[str, dict]:
+    """
+    الـ passes متداخلة (round-robin) بين الـ benches: أي تغيّر في حمل الجهاز يصيبها كلها بالتساوي.
+    ops_per_s من أفضل pass (الضجيج يزيد الوقت فقط) — الـ median و p90 للعرض
+    """
+    hits = {name: sum(1 for text in corpus if _hit(fn(text))) for name, fn in benches.items()}
+    for _ in range(warmup):
+        for fn in benches.values():
+            _pass_ns(fn, corpus)
+
+    timings: Dict[str, List[float]] = {name: [] for name in benches}
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(reps):
+            for name, fn in benches.items():
+                timings[name].append(_pass_ns(fn, corpus) / len(corpus))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {name: _stats(timings[name], hits[name]) for name in benches}
+
+
+def run(size: int, seed: int, reps: int, warmup: int, only: Optional[str] = None) -> dict:
+    corpus = make_corpus(size, seed)
+    benches = {name: fn for name, fn in make_benches().items()
+               if not only or name == "reference" or only in name}
+    results = bench_all(benches, corpus, reps, warmup)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(terse=True),
+            "corpus_size": size,
+            "seed": seed,
+            "reps": reps,
+            "warmup": warmup,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "benches": results,
+    }
+
+
+# ============================================================
+# Report / compare
+# ============================================================
+
+def print_report(result: dict) -> None:
+    meta = result["meta"]
+    print(f"📊 text_bench: {meta['corpus_size']} transcripts (seed {meta['seed']}), "
+          f"{meta['reps']} reps, Python {meta['python']} {meta['machine']}")
+    print(f"\n{'bench':<34}{'min ns':>9}{'median ns':>11}{'p90 ns':>10}{'IQR':>8}{'ops/s':>12}{'hits':>7}")
+    for name, r in result["benches"].items():
+        ns = r["ns_per_call"]
+        print(f"{name:<34}{ns['min']:>9.0f}{ns['median']:>11.0f}{ns['p90']:>10.0f}{r['iqr_pct']:>7.1f}%"
+              f"{r['ops_per_s']:>12,}{r['hits']:>7}")
+
+
+def compare(result: dict, baseline: dict, threshold: float, scale: bool = True) -> List[str]:
+    """
+    ops/s لكل bench مقابل الـ baseline (بعد تصحيحه بسرعة الجهاز عبر reference).
+    failure: أبطأ بأكثر من threshold، أو hits مختلفة (تغيّر في السلوك) على نفس الـ corpus
+    """
+    failures = []
+    base_benches = baseline.get("benches", {})
+    factor = 1.0
+    base_ref = base_benches.get("reference", {}).get("ops_per_s")
+    cur_ref = result["benches"].get("reference", {}).get("ops_per_s")
+    if scale and base_ref and cur_ref:
+        factor = cur_ref / base_ref
+    same_corpus = all(baseline.get("meta", {}).get(k) == result["meta"][k] for k in ("corpus_size", "seed"))
+
+    print(f"\n{'vs baseline':<34}{'expected ops/s':>16}{'ops/s':>12}{'change':>9}"
+          f"   (machine factor {factor:.2f})")
+    for name, cur in result["benches"].items():
+        base = base_benches.get(name)
+        if not base or name == "reference":
+            continue
+        expected = base["ops_per_s"] * factor
+        change = cur["ops_per_s"] / expected - 1 if expected else 0.0
+        flag = change < -threshold
+        if flag:
+            failures.append(f"{name}: {expected:,.0f} → {cur['ops_per_s']:,} ops/s ({change:+.0%})")
+        if same_corpus and base.get("hits") is not None and base["hits"] != cur["hits"]:
+            failures.append(f"{name}: hits {base['hits']} → {cur['hits']} (behavior changed)")
+            flag = True
+        print(f"{name:<34}{expected:>16,.0f}{cur['ops_per_s']:>12,}{change:>+8.0%}{'!' if flag else ' '}")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for wake / stop / local-command text paths")
+    parser.add_argument("--size", type=int, default=4000, help="Corpus size (transcripts)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reps", type=int, default=25, help="Timed passes over the corpus per bench")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed passes before timing")
+    parser.add_argument("--filter", help="Only benches whose name contains this")
+    parser.add_argument("--out", help="Write the JSON result here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Compare against this JSON result")
+    parser.add_argument("--no-check", action="store_true", help="Do not compare with a baseline")
+    parser.add_argument("--no-scale", action="store_true", help="Compare raw ops/s (same machine only)")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write the JSON result as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    parser.add_argument("--show-corpus", type=int, metavar="N", help="Print N corpus samples and exit")
+    args = parser.parse_args(argv)
+
+    if args.show_corpus:
+        for text in make_corpus(args.show_corpus, args.seed):
+            print(repr(text))
+        return 0
+
+    result = run(args.size, args.seed, max(1, args.reps), max(0, args.warmup), args.filter)
+    print_report(result)
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            print(f"💾 {path}")
+
+    if args.no_check or args.save_baseline:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️ No baseline at {args.baseline} (create one with --save-baseline)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    failures = compare(result, baseline, args.threshold, scale=not args.no_scale)
+    if failures:
+        print("\n❌ Regressions:")
+        for line in failures:
+            print(f"   {line}")
+        return 1
+    print("\n✅ No regression beyond the threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,15 +4,24 @@
 import io
 import time
 import threading
+import numpy as np
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from Config import Config
+from audio_envelope import envelope
+from audio_io import open_output
+from turn_trace import tracer
 
-# Try different audio backends
+# Raw PCM requested from ElevenLabs for every backend except pygame (it decodes the MP3 itself):
+# no decoder needed, and the amplitude envelope (mouth / eyes) is computed from the samples
+PCM_RATE = 16000
+PCM_FORMAT = f"pcm_{PCM_RATE}"
+
+# Try different audio backends (pip package pyalsaaudio, module alsaaudio)
 try:
-    import pyalsaaudio
+    import alsaaudio as pyalsaaudio
     _HAS_ALSA = True
 except ImportError:
     _HAS_ALSA = False
@@ -31,7 +40,7 @@ class TextToSpeech:
         if not self.api_key:
             raise ValueError("Missing ELEVENLABS_API_KEY")
 
-        self.url_base = "https://api.elevenlabs.io/v1/text-to-speech"
+        self.url_base = self.cfg.ELEVEN_TTS_URL.rstrip("/")
         
         # ✅ Session مع connection pooling
         self.session = requests.Session()
@@ -63,6 +72,13 @@ class TextToSpeech:
     def _init_audio_backend(self):
         """تهيئة audio backend حسب المتاح"""
         backend = self.cfg.AUDIO_BACKEND
+
+        # audio_io output (Config.AUDIO_OUTPUT: capture / sounddevice / alsa) takes precedence
+        self.output = open_output(self.cfg, source="tts")
+        if self.output is not None:
+            self.backend = "output"
+            print(f"[TTS] Using audio_io output ({self.cfg.AUDIO_OUTPUT})")
+            return
         
         if backend == "alsa" and _HAS_ALSA:
             self.backend = "alsa"
@@ -90,10 +106,13 @@ class TextToSpeech:
     def interrupt(self):
         """قطع التشغيل الحالي"""
         self._interrupt_flag.set()
+        envelope.clear()
         
         # Stop playback based on backend
         try:
-            if self.backend == "pygame" and _HAS_PYGAME:
+            if self.backend == "output":
+                self.output.stop()
+            elif self.backend == "pygame" and _HAS_PYGAME:
                 pygame.mixer.music.stop()
             elif self.backend == "alsa" and hasattr(self, '_alsa_device'):
                 if self._alsa_device:
@@ -105,6 +124,9 @@ class TextToSpeech:
         """إعادة تعيين interrupt flag"""
         self._interrupt_flag.clear()
 
+    def is_interrupted(self) -> bool:
+        return self._interrupt_flag.is_set()
+
     def say(self, text: str, voice: str = None) -> bool:
         """
         تحويل النص لصوت وتشغيله
@@ -134,8 +156,10 @@ class TextToSpeech:
             if self._interrupt_flag.is_set():
                 return False
             
-            # ✅ Play audio
-            return self._play_audio(audio_data)
+            # ✅ Play audio (each backend marks first_audio_out when sound actually starts)
+            played = self._play_audio(audio_data)
+            tracer.mark("playback_end", interrupted=not played)
+            return played
 
     def _fetch_audio(self, text: str, voice_id: str) -> bytes:
         """جلب الصوت من ElevenLabs API"""
@@ -158,6 +182,8 @@ class TextToSpeech:
             resp = self.session.post(
                 url,
                 json=payload,
+                # output / alsa / aplay play raw PCM (no MP3 decoding); pygame gets MP3
+                params=None if self.backend == "pygame" else {"output_format": PCM_FORMAT},
                 timeout=15,
                 stream=True  # ✅ Streaming للسرعة
             )
@@ -169,6 +195,8 @@ class TextToSpeech:
             for chunk in resp.iter_content(chunk_size=8192):
                 if self._interrupt_flag.is_set():
                     return b""
+                if not audio_data:
+                    tracer.mark("tts_first_byte")
                 audio_data += chunk
             
             elapsed = time.time() - start_time
@@ -183,7 +211,9 @@ class TextToSpeech:
     def _play_audio(self, audio_data: bytes) -> bool:
         """تشغيل الصوت حسب الـ backend"""
         try:
-            if self.backend == "alsa":
+            if self.backend == "output":
+                return self._play_output(audio_data)
+            elif self.backend == "alsa":
                 return self._play_alsa(audio_data)
             elif self.backend == "pygame":
                 return self._play_pygame(audio_data)
@@ -193,46 +223,63 @@ class TextToSpeech:
             print(f"[TTS] ❌ Playback error: {e}")
             return False
 
+    @staticmethod
+    def _as_pcm(audio_data: bytes) -> np.ndarray:
+        return np.frombuffer(audio_data[:len(audio_data) // 2 * 2], dtype=np.int16)
+
+    def _mark_started(self) -> None:
+        """first_audio_out: بعد أن يبدأ الـ backend التشغيل فعلًا (بعد الـ decode / تشغيل aplay)"""
+        tracer.mark("first_audio_out", backend=self.backend)
+
+    def _publish_envelope(self, pcm: np.ndarray) -> None:
+        """Envelope للعيون / الفم، مُزاح بتأخير خرج الصوت"""
+        envelope.publish(pcm, PCM_RATE, time.monotonic() + self.cfg.TTS_ENVELOPE_LATENCY)
+
+    def _play_output(self, audio_data: bytes) -> bool:
+        """تشغيل PCM 16kHz عبر audio_io output"""
+        pcm = self._as_pcm(audio_data)
+        self._publish_envelope(pcm)
+        self.output.play(pcm, PCM_RATE)
+        self._mark_started()
+        while self.output.is_active():
+            if self._interrupt_flag.is_set():
+                self.output.stop()
+                return False
+            time.sleep(0.02)
+        return True
+
     def _play_alsa(self, audio_data: bytes) -> bool:
-        """تشغيل باستخدام ALSA"""
+        """تشغيل PCM 16kHz mono باستخدام ALSA"""
         if not _HAS_ALSA:
             return False
         
         try:
-            import wave
+            device = pyalsaaudio.PCM(
+                type=pyalsaaudio.PCM_PLAYBACK,
+                device=self.cfg.AUDIO_DEVICE
+            )
+            device.setchannels(1)
+            device.setrate(PCM_RATE)
+            device.setformat(pyalsaaudio.PCM_FORMAT_S16_LE)
+            device.setperiodsize(1024)
             
-            # Parse WAV to get format
-            wav_io = io.BytesIO(audio_data)
-            with wave.open(wav_io, 'rb') as wf:
-                channels = wf.getnchannels()
-                rate = wf.getframerate()
-                
-                device = pyalsaaudio.PCM(
-                    type=pyalsaaudio.PCM_PLAYBACK,
-                    device=self.cfg.AUDIO_DEVICE
-                )
-                device.setchannels(channels)
-                device.setrate(rate)
-                device.setformat(pyalsaaudio.PCM_FORMAT_S16_LE)
-                device.setperiodsize(1024)
-                
-                self._alsa_device = device
-                
-                # Play chunks
-                pcm_data = wf.readframes(wf.getnframes())
-                chunk_size = 4096
-                
+            self._alsa_device = device
+            
+            pcm_data = self._as_pcm(audio_data).tobytes()
+            self._publish_envelope(np.frombuffer(pcm_data, dtype=np.int16))
+            chunk_size = 4096
+            
+            try:
                 for i in range(0, len(pcm_data), chunk_size):
                     if self._interrupt_flag.is_set():
-                        device.close()
                         return False
-                    
-                    chunk = pcm_data[i:i + chunk_size]
-                    device.write(chunk)
-                
+                    device.write(pcm_data[i:i + chunk_size])
+                    if i == 0:
+                        self._mark_started()
+                return True
+            finally:
                 device.close()
                 self._alsa_device = None
-                return True
                 
         except Exception as e:
             print(f"[TTS] ALSA error: {e}")
@@ -247,6 +294,7 @@ class TextToSpeech:
             sound_io = io.BytesIO(audio_data)
             pygame.mixer.music.load(sound_io)
             pygame.mixer.music.play()
+            self._mark_started()
             
             # انتظار انتهاء التشغيل
             while pygame.mixer.music.get_busy():
@@ -262,35 +310,45 @@ class TextToSpeech:
             return False
 
     def _play_aplay(self, audio_data: bytes) -> bool:
-        """تشغيل باستخدام aplay"""
+        """تشغيل PCM 16kHz mono باستخدام aplay (عبر stdin، بدون ملف مؤقت)"""
         import subprocess
-        import tempfile
-        import os
         
         try:
-            # حفظ مؤقت للملف
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-                tmp.write(audio_data)
-                tmp_path = tmp.name
-            
-            # تشغيل
+            pcm_data = self._as_pcm(audio_data).tobytes()
             process = subprocess.Popen(
-                ["aplay", "-q", tmp_path],
+                ["aplay", "-q", "-D", self.cfg.AUDIO_DEVICE,
+                 "-t", "raw", "-f", "S16_LE", "-r", str(PCM_RATE), "-c", "1", "-"],
+                stdin=subprocess.PIPE,
+                bufsize=0,  # each chunk reaches aplay immediately
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL
             )
+            self._publish_envelope(np.frombuffer(pcm_data, dtype=np.int16))
             
-            # انتظار مع إمكانية المقاطعة
+            # الكتابة بقطع صغيرة: الـ pipe يحجب بسرعة التشغيل، والمقاطعة تُفحص بين القطع
+            chunk_size = 4096
+            try:
+                for i in range(0, len(pcm_data), chunk_size):
+                    if self._interrupt_flag.is_set():
+                        process.terminate()
+                        process.wait(timeout=1)
+                        return False
+                    process.stdin.write(pcm_data[i:i + chunk_size])
+                    if i == 0:
+                        self._mark_started()
+                process.stdin.close()
+            except BrokenPipeError:
+                pass  # aplay exited (terminated / device error)
+            
+            # انتظار نهاية ما في الـ buffer مع إمكانية المقاطعة
             while process.poll() is None:
                 if self._interrupt_flag.is_set():
                     process.terminate()
                     process.wait(timeout=1)
-                    os.unlink(tmp_path)
                     return False
-                time.sleep(0.1)
+                time.sleep(0.05)
             
-            os.unlink(tmp_path)
-            return True
+            return process.returncode == 0
             
         except Exception as e:
             print(f"[TTS] aplay error: {e}")
@@ -8,12 +8,14 @@ import time
 import threading
 import queue
 import numpy as np
-import sounddevice as sd
 from elevenlabs.client import ElevenLabs
 
 import io
 
 from Config import Config
+from audio_envelope import envelope
+from audio_io import open_output
+from turn_trace import tracer
 
 VOICE_IDS = {
     "rachel": "21m00Tcm4TlvDq8ikWAM",
@@ -32,17 +34,23 @@ class TextToSpeech:
         self._elevenlabs = ElevenLabs(api_key=self.cfg.ELEVENLABS_API_KEY)
         self.rate = 16000
         self.dtype = "int16"
+        # Config.AUDIO_OUTPUT (capture / alsa / ...), sounddevice by default
+        self.output = open_output(self.cfg, source="tts") or open_output(self.cfg, "sounddevice")
 
     def interrupt(self):
         self._interrupt_flag.set()
+        envelope.clear()
         try:
-            sd.stop()
+            self.output.stop()
         except Exception:
             pass
 
     def reset_interrupt(self):
         self._interrupt_flag.clear()
 
+    def is_interrupted(self) -> bool:
+        return self._interrupt_flag.is_set()
+
     def say(self, text: str, voice: str = None) -> bool:
         if not text or not text.strip():
             return False
@@ -73,6 +81,8 @@ class TextToSpeech:
                 for chunk in audio_chunks:
                     if self._interrupt_flag.is_set():
                         return False
+                    if not pcm_data:
+                        tracer.mark("tts_first_byte")
                     pcm_data += chunk
                 
                 elapsed = time.time() - start
@@ -83,14 +93,19 @@ class TextToSpeech:
                 
                 # Play directly
                 arr = np.frombuffer(pcm_data, dtype=self.dtype)
-                sd.play(arr, samplerate=self.rate, blocking=False)
+                # Amplitude envelope for the eyes (RMS / 20ms, timestamped at playback start)
+                envelope.publish(arr, self.rate, time.monotonic() + self.cfg.TTS_ENVELOPE_LATENCY)
+                self.output.play(arr, self.rate)
+                tracer.mark("first_audio_out")
                 
-                while sd.get_stream() is not None and sd.get_stream().active:
+                while self.output.is_active():
                     if self._interrupt_flag.is_set():
-                        sd.stop()
+                        self.output.stop()
+                        tracer.mark("playback_end", interrupted=True)
                         return False
                     time.sleep(0.05)
                 
+                tracer.mark("playback_end")
                 return True
                 
             except Exception as e:
@@ -0,0 +1,248 @@
+# turn_trace.py
+# End-to-end latency tracing for one conversation turn (speech start → playback end)
+# - A turn id is assigned when the recorder detects speech start (tracer.begin_turn)
+# - Spans (start/end) and marks (instants) use perf_counter_ns: monotonic, no time.time jumps
+# - Events go into a fixed-size ring: one itertools.count() step + one list store per event,
+#   no lock on the hot path (both are atomic under the GIL); old turns are overwritten
+# - end_turn() prints a one-line per-stage summary
+# - Export: JSONL (one event per line) or Chrome trace (chrome://tracing / ui.perfetto.dev)
+#
+# Stages recorded by main.py / audio_recorder.py / text_to_speech*.py:
+#   capture, vad_end, stt, wake_check, local_commands, n8n | llm | llm_first_sentence,
+#   tts_first_byte, first_audio_out, playback_end
+#
+# Demo: python turn_trace.py
+
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from Config import Config
+
+# Marks whose first occurrence in a turn is reported in the summary (TTS says one per sentence)
+_FIRST_MARKS = ("tts_first_byte", "first_audio_out", "llm_first_sentence")
+
+
+class TurnTracer:
+    """
+        turn = tracer.begin_turn()                 # عند بداية الكلام
+        with tracer.span("stt"): ...               # مرحلة لها بداية ونهاية
+        tracer.mark("first_audio_out")             # لحظة واحدة
+        tracer.end_turn()                          # يطبع ملخص الـ turn
+        tracer.export("turns.json")                # Chrome trace (أو .jsonl)
+    """
+
+    def __init__(self, capacity: int = 4096, enabled: bool = True):
+        self.enabled = enabled
+        self.capacity = max(16, int(capacity))
+        self._ring: List[Optional[tuple]] = [None] * self.capacity
+        self._seq = itertools.count()
+        self._turns = itertools.count(1)
+        self.turn = 0  # current turn (0 = none yet)
+        self._turn_start: Dict[int, int] = {}
+        # perf_counter_ns → wall clock, for exported timestamps
+        self._epoch_ns = time.time_ns() - time.perf_counter_ns()
+
+    # ---------------- Recording (any thread) ----------------
+
+    def begin_turn(self, t_ns: Optional[int] = None) -> int:
+        if not self.enabled:
+            return 0
+        turn = next(self._turns)
+        t_ns = time.perf_counter_ns() if t_ns is None else t_ns
+        self._turn_start[turn] = t_ns
+        self._turn_start.pop(turn - 64, None)  # bounded
+        self.turn = turn
+        self.add("speech_start", t_ns, t_ns, turn)
+        return turn
+
+    def add(self, name: str, start_ns: int, end_ns: int, turn: Optional[int] = None, **args) -> None:
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        seq = next(self._seq)
+        self._ring[seq % self.capacity] = (seq, self.turn if turn is None else turn, name,
+                                           start_ns, end_ns, thread.ident, thread.name, args or None)
+
+    def mark(self, name: str, turn: Optional[int] = None, **args) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.add(name, now, now, turn, **args)
+
+    @contextmanager
+    def span(self, name: str, turn: Optional[int] = None, **args):
+        if not self.enabled:
+            yield
+            return
+        turn = self.turn if turn is None else turn  # keep the turn even if a new one begins meanwhile
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter_ns(), turn, **args)
+
+    def end_turn(self, status: str = "done", verbose: bool = True) -> Optional[dict]:
+        if not self.enabled or not self.turn:
+            return None
+        turn = self.turn
+        self.mark("turn_end", turn, status=status)
+        summary = self.summary(turn)
+        if verbose and status == "done":
+            print(f"⏱️  [Trace] {self.format_summary(summary)}")
+        return summary
+
+    # ---------------- Reading ----------------
+
+    def events(self, turn: Optional[int] = None) -> List[tuple]:
+        """الأحداث الموجودة في الـ ring بالترتيب (turn=None: كلها)"""
+        records = [r for r in list(self._ring) if r is not None and (turn is None or r[1] == turn)]
+        records.sort(key=lambda r: r[0])
+        return records
+
+    def summary(self, turn: int) -> dict:
+        """
+        مدة كل span (ms) وتوقيت كل mark (ms من بداية الكلام).
+        total_ms: من نهاية الكلام (vad_end) حتى أول صوت خارج — الـ latency التي يشعر بها المستخدم
+        """
+        events = self.events(turn)
+        origin = self._turn_start.get(turn, events[0][3] if events else 0)
+        spans: Dict[str, float] = {}
+        marks: Dict[str, float] = {}
+        for _, _, name, start, end, _, _, _ in events:
+            if end > start:
+                spans[name] = spans.get(name, 0.0) + (end - start) / 1e6
+            elif name not in marks or name not in _FIRST_MARKS:
+                marks[name] = (start - origin) / 1e6
+        result = {"turn": turn, "spans": spans, "marks": marks}
+        if "vad_end" in marks and "first_audio_out" in marks:
+            result["total_ms"] = marks["first_audio_out"] - marks["vad_end"]
+        return result
+
+    @staticmethod
+    def format_summary(summary: dict) -> str:
+        parts = [f"{name} {ms / 1000:.2f}s" if ms >= 100 else f"{name} {ms:.1f}ms"
+                 for name, ms in summary["spans"].items()]
+        marks = summary["marks"]
+        if "vad_end" in marks:
+            for name in ("tts_first_byte", "first_audio_out", "playback_end"):
+                if name in marks:
+                    parts.append(f"{name} +{(marks[name] - marks['vad_end']) / 1000:.2f}s")
+        head = f"turn {summary['turn']}"
+        if "total_ms" in summary:
+            head += f": end of speech → first audio {summary['total_ms'] / 1000:.2f}s"
+        return head + (" | " + ", ".join(parts) if parts else "")
+
+    # ---------------- Export ----------------
+
+    def _event_dict(self, record: tuple) -> dict:
+        seq, turn, name, start, end, tid, thread_name, args = record
+        event = {
+            "turn": turn,
+            "name": name,
+            "ts": (self._epoch_ns + start) / 1e9,  # wall clock (s)
+            "dur_ms": round((end - start) / 1e6, 3),
+            "thread": thread_name,
+        }
+        if args:
+            event["args"] = args
+        return event
+
+    def export_jsonl(self, path: str, turn: Optional[int] = None) -> int:
+        events = self.events(turn)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in events:
+                f.write(json.dumps(self._event_dict(record), ensure_ascii=False) + "\n")
+        return len(events)
+
+    def export_chrome(self, path: str, turn: Optional[int] = None) -> int:
+        """Chrome trace event format: سطر لكل thread، الـ turn في args"""
+        events = self.events(turn)
+        trace = []
+        threads = {}
+        for seq, turn_id, name, start, end, tid, thread_name, args in events:
+            threads[tid] = thread_name
+            event = {
+                "name": name,
+                "cat": "turn",
+                "pid": os.getpid(),
+                "tid": tid,
+                "ts": (self._epoch_ns + start) / 1e3,  # µs
+                "args": dict(args or {}, turn=turn_id),
+            }
+            if end > start:
+                event.update(ph="X", dur=(end - start) / 1e3)
+            else:
+                event.update(ph="i", s="p")  # process-wide instant: visible on every row
+            trace.append(event)
+        for tid, thread_name in threads.items():
+            trace.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                          "args": {"name": thread_name}})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(events)
+
+    def export(self, path: str) -> int:
+        """.jsonl → JSONL، غير ذلك → Chrome trace"""
+        if not path:
+            return 0
+        if path.endswith(".jsonl"):
+            count = self.export_jsonl(path)
+        else:
+            count = self.export_chrome(path)
+        print(f"⏱️  [Trace] {count} events → {path}")
+        return count
+
+
+# Process-wide tracer (like render_scheduler.activity)
+tracer = TurnTracer(Config.TRACE_CAPACITY, Config.TRACE_ENABLED)
+
+
+# ✅ Quick check
+if __name__ == "__main__":
+    import tempfile
+
+    demo = TurnTracer(capacity=256)
+
+    def fake_turn(ai_seconds: float):
+        demo.begin_turn()
+        time.sleep(0.3)  # user speaking
+        demo.mark("vad_end")
+        with demo.span("stt"):
+            time.sleep(0.12)
+        with demo.span("wake_check"):
+            pass
+        with demo.span("local_commands"):
+            pass
+
+        def ai():
+            with demo.span("n8n"):
+                time.sleep(ai_seconds)
+        worker = threading.Thread(target=ai, name="AIWorker")
+        worker.start()
+        worker.join()
+        time.sleep(0.05)
+        demo.mark("tts_first_byte")
+        time.sleep(0.02)
+        demo.mark("first_audio_out")
+        time.sleep(0.1)
+        demo.mark("playback_end")
+        demo.end_turn()
+
+    for seconds in (0.2, 0.4):
+        fake_turn(seconds)
+
+    out = tempfile.gettempdir()
+    demo.export_jsonl(os.path.join(out, "turn_trace_demo.jsonl"), turn=1)
+    print(f"JSONL:  {os.path.join(out, 'turn_trace_demo.jsonl')}")
+    demo.export_chrome(os.path.join(out, "turn_trace_demo.json"), turn=2)
+    print(f"Chrome: {os.path.join(out, 'turn_trace_demo.json')}")
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        demo.mark("bench")
+    print(f"mark(): {(time.perf_counter() - start) * 10:.2f}µs per event")
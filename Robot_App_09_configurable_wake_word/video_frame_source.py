@@ -0,0 +1,369 @@
+# video_frame_source.py
+# Streaming frame source for the video eye players (replaces decoding every clip up front)
+# - One decode thread per clip, started lazily on the first request, reading ahead of the playhead
+# - Decoded frames live in one LRU shared by all clips, bounded in bytes (VIDEO_CACHE_MB)
+# - Optional storage reduction: downscale (VIDEO_SCALE) and/or single-channel gray (VIDEO_STORAGE)
+# - Cached frames are returned read-only without copying (cv2.imshow takes them as-is)
+# - A clip that fits in the cap stops decoding after its first loop
+# - Clips already transcoded by frame_store.py are memory-mapped instead (no decoder at all)
+#
+# Benchmark: python video_frame_source.py --bench Resources/eye_videos/02.mp4
+
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from frame_store import open_store
+
+STORAGE_MODES = ("bgr", "gray")
+
+
+# ==========================================
+# DECODED-FRAME LRU
+# ==========================================
+
+class FrameCache:
+    """LRU مشترك بين كل الفيديوهات، محدود بعدد الـ bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self.bytes = 0
+        self._frames: "OrderedDict[Tuple[str, int], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key) -> Optional[np.ndarray]:
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def peek(self, key) -> Optional[np.ndarray]:
+        """مثل get بدون تسجيل hit/miss (انتظار الـ decoder)"""
+        with self._lock:
+            return self._frames.get(key)
+
+    def contains(self, key) -> bool:
+        with self._lock:
+            return key in self._frames
+
+    def put(self, key, frame: np.ndarray) -> None:
+        frame.flags.writeable = False  # shared with the display path, never copied
+        with self._lock:
+            old = self._frames.pop(key, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._frames[key] = frame
+            self.bytes += frame.nbytes
+            while self.bytes > self.max_bytes and len(self._frames) > 1:
+                _, evicted = self._frames.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "frames": len(self._frames),
+                "mb": self.bytes / 1e6,
+                "cap_mb": self.max_bytes / 1e6,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+# ==========================================
+# PER-CLIP DECODER
+# ==========================================
+
+class ClipStream:
+    """
+    Thread فك ترميز لفيديو واحد.
+    يفك الـ frames بالترتيب حتى playhead + readahead ثم ينام؛
+    إذا طُلب frame غير موجود خلف موضع القراءة (loop / قفزة) → seek.
+    """
+
+    def __init__(self, name: str, path: Path, cache: FrameCache, scale: float = 1.0,
+                 storage: str = "bgr", readahead: int = 8):
+        self.name = name
+        self.path = Path(path)
+        self.cache = cache
+        self.scale = float(scale)
+        self.storage = storage
+        self.readahead = max(1, int(readahead))
+        self._window = self.readahead  # clamped to what the cache can hold (first decoded frame)
+
+        # Probe (header only, no decoding)
+        cap = cv2.VideoCapture(str(self.path))
+        if not cap.isOpened():
+            raise IOError(f"Cannot open {self.path}")
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+
+        self._cap = None
+        self._pos = 0          # index of the next frame cap.read() returns
+        self._playhead = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._since_get = 0    # frames decoded since the playhead last moved
+        self.decoded = 0
+        self.seeks = 0
+        self.decode_ms = 0.0
+
+    # ---------------- Decode thread ----------------
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._loop, daemon=True, name=f"Decode-{self.name}")
+            self._thread.start()
+
+    def _convert(self, frame: np.ndarray) -> np.ndarray:
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if self.storage == "gray":
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def _next_missing(self) -> Optional[int]:
+        """أول frame غير موجود في الـ cache ضمن نافذة القراءة المسبقة"""
+        if self._since_get >= 2 * self._window:
+            # The window keeps evicting itself (cache shared with other clips): wait for get()
+            return None
+        count = self.frame_count
+        for step in range(self._window):
+            index = self._playhead + step
+            if count:
+                index %= count
+            if not self.cache.contains((self.name, index)):
+                return index
+        return None
+
+    def _loop(self) -> None:
+        while self._running:
+            with self._cond:
+                index = self._next_missing()
+                while index is None and self._running:
+                    self._cond.wait(0.5)
+                    index = self._next_missing()
+            if not self._running:
+                break
+
+            if self._cap is None:
+                self._cap = cv2.VideoCapture(str(self.path))
+                self._pos = 0
+            if index != self._pos:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                self._pos = index
+                self.seeks += 1
+
+            start = time.perf_counter()
+            ok, frame = self._cap.read()
+            if not ok:
+                # Header frame counts can be wrong: the real end is where decoding stops
+                if self._pos > 0 and self._pos != self.frame_count:
+                    self.frame_count = self._pos
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                self._pos = 0
+                if index == 0:
+                    time.sleep(0.1)  # unreadable clip: don't spin
+                continue
+            frame = self._convert(frame)
+            self.decode_ms += (time.perf_counter() - start) * 1000.0
+            self.decoded += 1
+            if self.decoded == 1:
+                self._clamp_window(frame.nbytes)
+            self.cache.put((self.name, self._pos), frame)
+            self._pos += 1
+            with self._cond:
+                self._since_get += 1
+                self._cond.notify_all()
+
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def _clamp_window(self, frame_bytes: int) -> None:
+        """readahead أكبر من سعة الـ cache يطرد نفسه ويجعل الـ decoder يدور بلا توقف"""
+        fit = max(1, self.cache.max_bytes // max(1, frame_bytes))
+        if fit < self._window:
+            print(f"⚠️ [Video] {self.name}: cache holds {fit} frames, readahead {self.readahead} → {fit}")
+            self._window = fit
+
+    # ---------------- API ----------------
+
+    def get(self, index: int, timeout: float = 0.5) -> Optional[np.ndarray]:
+        """Frame (read-only, بدون نسخ). ينتظر الـ decoder حتى timeout عند الـ miss"""
+        if self.frame_count:
+            index %= self.frame_count
+        self._ensure_started()
+        with self._cond:
+            if index != self._playhead:
+                self._since_get = 0
+            self._playhead = index
+            self._cond.notify_all()
+        key = (self.name, index)
+        frame = self.cache.get(key)
+        if frame is not None:
+            return frame
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            self._since_get = 0  # a miss always gets decoded, even with an exhausted budget
+            self._cond.notify_all()
+            while True:
+                frame = self.cache.peek(key)
+                remaining = deadline - time.perf_counter()
+                if frame is not None or remaining <= 0 or not self._running:
+                    return frame
+                self._cond.wait(remaining)
+
+    def stop(self) -> None:
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+class MappedClip:
+    """نفس واجهة ClipStream لكن من FrameStore (mmap): لا decode، لا cache"""
+
+    def __init__(self, name: str, store):
+        self.name = name
+        self.store = store
+        self.frame_count = len(store)
+        self.fps = store.fps
+        self.decoded = 0
+        self.seeks = 0
+        self.decode_ms = 0.0
+
+    def get(self, index: int, timeout: float = 0.5) -> Optional[np.ndarray]:
+        return self.store.frame(index)
+
+    def stop(self) -> None:
+        self.store.close()
+
+
+class FrameSource:
+    """
+    مصدر frames لعدة فيديوهات:
+        source = FrameSource(VIDEO_PATHS, max_mb=64, scale=0.5)
+        frame = source.get_frame('idle', i)    # read-only, zero-copy
+    """
+
+    def __init__(self, paths: Dict[str, Path], max_mb: float = 64.0, scale: float = 1.0,
+                 storage: str = "bgr", readahead: int = 8, store_dir: Optional[str] = None,
+                 store_size: Optional[Tuple[int, int]] = None):
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"storage must be one of {STORAGE_MODES}")
+        self.cache = FrameCache(int(max_mb * 1024 * 1024))
+        self.clips: Dict[str, ClipStream] = {}
+        for name, path in paths.items():
+            path = Path(path)
+            if not path.exists():
+                print(f"⚠️  Video not found: {name} ({path})")
+                continue
+            store = open_store(path, store_dir, store_size, storage == "gray") if store_dir else None
+            if store is not None:
+                self.clips[name] = MappedClip(name, store)
+                continue
+            try:
+                self.clips[name] = ClipStream(name, path, self.cache, scale, storage, readahead)
+            except IOError as e:
+                print(f"❌ {e}")
+
+    def get_frame(self, name: str, index: int, timeout: float = 0.5) -> Optional[np.ndarray]:
+        clip = self.clips.get(name)
+        return clip.get(index, timeout) if clip is not None else None
+
+    def get_frame_count(self, name: str) -> int:
+        clip = self.clips.get(name)
+        return clip.frame_count if clip is not None else 0
+
+    def stats(self) -> Dict:
+        s = self.cache.stats()
+        s["decoded"] = sum(c.decoded for c in self.clips.values())
+        s["seeks"] = sum(c.seeks for c in self.clips.values())
+        decode_ms = sum(c.decode_ms for c in self.clips.values())
+        s["avg_decode_ms"] = decode_ms / s["decoded"] if s["decoded"] else 0.0
+        return s
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return (f"cache {s['mb']:.0f}/{s['cap_mb']:.0f}MB ({s['frames']} frames), "
+                f"hit {s['hit_rate'] * 100:.0f}%, decoded {s['decoded']} "
+                f"({s['avg_decode_ms']:.1f}ms avg), seeks {s['seeks']}, evicted {s['evictions']}")
+
+    def close(self) -> None:
+        for clip in self.clips.values():
+            clip.stop()
+
+
+# ==========================================
+# BENCHMARK
+# ==========================================
+
+if __name__ == "__main__":
+    import argparse
+    import resource
+
+    parser = argparse.ArgumentParser(description="Streaming video frame source benchmark")
+    parser.add_argument("--bench", default="Resources/eye_videos/02.mp4")
+    parser.add_argument("--cache-mb", type=float, default=64)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--storage", choices=STORAGE_MODES, default="bgr")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30)
+    args = parser.parse_args()
+
+    def rss_mb():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    source = FrameSource({"clip": args.bench}, args.cache_mb, args.scale, args.storage)
+    first = source.get_frame("clip", 0, timeout=5)
+    print(f"Startup (first frame): {(time.perf_counter() - start) * 1000:.0f}ms, "
+          f"{source.get_frame_count('clip')} frames, shape {None if first is None else first.shape}")
+
+    late = 0
+    period = 1.0 / args.fps
+    next_t = time.perf_counter()
+    for i in range(args.frames):
+        t0 = time.perf_counter()
+        if source.get_frame("clip", i, timeout=period) is None:
+            late += 1
+        next_t += period
+        time.sleep(max(0.0, next_t - time.perf_counter()))
+    print(f"Streaming {args.frames} frames @ {args.fps:.0f} FPS: {late} late, {source.format_stats()}")
+    print(f"Peak RSS growth: {rss_mb() - base_rss:.0f}MB")
+    source.close()
+
+    # Eager baseline: what load_all_videos() used to hold (all decoded frames)
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(args.bench)
+    frames = 0
+    frame_bytes = 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames += 1
+        frame_bytes = frame.nbytes
+    cap.release()
+    print(f"Eager decode: {frames} frames in {(time.perf_counter() - start) * 1000:.0f}ms, "
+          f"would hold {frames * frame_bytes / 1e6:.0f}MB")
@@ -0,0 +1,185 @@
+# video_transitions.py
+# Transition engine for the video eye player (fade / slide between clips)
+# - Fade weights come from a precomputed ramp quantized to `steps` levels (no per-frame easing math)
+# - All outputs are written into preallocated buffers (no allocation per frame, no zeros_like)
+# - work_scale < 1: blend on a downscaled working buffer and present it as-is
+#   (the fullscreen window scales it up, so there is no upscale pass)
+# - Clips with different resolutions are resized into a reused buffer instead of failing
+# - Per-transition timing: frames, avg / max ms
+#
+# Benchmark: python video_transitions.py Resources/eye_videos/02.mp4
+
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def smoothstep(t: np.ndarray) -> np.ndarray:
+    return t * t * (3 - 2 * t)
+
+
+class TransitionEngine:
+    """
+        engine.begin('idle', 'talking')
+        frame = engine.fade(frame1, frame2, progress)   # buffer مُعاد استخدامه: اعرضه فوراً
+        engine.finish()                                 # يطبع زمن الـ transition
+    """
+
+    def __init__(self, steps: int = 32, work_scale: float = 1.0, easing: bool = False):
+        self.steps = max(1, int(steps))
+        self.work_scale = float(work_scale)
+        t = np.linspace(0.0, 1.0, self.steps + 1, dtype=np.float32)
+        self.ramp = smoothstep(t) if easing else t
+        self._buffers: Dict[Tuple, np.ndarray] = {}
+
+        # Timing of the transition in progress
+        self.current: Optional[Tuple[str, str]] = None
+        self._frame_ms = []
+        self._started = 0.0
+        self.last_stats: Optional[Dict] = None
+
+    # ---------------- Buffers ----------------
+
+    def _buffer(self, tag: str, shape) -> np.ndarray:
+        key = (tag,) + tuple(shape)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = self._buffers[key] = np.empty(shape, dtype=np.uint8)
+        return buf
+
+    def _fit(self, tag: str, frame: np.ndarray, shape) -> np.ndarray:
+        """نفس الشكل → نفس المصفوفة؛ غير ذلك → resize داخل buffer ثابت"""
+        if frame.shape == tuple(shape):
+            return frame
+        out = self._buffer(tag, shape)
+        cv2.resize(frame, (shape[1], shape[0]), dst=out, interpolation=cv2.INTER_NEAREST)
+        return out
+
+    def _work_shape(self, frame: np.ndarray):
+        if self.work_scale >= 1.0:
+            return frame.shape
+        h, w = frame.shape[:2]
+        return (max(1, int(h * self.work_scale)), max(1, int(w * self.work_scale))) + frame.shape[2:]
+
+    def weight(self, progress: float) -> float:
+        step = min(self.steps, max(0, int(progress * self.steps + 0.5)))
+        return float(self.ramp[step])
+
+    # ---------------- Effects ----------------
+
+    def fade(self, frame1: np.ndarray, frame2: np.ndarray, progress: float) -> np.ndarray:
+        start = time.perf_counter()
+        shape = self._work_shape(frame1)
+        a = self._fit("a", frame1, shape)
+        b = self._fit("b", frame2, shape)
+        alpha = self.weight(progress)
+        out = self._buffer("fade", shape)
+        cv2.addWeighted(a, 1.0 - alpha, b, alpha, 0, dst=out)
+        self._record(start)
+        return out
+
+    def slide(self, frame1: np.ndarray, frame2: np.ndarray, progress: float,
+              direction: str = "left") -> np.ndarray:
+        start = time.perf_counter()
+        shape = frame1.shape
+        b = self._fit("b", frame2, shape)
+        w = shape[1]
+        offset = min(w, max(0, int(w * progress)))
+        out = self._buffer("slide", shape)  # every column is written below
+        if direction == "left":
+            out[:, :w - offset] = frame1[:, offset:]
+            out[:, w - offset:] = b[:, :offset]
+        else:  # right
+            out[:, offset:] = frame1[:, :w - offset]
+            out[:, :offset] = b[:, w - offset:]
+        self._record(start)
+        return out
+
+    # ---------------- Timing ----------------
+
+    def begin(self, source: str = "", target: str = "") -> None:
+        if self.current is not None:
+            self.finish()  # retargeted mid-transition
+        self.current = (source, target)
+        self._frame_ms = []
+        self._started = time.perf_counter()
+
+    def _record(self, start: float) -> None:
+        if self.current is not None:
+            self._frame_ms.append((time.perf_counter() - start) * 1000.0)
+
+    def finish(self, verbose: bool = True) -> Optional[Dict]:
+        if self.current is None:
+            return None
+        ms = self._frame_ms
+        self.last_stats = {
+            "label": " → ".join(self.current),
+            "frames": len(ms),
+            "avg_ms": (sum(ms) / len(ms)) if ms else 0.0,
+            "max_ms": max(ms) if ms else 0.0,
+            "duration_s": time.perf_counter() - self._started,
+        }
+        self.current = None
+        if verbose:
+            s = self.last_stats
+            print(f"[Transition] {s['label']}: {s['frames']} frames in {s['duration_s']:.2f}s, "
+                  f"blend avg {s['avg_ms']:.2f}ms max {s['max_ms']:.2f}ms")
+        return self.last_stats
+
+
+# ==========================================
+# BENCHMARK
+# ==========================================
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "Resources/eye_videos/02.mp4"
+    cap = cv2.VideoCapture(path)
+    frames = []
+    for _ in range(60):
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    if len(frames) < 2:
+        sys.exit(f"Not enough frames in {path}")
+
+    n = 200
+
+    def bench(label, fn):
+        fn(0)
+        start = time.perf_counter()
+        for i in range(n):
+            fn(i)
+        print(f"{label:<36} {(time.perf_counter() - start) / n * 1000:.2f}ms/frame")
+
+    def old_fade(i):
+        # Previous path: get_frame() copies + addWeighted allocation
+        a, b = frames[i % 30].copy(), frames[30 + i % 30].copy()
+        return cv2.addWeighted(a, 1 - (i % 16) / 16, b, (i % 16) / 16, 0)
+
+    def old_slide(i):
+        a, b = frames[i % 30], frames[30 + i % 30]
+        h, w = a.shape[:2]
+        offset = int(w * (i % 16) / 16)
+        result = np.zeros_like(a)
+        result[:, :w - offset] = a[:, offset:]
+        result[:, w - offset:] = b[:, :offset]
+        return result
+
+    full = TransitionEngine()
+    half = TransitionEngine(work_scale=0.5)
+    bench("old fade (copy + alloc)", old_fade)
+    bench("engine fade (full res)", lambda i: full.fade(frames[i % 30], frames[30 + i % 30], (i % 16) / 16))
+    bench("engine fade (work_scale 0.5)", lambda i: half.fade(frames[i % 30], frames[30 + i % 30], (i % 16) / 16))
+    bench("old slide (zeros_like)", old_slide)
+    bench("engine slide", lambda i: full.slide(frames[i % 30], frames[30 + i % 30], (i % 16) / 16))
+
+    full.begin("idle", "talking")
+    for i in range(15):
+        full.fade(frames[i], frames[30 + i], i / 14)
+    full.finish()